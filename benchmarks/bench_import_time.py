@@ -0,0 +1,133 @@
+""" Import Time Benchmark
+
+Measures the cold import time of the package entry points in fresh interpreters and enforces a time budget, along
+with the heavy modules each entry point must not pull in. Exits with a non-zero status when any budget is exceeded.
+
+    python benchmarks/bench_import_time.py [--repeats 5] [--scale 1.0]
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import sys
+import json
+import argparse
+import subprocess
+import dataclasses
+import statistics
+from pathlib import Path
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+PROJECT_BASE_PATH = Path(__file__).parent.parent
+
+DEFAULT_REPEATS = 5
+
+# Statement run in the child interpreter. It reports the import time and the loaded top-level modules
+MEASUREMENT_STATEMENT = """
+import sys, time, json
+start = time.perf_counter()
+{statement}
+duration = time.perf_counter() - start
+print(json.dumps({{"duration": duration, "modules": sorted({{name.split(".")[0] for name in sys.modules}})}}))
+"""
+
+
+# --------------------------------------------------
+#   Dataclasses
+# --------------------------------------------------
+
+@dataclasses.dataclass(frozen=True)
+class ImportBudgetData:
+    name: str
+    statement: str
+    # Stores the allowed median import time in seconds
+    budget: float
+    forbidden_modules: tuple[str, ...] = ()
+
+
+# --------------------------------------------------
+#   Variables
+# --------------------------------------------------
+
+import_budgets = [
+    ImportBudgetData(
+        name="package",
+        statement="import switchsim",
+        budget=0.05,
+        forbidden_modules=("pandas", "numpy", "matplotlib", "ltspice", "yaml"),
+    ),
+    ImportBudgetData(
+        name="cli",
+        statement="import switchsim.cli",
+        budget=0.05,
+        forbidden_modules=("pandas", "numpy", "matplotlib", "ltspice", "yaml"),
+    ),
+    ImportBudgetData(
+        name="process-output",
+        statement="import switchsim.dataset, switchsim.simulation",
+        budget=0.6,
+        forbidden_modules=("matplotlib", "ltspice", "sqlite3", "http", "psutil"),
+    ),
+]
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def measure_import(statement: str) -> tuple[float, set[str]]:
+    completed_process = subprocess.run(
+        [sys.executable, "-c", MEASUREMENT_STATEMENT.format(statement=statement)],
+        cwd=PROJECT_BASE_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    measurement = json.loads(completed_process.stdout.strip().splitlines()[-1])
+    return measurement["duration"], set(measurement["modules"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SwitchSim import time benchmark")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="Number of cold imports per entry point")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier applied to every budget for slow machines")
+    args = parser.parse_args()
+
+    failures = []
+    for import_budget in import_budgets:
+        durations = []
+        loaded_modules = set()
+        for _ in range(args.repeats):
+            duration, modules = measure_import(import_budget.statement)
+            durations.append(duration)
+            loaded_modules |= modules
+
+        median_duration = statistics.median(durations)
+        budget = import_budget.budget * args.scale
+        leaked_modules = sorted(loaded_modules.intersection(import_budget.forbidden_modules))
+
+        print(f"{import_budget.name:<16} {median_duration * 1e3: 8.1f} ms (budget {budget * 1e3: .1f} ms)"
+              f"{' leaked: ' + ', '.join(leaked_modules) if leaked_modules else ''}")
+
+        if median_duration > budget:
+            failures.append(f"{import_budget.name} took {median_duration * 1e3: .1f} ms")
+        if leaked_modules:
+            failures.append(f"{import_budget.name} imported {', '.join(leaked_modules)}")
+
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+# --------------------------------------------------
+#   Entry Point
+# --------------------------------------------------
+
+if __name__ == '__main__':
+    main()
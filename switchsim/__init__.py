@@ -10,9 +10,357 @@ __author__ = 'Joshua Sello'
 #   Imports
 # --------------------------------------------------
 
-from .analysis import *
+import importlib
+
+# Only the dependency-free modules are imported eagerly. Everything else (pandas, numpy, yaml, matplotlib, ...)
+# is loaded on first attribute access, so `import switchsim` and short-lived CLI workers stay cheap
+from . import config, fields, utils
+from .config import *
 from .fields import *
-from .simulation import *
-from .spice import *
 from .utils import *
-from .visualisation import *
+
+
+# --------------------------------------------------
+#   Variables
+# --------------------------------------------------
+
+_lazy_submodule_exports = {
+    "execution": (
+        "SimulationFailureType",
+        "DEFAULT_RETRY_FAILURE_TYPES",
+        "ExecutionPolicyData",
+        "ExecutionResultData",
+        "SimulationExecutionError",
+        "run_process",
+        "kill_process_tree",
+        "read_ltspice_log",
+        "classify_ltspice_log",
+        "execute_with_retries",
+    ),
+    "spice": (
+        "SimulationType",
+        "DoublePulseTestParameters",
+        "BuckConverterParameters",
+        "ParametersType",
+        "DoublePulseTestOutputFields",
+        "BuckConverterOutputFields",
+        "OutputFieldsType",
+        "NETLIST_FILE_SUFFIXES",
+        "modify_ltspice_params",
+        "modify_ltspice_netlist_params",
+        "compile_ltspice_netlist",
+        "is_netlist_file_path",
+        "add_ltspice_directives",
+        "get_save_directive",
+        "set_ltspice_transient_start",
+        "execute_ltspice",
+        "read_ltspice_output",
+        "DEFAULT_WAVEFORM_CHUNK_SIZE",
+        "iter_ltspice_output_chunks",
+        "RawFileHeaderData",
+        "WaveformReadPlanData",
+        "read_ltspice_raw_header",
+        "resolve_output_column_mapping",
+        "compile_waveform_read_plan",
+        "get_waveform_read_plan",
+        "get_raw_file_path",
+        "get_log_file_path",
+        "get_parameters_type",
+        "get_output_fields_type",
+    ),
+    "pyramid": (
+        "DEFAULT_BASE_BUCKET_SIZE",
+        "DEFAULT_LEVEL_FACTOR",
+        "DEFAULT_MIN_BUCKETS",
+        "WaveformPyramidData",
+        "build_waveform_pyramid",
+        "save_waveform_pyramid",
+        "load_waveform_pyramid",
+        "get_pyramid_envelope",
+    ),
+    "analysis": (
+        "ANALYSIS_START_TIME_MARGIN",
+        "NUM_SAMPLES_RESULT_KEY",
+        "get_power_efficiency",
+        "get_steady_state_period",
+        "extract_ripple_performance",
+        "get_turn_on_energy_loss",
+        "get_turn_off_energy_loss",
+        "get_turn_on_energy_loss_period",
+        "get_turn_off_energy_loss_period",
+        "get_num_samples",
+        "get_analysis_start_time",
+        "get_drain_source_energy_between_period",
+        "get_total_drain_source_energy",
+        "get_filtered_between_period",
+        "get_total_drain_source_energy_between_period",
+        "double_pulse_test_result_getters",
+        "buck_converter_getters",
+        "simulation_type_result_getters",
+        "double_pulse_test_result_periods",
+        "buck_converter_periods",
+        "simulation_type_result_periods",
+    ),
+    "chunked": (
+        "WaveformChunkSourceData",
+        "WaveformChunkAccumulator",
+        "PeriodEnergyAccumulator",
+        "SteadyStatePowerEfficiencyAccumulator",
+        "SampleCountAccumulator",
+        "get_turn_on_energy_loss_accumulator",
+        "get_turn_off_energy_loss_accumulator",
+        "get_power_efficiency_accumulator",
+        "get_num_samples_accumulator",
+        "analyse_waveform_chunks",
+        "double_pulse_test_result_accumulators",
+        "buck_converter_accumulators",
+        "simulation_type_result_accumulators",
+    ),
+    "scheduling": (
+        "RUNTIME_HISTORY_FILE_NAME",
+        "MAX_RUNTIME_RECORDS_PER_SOURCE",
+        "RuntimeRecordData",
+        "RuntimeCostModelData",
+        "ScheduledPointData",
+        "RuntimeHistory",
+        "get_default_runtime_history_file_path",
+        "get_simulation_cost",
+        "schedule_simulation_points",
+        "estimate_wall_time",
+        "format_simulation_schedule",
+    ),
+    "governor": (
+        "DEFAULT_TARGET_CPU_UTILISATION",
+        "DEFAULT_MIN_AVAILABLE_MEMORY_FRACTION",
+        "DEFAULT_GOVERNOR_SAMPLE_INTERVAL",
+        "ResourceSampleData",
+        "ConcurrencyGovernor",
+        "sample_resources",
+    ),
+    "metrics": (
+        "METRICS_NAMESPACE",
+        "DEFAULT_METRICS_REFRESH_INTERVAL",
+        "METRICS_CONTENT_TYPE",
+        "MetricType",
+        "MetricData",
+        "SimulationMetrics",
+        "MetricsExporter",
+        "simulation_metrics",
+    ),
+    "sampling": (
+        "DEFAULT_MONTE_CARLO_BATCH_SIZE",
+        "DistributionType",
+        "DistributionData",
+        "MonteCarloData",
+        "draw_distribution_value",
+        "iter_monte_carlo_parameters",
+    ),
+    "streaming": (
+        "DEFAULT_SKETCH_RELATIVE_ACCURACY",
+        "DEFAULT_SKETCH_MAX_NUM_BUCKETS",
+        "DEFAULT_SUMMARY_QUANTILES",
+        "DEFAULT_SUMMARY_NUM_BINS",
+        "RunningStatistics",
+        "QuantileSketch",
+        "StreamingSummary",
+    ),
+    "transport": (
+        "WaveformDescriptorData",
+        "WaveformTransport",
+        "get_default_transport_directory_path",
+        "export_waveform",
+        "import_waveform",
+    ),
+    "storage": (
+        "COMPRESSED_WAVEFORM_FILE_SUFFIX",
+        "SHARED_COLUMN_FILE_PREFIX",
+        "DEFAULT_SHARED_FIELDS",
+        "STORAGE_BLOCK_SIZE",
+        "save_compressed_waveform",
+        "load_compressed_waveform",
+        "iter_compressed_waveform_chunks",
+        "encode_column",
+        "decode_column",
+    ),
+    "database": (
+        "RESULTS_DATABASE_FILE_NAME",
+        "POINTS_TABLE_NAME",
+        "RESULTS_TABLE_NAME",
+        "POINT_RESULTS_VIEW_NAME",
+        "open_results_database",
+        "write_results_database",
+        "query_results_database",
+        "load_point_results",
+    ),
+    "sweep": (
+        "SWEEP_VALUE_SIGNIFICANT_DIGITS",
+        "SweepMode",
+        "SweptParameterData",
+        "canonicalize_sweep_value",
+        "canonicalize_parameters",
+        "get_sweep_values",
+        "get_swept_parameters",
+    ),
+    "simulation": (
+        "SIMULATION_PARAMETERS_FILE_NAME",
+        "SIMULATION_OUTPUT_FILE_NAME",
+        "SIMULATION_COMPRESSED_OUTPUT_FILE_NAME",
+        "SIMULATION_OUTPUT_PYRAMID_FILE_NAME",
+        "PARAMETER_SWEEP_FILE_NAME",
+        "SIMULATION_MANIFEST_FILE_NAME",
+        "COMPUTED_RESULTS_FILE_NAME",
+        "COMPUTED_RESULTS_ATTRS_KEY",
+        "TRANSIENT_START_TIME_ATTRS_KEY",
+        "RunData",
+        "SimulationJobData",
+        "SimulationPointData",
+        "ConfigSetupData",
+        "ConfigData",
+        "load_config_from_yaml",
+        "config_from_dict",
+        "config_setup_from_dict",
+        "run_simulations",
+        "compile_run_netlists",
+        "get_simulation_jobs",
+        "plan_simulation_points",
+        "simulate_points",
+        "run_double_pulse_test_simulations",
+        "process_simulation_outputs",
+        "process_double_pulse_simulation_outputs",
+        "save_simulation_outputs",
+        "save_simulation_point_output",
+        "load_simulation_manifest",
+        "update_simulation_manifest",
+        "load_simulation_outputs",
+        "load_simulation_point_output",
+        "iter_simulation_point_output_chunks",
+        "load_double_pulse_test_simulation_outputs",
+        "save_simulation_results",
+        "load_simulation_results",
+        "simulate",
+        "simulate_double_pulse_test",
+        "simulate_swept",
+        "run_buck_converter_simulations",
+    ),
+    "surrogate": (
+        "DEFAULT_SURROGATE_NOISE",
+        "DEFAULT_SURROGATE_LENGTH_SCALES",
+        "SurrogatePredictionData",
+        "GaussianProcessSurrogate",
+        "fit_result_surrogate",
+        "refine_result_surrogate",
+    ),
+    "optimisation": (
+        "DEFAULT_MAX_SIMULATIONS",
+        "OPTIMISATION_CACHE_FILE_NAME",
+        "OPTIMISATION_EVALUATIONS_FILE_NAME",
+        "OPTIMISATION_BEST_FILE_NAME",
+        "CONSTRAINT_VIOLATION_FIELD_NAME",
+        "OptimisationMethod",
+        "OptimisedParameterData",
+        "OptimisationObjectiveData",
+        "OptimisationConstraintData",
+        "OptimisationResultData",
+        "OptimisationConfigData",
+        "OptimisationCache",
+        "load_optimisation_config_from_yaml",
+        "optimisation_config_from_dict",
+        "optimise_parameters",
+        "save_optimisation_result",
+    ),
+    "calibration": (
+        "DEFAULT_TIMESTEP_TOLERANCE",
+        "DEFAULT_NUM_TIMESTEP_LEVELS",
+        "DEFAULT_TIMESTEP_REFINEMENT_FACTOR",
+        "TIMESTEP_CALIBRATION_FILE_NAME",
+        "TimestepLevelData",
+        "TimestepCalibrationData",
+        "get_max_timestep_levels",
+        "calibrate_max_timestep",
+        "calibrate_run_max_timesteps",
+        "get_calibrated_max_timestep",
+        "save_timestep_calibrations",
+        "write_calibrated_config",
+    ),
+    "montecarlo": (
+        "MONTE_CARLO_DIRECTORY_NAME",
+        "MONTE_CARLO_RESULTS_FILE_NAME",
+        "MONTE_CARLO_STATISTICS_FILE_NAME",
+        "MonteCarloResultData",
+        "run_monte_carlo_simulation",
+        "run_monte_carlo_simulations",
+        "get_monte_carlo_jobs",
+        "load_monte_carlo_statistics",
+    ),
+    "dataset": (
+        "DEFAULT_WAVEFORM_CACHE_SIZE",
+        "SimulationOutputEntry",
+        "SimulationOutputDataset",
+        "open_simulation_output_dataset",
+    ),
+    "distributed": (
+        "DEFAULT_LEASE_TIMEOUT",
+        "DEFAULT_HEARTBEAT_INTERVAL",
+        "DEFAULT_POLL_INTERVAL",
+        "DEFAULT_MAX_JOB_ATTEMPTS",
+        "DirectoryJobQueue",
+        "generate_submission_id",
+        "submit_simulation_jobs",
+        "wait_for_simulation_jobs",
+        "run_distributed_simulations",
+        "run_simulation_worker",
+    ),
+    "visualisation": (
+        "FIGURE_FILE_FORMATS",
+        "SubplotData",
+        "ResultPlotData",
+        "EnvelopePlotData",
+        "VerticalSubplotsRenderer",
+        "plot_vertical_subplots",
+        "plot_parameter_results",
+        "plot_waveform_envelopes",
+        "render_vertical_subplots",
+        "render_parameter_results",
+        "render_results_tree",
+        "default_waveform_plot_fields",
+    ),
+}
+
+_lazy_exports = {
+    name: submodule_name
+    for submodule_name, names in _lazy_submodule_exports.items()
+    for name in names
+}
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    *config.__all__,
+    *fields.__all__,
+    *utils.__all__,
+    *_lazy_exports,
+]
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def __getattr__(name: str):
+    submodule_name = _lazy_exports.get(name)
+    if submodule_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    submodule = importlib.import_module(f".{submodule_name}", __name__)
+    value = getattr(submodule, name)
+
+    # Cache the resolved attribute so later lookups bypass this hook
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_lazy_exports))
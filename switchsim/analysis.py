@@ -16,6 +16,41 @@ from .spice import *
 #   Exports
 # --------------------------------------------------
 
+__all__ = [
+    "ANALYSIS_START_TIME_MARGIN",
+    "NUM_SAMPLES_RESULT_KEY",
+    "get_power_efficiency",
+    "get_steady_state_period",
+    "extract_ripple_performance",
+    "get_turn_on_energy_loss",
+    "get_turn_off_energy_loss",
+    "get_turn_on_energy_loss_period",
+    "get_turn_off_energy_loss_period",
+    "get_num_samples",
+    "get_analysis_start_time",
+    "get_drain_source_energy_between_period",
+    "get_total_drain_source_energy",
+    "get_filtered_between_period",
+    "get_total_drain_source_energy_between_period",
+    "double_pulse_test_result_getters",
+    "buck_converter_getters",
+    "simulation_type_result_getters",
+    "double_pulse_test_result_periods",
+    "buck_converter_periods",
+    "simulation_type_result_periods",
+]
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+# Stores the fraction of its start time by which the first analysis window is widened before the transient start
+ANALYSIS_START_TIME_MARGIN = 0.05
+
+# Stores the key of the result counting the waveform's samples, which looks at no window of it
+NUM_SAMPLES_RESULT_KEY = "num_samples"
+
 
 # --------------------------------------------------
 #   Functions
@@ -37,10 +72,15 @@ def get_power_efficiency(input_data: pd.DataFrame, input_parameters: BuckConvert
 
 
 
-def _filtered_for_steady_state(input_data: pd.DataFrame, input_parameters: BuckConverterParameters) -> pd.DataFrame:
+def get_steady_state_period(input_parameters: BuckConverterParameters) -> tuple[float, float]:
     # TODO: Fix this: Assume that at the halfway point of the simulation run time, the output has reached stead-state
     start = input_parameters.duration / 2
     end = start + input_parameters.duration / 4
+    return start, end
+
+
+def _filtered_for_steady_state(input_data: pd.DataFrame, input_parameters: BuckConverterParameters) -> pd.DataFrame:
+    start, end = get_steady_state_period(input_parameters)
     return input_data[(start <= input_data[TIME_FIELD_NAME]) & (input_data[TIME_FIELD_NAME] <= end)]
 
 
@@ -49,8 +89,7 @@ def extract_ripple_performance(input_data: pd.DataFrame) -> float:
 
 
 def get_turn_on_energy_loss(input_data: pd.DataFrame, input_parameters: DoublePulseTestParameters) -> float:
-    start_time = input_parameters.second_pulse_start
-    end_time = input_parameters.second_pulse_start + 0.5 * input_parameters.second_pulse_duration
+    start_time, end_time = get_turn_on_energy_loss_period(input_parameters)
 
     turn_on_energy_loss = get_drain_source_energy_between_period(
         input_data=input_data,
@@ -62,8 +101,7 @@ def get_turn_on_energy_loss(input_data: pd.DataFrame, input_parameters: DoublePu
 
 
 def get_turn_off_energy_loss(input_data: pd.DataFrame, input_parameters: DoublePulseTestParameters) -> float:
-    start_time = input_parameters.first_pulse_start + input_parameters.first_pulse_duration
-    end_time = start_time + 0.5 * input_parameters.off_duration
+    start_time, end_time = get_turn_off_energy_loss_period(input_parameters)
 
     turn_off_energy_loss = get_drain_source_energy_between_period(
         input_data=input_data,
@@ -74,6 +112,37 @@ def get_turn_off_energy_loss(input_data: pd.DataFrame, input_parameters: DoubleP
     return turn_off_energy_loss
 
 
+def get_turn_on_energy_loss_period(input_parameters: DoublePulseTestParameters) -> tuple[float, float]:
+    start_time = input_parameters.second_pulse_start
+    end_time = input_parameters.second_pulse_start + 0.5 * input_parameters.second_pulse_duration
+    return start_time, end_time
+
+
+def get_turn_off_energy_loss_period(input_parameters: DoublePulseTestParameters) -> tuple[float, float]:
+    start_time = input_parameters.first_pulse_start + input_parameters.first_pulse_duration
+    end_time = start_time + 0.5 * input_parameters.off_duration
+    return start_time, end_time
+
+
+def get_num_samples(input_data: pd.DataFrame, input_parameters: ParametersType) -> float:
+    return float(len(input_data))
+
+
+def get_analysis_start_time(
+        simulation_type: SimulationType,
+        input_parameters: ParametersType,
+        selected_results: list[str],
+        margin: float = ANALYSIS_START_TIME_MARGIN,
+) -> float | None:
+    # The time before which no selected result looks at the waveform, or None when a result has no known window
+    result_periods = simulation_type_result_periods[SimulationType(simulation_type).value]
+    if not selected_results or any(result_key not in result_periods for result_key in selected_results):
+        return None
+
+    start_time = min(result_periods[result_key](input_parameters)[0] for result_key in selected_results)
+    return max(start_time * (1.0 - margin), 0.0)
+
+
 def get_drain_source_energy_between_period(input_data: pd.DataFrame, start_time: float, end_time: float) -> float:
     filtered_data = get_filtered_between_period(input_data, start_time, end_time)
     total_energy = get_total_drain_source_energy(filtered_data)
@@ -107,10 +176,12 @@ def get_total_drain_source_energy_between_period(
 double_pulse_test_result_getters = {
     "turn_on_loss": get_turn_on_energy_loss,
     "turn_off_loss": get_turn_off_energy_loss,
+    NUM_SAMPLES_RESULT_KEY: get_num_samples,
 }
 
 buck_converter_getters = {
-    "power_efficiency": get_power_efficiency
+    "power_efficiency": get_power_efficiency,
+    NUM_SAMPLES_RESULT_KEY: get_num_samples,
 }
 
 
@@ -118,3 +189,19 @@ simulation_type_result_getters = {
     SimulationType.DOUBLE_PULSE_TEST.value: double_pulse_test_result_getters,
     SimulationType.BUCK_CONVERTER.value: buck_converter_getters,
 }
+
+# Stores the (start, end) window of the waveform each result is computed from
+double_pulse_test_result_periods = {
+    "turn_on_loss": get_turn_on_energy_loss_period,
+    "turn_off_loss": get_turn_off_energy_loss_period,
+}
+
+buck_converter_periods = {
+    "power_efficiency": get_steady_state_period,
+}
+
+
+simulation_type_result_periods = {
+    SimulationType.DOUBLE_PULSE_TEST.value: double_pulse_test_result_periods,
+    SimulationType.BUCK_CONVERTER.value: buck_converter_periods,
+}
@@ -0,0 +1,361 @@
+""" Timestep Calibration Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import json
+import math
+import dataclasses
+from pathlib import Path
+
+import yaml
+
+from .analysis import *
+from .chunked import *
+from .config import *
+from .execution import *
+from .fields import *
+from .governor import *
+from .metrics import *
+from .scheduling import *
+from .simulation import *
+from .spice import *
+from .sweep import *
+from .utils import *
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "DEFAULT_TIMESTEP_TOLERANCE",
+    "DEFAULT_NUM_TIMESTEP_LEVELS",
+    "DEFAULT_TIMESTEP_REFINEMENT_FACTOR",
+    "TIMESTEP_CALIBRATION_FILE_NAME",
+    "TimestepLevelData",
+    "TimestepCalibrationData",
+    "get_max_timestep_levels",
+    "calibrate_max_timestep",
+    "calibrate_run_max_timesteps",
+    "get_calibrated_max_timestep",
+    "save_timestep_calibrations",
+    "write_calibrated_config",
+]
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+# Stores the relative difference from the finest level within which a result is converged
+DEFAULT_TIMESTEP_TOLERANCE = 0.01
+
+# Stores the number of max_timestep values simulated, the finest being the configured one
+DEFAULT_NUM_TIMESTEP_LEVELS = 5
+
+# Stores the ratio between consecutive max_timestep values
+DEFAULT_TIMESTEP_REFINEMENT_FACTOR = 2.0
+
+TIMESTEP_CALIBRATION_FILE_NAME = "timestep_calibration.json"
+
+
+# --------------------------------------------------
+#   Dataclasses
+# --------------------------------------------------
+
+@dataclasses.dataclass(frozen=True)
+class TimestepLevelData:
+    max_timestep: float
+    # Stores the value of every selected result, empty when the point failed
+    results: dict[str, float]
+    # Stores the difference of every result from the finest level, relative to the finest level
+    relative_errors: dict[str, float]
+    # Stores the number of samples in the waveform, which the .raw size follows
+    num_samples: int
+    within_tolerance: bool
+
+
+@dataclasses.dataclass(frozen=True)
+class TimestepCalibrationData:
+    source_file_path: Path
+    tolerance: float
+    absolute_tolerance: float
+    reference_max_timestep: float
+    selected_max_timestep: float
+    # Stores the levels from the coarsest to the finest
+    levels: tuple[TimestepLevelData, ...]
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def get_max_timestep_levels(
+        finest_max_timestep: float,
+        num_levels: int = DEFAULT_NUM_TIMESTEP_LEVELS,
+        refinement_factor: float = DEFAULT_TIMESTEP_REFINEMENT_FACTOR,
+) -> list[float]:
+    # Returns the values from the coarsest to the finest, each finer by the refinement factor
+    if finest_max_timestep <= 0:
+        raise ValueError(f"The finest max_timestep must be positive, got {finest_max_timestep}")
+    if num_levels < 2:
+        raise ValueError(f"At least two timestep levels are needed, got {num_levels}")
+    if refinement_factor <= 1:
+        raise ValueError(f"The refinement factor must be greater than one, got {refinement_factor}")
+
+    return [
+        canonicalize_sweep_value(finest_max_timestep * refinement_factor ** level)
+        for level in reversed(range(num_levels))
+    ]
+
+
+def calibrate_max_timestep(
+        simulation_type: SimulationType,
+        source_file_path: str | Path,
+        default_parameters: ParametersType,
+        output_field_mapping: OutputFieldsType,
+        selected_results: list[str],
+        tolerance: float = DEFAULT_TIMESTEP_TOLERANCE,
+        absolute_tolerance: float = 0.0,
+        num_levels: int = DEFAULT_NUM_TIMESTEP_LEVELS,
+        refinement_factor: float = DEFAULT_TIMESTEP_REFINEMENT_FACTOR,
+        ltspice_executable_file_path: str = DEFAULT_LTSPICE_EXECUTABLE_FILE_PATH,
+        execution_policy: ExecutionPolicyData | None = None,
+        max_workers: int | None = None,
+        runtime_history: RuntimeHistory | None = None,
+        save_mapped_traces: bool = False,
+        windowed_results: list[str] | None = None,
+        metrics: SimulationMetrics | None = None,
+        governor: ConcurrencyGovernor | None = None,
+        verbose: bool = False,
+) -> TimestepCalibrationData:
+    # The default parameters are simulated at progressively finer max_timestep values down to the configured one,
+    # which is the reference. The selected value is the coarsest whose results, and those of every finer level, are
+    # within the tolerance of the reference, so a level that only matches by chance is not picked. Every level's
+    # results are streamed from its waveform, so no waveform is held whole
+    simulation_type = SimulationType(simulation_type)
+    source_file_path = Path(source_file_path).resolve()
+    selected_results = [
+        result_key for result_key in dict.fromkeys(selected_results) if result_key != NUM_SAMPLES_RESULT_KEY
+    ]
+    result_accumulators = simulation_type_result_accumulators[simulation_type.value]
+
+    missing_result_keys = [result_key for result_key in selected_results if result_key not in result_accumulators]
+    if missing_result_keys:
+        raise KeyError(f"Unknown results: {', '.join(missing_result_keys)}")
+    if not selected_results:
+        raise ValueError("At least one result is needed to calibrate the max_timestep")
+
+    max_timesteps = get_max_timestep_levels(default_parameters.max_timestep, num_levels, refinement_factor)
+    level_parameters = [
+        canonicalize_parameters(dataclasses.replace(default_parameters, max_timestep=max_timestep))
+        for max_timestep in max_timesteps
+    ]
+    points = [
+        SimulationPointData(
+            source_file_path=source_file_path,
+            parameters=parameters,
+            point_hash=dataclass_hash(parameters),
+            jobs=(),
+        )
+        for parameters in level_parameters
+    ]
+
+    per_point_results = simulate_points(
+        simulation_type=simulation_type,
+        points=points,
+        output_field_mapping=output_field_mapping,
+        ltspice_executable_file_path=ltspice_executable_file_path,
+        execution_policy=execution_policy,
+        max_workers=max_workers,
+        runtime_history=runtime_history,
+        save_mapped_traces=save_mapped_traces,
+        windowed_results=windowed_results,
+        selected_results=[*selected_results, NUM_SAMPLES_RESULT_KEY],
+        metrics=metrics,
+        governor=governor,
+    )
+
+    per_level_results = []
+    per_level_num_samples = []
+    for point in points:
+        point_results = per_point_results.get((source_file_path, point.point_hash))
+        if point_results is None:
+            per_level_results.append({})
+            per_level_num_samples.append(0)
+            continue
+        per_level_results.append({result_key: float(point_results[result_key]) for result_key in selected_results})
+        per_level_num_samples.append(int(point_results[NUM_SAMPLES_RESULT_KEY]))
+
+    reference_results = per_level_results[-1]
+    if not reference_results:
+        raise RuntimeError(f"The reference point of {source_file_path.name} at max_timestep {max_timesteps[-1]:g} failed")
+
+    levels = []
+    for max_timestep, results, num_samples in zip(max_timesteps, per_level_results, per_level_num_samples):
+        relative_errors = {
+            result_key: _get_relative_error(results[result_key], reference_results[result_key])
+            for result_key in results
+        }
+        within_tolerance = bool(results) and all(
+            _is_within_tolerance(results[result_key], reference_results[result_key], tolerance, absolute_tolerance)
+            for result_key in selected_results
+        )
+        levels.append(TimestepLevelData(
+            max_timestep=max_timestep,
+            results=results,
+            relative_errors=relative_errors,
+            num_samples=num_samples,
+            within_tolerance=within_tolerance,
+        ))
+
+        largest_error = max(relative_errors.values(), default=math.nan)
+        verbose_print(
+            verbose,
+            f"\t - max_timestep {max_timestep:g}: {num_samples} samples, largest relative error {largest_error:.3g}"
+            f"{'' if within_tolerance else ', outside the tolerance'}",
+        )
+
+    # Walked from the finest level up, stopping at the first one outside the tolerance
+    selected_max_timestep = max_timesteps[-1]
+    for level in reversed(levels):
+        if not level.within_tolerance:
+            break
+        selected_max_timestep = level.max_timestep
+
+    return TimestepCalibrationData(
+        source_file_path=source_file_path,
+        tolerance=tolerance,
+        absolute_tolerance=absolute_tolerance,
+        reference_max_timestep=max_timesteps[-1],
+        selected_max_timestep=selected_max_timestep,
+        levels=tuple(levels),
+    )
+
+
+def calibrate_run_max_timesteps(
+        simulation_type: SimulationType,
+        runs: dict[str, RunData],
+        default_parameters: ParametersType,
+        output_field_mapping: OutputFieldsType,
+        selected_results: list[str],
+        tolerance: float = DEFAULT_TIMESTEP_TOLERANCE,
+        absolute_tolerance: float = 0.0,
+        num_levels: int = DEFAULT_NUM_TIMESTEP_LEVELS,
+        refinement_factor: float = DEFAULT_TIMESTEP_REFINEMENT_FACTOR,
+        ltspice_executable_file_path: str = DEFAULT_LTSPICE_EXECUTABLE_FILE_PATH,
+        execution_policy: ExecutionPolicyData | None = None,
+        max_workers: int | None = None,
+        runtime_history: RuntimeHistory | None = None,
+        use_netlist: bool = False,
+        save_mapped_traces: bool = False,
+        windowed_results: list[str] | None = None,
+        metrics: SimulationMetrics | None = None,
+        governor: ConcurrencyGovernor | None = None,
+        verbose: bool = False,
+) -> dict[str, TimestepCalibrationData]:
+    # Each schematic is calibrated once at the default parameters, and the runs sharing it share its calibration
+    if use_netlist:
+        runs = compile_run_netlists(
+            runs=runs,
+            ltspice_executable_file_path=ltspice_executable_file_path,
+            execution_policy=execution_policy,
+        )
+
+    per_source_calibrations = {}
+    per_run_calibrations = {}
+    for run_name, run_data in runs.items():
+        source_file_path = Path(run_data.source_file_path).resolve()
+        if source_file_path not in per_source_calibrations:
+            verbose_print(verbose, f"Run {run_name}: calibrating max_timestep of {source_file_path.name}")
+            per_source_calibrations[source_file_path] = calibrate_max_timestep(
+                simulation_type=simulation_type,
+                source_file_path=source_file_path,
+                default_parameters=default_parameters,
+                output_field_mapping=output_field_mapping,
+                selected_results=selected_results,
+                tolerance=tolerance,
+                absolute_tolerance=absolute_tolerance,
+                num_levels=num_levels,
+                refinement_factor=refinement_factor,
+                ltspice_executable_file_path=ltspice_executable_file_path,
+                execution_policy=execution_policy,
+                max_workers=max_workers,
+                runtime_history=runtime_history,
+                save_mapped_traces=save_mapped_traces,
+                windowed_results=windowed_results,
+                metrics=metrics,
+                governor=governor,
+                verbose=verbose,
+            )
+        per_run_calibrations[run_name] = per_source_calibrations[source_file_path]
+        verbose_print(verbose, f"Run {run_name}: max_timestep {per_run_calibrations[run_name].selected_max_timestep:g}")
+
+    return per_run_calibrations
+
+
+def get_calibrated_max_timestep(per_run_calibrations: dict[str, TimestepCalibrationData]) -> float:
+    # The default parameters are shared by every run, so the finest of the selected values holds for all of them
+    return min(calibration.selected_max_timestep for calibration in per_run_calibrations.values())
+
+
+def save_timestep_calibrations(
+        per_run_calibrations: dict[str, TimestepCalibrationData],
+        output_directory_path: str | Path,
+) -> Path:
+    output_directory_path = Path(output_directory_path)
+    output_directory_path.mkdir(parents=True, exist_ok=True)
+
+    calibration_file_path = output_directory_path / TIMESTEP_CALIBRATION_FILE_NAME
+    with open(calibration_file_path, "w") as json_file:
+        json.dump({
+            "max_timestep": get_calibrated_max_timestep(per_run_calibrations),
+            "runs": {
+                run_name: {
+                    **dataclasses.asdict(calibration),
+                    "source_file_path": str(calibration.source_file_path),
+                }
+                for run_name, calibration in per_run_calibrations.items()
+            },
+        }, json_file, indent=4)
+
+    return calibration_file_path
+
+
+def write_calibrated_config(
+        config_file_path: str | Path,
+        calibrated_config_file_path: str | Path,
+        max_timestep: float,
+) -> None:
+    # The config is copied as loaded, with only the default max_timestep replaced. Runs that sweep max_timestep
+    # keep their own values
+    with open(config_file_path, "r") as file:
+        config_data = yaml.safe_load(file)
+
+    config_data["setup"]["default_parameters"]["max_timestep"] = max_timestep
+
+    calibrated_config_file_path = Path(calibrated_config_file_path)
+    calibrated_config_file_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(calibrated_config_file_path, "w") as file:
+        yaml.safe_dump(config_data, file, sort_keys=False)
+
+
+def _get_relative_error(value: float, reference_value: float) -> float:
+    if math.isnan(value) and math.isnan(reference_value):
+        return 0.0
+    if value == reference_value:
+        return 0.0
+    if reference_value == 0:
+        return math.inf
+    return abs(value - reference_value) / abs(reference_value)
+
+
+def _is_within_tolerance(value: float, reference_value: float, tolerance: float, absolute_tolerance: float) -> bool:
+    # Results that are NaN at both levels agree, as when a window holds no switching event at any timestep
+    if math.isnan(value) or math.isnan(reference_value):
+        return math.isnan(value) and math.isnan(reference_value)
+    return abs(value - reference_value) <= max(tolerance * abs(reference_value), absolute_tolerance)
@@ -0,0 +1,207 @@
+""" Chunked Analysis Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import typing
+import dataclasses
+
+import numpy as np
+import pandas as pd
+
+from .analysis import *
+from .fields import *
+from .spice import *
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "WaveformChunkSourceData",
+    "WaveformChunkAccumulator",
+    "PeriodEnergyAccumulator",
+    "SteadyStatePowerEfficiencyAccumulator",
+    "SampleCountAccumulator",
+    "get_turn_on_energy_loss_accumulator",
+    "get_turn_off_energy_loss_accumulator",
+    "get_power_efficiency_accumulator",
+    "get_num_samples_accumulator",
+    "analyse_waveform_chunks",
+    "double_pulse_test_result_accumulators",
+    "buck_converter_accumulators",
+    "simulation_type_result_accumulators",
+]
+
+
+# --------------------------------------------------
+#   Dataclasses
+# --------------------------------------------------
+
+@dataclasses.dataclass(frozen=True)
+class WaveformChunkSourceData:
+    # Stores a callable that opens a new stream of the waveform's chunks, so it can be streamed more than once
+    open_chunks: typing.Callable[[], typing.Iterator[pd.DataFrame]]
+    # Stores the time the transient was simulated from, as a windowed transient holds nothing before it
+    transient_start_time: float = 0.0
+
+
+# --------------------------------------------------
+#   Classes
+# --------------------------------------------------
+
+class WaveformChunkAccumulator:
+    """ A result computed from a waveform streamed as consecutive chunks of rows.
+
+    Each chunk is folded into the state carried to the next one, so the result equals the getter's result on the
+    whole waveform while only one chunk is held at a time.
+    """
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        raise NotImplementedError()
+
+    def result(self) -> float:
+        raise NotImplementedError()
+
+
+class PeriodEnergyAccumulator(WaveformChunkAccumulator):
+    """ The running drain-source energy between two times, as get_drain_source_energy_between_period.
+
+    The energy of each row spans back to the previous row, which the chunk readers carry across chunk boundaries,
+    so the integral only has to be summed.
+    """
+
+    def __init__(self, start_time: float, end_time: float) -> None:
+        self.start_time = start_time
+        self.end_time = end_time
+        self.total_energy = 0.0
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        time = chunk[TIME_FIELD_NAME].to_numpy()
+        if len(time) == 0 or time[-1] < self.start_time or time[0] > self.end_time:
+            return
+
+        in_period = (self.start_time <= time) & (time <= self.end_time)
+        self.total_energy += chunk[DUT_DRAIN_SOURCE_ENERGY_FIELD_NAME].to_numpy()[in_period].sum()
+
+    def result(self) -> float:
+        return self.total_energy
+
+
+class SteadyStatePowerEfficiencyAccumulator(WaveformChunkAccumulator):
+    """ The running output and input power sums over the steady state window, as get_power_efficiency. """
+
+    def __init__(self, input_parameters: BuckConverterParameters) -> None:
+        self.load_resistance = input_parameters.load_resistance
+        self.start_time, self.end_time = get_steady_state_period(input_parameters)
+        self.output_power_sum = 0.0
+        self.input_power_sum = 0.0
+        self.num_points = 0
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        time = chunk[TIME_FIELD_NAME].to_numpy()
+        if len(time) == 0 or time[-1] < self.start_time or time[0] > self.end_time:
+            return
+
+        in_window = (self.start_time <= time) & (time <= self.end_time)
+        load_current = chunk[LOAD_CURRENT_FIELD_FIELD_NAME].to_numpy()[in_window]
+        supply_voltage = chunk[SUPPLY_VOLTAGE_FIELD_NAME].to_numpy()[in_window]
+        supply_current = chunk[SUPPLY_CURRENT_FIELD_NAME].to_numpy()[in_window]
+
+        self.output_power_sum += (self.load_resistance * load_current**2).sum()
+        self.input_power_sum += (supply_voltage * supply_current).sum()
+        self.num_points += int(in_window.sum())
+
+    def result(self) -> float:
+        # The window means are taken from the sums, which matches the getter's NaN when the window is empty
+        with np.errstate(invalid="ignore", divide="ignore"):
+            output_power = abs(np.float64(self.output_power_sum) / self.num_points)
+            input_power = abs(np.float64(self.input_power_sum) / self.num_points)
+            return output_power / input_power
+
+
+class SampleCountAccumulator(WaveformChunkAccumulator):
+    """ The running number of rows in the waveform, as get_num_samples. """
+
+    def __init__(self) -> None:
+        self.num_samples = 0
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        self.num_samples += len(chunk)
+
+    def result(self) -> float:
+        return float(self.num_samples)
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def get_turn_on_energy_loss_accumulator(input_parameters: DoublePulseTestParameters) -> PeriodEnergyAccumulator:
+    start_time, end_time = get_turn_on_energy_loss_period(input_parameters)
+    return PeriodEnergyAccumulator(start_time=start_time, end_time=end_time)
+
+
+def get_turn_off_energy_loss_accumulator(input_parameters: DoublePulseTestParameters) -> PeriodEnergyAccumulator:
+    start_time, end_time = get_turn_off_energy_loss_period(input_parameters)
+    return PeriodEnergyAccumulator(start_time=start_time, end_time=end_time)
+
+
+def get_power_efficiency_accumulator(
+        input_parameters: BuckConverterParameters,
+) -> SteadyStatePowerEfficiencyAccumulator:
+    return SteadyStatePowerEfficiencyAccumulator(input_parameters=input_parameters)
+
+
+def get_num_samples_accumulator(input_parameters: ParametersType) -> SampleCountAccumulator:
+    return SampleCountAccumulator()
+
+
+def analyse_waveform_chunks(
+        simulation_type: SimulationType,
+        chunks: typing.Iterable[pd.DataFrame],
+        input_parameters: ParametersType,
+        selected_results: list[str],
+) -> dict[str, float]:
+    # Every selected result is computed in a single pass over the chunks, with memory bounded by the chunk size
+    result_accumulators = simulation_type_result_accumulators[SimulationType(simulation_type).value]
+
+    missing_result_keys = [result_key for result_key in selected_results if result_key not in result_accumulators]
+    if missing_result_keys:
+        raise KeyError(f"No chunked analysis for results: {', '.join(missing_result_keys)}")
+
+    accumulators = {
+        result_key: result_accumulators[result_key](input_parameters) for result_key in selected_results
+    }
+
+    for chunk in chunks:
+        for accumulator in accumulators.values():
+            accumulator.update(chunk)
+
+    return {result_key: accumulator.result() for result_key, accumulator in accumulators.items()}
+
+
+# --------------------------------------------------
+#   Variables
+# --------------------------------------------------
+
+double_pulse_test_result_accumulators = {
+    "turn_on_loss": get_turn_on_energy_loss_accumulator,
+    "turn_off_loss": get_turn_off_energy_loss_accumulator,
+    NUM_SAMPLES_RESULT_KEY: get_num_samples_accumulator,
+}
+
+buck_converter_accumulators = {
+    "power_efficiency": get_power_efficiency_accumulator,
+    NUM_SAMPLES_RESULT_KEY: get_num_samples_accumulator,
+}
+
+
+simulation_type_result_accumulators = {
+    SimulationType.DOUBLE_PULSE_TEST.value: double_pulse_test_result_accumulators,
+    SimulationType.BUCK_CONVERTER.value: buck_converter_accumulators,
+}
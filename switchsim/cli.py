@@ -7,8 +7,11 @@
 # --------------------------------------------------
 
 import argparse
+from pathlib import Path
 
-from switchsim import *
+from switchsim.utils import verbose_print
+
+# The heavier modules are imported within each command, so every invocation only pays for what it runs
 
 
 # --------------------------------------------------
@@ -24,26 +27,100 @@ def main() -> None:
     run_simulation_parser.add_argument("--type", required=True, choices=["dpt", "buck"], help="Type of simulation to run")
     run_simulation_parser.add_argument("--config-path", required=True, help="File path to simulation config")
     run_simulation_parser.add_argument("--output-path", required=True, help="Directory path to store simulation output data")
+    run_simulation_parser.add_argument("--queue-path", help="Shared job queue directory. When given, the points are distributed to workers")
+    run_simulation_parser.add_argument("--max-workers", type=int, help="Number of local simulation processes. Defaults to one, in this process")
+    run_simulation_parser.add_argument("--auto-workers", action="store_true", help="Tune the number of points simulated at once from the measured CPU and memory use, up to --max-workers or the number of CPUs")
+    run_simulation_parser.add_argument("--min-available-memory", type=float, help="Available memory in MB below which --auto-workers pauses dispatch. Defaults to a tenth of the total memory")
+    run_simulation_parser.add_argument("--history-path", help="File path to the runtime history the points are scheduled from. Defaults to one per user")
+    run_simulation_parser.add_argument("--dry-run", action="store_true", help="Print the point schedule and its estimated wall time for --max-workers workers, without simulating")
+    run_simulation_parser.add_argument("--metrics-path", help="File path the Prometheus metrics of the sweep are rewritten to while it runs")
+    run_simulation_parser.add_argument("--metrics-port", type=int, help="Local port serving the Prometheus metrics of the sweep at /metrics while it runs")
     run_simulation_parser.add_argument("--verbose", action="store_true", help="Enable verbose mode")
     run_simulation_parser.set_defaults(func=run_simulation_command)
 
+    # Worker Command
+    worker_parser = subparsers.add_parser("worker", help="Execute simulation jobs from a shared job queue")
+    worker_parser.add_argument("--queue-path", required=True, help="Shared job queue directory")
+    worker_parser.add_argument("--worker-id", help="Identifier of the worker. Defaults to the host name and process id")
+    worker_parser.add_argument("--lease-timeout", type=float, default=300.0, help="Seconds without a heartbeat after which a job is re-queued")
+    worker_parser.add_argument("--heartbeat-interval", type=float, default=30.0, help="Seconds between lease heartbeats")
+    worker_parser.add_argument("--wait", action="store_true", help="Keep polling for new jobs instead of exiting once the queue is empty")
+    worker_parser.add_argument("--metrics-path", help="File path the Prometheus metrics of the worker are rewritten to while it runs")
+    worker_parser.add_argument("--metrics-port", type=int, help="Local port serving the Prometheus metrics of the worker at /metrics while it runs")
+    worker_parser.add_argument("--verbose", action="store_true", help="Enable verbose mode")
+    worker_parser.set_defaults(func=worker_command)
+
     # Pull Tracking Data Command
     process_output_parser = subparsers.add_parser("process-output", help="Pull driver tracking data")
     process_output_parser.add_argument("--type", required=True, choices=["dpt", "buck"], help="Type of simulation whose outputs are processed")
     process_output_parser.add_argument("--config-path", required=True, help="File path to simulation config")
     process_output_parser.add_argument("--output-path", required=True, help="Directory path that stored the simulation output data")
     process_output_parser.add_argument("--results-path", required=True, help="Directory path to store simulation processed result data")
+    process_output_parser.add_argument("--chunk-size", type=int, help="Stream each waveform in chunks of this many rows, for outputs larger than memory")
     process_output_parser.add_argument("--verbose", action="store_true", help="Enable verbose mode")
     process_output_parser.set_defaults(func=process_output_command)
 
+    # Optimise Command
+    optimise_parser = subparsers.add_parser("optimise", help="Search the parameters that optimise the results of a config file")
+    optimise_parser.add_argument("--type", required=True, choices=["dpt", "buck"], help="Type of simulation to optimise")
+    optimise_parser.add_argument("--config-path", required=True, help="File path to the config with an optimisation section")
+    optimise_parser.add_argument("--output-path", required=True, help="Directory path to store the evaluations. Earlier evaluations stored there are reused")
+    optimise_parser.add_argument("--max-workers", type=int, help="Number of local simulation processes. Defaults to one, in this process")
+    optimise_parser.add_argument("--verbose", action="store_true", help="Enable verbose mode")
+    optimise_parser.set_defaults(func=optimise_command)
+
+    # Calibrate Timestep Command
+    calibrate_timestep_parser = subparsers.add_parser("calibrate-timestep", help="Find the coarsest max_timestep whose results match the configured one")
+    calibrate_timestep_parser.add_argument("--type", required=True, choices=["dpt", "buck"], help="Type of simulation to calibrate")
+    calibrate_timestep_parser.add_argument("--config-path", required=True, help="File path to simulation config, whose default max_timestep is the finest simulated")
+    calibrate_timestep_parser.add_argument("--output-path", required=True, help="Directory path to store the calibration")
+    calibrate_timestep_parser.add_argument("--calibrated-config-path", help="File path the config with the calibrated max_timestep is written to. Defaults to one in --output-path")
+    calibrate_timestep_parser.add_argument("--tolerance", type=float, default=0.01, help="Relative difference from the finest max_timestep within which every result must be")
+    calibrate_timestep_parser.add_argument("--absolute-tolerance", type=float, default=0.0, help="Absolute difference always accepted, for results near zero")
+    calibrate_timestep_parser.add_argument("--num-levels", type=int, default=5, help="Number of max_timestep values simulated")
+    calibrate_timestep_parser.add_argument("--refinement-factor", type=float, default=2.0, help="Ratio between consecutive max_timestep values")
+    calibrate_timestep_parser.add_argument("--run", action="append", dest="run_names", help="Name of a run to calibrate, repeatable. Defaults to every run")
+    calibrate_timestep_parser.add_argument("--max-workers", type=int, help="Number of local simulation processes. Defaults to one, in this process")
+    calibrate_timestep_parser.add_argument("--verbose", action="store_true", help="Enable verbose mode")
+    calibrate_timestep_parser.set_defaults(func=calibrate_timestep_command)
+
+    # Render Figures Command
+    render_figures_parser = subparsers.add_parser("render-figures", help="Render the result and waveform figures of a results tree")
+    render_figures_parser.add_argument("--type", required=True, choices=["dpt", "buck"], help="Type of simulation whose results are rendered")
+    render_figures_parser.add_argument("--results-path", required=True, help="Directory path that stored the processed result data")
+    render_figures_parser.add_argument("--figures-path", required=True, help="Directory path to store the rendered figures")
+    render_figures_parser.add_argument("--output-path", help="Directory path that stored the simulation output data. When given, waveform figures are rendered too")
+    render_figures_parser.add_argument("--format", default="png", choices=["png", "svg"], help="File format of the figures")
+    render_figures_parser.add_argument("--max-workers", type=int, help="Number of rendering processes. Defaults to the number of CPUs")
+    render_figures_parser.add_argument("--verbose", action="store_true", help="Enable verbose mode")
+    render_figures_parser.set_defaults(func=render_figures_command)
+
     args = parser.parse_args()
     args.func(args)
 
 
 def run_simulation_command(args) -> None:
+    from switchsim.metrics import MetricsExporter, SimulationMetrics
+    from switchsim.scheduling import (
+        RuntimeHistory,
+        format_simulation_schedule,
+        get_default_runtime_history_file_path,
+        schedule_simulation_points,
+    )
+    from switchsim.simulation import (
+        compile_run_netlists,
+        get_simulation_jobs,
+        load_config_from_yaml,
+        plan_simulation_points,
+        run_simulations,
+        save_simulation_outputs,
+    )
+    from switchsim.spice import SimulationType
+
     simulation_type = SimulationType(args.type)
     config_path = args.config_path
     output_path = args.output_path
+    queue_path = args.queue_path
     verbose = args.verbose
 
     config = load_config_from_yaml(
@@ -51,22 +128,150 @@ def run_simulation_command(args) -> None:
         simulation_type=simulation_type,
     )
 
-    per_run_outputs = run_double_pulse_test_simulations(
-        runs=config.runs,
-        default_parameters=config.setup.default_parameters,
-        output_field_mapping=config.setup.output_field_mapping,
-        ltspice_executable_file_path=config.setup.ltspice_executable_file_path,
-        verbose=verbose,
+    runtime_history = RuntimeHistory(
+        args.history_path if args.history_path is not None else get_default_runtime_history_file_path()
     )
 
-    save_simulation_outputs(
-        output_directory_path=output_path,
-        per_run_outputs=per_run_outputs,
-    )
+    # A dry run only plans the points, so it neither translates the schematics nor needs LTspice
+    runs = config.runs
+    if args.dry_run:
+        jobs = get_simulation_jobs(
+            simulation_type=simulation_type,
+            runs=runs,
+            default_parameters=config.setup.default_parameters,
+        )
+        if any(run_data.monte_carlo is not None for run_data in runs.values()):
+            from switchsim.montecarlo import get_monte_carlo_jobs
+
+            jobs += get_monte_carlo_jobs(runs=runs, default_parameters=config.setup.default_parameters)
+        print(format_simulation_schedule(
+            scheduled_points=schedule_simulation_points(plan_simulation_points(jobs), runtime_history),
+            num_workers=args.max_workers or 1,
+        ))
+        return
+
+    if config.setup.use_netlist:
+        runs = compile_run_netlists(
+            runs=runs,
+            ltspice_executable_file_path=config.setup.ltspice_executable_file_path,
+            execution_policy=config.setup.execution_policy,
+        )
+
+    # The transient only starts just before the first window of the config's results when enabled
+    windowed_results = config.results if config.setup.windowed_transient else None
+
+    # The governor sizes the pool to its upper limit and tunes how many points run at once
+    governor = None
+    if args.auto_workers:
+        from switchsim.governor import ConcurrencyGovernor
+
+        governor = ConcurrencyGovernor(
+            max_workers=args.max_workers,
+            min_available_memory=int(args.min_available_memory * 2**20) if args.min_available_memory is not None else None,
+        )
+        verbose_print(verbose, f"Concurrency {governor.format_status()}")
+
+    # The sweep's metrics are exposed while it runs when a metrics file or port is given
+    metrics = SimulationMetrics()
+    with MetricsExporter(metrics, file_path=args.metrics_path, port=args.metrics_port):
+        # Monte Carlo runs keep only their results and statistics, and are always simulated locally
+        if any(run_data.monte_carlo is not None for run_data in runs.values()):
+            from switchsim.montecarlo import run_monte_carlo_simulations
+
+            run_monte_carlo_simulations(
+                simulation_type=simulation_type,
+                runs=runs,
+                default_parameters=config.setup.default_parameters,
+                output_field_mapping=config.setup.output_field_mapping,
+                selected_results=config.results,
+                output_directory_path=output_path,
+                ltspice_executable_file_path=config.setup.ltspice_executable_file_path,
+                execution_policy=config.setup.execution_policy,
+                max_workers=args.max_workers,
+                runtime_history=runtime_history,
+                save_mapped_traces=config.setup.save_mapped_traces,
+                windowed_results=windowed_results,
+                metrics=metrics,
+                governor=governor,
+                verbose=verbose,
+            )
+            if all(run_data.monte_carlo is not None for run_data in runs.values()):
+                return
+
+        if queue_path is not None:
+            from switchsim.distributed import run_distributed_simulations
+
+            # Coordinator mode: the points are pushed to the queue and the workers write the outputs
+            run_distributed_simulations(
+                queue_directory_path=queue_path,
+                simulation_type=simulation_type,
+                runs=runs,
+                default_parameters=config.setup.default_parameters,
+                output_field_mapping=config.setup.output_field_mapping,
+                output_directory_path=output_path,
+                ltspice_executable_file_path=config.setup.ltspice_executable_file_path,
+                execution_policy=config.setup.execution_policy,
+                runtime_history=runtime_history,
+                save_mapped_traces=config.setup.save_mapped_traces,
+                windowed_results=windowed_results,
+                metrics=metrics,
+                verbose=verbose,
+            )
+            return
+
+        per_run_outputs = run_simulations(
+            simulation_type=simulation_type,
+            runs=runs,
+            default_parameters=config.setup.default_parameters,
+            output_field_mapping=config.setup.output_field_mapping,
+            ltspice_executable_file_path=config.setup.ltspice_executable_file_path,
+            execution_policy=config.setup.execution_policy,
+            max_workers=args.max_workers,
+            runtime_history=runtime_history,
+            save_mapped_traces=config.setup.save_mapped_traces,
+            windowed_results=windowed_results,
+            metrics=metrics,
+            governor=governor,
+            verbose=verbose,
+        )
+
+        save_simulation_outputs(
+            output_directory_path=output_path,
+            per_run_outputs=per_run_outputs,
+            metrics=metrics,
+        )
+
+
+def worker_command(args) -> None:
+    from switchsim.distributed import run_simulation_worker
+    from switchsim.metrics import MetricsExporter, SimulationMetrics
+
+    metrics = SimulationMetrics()
+    with MetricsExporter(metrics, file_path=args.metrics_path, port=args.metrics_port):
+        num_completed_jobs = run_simulation_worker(
+            queue_directory_path=args.queue_path,
+            worker_id=args.worker_id,
+            lease_timeout=args.lease_timeout,
+            heartbeat_interval=args.heartbeat_interval,
+            exit_when_idle=not args.wait,
+            metrics=metrics,
+            verbose=args.verbose,
+        )
+
+    verbose_print(args.verbose, f"Completed {num_completed_jobs} job(s)")
 
 
 def process_output_command(args) -> None:
-    simulation_type = args.type
+    from switchsim.dataset import open_simulation_output_dataset
+    from switchsim.simulation import (
+        load_config_from_yaml,
+        load_simulation_results,
+        process_simulation_outputs,
+        save_simulation_results,
+    )
+    from switchsim.spice import SimulationType
+
+    simulation_type = SimulationType(args.type)
     config_path = args.config_path
     output_path = args.output_path
     results_path = args.results_path
@@ -77,21 +282,158 @@ def process_output_command(args) -> None:
         simulation_type=simulation_type,
     )
 
-    per_run_outputs = load_double_pulse_test_simulation_outputs(
+    # Waveforms are only loaded for points that still have results to compute, whole or streamed in chunks
+    dataset = open_simulation_output_dataset(
         output_directory_path=output_path,
+        simulation_type=simulation_type,
     )
+    per_run_outputs = dataset.to_per_run_outputs(lazy=True, chunk_size=args.chunk_size)
 
-    per_run_results = process_double_pulse_simulation_outputs(
+    previous_results = None
+    if Path(results_path).exists():
+        previous_results = load_simulation_results(
+            output_directory_path=results_path,
+        )
+
+    per_run_results = process_simulation_outputs(
         per_run_outputs=per_run_outputs,
         selected_results=config.results,
+        simulation_type=simulation_type,
+        previous_results=previous_results,
     )
 
     save_simulation_results(
         per_run_results=per_run_results,
         output_directory_path=results_path,
+        simulation_output_directory_path=output_path,
+    )
+
+    verbose_print(verbose, f"Processed {len(dataset)} simulation outputs into {results_path}")
+
+
+def optimise_command(args) -> None:
+    from switchsim.optimisation import (
+        OPTIMISATION_CACHE_FILE_NAME,
+        OptimisationCache,
+        load_optimisation_config_from_yaml,
+        optimise_parameters,
+        save_optimisation_result,
+    )
+    from switchsim.spice import SimulationType
+
+    simulation_type = SimulationType(args.type)
+    output_path = Path(args.output_path)
+
+    config = load_optimisation_config_from_yaml(
+        config_file_path=args.config_path,
+        simulation_type=simulation_type,
+    )
+
+    optimisation_result = optimise_parameters(
+        simulation_type=simulation_type,
+        source_file_path=config.source_file_path,
+        output_field_mapping=config.setup.output_field_mapping,
+        default_parameters=config.setup.default_parameters,
+        parameters=config.parameters,
+        objectives=config.objectives,
+        constraints=config.constraints,
+        method=config.method,
+        max_simulations=config.max_simulations,
+        batch_size=config.batch_size,
+        max_workers=args.max_workers,
+        cache=OptimisationCache(output_path / OPTIMISATION_CACHE_FILE_NAME),
+        seed=config.seed,
+        ltspice_executable_file_path=config.setup.ltspice_executable_file_path,
+        execution_policy=config.setup.execution_policy,
+        use_netlist=config.setup.use_netlist,
+        save_mapped_traces=config.setup.save_mapped_traces,
+        windowed_transient=config.setup.windowed_transient,
+        verbose=args.verbose,
+    )
+
+    save_optimisation_result(
+        optimisation_result=optimisation_result,
+        output_directory_path=output_path,
+    )
+
+    print(optimisation_result.best_results.to_string(index=False))
+
+
+def calibrate_timestep_command(args) -> None:
+    from switchsim.calibration import (
+        calibrate_run_max_timesteps,
+        get_calibrated_max_timestep,
+        save_timestep_calibrations,
+        write_calibrated_config,
+    )
+    from switchsim.simulation import load_config_from_yaml
+    from switchsim.spice import SimulationType
+
+    simulation_type = SimulationType(args.type)
+    output_path = Path(args.output_path)
+
+    config = load_config_from_yaml(
+        config_file_path=args.config_path,
+        simulation_type=simulation_type,
+    )
+
+    runs = config.runs
+    if args.run_names is not None:
+        missing_run_names = [run_name for run_name in args.run_names if run_name not in runs]
+        if missing_run_names:
+            raise KeyError(f"Unknown runs: {', '.join(missing_run_names)}")
+        runs = {run_name: runs[run_name] for run_name in args.run_names}
+
+    per_run_calibrations = calibrate_run_max_timesteps(
+        simulation_type=simulation_type,
+        runs=runs,
+        default_parameters=config.setup.default_parameters,
+        output_field_mapping=config.setup.output_field_mapping,
+        selected_results=config.results,
+        tolerance=args.tolerance,
+        absolute_tolerance=args.absolute_tolerance,
+        num_levels=args.num_levels,
+        refinement_factor=args.refinement_factor,
+        ltspice_executable_file_path=config.setup.ltspice_executable_file_path,
+        execution_policy=config.setup.execution_policy,
+        max_workers=args.max_workers,
+        use_netlist=config.setup.use_netlist,
+        save_mapped_traces=config.setup.save_mapped_traces,
+        windowed_results=config.results if config.setup.windowed_transient else None,
+        verbose=args.verbose,
+    )
+
+    # The calibrated config is the one the full sweep is then run from
+    max_timestep = get_calibrated_max_timestep(per_run_calibrations)
+    calibration_file_path = save_timestep_calibrations(per_run_calibrations, output_path)
+    calibrated_config_path = (
+        Path(args.calibrated_config_path) if args.calibrated_config_path is not None
+        else output_path / f"{Path(args.config_path).stem}_calibrated.yaml"
+    )
+    write_calibrated_config(args.config_path, calibrated_config_path, max_timestep)
+
+    print(
+        f"max_timestep {config.setup.default_parameters.max_timestep:g} -> {max_timestep:g}, "
+        f"written to {calibrated_config_path} ({calibration_file_path.name} has every level)",
     )
 
 
+def render_figures_command(args) -> None:
+    from switchsim.visualisation import render_results_tree
+    from switchsim.spice import SimulationType
+
+    figure_file_paths = render_results_tree(
+        simulation_type=SimulationType(args.type),
+        results_directory_path=args.results_path,
+        figures_directory_path=args.figures_path,
+        output_directory_path=args.output_path,
+        file_format=args.format,
+        max_workers=args.max_workers,
+    )
+
+    verbose_print(args.verbose, f"Rendered {len(figure_file_paths)} figures into {args.figures_path}")
+
+
 # --------------------------------------------------
 #   Entry Point
 # --------------------------------------------------
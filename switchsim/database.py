@@ -0,0 +1,247 @@
+""" Results Database Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import math
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+
+from .fields import *
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "RESULTS_DATABASE_FILE_NAME",
+    "POINTS_TABLE_NAME",
+    "RESULTS_TABLE_NAME",
+    "POINT_RESULTS_VIEW_NAME",
+    "open_results_database",
+    "write_results_database",
+    "query_results_database",
+    "load_point_results",
+]
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+RESULTS_DATABASE_FILE_NAME = "results.sqlite"
+
+POINTS_TABLE_NAME = "points"
+RESULTS_TABLE_NAME = "results"
+METADATA_TABLE_NAME = "metadata"
+# Stores the name of the view with one row per point and one column per result key
+POINT_RESULTS_VIEW_NAME = "point_results"
+
+SIMULATION_OUTPUT_DIRECTORY_METADATA_KEY = "simulation_output_directory_path"
+
+# Columns of the points table that are not parameters
+POINT_COLUMNS = ("point_id", "run_name", "swept_parameter", "point_index", POINT_HASH_FIELD_NAME, "output_location")
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def open_results_database(database_file_path: str | Path) -> sqlite3.Connection:
+    # Accepts either the database file itself or the results directory holding it
+    database_file_path = Path(database_file_path)
+    if database_file_path.is_dir():
+        database_file_path = database_file_path / RESULTS_DATABASE_FILE_NAME
+
+    connection = sqlite3.connect(database_file_path)
+    connection.executescript(f"""
+        CREATE TABLE IF NOT EXISTS {POINTS_TABLE_NAME} (
+            point_id INTEGER PRIMARY KEY,
+            run_name TEXT NOT NULL,
+            swept_parameter TEXT NOT NULL,
+            point_index INTEGER NOT NULL,
+            {POINT_HASH_FIELD_NAME} TEXT,
+            output_location TEXT NOT NULL,
+            UNIQUE (run_name, swept_parameter, point_index)
+        );
+        CREATE TABLE IF NOT EXISTS {RESULTS_TABLE_NAME} (
+            point_id INTEGER NOT NULL REFERENCES {POINTS_TABLE_NAME} (point_id) ON DELETE CASCADE,
+            result_key TEXT NOT NULL,
+            value REAL,
+            PRIMARY KEY (point_id, result_key)
+        );
+        CREATE TABLE IF NOT EXISTS {METADATA_TABLE_NAME} (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE INDEX IF NOT EXISTS {POINTS_TABLE_NAME}_{POINT_HASH_FIELD_NAME}_index
+            ON {POINTS_TABLE_NAME} ({POINT_HASH_FIELD_NAME});
+        CREATE INDEX IF NOT EXISTS {RESULTS_TABLE_NAME}_result_key_value_index
+            ON {RESULTS_TABLE_NAME} (result_key, value);
+    """)
+    connection.execute("PRAGMA foreign_keys = ON")
+
+    return connection
+
+
+def write_results_database(
+        database_file_path: str | Path,
+        per_run_results: dict[str, dict[str, pd.DataFrame]],
+        result_keys: list[str],
+        simulation_output_directory_path: str | Path | None = None,
+        per_run_point_indices: dict[str, dict[str, list[int]]] | None = None,
+) -> None:
+    # Every (run, sweep) given replaces its previous rows, so the database always mirrors the results.csv files.
+    # Columns that are neither results nor the point hash are stored as indexed parameter columns. Each row's point
+    # index is that of its output directory when given, and otherwise its position in the sweep
+    if per_run_point_indices is None:
+        per_run_point_indices = {}
+
+    with open_results_database(database_file_path) as connection:
+        parameter_names = _get_parameter_column_names(connection)
+        for per_swept_parameter_results in per_run_results.values():
+            for parameter_sweep_results in per_swept_parameter_results.values():
+                for column in parameter_sweep_results.columns:
+                    if column not in result_keys and column != POINT_HASH_FIELD_NAME and column not in parameter_names:
+                        _add_parameter_column(connection, column)
+                        parameter_names.append(column)
+
+        for run_name, per_swept_parameter_results in per_run_results.items():
+            for swept_parameter, parameter_sweep_results in per_swept_parameter_results.items():
+                connection.execute(
+                    f"DELETE FROM {POINTS_TABLE_NAME} WHERE run_name = ? AND swept_parameter = ?",
+                    (run_name, swept_parameter),
+                )
+                _insert_parameter_sweep_results(
+                    connection=connection,
+                    run_name=run_name,
+                    swept_parameter=swept_parameter,
+                    parameter_sweep_results=parameter_sweep_results,
+                    parameter_names=parameter_names,
+                    result_keys=result_keys,
+                    point_indices=per_run_point_indices.get(run_name, {}).get(swept_parameter),
+                )
+
+        if simulation_output_directory_path is not None:
+            connection.execute(
+                f"INSERT OR REPLACE INTO {METADATA_TABLE_NAME} (key, value) VALUES (?, ?)",
+                (SIMULATION_OUTPUT_DIRECTORY_METADATA_KEY, str(Path(simulation_output_directory_path).absolute())),
+            )
+
+        _create_point_results_view(connection, parameter_names)
+
+    connection.close()
+
+
+def query_results_database(
+        database_file_path: str | Path,
+        query: str,
+        parameters: tuple | dict = (),
+) -> pd.DataFrame:
+    # e.g. "SELECT run_name, MIN(turn_off_loss) AS turn_off_loss FROM point_results
+    #       WHERE load_supply_voltage = 400 GROUP BY run_name ORDER BY turn_off_loss LIMIT 1"
+    connection = open_results_database(database_file_path)
+    try:
+        return pd.read_sql_query(query, connection, params=parameters)
+    finally:
+        connection.close()
+
+
+def load_point_results(
+        database_file_path: str | Path,
+        where: str | None = None,
+        parameters: tuple | dict = (),
+) -> pd.DataFrame:
+    query = f"SELECT * FROM {POINT_RESULTS_VIEW_NAME}"
+    if where is not None:
+        query += f" WHERE {where}"
+
+    return query_results_database(database_file_path, query, parameters)
+
+
+def _get_parameter_column_names(connection: sqlite3.Connection) -> list[str]:
+    return [
+        row[1] for row in connection.execute(f"PRAGMA table_info({POINTS_TABLE_NAME})")
+        if row[1] not in POINT_COLUMNS
+    ]
+
+
+def _add_parameter_column(connection: sqlite3.Connection, parameter_name: str) -> None:
+    connection.execute(f'ALTER TABLE {POINTS_TABLE_NAME} ADD COLUMN "{parameter_name}" REAL')
+    connection.execute(
+        f'CREATE INDEX IF NOT EXISTS "{POINTS_TABLE_NAME}_{parameter_name}_index" '
+        f'ON {POINTS_TABLE_NAME} ("{parameter_name}")'
+    )
+
+
+def _insert_parameter_sweep_results(
+        connection: sqlite3.Connection,
+        run_name: str,
+        swept_parameter: str,
+        parameter_sweep_results: pd.DataFrame,
+        parameter_names: list[str],
+        result_keys: list[str],
+        point_indices: list[int] | None = None,
+) -> None:
+    present_parameter_names = [name for name in parameter_names if name in parameter_sweep_results.columns]
+    present_result_keys = [key for key in result_keys if key in parameter_sweep_results.columns]
+
+    parameter_columns = "".join(f', "{name}"' for name in present_parameter_names)
+    insert_point_statement = (
+        f"INSERT INTO {POINTS_TABLE_NAME} "
+        f"(run_name, swept_parameter, point_index, {POINT_HASH_FIELD_NAME}, output_location{parameter_columns}) "
+        f"VALUES (?, ?, ?, ?, ?{', ?' * len(present_parameter_names)})"
+    )
+
+    rows = parameter_sweep_results.to_dict(orient="records")
+    if point_indices is None:
+        point_indices = range(len(rows))
+
+    for point_index, row in zip(point_indices, rows):
+        cursor = connection.execute(insert_point_statement, (
+            run_name,
+            swept_parameter,
+            point_index,
+            row.get(POINT_HASH_FIELD_NAME),
+            f"{run_name}/{swept_parameter}/{point_index}",
+            *(row[name] for name in present_parameter_names),
+        ))
+        connection.executemany(
+            f"INSERT INTO {RESULTS_TABLE_NAME} (point_id, result_key, value) VALUES (?, ?, ?)",
+            [
+                (cursor.lastrowid, result_key, _to_sql_value(row[result_key]))
+                for result_key in present_result_keys
+            ],
+        )
+
+
+def _create_point_results_view(connection: sqlite3.Connection, parameter_names: list[str]) -> None:
+    # The view pivots the result values into one column per key, so queries read like the results.csv files
+    result_keys = [row[0] for row in connection.execute(f"SELECT DISTINCT result_key FROM {RESULTS_TABLE_NAME}")]
+    result_columns = "".join(
+        f', MAX(CASE WHEN r.result_key = \'{result_key}\' THEN r.value END) AS "{result_key}"'
+        for result_key in result_keys
+    )
+    parameter_columns = "".join(f', p."{name}"' for name in parameter_names)
+
+    connection.execute(f"DROP VIEW IF EXISTS {POINT_RESULTS_VIEW_NAME}")
+    connection.execute(
+        f"CREATE VIEW {POINT_RESULTS_VIEW_NAME} AS "
+        f"SELECT p.point_id, p.run_name, p.swept_parameter, p.point_index, p.{POINT_HASH_FIELD_NAME}, "
+        f"p.output_location{parameter_columns}{result_columns} "
+        f"FROM {POINTS_TABLE_NAME} AS p LEFT JOIN {RESULTS_TABLE_NAME} AS r ON r.point_id = p.point_id "
+        f"GROUP BY p.point_id"
+    )
+
+
+def _to_sql_value(value):
+    # NaN results are stored as NULL, which SQL aggregates skip
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
@@ -0,0 +1,303 @@
+""" Simulation Output Dataset Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import json
+import typing
+import functools
+import collections
+import dataclasses
+from pathlib import Path
+
+import pandas as pd
+
+from .chunked import *
+from .pyramid import *
+from .simulation import *
+from .spice import *
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "DEFAULT_WAVEFORM_CACHE_SIZE",
+    "SimulationOutputEntry",
+    "SimulationOutputDataset",
+    "open_simulation_output_dataset",
+]
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+DEFAULT_WAVEFORM_CACHE_SIZE = 8
+
+RUN_NAME_INDEX_COLUMN = "run_name"
+SWEPT_PARAMETER_INDEX_COLUMN = "swept_parameter"
+POINT_INDEX_COLUMN = "index"
+
+
+# --------------------------------------------------
+#   Dataclasses
+# --------------------------------------------------
+
+@dataclasses.dataclass(frozen=True)
+class SimulationOutputEntry:
+    run_name: str
+    swept_parameter: str
+    index: int
+    parameters: ParametersType
+    directory_path: Path
+    # Stores the time the transient was simulated from, as a windowed transient holds nothing before it
+    transient_start_time: float = 0.0
+
+    @property
+    def output_file_path(self) -> Path:
+        # Outputs saved before compression was added are still csv
+        compressed_output_file_path = self.directory_path / SIMULATION_COMPRESSED_OUTPUT_FILE_NAME
+        if compressed_output_file_path.exists():
+            return compressed_output_file_path
+        return self.directory_path / SIMULATION_OUTPUT_FILE_NAME
+
+    @property
+    def pyramid_file_path(self) -> Path:
+        return self.directory_path / SIMULATION_OUTPUT_PYRAMID_FILE_NAME
+
+
+# --------------------------------------------------
+#   Classes
+# --------------------------------------------------
+
+class SimulationOutputDataset:
+    """ Lazy view over a saved simulation output tree.
+
+    The tree is indexed once (from its manifest when available) into run -> sweep -> point -> parameters, and
+    waveforms are only read from disk when requested, with the most recently used ones kept in memory.
+    """
+
+    def __init__(
+            self,
+            output_directory_path: str | Path,
+            simulation_type: SimulationType,
+            cache_size: int = DEFAULT_WAVEFORM_CACHE_SIZE,
+    ) -> None:
+        if isinstance(output_directory_path, str):
+            output_directory_path = Path(output_directory_path)
+
+        self.output_directory_path = output_directory_path
+        self.simulation_type = SimulationType(simulation_type)
+        self.cache_size = cache_size
+
+        self._entries = _load_entries(
+            output_directory_path=output_directory_path,
+            parameters_type=get_parameters_type(self.simulation_type),
+        )
+        self._positions = {
+            (entry.run_name, entry.swept_parameter, entry.index): position
+            for position, entry in enumerate(self._entries)
+        }
+        self._index: pd.DataFrame | None = None
+        self._waveform_cache: collections.OrderedDict[int, pd.DataFrame] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> typing.Iterator[SimulationOutputEntry]:
+        return iter(self._entries)
+
+    @property
+    def entries(self) -> list[SimulationOutputEntry]:
+        return list(self._entries)
+
+    @property
+    def index(self) -> pd.DataFrame:
+        # The tabular index is only built on first use, as opening the dataset should not pay for it
+        if self._index is None:
+            self._index = pd.DataFrame([
+                {
+                    RUN_NAME_INDEX_COLUMN: entry.run_name,
+                    SWEPT_PARAMETER_INDEX_COLUMN: entry.swept_parameter,
+                    POINT_INDEX_COLUMN: entry.index,
+                    **dataclasses.asdict(entry.parameters),
+                }
+                for entry in self._entries
+            ])
+        return self._index
+
+    @property
+    def run_names(self) -> list[str]:
+        return list(dict.fromkeys(entry.run_name for entry in self._entries))
+
+    def get_swept_parameters(self, run_name: str) -> list[str]:
+        return list(dict.fromkeys(entry.swept_parameter for entry in self._entries if entry.run_name == run_name))
+
+    def get_entry(self, run_name: str, swept_parameter: str, index: int) -> SimulationOutputEntry:
+        try:
+            return self._entries[self._positions[(run_name, swept_parameter, index)]]
+        except KeyError:
+            raise KeyError(f"No simulation output for run '{run_name}', sweep '{swept_parameter}', point {index}")
+
+    def select(
+            self,
+            run_name: str | None = None,
+            swept_parameter: str | None = None,
+            where: str | typing.Callable[[ParametersType], bool] | None = None,
+    ) -> list[SimulationOutputEntry]:
+        # Filters only use the index, so no waveform file is touched. A string condition is evaluated as a
+        # pandas query against the parameter columns, e.g. "load_test_current > 10"
+        if isinstance(where, str):
+            positions = self.index.query(where).index
+            candidates = [self._entries[position] for position in positions]
+        else:
+            candidates = self._entries
+
+        return [
+            entry for entry in candidates
+            if (run_name is None or entry.run_name == run_name)
+            and (swept_parameter is None or entry.swept_parameter == swept_parameter)
+            and (where is None or isinstance(where, str) or where(entry.parameters))
+        ]
+
+    def load(self, entry: SimulationOutputEntry) -> pd.DataFrame:
+        position = self._positions[(entry.run_name, entry.swept_parameter, entry.index)]
+
+        if position in self._waveform_cache:
+            self._waveform_cache.move_to_end(position)
+            return self._waveform_cache[position]
+
+        waveform_data = load_simulation_point_output(entry.directory_path)
+        if entry.transient_start_time:
+            waveform_data.attrs[TRANSIENT_START_TIME_ATTRS_KEY] = entry.transient_start_time
+
+        if self.cache_size > 0:
+            self._waveform_cache[position] = waveform_data
+            while len(self._waveform_cache) > self.cache_size:
+                self._waveform_cache.popitem(last=False)
+
+        return waveform_data
+
+    def iter_chunks(
+            self,
+            entry: SimulationOutputEntry,
+            chunk_size: int = DEFAULT_WAVEFORM_CHUNK_SIZE,
+    ) -> typing.Iterator[pd.DataFrame]:
+        # Streamed waveforms bypass the cache, as they are read because they do not fit in memory
+        return iter_simulation_point_output_chunks(entry.directory_path, chunk_size=chunk_size)
+
+    def load_pyramid(self, entry: SimulationOutputEntry) -> WaveformPyramidData:
+        # Outputs saved before pyramids were written fall back to building one from the waveform
+        if entry.pyramid_file_path.exists():
+            return load_waveform_pyramid(entry.pyramid_file_path)
+        return build_waveform_pyramid(self.load(entry))
+
+    def clear_cache(self) -> None:
+        self._waveform_cache.clear()
+
+    def to_per_run_outputs(
+            self,
+            entries: list[SimulationOutputEntry] | None = None,
+            lazy: bool = False,
+            chunk_size: int | None = None,
+    ) -> dict[str, dict[str, list[tuple[ParametersType, pd.DataFrame | typing.Callable[[], pd.DataFrame] | WaveformChunkSourceData]]]]:
+        # Builds the nested structure returned by load_simulation_outputs. When lazy, each waveform is replaced
+        # by a callable that loads it on demand, and with a chunk size, by a source that streams it in chunks
+        if entries is None:
+            entries = self._entries
+
+        per_run_outputs = {}
+        for entry in entries:
+            if chunk_size is not None:
+                waveform_data = WaveformChunkSourceData(
+                    open_chunks=functools.partial(self.iter_chunks, entry, chunk_size),
+                    transient_start_time=entry.transient_start_time,
+                )
+            elif lazy:
+                waveform_data = functools.partial(self.load, entry)
+            else:
+                waveform_data = self.load(entry)
+            per_run_outputs.setdefault(entry.run_name, {}).setdefault(entry.swept_parameter, []).append(
+                (entry.parameters, waveform_data)
+            )
+
+        return per_run_outputs
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def open_simulation_output_dataset(
+        output_directory_path: str | Path,
+        simulation_type: SimulationType,
+        cache_size: int = DEFAULT_WAVEFORM_CACHE_SIZE,
+) -> SimulationOutputDataset:
+    return SimulationOutputDataset(
+        output_directory_path=output_directory_path,
+        simulation_type=simulation_type,
+        cache_size=cache_size,
+    )
+
+
+def _load_entries(
+        output_directory_path: Path,
+        parameters_type: type[ParametersType],
+) -> list[SimulationOutputEntry]:
+    manifest_entries = load_simulation_manifest(output_directory_path)
+
+    if manifest_entries is None:
+        manifest_entries = _scan_manifest_entries(output_directory_path)
+
+    entries = []
+    for manifest_entry in manifest_entries:
+        run_name = manifest_entry["run_name"]
+        swept_parameter = manifest_entry["swept_parameter"]
+        index = int(manifest_entry["index"])
+        entries.append(SimulationOutputEntry(
+            run_name=run_name,
+            swept_parameter=swept_parameter,
+            index=index,
+            parameters=parameters_type(**manifest_entry["parameters"]),
+            directory_path=output_directory_path / run_name / swept_parameter / f"{index}",
+            # Entries without a recorded start are full transients
+            transient_start_time=float(manifest_entry.get("transient_start_time", 0.0)),
+        ))
+
+    return entries
+
+
+def _scan_manifest_entries(output_directory_path: Path) -> list[dict]:
+    # Fallback for output trees saved without a manifest. Only the small parameter files are read
+    manifest_entries = []
+
+    for run_directory in sorted(output_directory_path.iterdir()):
+        if not run_directory.is_dir():
+            continue
+
+        for swept_parameter_directory in sorted(run_directory.iterdir()):
+            if not swept_parameter_directory.is_dir():
+                continue
+
+            simulation_directories = [
+                directory for directory in swept_parameter_directory.iterdir()
+                if directory.is_dir() and directory.name.isdigit()
+            ]
+            for simulation_directory in sorted(simulation_directories, key=lambda x: int(x.name)):
+                simulation_parameters_file_path = simulation_directory / SIMULATION_PARAMETERS_FILE_NAME
+                with open(simulation_parameters_file_path, "r") as json_file:
+                    simulation_parameters_data = json.load(json_file)
+
+                manifest_entries.append({
+                    "run_name": run_directory.name,
+                    "swept_parameter": swept_parameter_directory.name,
+                    "index": int(simulation_directory.name),
+                    "parameters": simulation_parameters_data,
+                })
+
+    return manifest_entries
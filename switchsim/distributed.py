@@ -0,0 +1,585 @@
+""" Distributed Simulation Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+import dataclasses
+from pathlib import Path
+from datetime import datetime
+
+from .config import *
+from .execution import *
+from .metrics import *
+from .scheduling import *
+from .simulation import *
+from .spice import *
+from .utils import *
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "DEFAULT_LEASE_TIMEOUT",
+    "DEFAULT_HEARTBEAT_INTERVAL",
+    "DEFAULT_POLL_INTERVAL",
+    "DEFAULT_MAX_JOB_ATTEMPTS",
+    "DirectoryJobQueue",
+    "generate_submission_id",
+    "submit_simulation_jobs",
+    "wait_for_simulation_jobs",
+    "run_distributed_simulations",
+    "run_simulation_worker",
+]
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+# Stores the time in seconds after which a job without a heartbeat is considered abandoned
+DEFAULT_LEASE_TIMEOUT = 300.0
+DEFAULT_HEARTBEAT_INTERVAL = 30.0
+DEFAULT_POLL_INTERVAL = 5.0
+DEFAULT_MAX_JOB_ATTEMPTS = 3
+
+PENDING_DIRECTORY_NAME = "pending"
+LEASED_DIRECTORY_NAME = "leased"
+DONE_DIRECTORY_NAME = "done"
+FAILED_DIRECTORY_NAME = "failed"
+SETUP_DIRECTORY_NAME = "setups"
+JOB_FILE_SUFFIX = ".json"
+
+
+# --------------------------------------------------
+#   Classes
+# --------------------------------------------------
+
+class DirectoryJobQueue:
+    """ Job queue stored in a (shared) directory.
+
+    Every job is a JSON file that moves between the pending, leased, done and failed directories through atomic
+    renames, so any number of workers on hosts sharing the filesystem can claim jobs without a server. A leased
+    job's modification time is its heartbeat; jobs whose heartbeat is older than the lease timeout are re-queued,
+    or failed once they have used up their attempts.
+
+    Each claim renames the job to a name holding a new lease token, and only the holder of that token can heartbeat,
+    complete or fail it, so a worker whose lease expired cannot act on the job once it was claimed again. Job ids
+    start with the id of their submission, whose setup is stored apart, so submissions can share a queue.
+    """
+
+    def __init__(self, queue_directory_path: str | Path) -> None:
+        if isinstance(queue_directory_path, str):
+            queue_directory_path = Path(queue_directory_path)
+
+        self.queue_directory_path = queue_directory_path
+        self.pending_directory_path = queue_directory_path / PENDING_DIRECTORY_NAME
+        self.leased_directory_path = queue_directory_path / LEASED_DIRECTORY_NAME
+        self.done_directory_path = queue_directory_path / DONE_DIRECTORY_NAME
+        self.failed_directory_path = queue_directory_path / FAILED_DIRECTORY_NAME
+        self.setup_directory_path = queue_directory_path / SETUP_DIRECTORY_NAME
+
+    def create(self) -> None:
+        for directory_path in self._state_directory_paths + [self.setup_directory_path]:
+            directory_path.mkdir(parents=True, exist_ok=True)
+
+    def write_setup(self, submission_id: str, setup_data: dict) -> None:
+        _write_json_atomically(self.setup_directory_path / f"{submission_id}{JOB_FILE_SUFFIX}", setup_data)
+
+    def read_setup(self, submission_id: str) -> dict:
+        return _read_json(self.setup_directory_path / f"{submission_id}{JOB_FILE_SUFFIX}")
+
+    def submit(self, submission_id: str, job_index: int, job_data: dict) -> str:
+        # The submission ids sort by time, so the workers claim earlier submissions first
+        job_id = f"{submission_id}-{job_index:08d}"
+        _write_json_atomically(self.pending_directory_path / f"{job_id}{JOB_FILE_SUFFIX}", {
+            **job_data,
+            "job_id": job_id,
+            "submission_id": submission_id,
+            "attempts": 0,
+        })
+        return job_id
+
+    def claim(self, worker_id: str) -> dict | None:
+        # Jobs are claimed in file name order. Losing the rename race to another worker just moves on to the next
+        for job_file_path in sorted(self.pending_directory_path.glob(f"*{JOB_FILE_SUFFIX}")):
+            lease_token = uuid.uuid4().hex[:16]
+            leased_job_file_path = self._get_leased_job_file_path(job_file_path.stem, lease_token)
+            try:
+                os.rename(job_file_path, leased_job_file_path)
+                # Renaming keeps the queued modification time, which would otherwise read as an expired lease
+                os.utime(leased_job_file_path)
+            except (FileNotFoundError, PermissionError):
+                continue
+
+            job_data = _read_json(leased_job_file_path)
+            job_data["worker_id"] = worker_id
+            job_data["lease_token"] = lease_token
+            job_data["attempts"] += 1
+            _write_json_atomically(leased_job_file_path, job_data)
+            return job_data
+
+        return None
+
+    def heartbeat(self, job_id: str, lease_token: str) -> bool:
+        try:
+            os.utime(self._get_leased_job_file_path(job_id, lease_token))
+        except FileNotFoundError:
+            # The lease expired and the job was handed back to the queue, and maybe to another worker
+            return False
+        return True
+
+    def complete(self, job_id: str, lease_token: str) -> bool:
+        return self._settle_leased_job(job_id, lease_token, self.done_directory_path) is not None
+
+    def fail(
+            self,
+            job_id: str,
+            lease_token: str,
+            message: str,
+            retry: bool = True,
+            max_attempts: int = DEFAULT_MAX_JOB_ATTEMPTS,
+    ) -> bool:
+        destination_directory_path = self._settle_leased_job(
+            job_id,
+            lease_token,
+            self.failed_directory_path,
+            message,
+            retry,
+            max_attempts,
+        )
+        return destination_directory_path is not None
+
+    def requeue_expired(
+            self,
+            lease_timeout: float = DEFAULT_LEASE_TIMEOUT,
+            max_attempts: int = DEFAULT_MAX_JOB_ATTEMPTS,
+    ) -> list[str]:
+        # An expired lease counts as a failed attempt, which was counted when the job was claimed, so a job that
+        # keeps taking its workers down is failed after its last attempt instead of being re-queued forever. The
+        # lease token is dropped, so the job's holder can no longer act on it
+        expiry_time = time.time() - lease_timeout
+        requeued_job_ids = []
+
+        for leased_job_file_path in self.leased_directory_path.glob(f"*{JOB_FILE_SUFFIX}"):
+            job_id, lease_token = leased_job_file_path.name.split(".")[:2]
+            try:
+                if leased_job_file_path.stat().st_mtime >= expiry_time:
+                    continue
+            except FileNotFoundError:
+                continue
+
+            destination_directory_path = self._settle_leased_job(
+                job_id,
+                lease_token,
+                self.failed_directory_path,
+                f"The lease expired without a heartbeat for {lease_timeout} seconds",
+                retry=True,
+                max_attempts=max_attempts,
+            )
+            if destination_directory_path == self.pending_directory_path:
+                requeued_job_ids.append(job_id)
+
+        return requeued_job_ids
+
+    def get_counts(self, submission_id: str | None = None) -> dict[str, int]:
+        # Counts the jobs of one submission, or of every submission
+        return {
+            directory_path.name: sum(1 for _ in directory_path.glob(_get_job_file_pattern(submission_id)))
+            for directory_path in self._state_directory_paths
+        }
+
+    def get_jobs(self, state: str, submission_id: str | None = None) -> list[dict]:
+        directory_path = self.queue_directory_path / state
+        return [
+            _read_json(job_file_path)
+            for job_file_path in sorted(directory_path.glob(_get_job_file_pattern(submission_id)))
+        ]
+
+    @property
+    def _state_directory_paths(self) -> list[Path]:
+        return [
+            self.pending_directory_path,
+            self.leased_directory_path,
+            self.done_directory_path,
+            self.failed_directory_path,
+        ]
+
+    def _get_leased_job_file_path(self, job_id: str, lease_token: str) -> Path:
+        return self.leased_directory_path / f"{job_id}.{lease_token}{JOB_FILE_SUFFIX}"
+
+    def _settle_leased_job(
+            self,
+            job_id: str,
+            lease_token: str,
+            destination_directory_path: Path,
+            message: str | None = None,
+            retry: bool = False,
+            max_attempts: int = DEFAULT_MAX_JOB_ATTEMPTS,
+    ) -> Path | None:
+        # The lease is first taken out of the leased directory under a hidden name, so it can no longer be re-queued
+        # while it is updated. Without the lease, the job belongs to someone else and is left alone. Returns the
+        # directory the job was moved to
+        settling_job_file_path = self.leased_directory_path / f".{job_id}.{lease_token}.settling"
+        try:
+            os.rename(self._get_leased_job_file_path(job_id, lease_token), settling_job_file_path)
+        except FileNotFoundError:
+            return None
+
+        if message is not None:
+            job_data = _read_json(settling_job_file_path)
+            job_data["error"] = message
+            _write_json_atomically(settling_job_file_path, job_data)
+            if retry and job_data["attempts"] < max_attempts:
+                destination_directory_path = self.pending_directory_path
+
+        os.rename(settling_job_file_path, destination_directory_path / f"{job_id}{JOB_FILE_SUFFIX}")
+        return destination_directory_path
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def submit_simulation_jobs(
+        queue_directory_path: str | Path,
+        simulation_type: SimulationType,
+        runs: dict[str, RunData],
+        default_parameters: ParametersType,
+        output_field_mapping: OutputFieldsType,
+        output_directory_path: str | Path,
+        ltspice_executable_file_path: str = DEFAULT_LTSPICE_EXECUTABLE_FILE_PATH,
+        execution_policy: ExecutionPolicyData | None = None,
+        runtime_history: RuntimeHistory | None = None,
+        use_netlist: bool = False,
+        save_mapped_traces: bool = False,
+        windowed_results: list[str] | None = None,
+        submission_id: str | None = None,
+) -> list[SimulationJobData]:
+    # The jobs are queued under the submission id, a new one by default, which wait_for_simulation_jobs takes to
+    # follow only them
+    if execution_policy is None:
+        execution_policy = ExecutionPolicyData()
+    if submission_id is None:
+        submission_id = generate_submission_id()
+    if use_netlist:
+        # The netlists are written next to their schematics, where the workers already expect the sources
+        runs = compile_run_netlists(
+            runs=runs,
+            ltspice_executable_file_path=ltspice_executable_file_path,
+            execution_policy=execution_policy,
+        )
+
+    queue = DirectoryJobQueue(queue_directory_path)
+    queue.create()
+
+    # Everything shared by the jobs is written once, so the job files only carry the point itself
+    queue.write_setup(submission_id, {
+        "simulation_type": SimulationType(simulation_type).value,
+        "output_field_mapping": dataclasses.asdict(output_field_mapping),
+        "output_directory_path": str(Path(output_directory_path).absolute()),
+        "ltspice_executable_file_path": str(ltspice_executable_file_path),
+        "execution_policy": dataclasses.asdict(execution_policy),
+        "save_mapped_traces": save_mapped_traces,
+        "windowed_results": windowed_results,
+    })
+
+    jobs = get_simulation_jobs(
+        simulation_type=simulation_type,
+        runs=runs,
+        default_parameters=default_parameters,
+    )
+
+    # Each unique point is queued once, and the worker writes its output to every sweep that references it. The
+    # workers claim the jobs in id order, so the ids follow the longest-first schedule
+    scheduled_points = schedule_simulation_points(plan_simulation_points(jobs), runtime_history)
+    for i, point in enumerate(scheduled_point.point for scheduled_point in scheduled_points):
+        queue.submit(submission_id, i, {
+            "targets": [
+                {
+                    "run_name": job.run_name,
+                    "swept_parameter": job.swept_parameter,
+                    "index": job.index,
+                }
+                for job in point.jobs
+            ],
+            "source_file_path": str(point.source_file_path),
+            "parameters": dataclasses.asdict(point.parameters),
+        })
+
+    return jobs
+
+
+def wait_for_simulation_jobs(
+        queue_directory_path: str | Path,
+        submission_id: str,
+        lease_timeout: float = DEFAULT_LEASE_TIMEOUT,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        max_job_attempts: int = DEFAULT_MAX_JOB_ATTEMPTS,
+        metrics: SimulationMetrics | None = None,
+        verbose: bool = False,
+) -> list[dict]:
+    queue = DirectoryJobQueue(queue_directory_path)
+
+    while True:
+        requeued_job_ids = queue.requeue_expired(lease_timeout, max_job_attempts)
+        if requeued_job_ids:
+            verbose_print(verbose, f"Re-queued {len(requeued_job_ids)} abandoned job(s): {', '.join(requeued_job_ids)}")
+
+        counts = queue.get_counts(submission_id)
+        verbose_print(verbose, ", ".join(f"{state}: {count}" for state, count in counts.items()))
+
+        # The coordinator only sees the queue, so the point timings are left to the workers' own metrics
+        if metrics is not None:
+            metrics.set("points_pending", counts[PENDING_DIRECTORY_NAME] + counts[LEASED_DIRECTORY_NAME])
+            metrics.set("workers_busy", counts[LEASED_DIRECTORY_NAME])
+            metrics.set("points_completed_total", counts[DONE_DIRECTORY_NAME])
+            metrics.set("points_failed_total", counts[FAILED_DIRECTORY_NAME])
+
+        if counts[PENDING_DIRECTORY_NAME] == 0 and counts[LEASED_DIRECTORY_NAME] == 0:
+            break
+        time.sleep(poll_interval)
+
+    # The workers write their outputs independently, so the manifest is written once every job has settled
+    setup_data = queue.read_setup(submission_id)
+    update_simulation_manifest(
+        output_directory_path=setup_data["output_directory_path"],
+        manifest_entries=[
+            {
+                **target,
+                "parameters": job_data["parameters"],
+            }
+            for job_data in queue.get_jobs(DONE_DIRECTORY_NAME, submission_id)
+            for target in job_data["targets"]
+        ],
+    )
+
+    return queue.get_jobs(FAILED_DIRECTORY_NAME, submission_id)
+
+
+def run_distributed_simulations(
+        queue_directory_path: str | Path,
+        simulation_type: SimulationType,
+        runs: dict[str, RunData],
+        default_parameters: ParametersType,
+        output_field_mapping: OutputFieldsType,
+        output_directory_path: str | Path,
+        ltspice_executable_file_path: str = DEFAULT_LTSPICE_EXECUTABLE_FILE_PATH,
+        execution_policy: ExecutionPolicyData | None = None,
+        lease_timeout: float = DEFAULT_LEASE_TIMEOUT,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        max_job_attempts: int = DEFAULT_MAX_JOB_ATTEMPTS,
+        runtime_history: RuntimeHistory | None = None,
+        use_netlist: bool = False,
+        save_mapped_traces: bool = False,
+        windowed_results: list[str] | None = None,
+        metrics: SimulationMetrics | None = None,
+        verbose: bool = False,
+) -> list[dict]:
+    if execution_policy is None:
+        execution_policy = ExecutionPolicyData()
+
+    submission_id = generate_submission_id()
+    jobs = submit_simulation_jobs(
+        queue_directory_path=queue_directory_path,
+        simulation_type=simulation_type,
+        runs=runs,
+        default_parameters=default_parameters,
+        output_field_mapping=output_field_mapping,
+        output_directory_path=output_directory_path,
+        ltspice_executable_file_path=ltspice_executable_file_path,
+        execution_policy=execution_policy,
+        runtime_history=runtime_history,
+        use_netlist=use_netlist,
+        save_mapped_traces=save_mapped_traces,
+        windowed_results=windowed_results,
+        submission_id=submission_id,
+    )
+    verbose_print(verbose, f"Submitted {len(jobs)} point(s) to {queue_directory_path} as {submission_id}")
+
+    failed_jobs = wait_for_simulation_jobs(
+        queue_directory_path=queue_directory_path,
+        submission_id=submission_id,
+        lease_timeout=lease_timeout,
+        poll_interval=poll_interval,
+        max_job_attempts=max_job_attempts,
+        metrics=metrics,
+        verbose=verbose,
+    )
+
+    if failed_jobs and not execution_policy.skip_failed:
+        raise RuntimeError("\n".join(
+            f"Job {job_data['job_id']} ({_format_job_targets(job_data)}) failed: {job_data.get('error')}"
+            for job_data in failed_jobs
+        ))
+
+    return failed_jobs
+
+
+def run_simulation_worker(
+        queue_directory_path: str | Path,
+        worker_id: str | None = None,
+        lease_timeout: float = DEFAULT_LEASE_TIMEOUT,
+        heartbeat_interval: float = DEFAULT_HEARTBEAT_INTERVAL,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        max_job_attempts: int = DEFAULT_MAX_JOB_ATTEMPTS,
+        exit_when_idle: bool = True,
+        metrics: SimulationMetrics | None = None,
+        verbose: bool = False,
+) -> int:
+    if worker_id is None:
+        worker_id = f"{socket.gethostname()}-{os.getpid()}"
+
+    queue = DirectoryJobQueue(queue_directory_path)
+    # Stores the setup of every submission the worker has run a job of
+    per_submission_setups = {}
+
+    num_completed_jobs = 0
+
+    while True:
+        job_data = queue.claim(worker_id)
+
+        if job_data is None:
+            # Abandoned jobs are picked up by whichever process notices them first
+            queue.requeue_expired(lease_timeout, max_job_attempts)
+            counts = queue.get_counts()
+            if exit_when_idle and counts[PENDING_DIRECTORY_NAME] == 0 and counts[LEASED_DIRECTORY_NAME] == 0:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        job_id = job_data["job_id"]
+        lease_token = job_data["lease_token"]
+        verbose_print(verbose, f"{worker_id}: {job_id} - {_format_job_targets(job_data)}")
+
+        stop_heartbeat_event = threading.Event()
+        heartbeat_thread = threading.Thread(
+            target=_heartbeat_job,
+            args=(queue, job_id, lease_token, heartbeat_interval, stop_heartbeat_event),
+            daemon=True,
+        )
+        heartbeat_thread.start()
+
+        if metrics is not None:
+            metrics.set("workers_busy", 1)
+        start_time = time.time()
+        try:
+            submission_id = job_data["submission_id"]
+            if submission_id not in per_submission_setups:
+                per_submission_setups[submission_id] = queue.read_setup(submission_id)
+            setup_data = per_submission_setups[submission_id]
+
+            simulation_type = SimulationType(setup_data["simulation_type"])
+            output_field_mapping = get_output_fields_type(simulation_type)(**setup_data["output_field_mapping"])
+            execution_policy = _execution_policy_from_setup_dict(setup_data["execution_policy"])
+            input_parameters = get_parameters_type(simulation_type)(**job_data["parameters"])
+
+            # Failures are surfaced as exceptions, so the queue decides whether the point is retried or skipped
+            [(used_parameters, simulation_outputs)] = simulate(
+                simulation_type=simulation_type,
+                source_file_path=job_data["source_file_path"],
+                output_field_mapping=output_field_mapping,
+                input_parameters_collection=[input_parameters],
+                cleanup=True,
+                ltspice_executable_file_path=setup_data["ltspice_executable_file_path"],
+                execution_policy=dataclasses.replace(execution_policy, skip_failed=False),
+                save_mapped_traces=setup_data.get("save_mapped_traces", False),
+                windowed_results=setup_data.get("windowed_results"),
+                metrics=metrics,
+            )
+
+            # A worker whose lease expired leaves the outputs to the worker that claimed the job again
+            if not queue.heartbeat(job_id, lease_token):
+                verbose_print(verbose, f"{worker_id}: {job_id} lost its lease, its outputs are discarded")
+                continue
+
+            for target in job_data["targets"]:
+                save_simulation_point_output(
+                    output_directory_path=setup_data["output_directory_path"],
+                    run_name=target["run_name"],
+                    swept_parameter=target["swept_parameter"],
+                    index=target["index"],
+                    used_parameters=used_parameters,
+                    simulation_outputs=simulation_outputs,
+                    metrics=metrics,
+                )
+        except SimulationExecutionError as error:
+            retry = error.failure_type in execution_policy.retry_failure_types
+            queue.fail(job_id, lease_token, str(error), retry=retry, max_attempts=max_job_attempts)
+            verbose_print(verbose, f"{worker_id}: {job_id} failed - {error}")
+        except Exception as error:
+            # Execution failures are counted by simulate, everything else only here
+            if metrics is not None:
+                metrics.increment("points_failed_total")
+            queue.fail(job_id, lease_token, repr(error), max_attempts=max_job_attempts)
+            verbose_print(verbose, f"{worker_id}: {job_id} failed - {error!r}")
+        else:
+            if metrics is not None:
+                metrics.observe("point_seconds", time.time() - start_time)
+            if queue.complete(job_id, lease_token):
+                num_completed_jobs += 1
+        finally:
+            if metrics is not None:
+                metrics.set("workers_busy", 0)
+            stop_heartbeat_event.set()
+            heartbeat_thread.join()
+
+    return num_completed_jobs
+
+
+def generate_submission_id() -> str:
+    return f"{datetime.now().strftime('%Y%m%d%H%M%S')}{uuid.uuid4().hex[:8]}"
+
+
+def _heartbeat_job(
+        queue: DirectoryJobQueue,
+        job_id: str,
+        lease_token: str,
+        heartbeat_interval: float,
+        stop_event: threading.Event,
+) -> None:
+    while not stop_event.wait(heartbeat_interval):
+        if not queue.heartbeat(job_id, lease_token):
+            break
+
+
+def _get_job_file_pattern(submission_id: str | None) -> str:
+    return f"{submission_id}-*{JOB_FILE_SUFFIX}" if submission_id is not None else f"*{JOB_FILE_SUFFIX}"
+
+
+def _format_job_targets(job_data: dict) -> str:
+    return ", ".join(
+        f"{target['run_name']}/{target['swept_parameter']}/{target['index']}" for target in job_data["targets"]
+    )
+
+
+def _execution_policy_from_setup_dict(execution_policy_data: dict) -> ExecutionPolicyData:
+    return ExecutionPolicyData(**{
+        **execution_policy_data,
+        "retry_failure_types": tuple(
+            SimulationFailureType(failure_type) for failure_type in execution_policy_data["retry_failure_types"]
+        ),
+    })
+
+
+def _read_json(file_path: Path) -> dict:
+    with open(file_path, "r") as json_file:
+        return json.load(json_file)
+
+
+def _write_json_atomically(file_path: Path, data: dict) -> None:
+    # Written next to the destination first, so readers never observe a partially written file
+    temporary_file_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.tmp")
+    with open(temporary_file_path, "w") as json_file:
+        json.dump(data, json_file)
+    os.replace(temporary_file_path, file_path)
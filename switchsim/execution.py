@@ -0,0 +1,283 @@
+""" Simulator Process Execution Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import os
+import re
+import sys
+import enum
+import time
+import signal
+import typing
+import subprocess
+import dataclasses
+from pathlib import Path
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "SimulationFailureType",
+    "DEFAULT_RETRY_FAILURE_TYPES",
+    "ExecutionPolicyData",
+    "ExecutionResultData",
+    "SimulationExecutionError",
+    "run_process",
+    "kill_process_tree",
+    "read_ltspice_log",
+    "classify_ltspice_log",
+    "execute_with_retries",
+]
+
+
+# --------------------------------------------------
+#   Enums
+# --------------------------------------------------
+
+class SimulationFailureType(enum.StrEnum):
+    TIMEOUT = "timeout"
+    CONVERGENCE = "convergence"
+    TIMESTEP_TOO_SMALL = "timestep_too_small"
+    MISSING_MODEL = "missing_model"
+    PROCESS_ERROR = "process_error"
+    MISSING_OUTPUT = "missing_output"
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+# Patterns are checked in order against the LTspice .log, so the most specific failures come first
+LTSPICE_LOG_FAILURE_PATTERNS = (
+    (SimulationFailureType.TIMESTEP_TOO_SMALL, re.compile(r"time\s*step too small", re.IGNORECASE)),
+    (SimulationFailureType.MISSING_MODEL, re.compile(
+        r"unknown subcircuit|unknown model|can't find definition of model|could not open include file|"
+        r"could not find (?:subcircuit|model)|missing model",
+        re.IGNORECASE,
+    )),
+    (SimulationFailureType.CONVERGENCE, re.compile(
+        r"(?:gmin|source) stepping failed|convergence failed|failed to converge|iteration limit reached|"
+        r"singular matrix",
+        re.IGNORECASE,
+    )),
+)
+
+# Stores the log lines of an operating point method that succeeded after an earlier one failed to converge
+LTSPICE_LOG_RECOVERY_PATTERN = re.compile(r"stepping succeeded|operating point found", re.IGNORECASE)
+
+# Failures that are deterministic for a given netlist are not retried by default
+DEFAULT_RETRY_FAILURE_TYPES = (
+    SimulationFailureType.TIMEOUT,
+    SimulationFailureType.PROCESS_ERROR,
+    SimulationFailureType.MISSING_OUTPUT,
+)
+
+
+# --------------------------------------------------
+#   Dataclasses
+# --------------------------------------------------
+
+@dataclasses.dataclass(frozen=True)
+class ExecutionPolicyData:
+    # Stores the wall-clock limit of a single attempt in seconds, or None for no limit
+    timeout: float | None = None
+    # Stores the number of attempts made after the first one fails
+    max_retries: int = 0
+    # Stores the delay before the first retry in seconds
+    backoff: float = 1.0
+    # Stores the multiplier applied to the delay after each retry
+    backoff_factor: float = 2.0
+    retry_failure_types: tuple[SimulationFailureType, ...] = DEFAULT_RETRY_FAILURE_TYPES
+    # Stores whether failed points are skipped instead of aborting the sweep
+    skip_failed: bool = False
+
+
+@dataclasses.dataclass(frozen=True)
+class ExecutionResultData:
+    return_code: int | None
+    duration: float
+    attempts: int
+    failure_type: SimulationFailureType | None = None
+    failure_message: str | None = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.failure_type is None
+
+
+# --------------------------------------------------
+#   Exceptions
+# --------------------------------------------------
+
+class SimulationExecutionError(RuntimeError):
+    def __init__(self, message: str, execution_result: ExecutionResultData) -> None:
+        super().__init__(message)
+        self.execution_result = execution_result
+
+    @property
+    def failure_type(self) -> SimulationFailureType | None:
+        return self.execution_result.failure_type
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def run_process(
+        argv: list[str],
+        timeout: float | None = None,
+        cwd: str | Path | None = None,
+) -> tuple[int | None, bool]:
+    # The process is started in its own group so the whole tree can be killed when it overruns
+    if sys.platform == "win32":
+        process = subprocess.Popen(argv, cwd=cwd, creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+    else:
+        process = subprocess.Popen(argv, cwd=cwd, start_new_session=True)
+
+    try:
+        return_code = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        kill_process_tree(process)
+        process.wait()
+        return None, True
+
+    return return_code, False
+
+
+def kill_process_tree(process: subprocess.Popen) -> None:
+    if sys.platform == "win32":
+        subprocess.run(
+            ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        return
+
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def read_ltspice_log(log_file_path: str | Path) -> str | None:
+    if isinstance(log_file_path, str):
+        log_file_path = Path(log_file_path)
+
+    if not log_file_path.exists():
+        return None
+
+    data = log_file_path.read_bytes()
+
+    # Depending on the version and settings, LTspice writes its log as UTF-16LE or as plain text
+    if data.startswith(b"\xff\xfe") or b"\x00" in data[:64]:
+        return data.decode("utf-16-le", errors="ignore").lstrip("\ufeff")
+    return data.decode("utf-8", errors="ignore")
+
+
+def classify_ltspice_log(log_file_path: str | Path) -> tuple[SimulationFailureType | None, str | None]:
+    log_text = read_ltspice_log(log_file_path)
+    if log_text is None:
+        return None, None
+
+    # LTspice also logs the operating point methods it recovered from, such as a failed gmin stepping followed by a
+    # successful source stepping, which are not failures of the run
+    lines = log_text.splitlines()
+    for failure_type, pattern in LTSPICE_LOG_FAILURE_PATTERNS:
+        for i, line in enumerate(lines):
+            if not pattern.search(line):
+                continue
+            if failure_type == SimulationFailureType.CONVERGENCE and any(
+                    LTSPICE_LOG_RECOVERY_PATTERN.search(later_line) for later_line in lines[i + 1:]
+            ):
+                continue
+            return failure_type, line.strip()
+
+    return None, None
+
+
+def execute_with_retries(
+        argv: list[str],
+        output_file_path: str | Path,
+        log_file_path: str | Path,
+        execution_policy: ExecutionPolicyData | None = None,
+        cwd: str | Path | None = None,
+        validate_output: typing.Callable[[Path], tuple[SimulationFailureType | None, str | None]] | None = None,
+) -> ExecutionResultData:
+    # An output that validate_output rejects fails the attempt like any other failure, so it is retried by policy
+    if execution_policy is None:
+        execution_policy = ExecutionPolicyData()
+    if isinstance(output_file_path, str):
+        output_file_path = Path(output_file_path)
+
+    start_time = time.time()
+    backoff = execution_policy.backoff
+    max_attempts = execution_policy.max_retries + 1
+    attempt = 0
+
+    while True:
+        attempt += 1
+        # A previous attempt's files would otherwise pass for this attempt's output
+        _remove_attempt_files(output_file_path, log_file_path)
+        return_code, timed_out = run_process(argv, timeout=execution_policy.timeout, cwd=cwd)
+
+        failure_type, failure_message = _classify_attempt(
+            return_code=return_code,
+            timed_out=timed_out,
+            output_file_path=output_file_path,
+            log_file_path=log_file_path,
+            execution_policy=execution_policy,
+            validate_output=validate_output,
+        )
+
+        execution_result = ExecutionResultData(
+            return_code=return_code,
+            duration=time.time() - start_time,
+            attempts=attempt,
+            failure_type=failure_type,
+            failure_message=failure_message,
+        )
+
+        if failure_type is None or failure_type not in execution_policy.retry_failure_types or attempt == max_attempts:
+            return execution_result
+
+        time.sleep(backoff)
+        backoff *= execution_policy.backoff_factor
+
+
+def _classify_attempt(
+        return_code: int | None,
+        timed_out: bool,
+        output_file_path: Path,
+        log_file_path: str | Path,
+        execution_policy: ExecutionPolicyData,
+        validate_output: typing.Callable[[Path], tuple[SimulationFailureType | None, str | None]] | None = None,
+) -> tuple[SimulationFailureType | None, str | None]:
+    if timed_out:
+        return SimulationFailureType.TIMEOUT, f"Exceeded the {execution_policy.timeout} second timeout"
+
+    # LTspice exits with 0 and leaves a partial .raw file when it aborts a transient, so the log is always checked
+    failure_type, failure_message = classify_ltspice_log(log_file_path)
+    if failure_type is not None:
+        return failure_type, failure_message
+
+    if return_code != 0:
+        return SimulationFailureType.PROCESS_ERROR, f"Exited with return code {return_code}"
+
+    if not output_file_path.exists():
+        return SimulationFailureType.MISSING_OUTPUT, f"No output was written to {output_file_path}"
+
+    if validate_output is not None:
+        return validate_output(output_file_path)
+
+    return None, None
+
+
+def _remove_attempt_files(output_file_path: Path, log_file_path: str | Path) -> None:
+    for file_path in (output_file_path, Path(log_file_path)):
+        file_path.unlink(missing_ok=True)
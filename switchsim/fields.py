@@ -2,6 +2,32 @@
 
 """
 
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "TIME_FIELD_NAME",
+    "DUT_DRAIN_VOLTAGE_FIELD_NAME",
+    "DUT_DRAIN_CURRENT_FIELD_NAME",
+    "DUT_GATE_VOLTAGE_FIELD_NAME",
+    "DUT_SOURCE_VOLTAGE_FIELD_NAME",
+    "TIME_DIFFERENTIALS_FIELD_NAME",
+    "DUT_DRAIN_SOURCE_VOLTAGE_FIELD_NAME",
+    "DUT_DRAIN_SOURCE_POWER_FIELD_NAME",
+    "DUT_DRAIN_SOURCE_ENERGY_FIELD_NAME",
+    "DUT_DRAIN_SOURCE_RESISTANCE_FIELD_NAME",
+    "LOAD_NEGATIVE_VOLTAGE_FIELD_NAME",
+    "LOAD_POSITIVE_VOLTAGE_FIELD_NAME",
+    "SUPPLY_VOLTAGE_FIELD_NAME",
+    "SUPPLY_CURRENT_FIELD_NAME",
+    "LOAD_CURRENT_FIELD_FIELD_NAME",
+    "LOAD_VOLTAGE_FIELD_FIELD_NAME",
+    "STANDARD_DOUBLE_PULSE_TEST_FIELDS",
+    "POINT_HASH_FIELD_NAME",
+]
+
+
 # --------------------------------------------------
 #   Constants
 # --------------------------------------------------
@@ -30,4 +56,7 @@ STANDARD_DOUBLE_PULSE_TEST_FIELDS = (
     DUT_DRAIN_VOLTAGE_FIELD_NAME,
     DUT_SOURCE_VOLTAGE_FIELD_NAME,
     DUT_DRAIN_CURRENT_FIELD_NAME
-)
\ No newline at end of file
+)
+
+# Stores the column holding the canonical hash of each point's parameters in the result tables
+POINT_HASH_FIELD_NAME = "point_hash"
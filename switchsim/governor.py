@@ -0,0 +1,329 @@
+""" Concurrency Governor Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import os
+import sys
+import math
+import time
+import collections
+import dataclasses
+from pathlib import Path
+
+# psutil is optional. Without it, Linux is measured through /proc and other platforms run at the upper limit
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "DEFAULT_TARGET_CPU_UTILISATION",
+    "DEFAULT_MIN_AVAILABLE_MEMORY_FRACTION",
+    "DEFAULT_GOVERNOR_SAMPLE_INTERVAL",
+    "ResourceSampleData",
+    "ConcurrencyGovernor",
+    "sample_resources",
+]
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+# Stores the share of every core the simulations may use together, leaving some for the parent and the system
+DEFAULT_TARGET_CPU_UTILISATION = 0.9
+
+# Stores the share of the total memory below which no new point is dispatched, when no threshold is given
+DEFAULT_MIN_AVAILABLE_MEMORY_FRACTION = 0.1
+
+# Stores the seconds between resource samples
+DEFAULT_GOVERNOR_SAMPLE_INTERVAL = 1.0
+
+# Stores the number of samples over which the peak memory of a job is remembered
+JOB_MEMORY_WINDOW_SIZE = 120
+
+# Stores the weight of the latest sample in the running estimate of the cores used per job
+JOB_CPU_SMOOTHING = 0.3
+
+PROC_DIRECTORY_PATH = Path("/proc")
+
+
+# --------------------------------------------------
+#   Dataclasses
+# --------------------------------------------------
+
+@dataclasses.dataclass(frozen=True)
+class ResourceSampleData:
+    timestamp: float
+    cpu_count: int
+    # Stores the busy and total CPU seconds of the whole system, summed over every core
+    system_cpu_busy_time: float
+    system_cpu_total_time: float
+    # Stores the memory in bytes
+    available_memory: int
+    total_memory: int
+    # Stores the CPU seconds and RSS bytes of each job, keyed by the pid of the worker process running it. A job's
+    # usage includes its worker and every simulator process below it, running or already finished
+    job_cpu_times: dict[int, float]
+    job_memory_usages: dict[int, int]
+
+
+# --------------------------------------------------
+#   Classes
+# --------------------------------------------------
+
+class ConcurrencyGovernor:
+    """ The number of points simulated at once, tuned from the measured CPU and memory use of the running jobs.
+
+    Every sample estimates the cores used per job and the peak memory of a job, and bounds the concurrency by the
+    cores left over by other processes and by the memory above the available memory threshold. The limit starts
+    at the minimum, rises by one worker per sample towards the bound and falls to it at once, so large transients
+    never pile up before their memory has been seen. Dispatch pauses while the available memory is below the
+    threshold, unless nothing is running, so a sweep never stalls on memory held by other processes.
+    """
+
+    def __init__(
+            self,
+            max_workers: int | None = None,
+            min_workers: int = 1,
+            min_available_memory: int | None = None,
+            target_cpu_utilisation: float = DEFAULT_TARGET_CPU_UTILISATION,
+            sample_interval: float = DEFAULT_GOVERNOR_SAMPLE_INTERVAL,
+    ) -> None:
+        self.max_workers = max(max_workers or os.cpu_count() or 1, 1)
+        self.min_workers = min(max(min_workers, 1), self.max_workers)
+        self.min_available_memory = min_available_memory
+        self.target_cpu_utilisation = target_cpu_utilisation
+        self.sample_interval = sample_interval
+
+        self.limit = self.min_workers
+        self.paused = False
+        self.cpu_per_job: float | None = None
+        self.memory_per_job: int | None = None
+        self.last_sample: ResourceSampleData | None = sample_resources()
+
+        self._job_memory_peaks = collections.deque(maxlen=JOB_MEMORY_WINDOW_SIZE)
+
+        # Without measurements the limit cannot be tuned, so the upper limit is used as is
+        if self.last_sample is None:
+            self.limit = self.max_workers
+        elif self.min_available_memory is None:
+            self.min_available_memory = int(self.last_sample.total_memory * DEFAULT_MIN_AVAILABLE_MEMORY_FRACTION)
+
+    def can_dispatch(self, num_running: int) -> bool:
+        if num_running == 0:
+            return True
+        return num_running < self.limit and not self.paused
+
+    def update(self, num_running: int, worker_pids: list[int] | None = None) -> bool:
+        # Returns whether the limit or the pause changed. Samples closer together than the interval are skipped
+        if self.last_sample is None or time.time() - self.last_sample.timestamp < self.sample_interval:
+            return False
+
+        sample = sample_resources(worker_pids)
+        previous_sample, self.last_sample = self.last_sample, sample
+        if sample is None:
+            return False
+
+        elapsed_time = sample.timestamp - previous_sample.timestamp
+        system_total_time = sample.system_cpu_total_time - previous_sample.system_cpu_total_time
+        if elapsed_time <= 0 or system_total_time <= 0:
+            return False
+
+        # The cores used by the jobs, from the CPU time each added since the last sample
+        jobs_busy_cores = sum(
+            max(cpu_time - previous_sample.job_cpu_times[pid], 0.0)
+            for pid, cpu_time in sample.job_cpu_times.items() if pid in previous_sample.job_cpu_times
+        ) / elapsed_time
+        system_busy_cores = (
+            (sample.system_cpu_busy_time - previous_sample.system_cpu_busy_time) / system_total_time * sample.cpu_count
+        )
+        if num_running > 0 and jobs_busy_cores > 0:
+            cpu_per_job = jobs_busy_cores / num_running
+            self.cpu_per_job = cpu_per_job if self.cpu_per_job is None else (
+                JOB_CPU_SMOOTHING * cpu_per_job + (1 - JOB_CPU_SMOOTHING) * self.cpu_per_job
+            )
+
+        if sample.job_memory_usages:
+            self._job_memory_peaks.append(max(sample.job_memory_usages.values()))
+        if self._job_memory_peaks:
+            self.memory_per_job = max(self._job_memory_peaks)
+
+        cpu_limit = self.max_workers
+        if self.cpu_per_job:
+            external_busy_cores = max(system_busy_cores - jobs_busy_cores, 0.0)
+            available_cores = max(sample.cpu_count * self.target_cpu_utilisation - external_busy_cores, 0.0)
+            cpu_limit = math.floor(available_cores / self.cpu_per_job)
+
+        memory_limit = self.max_workers
+        if self.memory_per_job:
+            memory_headroom = max(sample.available_memory - self.min_available_memory, 0)
+            memory_limit = num_running + memory_headroom // self.memory_per_job
+
+        target_limit = min(max(min(cpu_limit, memory_limit), self.min_workers), self.max_workers)
+        previous_limit, previous_paused = self.limit, self.paused
+        self.limit = min(self.limit + 1, target_limit) if target_limit > self.limit else target_limit
+        self.paused = sample.available_memory < self.min_available_memory
+
+        return self.limit != previous_limit or self.paused != previous_paused
+
+    def format_status(self) -> str:
+        status = f"limit {self.limit} of {self.min_workers}-{self.max_workers} workers"
+        if self.cpu_per_job is not None:
+            status += f", {self.cpu_per_job:.2f} cores per job"
+        if self.memory_per_job is not None:
+            status += f", {self.memory_per_job / 2**20:.0f} MB per job"
+        if self.last_sample is not None:
+            status += f", {self.last_sample.available_memory / 2**20:.0f} MB available"
+        if self.paused:
+            status += ", paused below the available memory threshold"
+        return status
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def sample_resources(worker_pids: list[int] | None = None) -> ResourceSampleData | None:
+    # Measures the system and the job of every worker process, the children of this process by default. Pool
+    # workers started through a fork server are not children of this process, so pools pass the pids their tasks
+    # report. None when neither psutil nor /proc is available
+    if psutil is not None:
+        return _sample_resources_with_psutil(worker_pids)
+    if sys.platform.startswith("linux") and PROC_DIRECTORY_PATH.exists():
+        return _sample_resources_with_proc(worker_pids)
+    return None
+
+
+def _sample_resources_with_psutil(worker_pids: list[int] | None) -> ResourceSampleData:
+    cpu_times = psutil.cpu_times()
+    system_cpu_total_time = sum(cpu_times)
+    system_cpu_idle_time = cpu_times.idle + getattr(cpu_times, "iowait", 0.0)
+    virtual_memory = psutil.virtual_memory()
+
+    job_cpu_times = {}
+    job_memory_usages = {}
+    if worker_pids is None:
+        worker_processes = psutil.Process().children()
+    else:
+        worker_processes = []
+        for worker_pid in worker_pids:
+            try:
+                worker_processes.append(psutil.Process(worker_pid))
+            except psutil.NoSuchProcess:
+                continue
+
+    # Processes may exit between being listed and being measured, which leaves them out of this sample
+    for worker_process in worker_processes:
+        try:
+            processes = [worker_process] + worker_process.children(recursive=True)
+        except psutil.NoSuchProcess:
+            continue
+
+        cpu_time = 0.0
+        memory_usage = 0
+        for process in processes:
+            try:
+                process_cpu_times = process.cpu_times()
+                memory_usage += process.memory_info().rss
+            except psutil.NoSuchProcess:
+                continue
+            cpu_time += process_cpu_times.user + process_cpu_times.system
+            # The finished simulators of a worker are only left in its children times
+            if process is worker_process:
+                cpu_time += getattr(process_cpu_times, "children_user", 0.0)
+                cpu_time += getattr(process_cpu_times, "children_system", 0.0)
+
+        job_cpu_times[worker_process.pid] = cpu_time
+        job_memory_usages[worker_process.pid] = memory_usage
+
+    return ResourceSampleData(
+        timestamp=time.time(),
+        cpu_count=psutil.cpu_count() or 1,
+        system_cpu_busy_time=system_cpu_total_time - system_cpu_idle_time,
+        system_cpu_total_time=system_cpu_total_time,
+        available_memory=virtual_memory.available,
+        total_memory=virtual_memory.total,
+        job_cpu_times=job_cpu_times,
+        job_memory_usages=job_memory_usages,
+    )
+
+
+def _sample_resources_with_proc(worker_pids: list[int] | None) -> ResourceSampleData:
+    clock_ticks = os.sysconf("SC_CLK_TCK")
+    page_size = os.sysconf("SC_PAGE_SIZE")
+
+    # The first line sums every core: user, nice, system, idle, iowait, irq, softirq, steal, ...
+    cpu_fields = [float(value) for value in (PROC_DIRECTORY_PATH / "stat").read_text().splitlines()[0].split()[1:9]]
+    system_cpu_total_time = sum(cpu_fields) / clock_ticks
+    system_cpu_idle_time = (cpu_fields[3] + cpu_fields[4]) / clock_ticks
+
+    memory_info = {}
+    for line in (PROC_DIRECTORY_PATH / "meminfo").read_text().splitlines():
+        name, value = line.split(":", 1)
+        memory_info[name] = int(value.split()[0]) * 1024
+
+    # Every process is read once, then the tree below each worker is walked from the parent pids
+    per_process_stats = {}
+    for process_directory_path in PROC_DIRECTORY_PATH.iterdir():
+        if not process_directory_path.name.isdigit():
+            continue
+        try:
+            stat_text = (process_directory_path / "stat").read_text()
+        except OSError:
+            continue
+        # The command name may contain spaces, so the fields are split after its closing parenthesis
+        stat_fields = stat_text[stat_text.rindex(")") + 2:].split()
+        per_process_stats[int(process_directory_path.name)] = (
+            int(stat_fields[1]),
+            sum(int(value) for value in stat_fields[11:13]) / clock_ticks,
+            sum(int(value) for value in stat_fields[13:15]) / clock_ticks,
+            int(stat_fields[21]) * page_size,
+        )
+
+    per_parent_children = {}
+    for pid, (parent_pid, *_) in per_process_stats.items():
+        per_parent_children.setdefault(parent_pid, []).append(pid)
+
+    job_cpu_times = {}
+    job_memory_usages = {}
+    if worker_pids is None:
+        worker_pids = per_parent_children.get(os.getpid(), [])
+
+    for worker_pid in worker_pids:
+        if worker_pid not in per_process_stats:
+            continue
+        _, cpu_time, children_cpu_time, memory_usage = per_process_stats[worker_pid]
+        # The finished simulators of a worker are only left in its children times
+        cpu_time += children_cpu_time
+
+        descendant_pids = list(per_parent_children.get(worker_pid, []))
+        while descendant_pids:
+            pid = descendant_pids.pop()
+            _, descendant_cpu_time, _, descendant_memory_usage = per_process_stats[pid]
+            cpu_time += descendant_cpu_time
+            memory_usage += descendant_memory_usage
+            descendant_pids.extend(per_parent_children.get(pid, []))
+
+        job_cpu_times[worker_pid] = cpu_time
+        job_memory_usages[worker_pid] = memory_usage
+
+    return ResourceSampleData(
+        timestamp=time.time(),
+        cpu_count=os.cpu_count() or 1,
+        system_cpu_busy_time=system_cpu_total_time - system_cpu_idle_time,
+        system_cpu_total_time=system_cpu_total_time,
+        available_memory=memory_info.get("MemAvailable", memory_info.get("MemFree", 0)),
+        total_memory=memory_info.get("MemTotal", 0),
+        job_cpu_times=job_cpu_times,
+        job_memory_usages=job_memory_usages,
+    )
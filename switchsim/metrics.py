@@ -0,0 +1,303 @@
+""" Simulation Metrics Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import os
+import enum
+import time
+import bisect
+import threading
+import dataclasses
+import http.server
+from pathlib import Path
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "METRICS_NAMESPACE",
+    "DEFAULT_METRICS_REFRESH_INTERVAL",
+    "METRICS_CONTENT_TYPE",
+    "MetricType",
+    "MetricData",
+    "SimulationMetrics",
+    "MetricsExporter",
+    "simulation_metrics",
+]
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+METRICS_NAMESPACE = "switchsim"
+
+# Stores the seconds between rewrites of the metrics file
+DEFAULT_METRICS_REFRESH_INTERVAL = 5.0
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Stores the upper bounds in seconds of the histogram buckets, the last one being +Inf
+RUNTIME_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+PARSE_TIME_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+# --------------------------------------------------
+#   Enums
+# --------------------------------------------------
+
+class MetricType(enum.StrEnum):
+    COUNTER = "counter"
+    GAUGE = "gauge"
+    HISTOGRAM = "histogram"
+
+
+# --------------------------------------------------
+#   Dataclasses
+# --------------------------------------------------
+
+@dataclasses.dataclass(frozen=True)
+class MetricData:
+    name: str
+    type: MetricType
+    description: str
+    # Stores the bucket upper bounds of a histogram
+    buckets: tuple[float, ...] = ()
+
+
+# --------------------------------------------------
+#   Classes
+# --------------------------------------------------
+
+class SimulationMetrics:
+    """ The counters, gauges and histograms of a running sweep, rendered in the Prometheus text format.
+
+    Updates are thread safe. Metrics recorded in a worker process are sent back with its result and merged, which
+    adds the counters and histograms and leaves the gauges to the process that owns them.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._values: dict[str, float] = {}
+        self._bucket_counts: dict[str, list[int]] = {}
+        self._sums: dict[str, float] = {}
+
+        for metric in simulation_metrics.values():
+            if metric.type == MetricType.HISTOGRAM:
+                self._bucket_counts[metric.name] = [0] * (len(metric.buckets) + 1)
+                self._sums[metric.name] = 0.0
+            else:
+                self._values[metric.name] = 0.0
+        self._values["start_time_seconds"] = time.time()
+
+    def __getstate__(self) -> dict:
+        with self._lock:
+            state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self._values[name] += value
+
+    def set(self, name: str, value: float) -> None:
+        with self._lock:
+            self._values[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        bucket_index = bisect.bisect_left(simulation_metrics[name].buckets, value)
+        with self._lock:
+            self._bucket_counts[name][bucket_index] += 1
+            self._sums[name] += value
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            if name in self._values:
+                return self._values[name]
+            return float(sum(self._bucket_counts[name]))
+
+    def merge(self, other: "SimulationMetrics") -> None:
+        with other._lock:
+            values = dict(other._values)
+            bucket_counts = {name: list(counts) for name, counts in other._bucket_counts.items()}
+            sums = dict(other._sums)
+
+        with self._lock:
+            for name, value in values.items():
+                if simulation_metrics[name].type == MetricType.COUNTER:
+                    self._values[name] += value
+            for name, counts in bucket_counts.items():
+                self._bucket_counts[name] = [count + other_count for count, other_count in zip(self._bucket_counts[name], counts)]
+                self._sums[name] += sums[name]
+
+    def format_prometheus(self) -> str:
+        with self._lock:
+            values = dict(self._values)
+            bucket_counts = {name: list(counts) for name, counts in self._bucket_counts.items()}
+            sums = dict(self._sums)
+
+        lines = []
+        for metric in simulation_metrics.values():
+            full_name = f"{METRICS_NAMESPACE}_{metric.name}"
+            lines.append(f"# HELP {full_name} {metric.description}")
+            lines.append(f"# TYPE {full_name} {metric.type}")
+
+            if metric.type != MetricType.HISTOGRAM:
+                lines.append(f"{full_name} {_format_value(values[metric.name])}")
+                continue
+
+            # The buckets are cumulative in the text format
+            cumulative_count = 0
+            for upper_bound, count in zip(metric.buckets + (float("inf"),), bucket_counts[metric.name]):
+                cumulative_count += count
+                lines.append(f'{full_name}_bucket{{le="{_format_value(upper_bound)}"}} {cumulative_count}')
+            lines.append(f"{full_name}_sum {_format_value(sums[metric.name])}")
+            lines.append(f"{full_name}_count {cumulative_count}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, file_path: str | Path) -> None:
+        # Written to a temporary file and renamed, so a scraper never reads a partial file
+        file_path = Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_file_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.tmp")
+        temporary_file_path.write_text(self.format_prometheus(), encoding="utf-8")
+        temporary_file_path.replace(file_path)
+
+
+class MetricsExporter:
+    """ Exposes a SimulationMetrics while a sweep runs, as a file rewritten every refresh interval, as a local HTTP
+    endpoint rendered on every scrape, or both.
+
+    The file suits the textfile collector of the Prometheus node exporter, and the endpoint a direct scrape. Used as
+    a context manager, the exporter starts on entry and writes the final values on exit. Without a file path or a
+    port it does nothing.
+    """
+
+    def __init__(
+            self,
+            metrics: SimulationMetrics,
+            file_path: str | Path | None = None,
+            port: int | None = None,
+            host: str = "127.0.0.1",
+            refresh_interval: float = DEFAULT_METRICS_REFRESH_INTERVAL,
+    ) -> None:
+        self.metrics = metrics
+        self.file_path = Path(file_path) if file_path is not None else None
+        self.port = port
+        self.host = host
+        self.refresh_interval = refresh_interval
+
+        self._stop_event = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._server: http.server.ThreadingHTTPServer | None = None
+
+    def __enter__(self) -> "MetricsExporter":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    @property
+    def address(self) -> tuple[str, int] | None:
+        return self._server.server_address[:2] if self._server is not None else None
+
+    def start(self) -> None:
+        self._stop_event.clear()
+
+        if self.file_path is not None:
+            self.metrics.write(self.file_path)
+            self._threads.append(threading.Thread(target=self._refresh_file, daemon=True))
+
+        if self.port is not None:
+            self._server = http.server.ThreadingHTTPServer((self.host, self.port), _get_metrics_request_handler(self.metrics))
+            self._server.daemon_threads = True
+            self._threads.append(threading.Thread(target=self._server.serve_forever, daemon=True))
+
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+        if self.file_path is not None:
+            self.metrics.write(self.file_path)
+
+    def _refresh_file(self) -> None:
+        while not self._stop_event.wait(self.refresh_interval):
+            self.metrics.write(self.file_path)
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def _get_metrics_request_handler(metrics: SimulationMetrics) -> type[http.server.BaseHTTPRequestHandler]:
+    class MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+
+            body = metrics.format_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", METRICS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            # Scrapes are frequent and would bury the verbose output
+            pass
+
+    return MetricsRequestHandler
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# --------------------------------------------------
+#   Variables
+# --------------------------------------------------
+
+simulation_metrics = {
+    metric.name: metric
+    for metric in [
+        MetricData("points_completed_total", MetricType.COUNTER, "Simulation points completed."),
+        MetricData("points_failed_total", MetricType.COUNTER, "Simulation points that failed."),
+        MetricData("points_pending", MetricType.GAUGE, "Simulation points not yet completed or failed."),
+        MetricData("workers_busy", MetricType.GAUGE, "Workers simulating a point."),
+        MetricData("concurrency_limit", MetricType.GAUGE, "Points the concurrency governor lets run at once."),
+        MetricData("available_memory_bytes", MetricType.GAUGE, "Available system memory at the last governor sample."),
+        MetricData("point_seconds", MetricType.HISTOGRAM, "Wall time of each point.", RUNTIME_BUCKETS),
+        MetricData("ltspice_runtime_seconds", MetricType.HISTOGRAM, "Wall time of each LTspice run.", RUNTIME_BUCKETS),
+        MetricData("parse_seconds", MetricType.HISTOGRAM, "Time reading each .raw file into a waveform.", PARSE_TIME_BUCKETS),
+        MetricData("raw_bytes_total", MetricType.COUNTER, "Bytes of LTspice .raw output read."),
+        MetricData("output_bytes_written_total", MetricType.COUNTER, "Bytes of point outputs written to the output directory."),
+        MetricData("start_time_seconds", MetricType.GAUGE, "Unix time the metrics were created at."),
+    ]
+}
@@ -0,0 +1,325 @@
+""" Monte Carlo Tolerance Analysis Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import csv
+import json
+import math
+import itertools
+import dataclasses
+from pathlib import Path
+
+from .analysis import *
+from .chunked import *
+from .config import *
+from .execution import *
+from .fields import *
+from .governor import *
+from .metrics import *
+from .sampling import *
+from .scheduling import *
+from .simulation import *
+from .spice import *
+from .streaming import *
+from .utils import *
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "MONTE_CARLO_DIRECTORY_NAME",
+    "MONTE_CARLO_RESULTS_FILE_NAME",
+    "MONTE_CARLO_STATISTICS_FILE_NAME",
+    "MonteCarloResultData",
+    "run_monte_carlo_simulation",
+    "run_monte_carlo_simulations",
+    "get_monte_carlo_jobs",
+    "load_monte_carlo_statistics",
+]
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+MONTE_CARLO_DIRECTORY_NAME = "monte_carlo"
+MONTE_CARLO_RESULTS_FILE_NAME = "results.csv"
+MONTE_CARLO_STATISTICS_FILE_NAME = "statistics.json"
+
+SAMPLE_INDEX_FIELD_NAME = "sample"
+FAILED_FIELD_NAME = "failed"
+
+
+# --------------------------------------------------
+#   Dataclasses
+# --------------------------------------------------
+
+@dataclasses.dataclass(frozen=True)
+class MonteCarloResultData:
+    run_name: str
+    num_samples: int
+    num_failed: int
+    # Stores the summary of every selected result, see StreamingSummary.to_dict
+    result_statistics: dict[str, dict]
+    results_file_path: Path
+    statistics_file_path: Path
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def run_monte_carlo_simulation(
+        simulation_type: SimulationType,
+        run_name: str,
+        source_file_path: str | Path,
+        monte_carlo_data: MonteCarloData,
+        default_parameters: ParametersType,
+        output_field_mapping: OutputFieldsType,
+        selected_results: list[str],
+        output_directory_path: str | Path,
+        ltspice_executable_file_path: str = DEFAULT_LTSPICE_EXECUTABLE_FILE_PATH,
+        execution_policy: ExecutionPolicyData | None = None,
+        max_workers: int | None = None,
+        runtime_history: RuntimeHistory | None = None,
+        save_mapped_traces: bool = False,
+        windowed_results: list[str] | None = None,
+        metrics: SimulationMetrics | None = None,
+        governor: ConcurrencyGovernor | None = None,
+        verbose: bool = False,
+) -> MonteCarloResultData:
+    # The samples are drawn, simulated and analysed one batch at a time, and each waveform is analysed in chunks
+    # straight from its .raw file. Only the result rows, appended to a csv, and the streaming summaries are kept, so
+    # memory is bounded by the batch and chunk sizes whatever the number of samples and the length of a waveform
+    simulation_type = SimulationType(simulation_type)
+    source_file_path = Path(source_file_path).resolve()
+    selected_results = list(dict.fromkeys(selected_results))
+    result_accumulators = simulation_type_result_accumulators[simulation_type.value]
+
+    missing_result_keys = [result_key for result_key in selected_results if result_key not in result_accumulators]
+    if missing_result_keys:
+        raise KeyError(f"Unknown results: {', '.join(missing_result_keys)}")
+
+    monte_carlo_directory_path = Path(output_directory_path) / run_name / MONTE_CARLO_DIRECTORY_NAME
+    monte_carlo_directory_path.mkdir(parents=True, exist_ok=True)
+    results_file_path = monte_carlo_directory_path / MONTE_CARLO_RESULTS_FILE_NAME
+    statistics_file_path = monte_carlo_directory_path / MONTE_CARLO_STATISTICS_FILE_NAME
+
+    result_summaries = {result_key: StreamingSummary() for result_key in selected_results}
+    samples = iter_monte_carlo_parameters(default_parameters, monte_carlo_data)
+    field_names = (
+        [SAMPLE_INDEX_FIELD_NAME]
+        + [field.name for field in dataclasses.fields(default_parameters)]
+        + [POINT_HASH_FIELD_NAME, FAILED_FIELD_NAME]
+        + selected_results
+    )
+
+    num_samples = 0
+    num_failed = 0
+
+    with open(results_file_path, "w", newline="") as results_file:
+        results_writer = csv.DictWriter(results_file, fieldnames=field_names)
+        results_writer.writeheader()
+
+        while True:
+            batch_parameters = list(itertools.islice(samples, monte_carlo_data.batch_size))
+            if not batch_parameters:
+                break
+
+            # Draws that round to the same parameters are simulated once
+            points = {}
+            for parameters in batch_parameters:
+                point_hash = dataclass_hash(parameters)
+                points.setdefault(point_hash, SimulationPointData(
+                    source_file_path=source_file_path,
+                    parameters=parameters,
+                    point_hash=point_hash,
+                    jobs=(),
+                ))
+
+            per_point_outputs = simulate_points(
+                simulation_type=simulation_type,
+                points=list(points.values()),
+                output_field_mapping=output_field_mapping,
+                ltspice_executable_file_path=ltspice_executable_file_path,
+                execution_policy=execution_policy,
+                max_workers=max_workers,
+                runtime_history=runtime_history,
+                save_mapped_traces=save_mapped_traces,
+                windowed_results=windowed_results,
+                selected_results=selected_results,
+                metrics=metrics,
+                governor=governor,
+            )
+
+            for parameters in batch_parameters:
+                point_hash = dataclass_hash(parameters)
+                point_results = per_point_outputs.get((source_file_path, point_hash))
+
+                # Points that failed and were skipped by the execution policy are kept as failed rows
+                row = {
+                    SAMPLE_INDEX_FIELD_NAME: num_samples,
+                    **dataclasses.asdict(parameters),
+                    POINT_HASH_FIELD_NAME: point_hash,
+                    FAILED_FIELD_NAME: point_results is None,
+                }
+                if point_results is None:
+                    num_failed += 1
+                else:
+                    for result_key in selected_results:
+                        result = point_results[result_key]
+                        result_summaries[result_key].update(result)
+                        row[result_key] = result
+
+                results_writer.writerow(row)
+                num_samples += 1
+
+            del per_point_outputs
+            results_file.flush()
+
+            # The summaries are rewritten after every batch, so a long study can be followed while it runs
+            result_statistics = _save_monte_carlo_statistics(
+                file_path=statistics_file_path,
+                run_name=run_name,
+                monte_carlo_data=monte_carlo_data,
+                num_samples=num_samples,
+                num_failed=num_failed,
+                result_summaries=result_summaries,
+            )
+            result_means = ", ".join(
+                f"{result_key} {summary['mean']:.4g} ± {summary['std']:.2g}"
+                for result_key, summary in result_statistics.items()
+            )
+            verbose_print(verbose, f"\t - {num_samples} / {monte_carlo_data.num_samples} samples, {num_failed} failed: {result_means}")
+
+    return MonteCarloResultData(
+        run_name=run_name,
+        num_samples=num_samples,
+        num_failed=num_failed,
+        result_statistics={result_key: summary.to_dict() for result_key, summary in result_summaries.items()},
+        results_file_path=results_file_path,
+        statistics_file_path=statistics_file_path,
+    )
+
+
+def run_monte_carlo_simulations(
+        simulation_type: SimulationType,
+        runs: dict[str, RunData],
+        default_parameters: ParametersType,
+        output_field_mapping: OutputFieldsType,
+        selected_results: list[str],
+        output_directory_path: str | Path,
+        ltspice_executable_file_path: str = DEFAULT_LTSPICE_EXECUTABLE_FILE_PATH,
+        execution_policy: ExecutionPolicyData | None = None,
+        max_workers: int | None = None,
+        runtime_history: RuntimeHistory | None = None,
+        use_netlist: bool = False,
+        save_mapped_traces: bool = False,
+        windowed_results: list[str] | None = None,
+        metrics: SimulationMetrics | None = None,
+        governor: ConcurrencyGovernor | None = None,
+        verbose: bool = False,
+) -> dict[str, MonteCarloResultData]:
+    # Only the runs with a monte_carlo section are run, the sweeps are left to run_simulations
+    runs = {run_name: run_data for run_name, run_data in runs.items() if run_data.monte_carlo is not None}
+    if use_netlist:
+        runs = compile_run_netlists(
+            runs=runs,
+            ltspice_executable_file_path=ltspice_executable_file_path,
+            execution_policy=execution_policy,
+        )
+
+    per_run_results = {}
+    for run_name, run_data in runs.items():
+        verbose_print(verbose, f"Run {run_name}: {run_data.monte_carlo.num_samples} Monte Carlo samples")
+        per_run_results[run_name] = run_monte_carlo_simulation(
+            simulation_type=simulation_type,
+            run_name=run_name,
+            source_file_path=run_data.source_file_path,
+            monte_carlo_data=run_data.monte_carlo,
+            default_parameters=default_parameters,
+            output_field_mapping=output_field_mapping,
+            selected_results=selected_results,
+            output_directory_path=output_directory_path,
+            ltspice_executable_file_path=ltspice_executable_file_path,
+            execution_policy=execution_policy,
+            max_workers=max_workers,
+            runtime_history=runtime_history,
+            save_mapped_traces=save_mapped_traces,
+            windowed_results=windowed_results,
+            metrics=metrics,
+            governor=governor,
+            verbose=verbose,
+        )
+
+    return per_run_results
+
+
+def get_monte_carlo_jobs(
+        runs: dict[str, RunData],
+        default_parameters: ParametersType,
+) -> list[SimulationJobData]:
+    # Expands the Monte Carlo runs into one job per sample, as get_simulation_jobs does for the sweeps, so the
+    # samples can be scheduled or listed without simulating them
+    jobs = []
+    for run_name, run_data in runs.items():
+        if run_data.monte_carlo is None:
+            continue
+        for i, parameters in enumerate(iter_monte_carlo_parameters(default_parameters, run_data.monte_carlo)):
+            jobs.append(SimulationJobData(
+                run_name=run_name,
+                swept_parameter=MONTE_CARLO_DIRECTORY_NAME,
+                index=i,
+                source_file_path=Path(run_data.source_file_path),
+                parameters=parameters,
+            ))
+
+    return jobs
+
+
+def load_monte_carlo_statistics(output_directory_path: str | Path, run_name: str) -> dict:
+    statistics_file_path = Path(output_directory_path) / run_name / MONTE_CARLO_DIRECTORY_NAME / MONTE_CARLO_STATISTICS_FILE_NAME
+    with open(statistics_file_path, "r") as json_file:
+        return json.load(json_file)
+
+
+def _save_monte_carlo_statistics(
+        file_path: Path,
+        run_name: str,
+        monte_carlo_data: MonteCarloData,
+        num_samples: int,
+        num_failed: int,
+        result_summaries: dict[str, StreamingSummary],
+) -> dict[str, dict]:
+    result_statistics = {result_key: summary.to_dict() for result_key, summary in result_summaries.items()}
+
+    temporary_file_path = file_path.with_suffix(f"{file_path.suffix}.tmp")
+    with open(temporary_file_path, "w") as json_file:
+        json.dump(_to_json_value({
+            "run_name": run_name,
+            "num_samples": num_samples,
+            "num_failed": num_failed,
+            "monte_carlo": dataclasses.asdict(monte_carlo_data),
+            "results": result_statistics,
+        }), json_file, indent=4, allow_nan=False)
+    temporary_file_path.replace(file_path)
+
+    return result_statistics
+
+
+def _to_json_value(value):
+    # NaN and infinite statistics, as of a result that failed at every sample, are written as null, since JSON
+    # has no literal for them
+    if isinstance(value, dict):
+        return {key: _to_json_value(item) for key, item in value.items()}
+    if isinstance(value, list | tuple):
+        return [_to_json_value(item) for item in value]
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
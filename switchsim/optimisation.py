@@ -0,0 +1,979 @@
+""" Parameter Optimisation Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import enum
+import json
+import math
+import typing
+import dataclasses
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from .config import *
+from .execution import *
+from .fields import *
+from .simulation import *
+from .spice import *
+from .surrogate import *
+from .sweep import *
+from .utils import *
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "DEFAULT_MAX_SIMULATIONS",
+    "OPTIMISATION_CACHE_FILE_NAME",
+    "OPTIMISATION_EVALUATIONS_FILE_NAME",
+    "OPTIMISATION_BEST_FILE_NAME",
+    "CONSTRAINT_VIOLATION_FIELD_NAME",
+    "OptimisationMethod",
+    "OptimisedParameterData",
+    "OptimisationObjectiveData",
+    "OptimisationConstraintData",
+    "OptimisationResultData",
+    "OptimisationConfigData",
+    "OptimisationCache",
+    "load_optimisation_config_from_yaml",
+    "optimisation_config_from_dict",
+    "optimise_parameters",
+    "save_optimisation_result",
+]
+
+
+# --------------------------------------------------
+#   Enums
+# --------------------------------------------------
+
+class OptimisationMethod(enum.StrEnum):
+    # Stores the derivative-free simplex search, for one objective
+    NELDER_MEAD = "nelder-mead"
+    # Stores the Gaussian process search by expected improvement, for one objective
+    BAYESIAN = "bayesian"
+    # Stores the non-dominated sorting genetic search, for a Pareto front over several objectives
+    NSGA = "nsga"
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+DEFAULT_MAX_SIMULATIONS = 40
+
+OPTIMISATION_CACHE_FILE_NAME = "evaluations.json"
+OPTIMISATION_EVALUATIONS_FILE_NAME = "evaluations.csv"
+OPTIMISATION_BEST_FILE_NAME = "best.csv"
+
+CONSTRAINT_VIOLATION_FIELD_NAME = "constraint_violation"
+SOURCE_FILE_PATH_FIELD_NAME = "source_file_path"
+FAILED_FIELD_NAME = "failed"
+
+# Stores the reflection, expansion, contraction and shrink coefficients of the simplex search
+NELDER_MEAD_COEFFICIENTS = (1.0, 2.0, 0.5, 0.5)
+# Stores the initial simplex edge and the simplex size at which the search stops, in units of each parameter's range
+NELDER_MEAD_INITIAL_STEP = 0.25
+NELDER_MEAD_TOLERANCE = 1e-3
+
+# Stores the number of random acquisition candidates per optimised parameter, and the spread of the candidates
+# drawn around the best point, in units of each parameter's range
+BAYESIAN_NUM_CANDIDATES_PER_PARAMETER = 512
+BAYESIAN_LOCAL_CANDIDATE_SPREAD = 0.05
+
+# Stores the distribution indices of the simulated binary crossover and the polynomial mutation
+NSGA_CROSSOVER_INDEX = 15.0
+NSGA_MUTATION_INDEX = 20.0
+# Stores how many generations in a row may produce nothing new before the search stops
+NSGA_MAX_STALLED_GENERATIONS = 3
+
+
+# --------------------------------------------------
+#   Dataclasses
+# --------------------------------------------------
+
+@dataclasses.dataclass(frozen=True)
+class OptimisedParameterData:
+    lower: float
+    upper: float
+
+
+@dataclasses.dataclass(frozen=True)
+class OptimisationObjectiveData:
+    # Stores the result keys whose sum is the objective, e.g. ("turn_on_loss", "turn_off_loss")
+    result_keys: tuple[str, ...]
+    maximise: bool = False
+
+    @property
+    def name(self) -> str:
+        return "+".join(self.result_keys)
+
+
+@dataclasses.dataclass(frozen=True)
+class OptimisationConstraintData:
+    result_key: str
+    lower: float | None = None
+    upper: float | None = None
+
+
+@dataclasses.dataclass(frozen=True)
+class OptimisationResultData:
+    # Stores every point evaluated by the optimisation, in evaluation order, with its objectives and violation
+    evaluations: pd.DataFrame
+    # Stores the best point of a single objective, or the Pareto front of several
+    best_results: pd.DataFrame
+    best_parameters: list[DoublePulseTestParameters | BuckConverterParameters]
+    num_simulations: int
+
+
+@dataclasses.dataclass(frozen=True)
+class OptimisationConfigData:
+    setup: ConfigSetupData
+    source_file_path: Path
+    parameters: dict[str, OptimisedParameterData]
+    objectives: list[OptimisationObjectiveData]
+    constraints: list[OptimisationConstraintData]
+    method: OptimisationMethod | None = None
+    max_simulations: int = DEFAULT_MAX_SIMULATIONS
+    batch_size: int | None = None
+    seed: int | None = None
+
+
+# --------------------------------------------------
+#   Classes
+# --------------------------------------------------
+
+class OptimisationCache:
+    """ Every point evaluated by the optimisations, keyed by source file and point hash.
+
+    Failed points are kept too, so they are not simulated again. When given a file, the cache is loaded from it and
+    saved after every batch, so an interrupted or repeated optimisation only simulates the points it has not seen.
+    """
+
+    def __init__(self, file_path: str | Path | None = None) -> None:
+        self.file_path = Path(file_path) if file_path is not None else None
+        self._rows: dict[tuple[str, str], dict] = {}
+
+        if self.file_path is not None and self.file_path.exists():
+            with open(self.file_path, "r") as json_file:
+                for row in json.load(json_file):
+                    self._rows[(row[SOURCE_FILE_PATH_FIELD_NAME], row[POINT_HASH_FIELD_NAME])] = row
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, source_file_path: str | Path, point_hash: str, result_keys: list[str]) -> dict | None:
+        # A point evaluated for other results only is a miss, as its waveform is not kept
+        row = self._rows.get((_get_source_file_key(source_file_path), point_hash))
+        if row is None:
+            return None
+        if row.get(FAILED_FIELD_NAME) or all(result_key in row for result_key in result_keys):
+            return row
+        return None
+
+    def add(self, source_file_path: str | Path, row: dict) -> None:
+        source_file_key = _get_source_file_key(source_file_path)
+        row = {**row, SOURCE_FILE_PATH_FIELD_NAME: source_file_key}
+        self._rows[(source_file_key, row[POINT_HASH_FIELD_NAME])] = row
+
+    def save(self) -> None:
+        if self.file_path is None:
+            return
+
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.file_path, "w") as json_file:
+            json.dump(list(self._rows.values()), json_file)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(list(self._rows.values()))
+
+
+class _BudgetExhaustedError(Exception):
+    pass
+
+
+class _OptimisationEvaluator:
+    """ Maps points of the unit cube to parameters, and evaluates batches of them through the cache. """
+
+    def __init__(
+            self,
+            simulation_type: SimulationType,
+            source_file_path: Path,
+            output_field_mapping: OutputFieldsType,
+            default_parameters: ParametersType,
+            parameters: dict[str, OptimisedParameterData],
+            objectives: list[OptimisationObjectiveData],
+            constraints: list[OptimisationConstraintData],
+            cache: OptimisationCache,
+            max_simulations: int,
+            ltspice_executable_file_path: str,
+            execution_policy: ExecutionPolicyData | None,
+            max_workers: int | None,
+            save_mapped_traces: bool,
+            windowed_transient: bool,
+            verbose: bool,
+    ) -> None:
+        self.simulation_type = simulation_type
+        self.source_file_path = source_file_path
+        self.output_field_mapping = output_field_mapping
+        self.parameter_names = list(parameters)
+        self.objectives = objectives
+        self.constraints = constraints
+        self.cache = cache
+        self.max_simulations = max_simulations
+        self.ltspice_executable_file_path = ltspice_executable_file_path
+        self.execution_policy = execution_policy
+        self.max_workers = max_workers
+        self.save_mapped_traces = save_mapped_traces
+        self.windowed_transient = windowed_transient
+        self.verbose = verbose
+
+        self.base_parameters = canonicalize_parameters(default_parameters)
+        self.lower = np.array([parameters[name].lower for name in self.parameter_names], dtype=np.float64)
+        self.upper = np.array([parameters[name].upper for name in self.parameter_names], dtype=np.float64)
+        self.result_keys = list(dict.fromkeys(
+            [result_key for objective in objectives for result_key in objective.result_keys]
+            + [constraint.result_key for constraint in constraints]
+        ))
+
+        self.num_simulations = 0
+        # Stores (parameters, row, objectives, violation) per evaluated point hash, in evaluation order
+        self.evaluations: dict[str, tuple[ParametersType, dict, np.ndarray, float]] = {}
+
+    @property
+    def num_parameters(self) -> int:
+        return len(self.parameter_names)
+
+    @property
+    def remaining(self) -> int:
+        return self.max_simulations - self.num_simulations
+
+    @property
+    def initial_point(self) -> np.ndarray:
+        # The defaults are where the search starts, clipped into the bounds
+        values = np.array([getattr(self.base_parameters, name) for name in self.parameter_names], dtype=np.float64)
+        return np.clip((values - self.lower) / (self.upper - self.lower), 0.0, 1.0)
+
+    def get_parameters(self, point: np.ndarray) -> ParametersType:
+        values = self.lower + np.clip(point, 0.0, 1.0) * (self.upper - self.lower)
+        return dataclasses.replace(self.base_parameters, **{
+            name: canonicalize_sweep_value(value) for name, value in zip(self.parameter_names, values)
+        })
+
+    def get_point(self, parameters: ParametersType) -> np.ndarray:
+        values = np.array([getattr(parameters, name) for name in self.parameter_names], dtype=np.float64)
+        return (values - self.lower) / (self.upper - self.lower)
+
+    def count_uncached(self, points: list[np.ndarray]) -> int:
+        return len(self._get_uncached_parameters([self.get_parameters(point) for point in points]))
+
+    def evaluate(self, points: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+        # Returns the minimised objectives and the constraint violation of every point. Points that were never
+        # seen are simulated as one batch, in parallel when workers are available
+        parameters_collection = [self.get_parameters(point) for point in points]
+        uncached_parameters = self._get_uncached_parameters(parameters_collection)
+        if len(uncached_parameters) > self.remaining:
+            raise _BudgetExhaustedError()
+
+        if uncached_parameters:
+            self._simulate(uncached_parameters)
+
+        for parameters in parameters_collection:
+            point_hash = dataclass_hash(parameters)
+            if point_hash not in self.evaluations:
+                row = self.cache.get(self.source_file_path, point_hash, self.result_keys)
+                self.evaluations[point_hash] = (parameters, row, *self._get_objectives(row))
+
+        per_point_evaluations = [self.evaluations[dataclass_hash(parameters)] for parameters in parameters_collection]
+        return (
+            np.array([evaluation[2] for evaluation in per_point_evaluations]).reshape(len(points), -1),
+            np.array([evaluation[3] for evaluation in per_point_evaluations], dtype=np.float64),
+        )
+
+    def to_dataframe(self) -> pd.DataFrame:
+        rows = []
+        for _, row, objective_values, violation in self.evaluations.values():
+            row = {key: value for key, value in row.items() if key != SOURCE_FILE_PATH_FIELD_NAME}
+            for objective, objective_value in zip(self.objectives, objective_values):
+                row[objective.name] = -objective_value if objective.maximise else objective_value
+            row[CONSTRAINT_VIOLATION_FIELD_NAME] = violation
+            rows.append(row)
+
+        return pd.DataFrame(rows)
+
+    def _get_uncached_parameters(self, parameters_collection: list[ParametersType]) -> list[ParametersType]:
+        uncached_parameters = {}
+        for parameters in parameters_collection:
+            point_hash = dataclass_hash(parameters)
+            if point_hash in self.evaluations or point_hash in uncached_parameters:
+                continue
+            if self.cache.get(self.source_file_path, point_hash, self.result_keys) is None:
+                uncached_parameters[point_hash] = parameters
+
+        return list(uncached_parameters.values())
+
+    def _simulate(self, parameters_collection: list[ParametersType]) -> None:
+        points = [
+            SimulationPointData(
+                source_file_path=self.source_file_path,
+                parameters=parameters,
+                point_hash=dataclass_hash(parameters),
+                jobs=(),
+            )
+            for parameters in parameters_collection
+        ]
+        per_point_outputs = simulate_points(
+            simulation_type=self.simulation_type,
+            points=points,
+            output_field_mapping=self.output_field_mapping,
+            ltspice_executable_file_path=self.ltspice_executable_file_path,
+            execution_policy=self.execution_policy,
+            max_workers=self.max_workers,
+            save_mapped_traces=self.save_mapped_traces,
+            windowed_results=self.result_keys if self.windowed_transient else None,
+            selected_results=self.result_keys,
+        )
+        self.num_simulations += len(points)
+
+        # Only the results are needed, which are computed while each .raw file is streamed
+        rows = {
+            point.point_hash: {
+                **dataclasses.asdict(point.parameters),
+                POINT_HASH_FIELD_NAME: point.point_hash,
+                **per_point_outputs[(point.source_file_path, point.point_hash)],
+            }
+            for point in points if (point.source_file_path, point.point_hash) in per_point_outputs
+        }
+
+        # Points that failed and were skipped by the execution policy are cached as failed
+        for point in points:
+            row = rows.get(point.point_hash)
+            if row is None:
+                row = {**dataclasses.asdict(point.parameters), POINT_HASH_FIELD_NAME: point.point_hash}
+            row[FAILED_FIELD_NAME] = point.point_hash not in rows
+            self.cache.add(self.source_file_path, row)
+
+        self.cache.save()
+
+        verbose_print(
+            self.verbose,
+            f"Simulated {len(points)} point(s), {len(points) - len(rows)} failed, "
+            f"{self.num_simulations} / {self.max_simulations} simulations used",
+        )
+
+    def _get_objectives(self, row: dict) -> tuple[np.ndarray, float]:
+        # Every objective is minimised, and a point without a result counts as infinitely infeasible
+        objective_values = np.array([
+            math.fsum(_get_result_value(row, result_key) for result_key in objective.result_keys)
+            * (-1.0 if objective.maximise else 1.0)
+            for objective in self.objectives
+        ])
+        if row.get(FAILED_FIELD_NAME) or np.isnan(objective_values).any():
+            return np.full(len(self.objectives), np.inf), math.inf
+
+        # Each constraint's violation is relative to its bound, so constraints of different units can be summed
+        violation = 0.0
+        for constraint in self.constraints:
+            value = _get_result_value(row, constraint.result_key)
+            if math.isnan(value):
+                return objective_values, math.inf
+            if constraint.lower is not None and value < constraint.lower:
+                violation += (constraint.lower - value) / max(abs(constraint.lower), 1e-30)
+            if constraint.upper is not None and value > constraint.upper:
+                violation += (value - constraint.upper) / max(abs(constraint.upper), 1e-30)
+
+        return objective_values, violation
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def load_optimisation_config_from_yaml(
+        config_file_path: str,
+        simulation_type: SimulationType,
+) -> OptimisationConfigData:
+    with open(config_file_path, "r") as file:
+        config_data = yaml.safe_load(file)
+
+    return optimisation_config_from_dict(config_data, simulation_type)
+
+
+def optimisation_config_from_dict(config_data: dict, simulation_type: SimulationType) -> OptimisationConfigData:
+    setup_data = config_data["setup"]
+    assert isinstance(setup_data, dict)
+
+    optimisation_data = config_data["optimisation"]
+    assert isinstance(optimisation_data, dict)
+
+    parameters_data = optimisation_data["parameters"]
+    assert isinstance(parameters_data, dict)
+
+    method = optimisation_data.get("method")
+    batch_size = optimisation_data.get("batch_size")
+    seed = optimisation_data.get("seed")
+
+    return OptimisationConfigData(
+        setup=config_setup_from_dict(setup_data, simulation_type),
+        source_file_path=Path(optimisation_data["source_file_path"]),
+        parameters={
+            parameter_name: OptimisedParameterData(
+                lower=float(parameter_data["lower"]),
+                upper=float(parameter_data["upper"]),
+            )
+            for parameter_name, parameter_data in parameters_data.items()
+        },
+        objectives=[
+            _objective_data_from_config(objective_data) for objective_data in optimisation_data["objectives"]
+        ],
+        constraints=[
+            OptimisationConstraintData(
+                result_key=result_key,
+                lower=float(constraint_data["lower"]) if constraint_data.get("lower") is not None else None,
+                upper=float(constraint_data["upper"]) if constraint_data.get("upper") is not None else None,
+            )
+            for result_key, constraint_data in optimisation_data.get("constraints", {}).items()
+        ],
+        method=OptimisationMethod(method) if method is not None else None,
+        max_simulations=int(optimisation_data.get("max_simulations", DEFAULT_MAX_SIMULATIONS)),
+        batch_size=int(batch_size) if batch_size is not None else None,
+        seed=int(seed) if seed is not None else None,
+    )
+
+
+def optimise_parameters(
+        simulation_type: SimulationType,
+        source_file_path: str | Path,
+        output_field_mapping: OutputFieldsType,
+        default_parameters: ParametersType,
+        parameters: dict[str, OptimisedParameterData],
+        objectives: list[OptimisationObjectiveData],
+        constraints: list[OptimisationConstraintData] | None = None,
+        method: OptimisationMethod | None = None,
+        max_simulations: int = DEFAULT_MAX_SIMULATIONS,
+        batch_size: int | None = None,
+        max_workers: int | None = None,
+        cache: OptimisationCache | None = None,
+        seed: int | None = None,
+        ltspice_executable_file_path: str = DEFAULT_LTSPICE_EXECUTABLE_FILE_PATH,
+        execution_policy: ExecutionPolicyData | None = None,
+        use_netlist: bool = False,
+        save_mapped_traces: bool = False,
+        windowed_transient: bool = False,
+        verbose: bool = False,
+) -> OptimisationResultData:
+    # Treats the simulation and its result getters as a black box over the given parameters, within their bounds.
+    # One objective defaults to the simplex search, and several to the Pareto search. The batch size is the number
+    # of points proposed at once by the Bayesian search, or the population of the Pareto search
+    simulation_type = SimulationType(simulation_type)
+    if constraints is None:
+        constraints = []
+    if cache is None:
+        cache = OptimisationCache()
+    if method is None:
+        method = OptimisationMethod.NELDER_MEAD if len(objectives) == 1 else OptimisationMethod.NSGA
+    method = OptimisationMethod(method)
+
+    _check_optimisation(
+        parameters_type=get_parameters_type(simulation_type),
+        parameters=parameters,
+        objectives=objectives,
+        method=method,
+    )
+    if use_netlist:
+        source_file_path = compile_ltspice_netlist(
+            schematic_file_path=source_file_path,
+            executable_file_path=ltspice_executable_file_path,
+            execution_policy=execution_policy,
+        )
+
+    evaluator = _OptimisationEvaluator(
+        simulation_type=simulation_type,
+        source_file_path=Path(source_file_path).resolve(),
+        output_field_mapping=output_field_mapping,
+        default_parameters=default_parameters,
+        parameters=parameters,
+        objectives=objectives,
+        constraints=constraints,
+        cache=cache,
+        max_simulations=max_simulations,
+        ltspice_executable_file_path=ltspice_executable_file_path,
+        execution_policy=execution_policy,
+        max_workers=max_workers,
+        save_mapped_traces=save_mapped_traces,
+        windowed_transient=windowed_transient,
+        verbose=verbose,
+    )
+    random_generator = np.random.default_rng(seed)
+    is_parallel = max_workers is not None and max_workers > 1
+
+    verbose_print(verbose, f"Optimising {', '.join(parameters)} with {method}, at most {max_simulations} simulations")
+
+    try:
+        if method == OptimisationMethod.NELDER_MEAD:
+            _optimise_nelder_mead(evaluator, speculative=is_parallel)
+        elif method == OptimisationMethod.BAYESIAN:
+            _optimise_bayesian(
+                evaluator=evaluator,
+                random_generator=random_generator,
+                batch_size=batch_size if batch_size is not None else max(max_workers or 1, 1),
+            )
+        else:
+            _optimise_nsga(
+                evaluator=evaluator,
+                random_generator=random_generator,
+                population_size=batch_size if batch_size is not None else max(4 * evaluator.num_parameters, 8),
+            )
+    except _BudgetExhaustedError:
+        verbose_print(verbose, "Simulation budget exhausted")
+
+    evaluations = evaluator.to_dataframe()
+    best_point_hashes = _get_best_point_hashes(evaluator)
+
+    verbose_print(verbose, f"Evaluated {len(evaluations)} points with {evaluator.num_simulations} simulations")
+
+    return OptimisationResultData(
+        evaluations=evaluations,
+        best_results=evaluations[evaluations[POINT_HASH_FIELD_NAME].isin(best_point_hashes)].reset_index(drop=True),
+        best_parameters=[evaluator.evaluations[point_hash][0] for point_hash in best_point_hashes],
+        num_simulations=evaluator.num_simulations,
+    )
+
+
+def save_optimisation_result(
+        optimisation_result: OptimisationResultData,
+        output_directory_path: str | Path,
+) -> None:
+    output_directory_path = Path(output_directory_path)
+    output_directory_path.mkdir(parents=True, exist_ok=True)
+
+    optimisation_result.evaluations.to_csv(output_directory_path / OPTIMISATION_EVALUATIONS_FILE_NAME, index=False)
+    optimisation_result.best_results.to_csv(output_directory_path / OPTIMISATION_BEST_FILE_NAME, index=False)
+
+
+def _optimise_nelder_mead(evaluator: _OptimisationEvaluator, speculative: bool) -> None:
+    # When simulating in parallel, every candidate an iteration may need is simulated at once, so an iteration
+    # takes one batch of wall time instead of up to three. The lazy lookups below then hit the cache
+    reflection, expansion, contraction, shrink = NELDER_MEAD_COEFFICIENTS
+    num_parameters = evaluator.num_parameters
+
+    initial_point = evaluator.initial_point
+    simplex = [initial_point]
+    for i in range(num_parameters):
+        point = initial_point.copy()
+        point[i] += NELDER_MEAD_INITIAL_STEP if point[i] + NELDER_MEAD_INITIAL_STEP <= 1.0 else -NELDER_MEAD_INITIAL_STEP
+        simplex.append(point)
+
+    keys = _get_rank_keys(*evaluator.evaluate(simplex))
+
+    for _ in range(evaluator.max_simulations * 10):
+        order = sorted(range(len(simplex)), key=lambda position: keys[position])
+        simplex = [simplex[position] for position in order]
+        keys = [keys[position] for position in order]
+
+        if max(np.max(np.abs(point - simplex[0])) for point in simplex[1:]) < NELDER_MEAD_TOLERANCE:
+            break
+
+        centroid = np.mean(simplex[:-1], axis=0)
+        direction = centroid - simplex[-1]
+        candidates = {
+            "reflection": np.clip(centroid + reflection * direction, 0.0, 1.0),
+            "expansion": np.clip(centroid + expansion * direction, 0.0, 1.0),
+            "outside": np.clip(centroid + contraction * direction, 0.0, 1.0),
+            "inside": np.clip(centroid - contraction * direction, 0.0, 1.0),
+        }
+        if speculative and evaluator.count_uncached(list(candidates.values())) <= evaluator.remaining:
+            evaluator.evaluate(list(candidates.values()))
+
+        def get_key(name: str) -> tuple[float, float]:
+            return _get_rank_keys(*evaluator.evaluate([candidates[name]]))[0]
+
+        reflection_key = get_key("reflection")
+        if reflection_key < keys[0]:
+            expansion_key = get_key("expansion")
+            if expansion_key < reflection_key:
+                simplex[-1], keys[-1] = candidates["expansion"], expansion_key
+            else:
+                simplex[-1], keys[-1] = candidates["reflection"], reflection_key
+            continue
+        if reflection_key < keys[-2]:
+            simplex[-1], keys[-1] = candidates["reflection"], reflection_key
+            continue
+
+        if reflection_key < keys[-1]:
+            contraction_key = get_key("outside")
+            if contraction_key <= reflection_key:
+                simplex[-1], keys[-1] = candidates["outside"], contraction_key
+                continue
+        else:
+            contraction_key = get_key("inside")
+            if contraction_key < keys[-1]:
+                simplex[-1], keys[-1] = candidates["inside"], contraction_key
+                continue
+
+        simplex = [simplex[0]] + [simplex[0] + shrink * (point - simplex[0]) for point in simplex[1:]]
+        keys = [keys[0]] + _get_rank_keys(*evaluator.evaluate(simplex[1:]))
+
+
+def _optimise_bayesian(
+        evaluator: _OptimisationEvaluator,
+        random_generator: np.random.Generator,
+        batch_size: int,
+) -> None:
+    num_parameters = evaluator.num_parameters
+    constrained_result_keys = [constraint.result_key for constraint in evaluator.constraints]
+
+    # Starts from the defaults and a Latin hypercube, enough points for the surrogate to have a shape
+    num_initial_points = min(max(2 * num_parameters + 1, batch_size), max(evaluator.remaining, 1))
+    evaluator.evaluate(
+        [evaluator.initial_point] + list(_get_latin_hypercube(num_initial_points - 1, num_parameters, random_generator))
+    )
+
+    while evaluator.remaining > 0:
+        training_points = []
+        training_values = []
+        for parameters, row, objective_values, violation in evaluator.evaluations.values():
+            values = [objective_values[0]] + [_get_result_value(row, key) for key in constrained_result_keys]
+            if np.all(np.isfinite(values)):
+                training_points.append(evaluator.get_point(parameters))
+                training_values.append(values)
+
+        if len(training_points) < 2:
+            batch = list(random_generator.random((min(batch_size, evaluator.remaining), num_parameters)))
+        else:
+            batch = _propose_bayesian_batch(
+                evaluator=evaluator,
+                training_points=np.array(training_points),
+                training_values=np.array(training_values),
+                batch_size=min(batch_size, evaluator.remaining),
+                random_generator=random_generator,
+            )
+        if not batch:
+            break
+
+        # A batch of points that were all evaluated before means the search has converged
+        num_simulations = evaluator.num_simulations
+        evaluator.evaluate(batch)
+        if evaluator.num_simulations == num_simulations:
+            break
+
+
+def _propose_bayesian_batch(
+        evaluator: _OptimisationEvaluator,
+        training_points: np.ndarray,
+        training_values: np.ndarray,
+        batch_size: int,
+        random_generator: np.random.Generator,
+) -> list[np.ndarray]:
+    # Each point after the first is chosen as if the earlier ones had returned their predicted mean, which
+    # flattens the acquisition around them so the batch spreads out
+    num_parameters = evaluator.num_parameters
+    result_keys = ["objective"] + [constraint.result_key for constraint in evaluator.constraints]
+
+    # Until a feasible point is found, the acquisition only seeks feasibility
+    best_point = None
+    best_key = None
+    best_objective = None
+    for parameters, _, objective_values, violation in evaluator.evaluations.values():
+        if best_key is None or (violation, objective_values[0]) < best_key:
+            best_point, best_key = evaluator.get_point(parameters), (violation, objective_values[0])
+    if best_key[0] == 0.0:
+        best_objective = best_key[1]
+
+    num_candidates = BAYESIAN_NUM_CANDIDATES_PER_PARAMETER * num_parameters
+    candidates = np.concatenate([
+        random_generator.random((num_candidates, num_parameters)),
+        np.clip(
+            best_point + random_generator.normal(0.0, BAYESIAN_LOCAL_CANDIDATE_SPREAD, (num_candidates, num_parameters)),
+            0.0,
+            1.0,
+        ),
+    ])
+
+    batch = []
+    for _ in range(batch_size):
+        surrogate = GaussianProcessSurrogate(
+            parameter_names=evaluator.parameter_names,
+            result_keys=result_keys,
+        ).fit(training_points, training_values)
+        predictions = surrogate.predict(candidates)
+
+        acquisition = _get_feasibility_probability(evaluator.constraints, predictions)
+        if best_objective is not None:
+            acquisition = acquisition * _get_expected_improvement(predictions["objective"], best_objective)
+
+        position = int(np.argmax(acquisition))
+        if acquisition[position] <= 0.0:
+            break
+
+        batch.append(candidates[position])
+        training_points = np.vstack([training_points, candidates[position]])
+        training_values = np.vstack([
+            training_values,
+            [predictions[result_key].mean[position] for result_key in result_keys],
+        ])
+        candidates = np.delete(candidates, position, axis=0)
+
+    return batch
+
+
+def _optimise_nsga(
+        evaluator: _OptimisationEvaluator,
+        random_generator: np.random.Generator,
+        population_size: int,
+) -> None:
+    num_parameters = evaluator.num_parameters
+    population_size = max(population_size + population_size % 2, 4)
+
+    population = [evaluator.initial_point] + list(
+        _get_latin_hypercube(min(population_size, evaluator.remaining) - 1, num_parameters, random_generator)
+    )
+    objectives, violations = evaluator.evaluate(population)
+
+    num_stalled_generations = 0
+    while evaluator.remaining > 0 and num_stalled_generations < NSGA_MAX_STALLED_GENERATIONS:
+        ranks, crowding_distances = _get_ranks_and_crowding_distances(objectives, violations)
+
+        offspring = _get_offspring(
+            population=np.array(population),
+            ranks=ranks,
+            crowding_distances=crowding_distances,
+            count=population_size,
+            random_generator=random_generator,
+        )
+        # The last generation only gets as many new points as the budget has left
+        offspring = _limit_to_budget(evaluator, offspring)
+
+        num_simulations = evaluator.num_simulations
+        offspring_objectives, offspring_violations = evaluator.evaluate(offspring)
+        num_stalled_generations = num_stalled_generations + 1 if evaluator.num_simulations == num_simulations else 0
+
+        # Parents and offspring compete for the next population, with duplicate points only kept once
+        combined_points = {}
+        for point, point_objectives, violation in zip(
+                population + offspring,
+                list(objectives) + list(offspring_objectives),
+                list(violations) + list(offspring_violations),
+        ):
+            combined_points.setdefault(dataclass_hash(evaluator.get_parameters(point)), (point, point_objectives, violation))
+        population = [point for point, _, _ in combined_points.values()]
+        objectives = np.array([point_objectives for _, point_objectives, _ in combined_points.values()])
+        violations = np.array([violation for _, _, violation in combined_points.values()])
+
+        ranks, crowding_distances = _get_ranks_and_crowding_distances(objectives, violations)
+        selected_positions = np.lexsort((-crowding_distances, ranks))[:population_size]
+        population = [population[position] for position in selected_positions]
+        objectives = objectives[selected_positions]
+        violations = violations[selected_positions]
+
+
+def _limit_to_budget(evaluator: _OptimisationEvaluator, points: list[np.ndarray]) -> list[np.ndarray]:
+    limited_points = []
+    for point in points:
+        if evaluator.count_uncached(limited_points + [point]) > evaluator.remaining:
+            break
+        limited_points.append(point)
+
+    return limited_points
+
+
+def _get_offspring(
+        population: np.ndarray,
+        ranks: np.ndarray,
+        crowding_distances: np.ndarray,
+        count: int,
+        random_generator: np.random.Generator,
+) -> list[np.ndarray]:
+    num_points, num_parameters = population.shape
+
+    # Binary tournament on rank, then on crowding distance
+    contestants = random_generator.integers(0, num_points, (2 * count, 2))
+    first, second = contestants[:, 0], contestants[:, 1]
+    first_wins = (ranks[first] < ranks[second]) | (
+        (ranks[first] == ranks[second]) & (crowding_distances[first] >= crowding_distances[second])
+    )
+    parents = population[np.where(first_wins, first, second)].reshape(count, 2, num_parameters)
+
+    # Simulated binary crossover of each pair of parents, then polynomial mutation of every child
+    uniform = random_generator.random((count, num_parameters))
+    spread = np.where(
+        uniform <= 0.5,
+        (2.0 * uniform) ** (1.0 / (NSGA_CROSSOVER_INDEX + 1.0)),
+        (1.0 / (2.0 * (1.0 - uniform))) ** (1.0 / (NSGA_CROSSOVER_INDEX + 1.0)),
+    )
+    spread = np.where(random_generator.random((count, num_parameters)) < 0.5, spread, 1.0)
+    sign = np.where(random_generator.random((count, 1)) < 0.5, 1.0, -1.0)
+    children = 0.5 * (parents[:, 0] + parents[:, 1]) + sign * 0.5 * spread * (parents[:, 0] - parents[:, 1])
+
+    uniform = random_generator.random((count, num_parameters))
+    perturbation = np.where(
+        uniform < 0.5,
+        (2.0 * uniform) ** (1.0 / (NSGA_MUTATION_INDEX + 1.0)) - 1.0,
+        1.0 - (2.0 * (1.0 - uniform)) ** (1.0 / (NSGA_MUTATION_INDEX + 1.0)),
+    )
+    is_mutated = random_generator.random((count, num_parameters)) < 1.0 / num_parameters
+    children = np.clip(children + np.where(is_mutated, perturbation, 0.0), 0.0, 1.0)
+
+    return list(children)
+
+
+def _get_ranks_and_crowding_distances(
+        objectives: np.ndarray,
+        violations: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    # Feasible points dominate infeasible ones, and infeasible points are ranked by their violation alone
+    num_points = len(objectives)
+    both_feasible = (violations[:, None] == 0.0) & (violations[None, :] == 0.0)
+    objective_dominates = (
+        np.all(objectives[:, None, :] <= objectives[None, :, :], axis=2)
+        & np.any(objectives[:, None, :] < objectives[None, :, :], axis=2)
+    )
+    dominates = np.where(both_feasible, objective_dominates, violations[:, None] < violations[None, :])
+
+    ranks = np.zeros(num_points, dtype=int)
+    crowding_distances = np.zeros(num_points)
+    num_dominating = dominates.sum(axis=0)
+    front = np.flatnonzero(num_dominating == 0)
+    rank = 0
+    while front.size:
+        ranks[front] = rank
+        crowding_distances[front] = _get_crowding_distances(objectives[front])
+
+        num_dominating = num_dominating - dominates[front].sum(axis=0)
+        num_dominating[front] = -1
+        front = np.flatnonzero(num_dominating == 0)
+        rank += 1
+
+    return ranks, crowding_distances
+
+
+def _get_crowding_distances(objectives: np.ndarray) -> np.ndarray:
+    num_points, num_objectives = objectives.shape
+    crowding_distances = np.zeros(num_points)
+    if num_points <= 2:
+        crowding_distances[:] = np.inf
+        return crowding_distances
+
+    for i in range(num_objectives):
+        order = np.argsort(objectives[:, i])
+        values = objectives[order, i]
+        crowding_distances[order[[0, -1]]] = np.inf
+
+        value_range = values[-1] - values[0]
+        if np.isfinite(value_range) and value_range > 0:
+            crowding_distances[order[1:-1]] += (values[2:] - values[:-2]) / value_range
+
+    return crowding_distances
+
+
+def _get_best_point_hashes(evaluator: _OptimisationEvaluator) -> list[str]:
+    point_hashes = list(evaluator.evaluations)
+    if not point_hashes:
+        return []
+
+    objectives = np.array([evaluator.evaluations[point_hash][2] for point_hash in point_hashes])
+    violations = np.array([evaluator.evaluations[point_hash][3] for point_hash in point_hashes])
+
+    if len(evaluator.objectives) == 1:
+        return [point_hashes[min(range(len(point_hashes)), key=lambda i: (violations[i], objectives[i, 0]))]]
+
+    ranks, _ = _get_ranks_and_crowding_distances(objectives, violations)
+    return [
+        point_hash for point_hash, rank, violation in zip(point_hashes, ranks, violations)
+        if rank == 0 and np.isfinite(violation)
+    ]
+
+
+def _get_rank_keys(objectives: np.ndarray, violations: np.ndarray) -> list[tuple[float, float]]:
+    # Feasible points are ordered by their objective, and come before every infeasible point
+    return [(float(violation), float(point_objectives[0])) for point_objectives, violation in zip(objectives, violations)]
+
+
+def _get_expected_improvement(prediction: SurrogatePredictionData, best_value: float) -> np.ndarray:
+    improvement = best_value - prediction.mean
+    std = np.maximum(prediction.std, 1e-12)
+    z = improvement / std
+    return np.maximum(improvement * _get_normal_cdf(z) + std * np.exp(-0.5 * z ** 2) / math.sqrt(2.0 * math.pi), 0.0)
+
+
+def _get_feasibility_probability(
+        constraints: list[OptimisationConstraintData],
+        predictions: dict[str, SurrogatePredictionData],
+) -> np.ndarray:
+    probability = np.ones_like(predictions["objective"].mean)
+    for constraint in constraints:
+        prediction = predictions[constraint.result_key]
+        std = np.maximum(prediction.std, 1e-12)
+        upper_probability = 1.0 if constraint.upper is None else _get_normal_cdf((constraint.upper - prediction.mean) / std)
+        lower_probability = 0.0 if constraint.lower is None else _get_normal_cdf((constraint.lower - prediction.mean) / std)
+        probability = probability * np.maximum(upper_probability - lower_probability, 0.0)
+
+    return probability
+
+
+def _get_normal_cdf(values: np.ndarray) -> np.ndarray:
+    return 0.5 * (1.0 + np.vectorize(math.erf, otypes=[np.float64])(values / math.sqrt(2.0)))
+
+
+def _get_latin_hypercube(count: int, num_parameters: int, random_generator: np.random.Generator) -> np.ndarray:
+    if count <= 0:
+        return np.empty((0, num_parameters))
+
+    strata = random_generator.permuted(np.tile(np.arange(count)[:, None], (1, num_parameters)), axis=0)
+    return (strata + random_generator.random((count, num_parameters))) / count
+
+
+def _get_result_value(row: dict, result_key: str) -> float:
+    value = row.get(result_key)
+    return math.nan if value is None else float(value)
+
+
+def _get_source_file_key(source_file_path: str | Path) -> str:
+    return str(Path(source_file_path).resolve())
+
+
+def _check_optimisation(
+        parameters_type: type[ParametersType],
+        parameters: dict[str, OptimisedParameterData],
+        objectives: list[OptimisationObjectiveData],
+        method: OptimisationMethod,
+) -> None:
+    field_names = {field.name for field in dataclasses.fields(parameters_type)}
+    if not parameters:
+        raise ValueError("An optimisation needs at least one parameter")
+    for parameter_name, parameter_data in parameters.items():
+        if parameter_name not in field_names:
+            raise ValueError(f"{parameter_name} is not a parameter of {parameters_type.__name__}")
+        if not parameter_data.lower < parameter_data.upper:
+            raise ValueError(f"The bounds of {parameter_name} need lower < upper")
+
+    if not objectives:
+        raise ValueError("An optimisation needs at least one objective")
+    if len(objectives) > 1 and method != OptimisationMethod.NSGA:
+        raise ValueError(f"The {method} method optimises one objective, use {OptimisationMethod.NSGA} for several")
+
+
+def _objective_data_from_config(objective_data: str | list | dict[str, typing.Any]) -> OptimisationObjectiveData:
+    # An objective is a result key, a list of result keys to sum, or a mapping with the results and direction
+    if isinstance(objective_data, str):
+        return OptimisationObjectiveData(result_keys=(objective_data,))
+    if isinstance(objective_data, list):
+        return OptimisationObjectiveData(result_keys=tuple(objective_data))
+
+    assert isinstance(objective_data, dict)
+    result_keys = objective_data["results"]
+    if isinstance(result_keys, str):
+        result_keys = [result_keys]
+
+    return OptimisationObjectiveData(
+        result_keys=tuple(result_keys),
+        maximise=bool(objective_data.get("maximise", False)),
+    )
@@ -0,0 +1,316 @@
+""" Waveform Pyramid Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import typing
+import dataclasses
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .fields import *
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "DEFAULT_BASE_BUCKET_SIZE",
+    "DEFAULT_LEVEL_FACTOR",
+    "DEFAULT_MIN_BUCKETS",
+    "WaveformPyramidData",
+    "build_waveform_pyramid",
+    "save_waveform_pyramid",
+    "load_waveform_pyramid",
+    "get_pyramid_envelope",
+]
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+# Stores the number of raw samples summarised by each bucket of the finest level. Views finer than it are drawn
+# from the raw samples
+DEFAULT_BASE_BUCKET_SIZE = 64
+# Stores the number of buckets of a level merged into one bucket of the next coarser level
+DEFAULT_LEVEL_FACTOR = 4
+# Stores the number of buckets below which no coarser level is built
+DEFAULT_MIN_BUCKETS = 256
+
+# Stores the number of envelope buckets drawn per horizontal pixel
+BUCKETS_PER_PIXEL = 1
+
+
+# --------------------------------------------------
+#   Dataclasses
+# --------------------------------------------------
+
+@dataclasses.dataclass(frozen=True)
+class WaveformPyramidData:
+    x_field: str
+    num_points: int
+    # Stores the number of raw samples per bucket of each level, from finest to coarsest
+    bucket_sizes: tuple[int, ...]
+    # Stores, per level and field, the envelope as the sample index and y of each bucket's minimum and maximum in
+    # time order
+    envelopes: tuple[dict[str, tuple[np.ndarray, np.ndarray]], ...]
+    # Stores the sorted sample indices referenced by any envelope and their x, so x is only stored once
+    x_indices: np.ndarray
+    x_values: np.ndarray
+
+    @property
+    def fields(self) -> list[str]:
+        return list(self.envelopes[0]) if self.envelopes else []
+
+    def get_x(self, indices: np.ndarray) -> np.ndarray:
+        return self.x_values[np.searchsorted(self.x_indices, indices)]
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def build_waveform_pyramid(
+        waveform_data: pd.DataFrame | typing.Iterable[pd.DataFrame],
+        fields: list[str] | None = None,
+        x_field: str = TIME_FIELD_NAME,
+        base_bucket_size: int = DEFAULT_BASE_BUCKET_SIZE,
+        level_factor: int = DEFAULT_LEVEL_FACTOR,
+        min_buckets: int = DEFAULT_MIN_BUCKETS,
+) -> WaveformPyramidData:
+    if isinstance(waveform_data, pd.DataFrame):
+        waveform_data = [waveform_data]
+
+    # The finest level is reduced from the raw samples, chunk by chunk. The samples of a bucket that a chunk leaves
+    # incomplete are carried into the next, so the buckets are the same as those of the whole waveform. The
+    # envelopes hold sample indices, and only the x of the samples they pick is kept
+    num_points = 0
+    carried_data: dict[str, np.ndarray] = {}
+    finest_segments: dict[str, list[tuple[np.ndarray, np.ndarray]]] = {}
+    x_segments: list[tuple[np.ndarray, np.ndarray]] = []
+    for chunk in waveform_data:
+        if fields is None:
+            fields = [field for field in chunk.columns if field != x_field]
+
+        chunk_data = {}
+        for field in [x_field, *fields]:
+            values = chunk[field].to_numpy()
+            chunk_data[field] = np.concatenate([carried_data[field], values]) if field in carried_data else values
+        first_index = num_points - len(carried_data.get(x_field, []))
+        num_points += len(chunk)
+
+        num_bucketed_points = len(chunk_data[x_field]) - len(chunk_data[x_field]) % base_bucket_size
+        carried_data = {field: values[num_bucketed_points:] for field, values in chunk_data.items()}
+        if num_bucketed_points:
+            chunk_data = {field: values[:num_bucketed_points] for field, values in chunk_data.items()}
+            x_segments.append(_reduce_chunk(chunk_data, fields, x_field, first_index, base_bucket_size, finest_segments))
+
+    # The last bucket may be ragged
+    if carried_data and len(carried_data[x_field]):
+        first_index = num_points - len(carried_data[x_field])
+        x_segments.append(_reduce_chunk(carried_data, fields, x_field, first_index, base_bucket_size, finest_segments))
+
+    bucket_sizes = []
+    envelopes = []
+
+    # Every coarser level is reduced from the previous level's envelope, which still holds the extremes of each
+    # bucket, so the raw data is only traversed once
+    bucket_size = base_bucket_size
+    index_dtype = _get_index_dtype(num_points)
+    level_envelopes = {}
+    for field, segments in finest_segments.items():
+        index_segments, y_segments = zip(*segments)
+        level_envelopes[field] = (np.concatenate(index_segments).astype(index_dtype), np.concatenate(y_segments))
+    while num_points > bucket_size:
+        bucket_sizes.append(bucket_size)
+        envelopes.append(level_envelopes)
+
+        if num_points // bucket_size < min_buckets * level_factor:
+            break
+
+        bucket_size *= level_factor
+        level_envelopes = {
+            field: _reduce_envelope(index_envelope, y_envelope, 2 * level_factor)
+            for field, (index_envelope, y_envelope) in level_envelopes.items()
+        }
+
+    x_indices = np.concatenate([np.empty(0, dtype=np.int64)] + [indices for indices, _ in x_segments])
+    x_values = np.concatenate([np.empty(0)] + [values for _, values in x_segments])
+
+    return WaveformPyramidData(
+        x_field=x_field,
+        num_points=num_points,
+        bucket_sizes=tuple(bucket_sizes),
+        envelopes=tuple(envelopes),
+        x_indices=x_indices.astype(index_dtype),
+        x_values=x_values.astype(np.float64),
+    )
+
+
+def save_waveform_pyramid(
+        pyramid: WaveformPyramidData,
+        file_path: str | Path,
+) -> None:
+    arrays = {
+        "num_points": np.array(pyramid.num_points),
+        "bucket_sizes": np.array(pyramid.bucket_sizes, dtype=np.int64),
+        "x_field": np.array(pyramid.x_field),
+        "fields": np.array(pyramid.fields),
+        "x_indices": pyramid.x_indices,
+        "x_values": pyramid.x_values,
+    }
+    for level, level_envelopes in enumerate(pyramid.envelopes):
+        for i, (index_envelope, y_envelope) in enumerate(level_envelopes.values()):
+            arrays[f"indices_{level}_{i}"] = index_envelope
+            arrays[f"y_{level}_{i}"] = y_envelope
+
+    with open(file_path, "wb") as file:
+        np.savez_compressed(file, **arrays)
+
+
+def load_waveform_pyramid(file_path: str | Path) -> WaveformPyramidData:
+    with np.load(file_path) as arrays:
+        fields = [str(field) for field in arrays["fields"]]
+        bucket_sizes = tuple(int(bucket_size) for bucket_size in arrays["bucket_sizes"])
+
+        if "x_indices" in arrays:
+            x_indices = arrays["x_indices"]
+            x_values = arrays["x_values"]
+            envelopes = tuple(
+                {
+                    field: (arrays[f"indices_{level}_{i}"], arrays[f"y_{level}_{i}"])
+                    for i, field in enumerate(fields)
+                }
+                for level in range(len(bucket_sizes))
+            )
+        else:
+            # Pyramids saved with an x per envelope point index into the sorted x of all their points instead
+            x_values = np.unique(np.concatenate([
+                arrays[f"x_{level}_{i}"] for level in range(len(bucket_sizes)) for i in range(len(fields))
+            ] or [np.empty(0)]))
+            x_indices = np.arange(len(x_values))
+            envelopes = tuple(
+                {
+                    field: (np.searchsorted(x_values, arrays[f"x_{level}_{i}"]), arrays[f"y_{level}_{i}"])
+                    for i, field in enumerate(fields)
+                }
+                for level in range(len(bucket_sizes))
+            )
+
+        return WaveformPyramidData(
+            x_field=str(arrays["x_field"]),
+            num_points=int(arrays["num_points"]),
+            bucket_sizes=bucket_sizes,
+            envelopes=envelopes,
+            x_indices=x_indices,
+            x_values=x_values,
+        )
+
+
+def get_pyramid_envelope(
+        pyramid: WaveformPyramidData,
+        field: str,
+        num_pixels: int,
+        x_range: tuple[float, float] | None = None,
+        waveform_data: pd.DataFrame | typing.Callable[[], pd.DataFrame] | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    # The coarsest level that still has a bucket per pixel within the visible range is drawn. When even the
+    # finest level is too coarse for the range, the raw samples are drawn if they are available, which may be
+    # loaded lazily as only then are they needed
+    required_points = 2 * BUCKETS_PER_PIXEL * num_pixels
+
+    for level_envelopes in reversed(pyramid.envelopes):
+        index_envelope, y_envelope = level_envelopes[field]
+        x_envelope = pyramid.get_x(index_envelope)
+        start, end = _get_visible_slice(x_envelope, x_range)
+        if end - start >= required_points:
+            return x_envelope[start:end], y_envelope[start:end]
+
+    if callable(waveform_data):
+        waveform_data = waveform_data()
+
+    if waveform_data is not None:
+        x_data = waveform_data[pyramid.x_field].to_numpy()
+        y_data = waveform_data[field].to_numpy()
+    elif pyramid.envelopes:
+        index_envelope, y_data = pyramid.envelopes[0][field]
+        x_data = pyramid.get_x(index_envelope)
+    else:
+        raise ValueError(f"The pyramid has no levels and no waveform data was given to draw {field!r} from")
+
+    start, end = _get_visible_slice(x_data, x_range)
+    return x_data[start:end], y_data[start:end]
+
+
+def _reduce_chunk(
+        chunk_data: dict[str, np.ndarray],
+        fields: list[str],
+        x_field: str,
+        first_index: int,
+        bucket_size: int,
+        finest_segments: dict[str, list[tuple[np.ndarray, np.ndarray]]],
+) -> tuple[np.ndarray, np.ndarray]:
+    # Appends the chunk's finest envelope of every field and returns the sample indices they pick with their x
+    sample_indices = np.arange(first_index, first_index + len(chunk_data[x_field]), dtype=np.int64)
+    for field in fields:
+        finest_segments.setdefault(field, []).append(
+            _reduce_envelope(sample_indices, chunk_data[field], bucket_size)
+        )
+
+    picked_indices = np.unique(np.concatenate(
+        [np.empty(0, dtype=np.int64)] + [finest_segments[field][-1][0] for field in fields]
+    ))
+    return picked_indices, chunk_data[x_field][picked_indices - first_index]
+
+
+def _get_index_dtype(num_points: int) -> np.dtype:
+    # Sample indices are stored as int32 unless the waveform is too long for it
+    if num_points <= np.iinfo(np.int32).max:
+        return np.dtype(np.int32)
+    return np.dtype(np.int64)
+
+
+def _reduce_envelope(
+        x_data: np.ndarray,
+        y_data: np.ndarray,
+        group_size: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    num_points = len(y_data)
+    num_groups = -(-num_points // group_size)
+
+    # The ragged tail is padded with its own last value, which can never change the tail's extremes
+    padded_y_data = np.empty(num_groups * group_size, dtype=y_data.dtype)
+    padded_y_data[:num_points] = y_data
+    padded_y_data[num_points:] = y_data[-1]
+    grouped_y_data = padded_y_data.reshape(num_groups, group_size)
+
+    group_offsets = np.arange(num_groups) * group_size
+    minimum_indices = np.minimum(group_offsets + grouped_y_data.argmin(axis=1), num_points - 1)
+    maximum_indices = np.minimum(group_offsets + grouped_y_data.argmax(axis=1), num_points - 1)
+
+    # Each group contributes its minimum and maximum in the order they occur, so the drawn line keeps the shape
+    indices = np.empty(2 * num_groups, dtype=np.int64)
+    indices[0::2] = np.minimum(minimum_indices, maximum_indices)
+    indices[1::2] = np.maximum(minimum_indices, maximum_indices)
+
+    return x_data[indices], y_data[indices]
+
+
+def _get_visible_slice(
+        x_data: np.ndarray,
+        x_range: tuple[float, float] | None,
+) -> tuple[int, int]:
+    if x_range is None:
+        return 0, len(x_data)
+
+    # One point either side of the range is kept so the line runs to the edges of the axis
+    start = max(int(np.searchsorted(x_data, x_range[0], side="left")) - 1, 0)
+    end = min(int(np.searchsorted(x_data, x_range[1], side="right")) + 1, len(x_data))
+    return start, end
@@ -0,0 +1,155 @@
+""" Parameter Sampling Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import enum
+import math
+import typing
+import dataclasses
+
+import numpy as np
+
+from .spice import *
+from .sweep import *
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "DEFAULT_MONTE_CARLO_BATCH_SIZE",
+    "DistributionType",
+    "DistributionData",
+    "MonteCarloData",
+    "draw_distribution_value",
+    "iter_monte_carlo_parameters",
+]
+
+
+# --------------------------------------------------
+#   Enums
+# --------------------------------------------------
+
+class DistributionType(enum.StrEnum):
+    # Stores a normal distribution of mean and std, where a tolerance is three standard deviations
+    NORMAL = "normal"
+    # Stores a lognormal distribution of median mean and log-space std, where a tolerance is three log-space
+    # standard deviations of 1 + tolerance
+    LOGNORMAL = "lognormal"
+    # Stores a uniform distribution from low to high, or within the tolerance of the mean
+    UNIFORM = "uniform"
+    # Stores a triangular distribution from low to high peaking at the mean, or within the tolerance of the mean
+    TRIANGULAR = "triangular"
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+# Stores the number of points simulated and analysed at once, which bounds the waveforms held in memory
+DEFAULT_MONTE_CARLO_BATCH_SIZE = 64
+
+# Stores how many draws of a truncated normal or lognormal may fall outside its bounds before giving up
+MAX_TRUNCATED_DRAW_ATTEMPTS = 1000
+
+
+# --------------------------------------------------
+#   Dataclasses
+# --------------------------------------------------
+
+@dataclasses.dataclass(frozen=True)
+class DistributionData:
+    type: DistributionType
+    # Stores the mean, median or mode of the distribution. Defaults to the parameter's default value
+    mean: float | None = None
+    std: float | None = None
+    # Stores the bounds of a uniform or triangular distribution, or the truncation of a normal or lognormal one
+    low: float | None = None
+    high: float | None = None
+    # Stores the relative tolerance around the mean, used in place of the std or bounds
+    tolerance: float | None = None
+
+
+@dataclasses.dataclass(frozen=True)
+class MonteCarloData:
+    num_samples: int
+    distributions: dict[str, DistributionData]
+    seed: int | None = None
+    batch_size: int = DEFAULT_MONTE_CARLO_BATCH_SIZE
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def draw_distribution_value(
+        distribution_data: DistributionData,
+        nominal_value: float,
+        random_generator: np.random.Generator,
+) -> float:
+    distribution_type = DistributionType(distribution_data.type)
+    mean = distribution_data.mean if distribution_data.mean is not None else nominal_value
+    tolerance = distribution_data.tolerance
+
+    if distribution_type in (DistributionType.UNIFORM, DistributionType.TRIANGULAR):
+        low, high = distribution_data.low, distribution_data.high
+        if tolerance is not None:
+            low, high = mean - abs(mean) * tolerance, mean + abs(mean) * tolerance
+        if low is None or high is None or high < low:
+            raise ValueError(f"A {distribution_type} distribution needs low <= high, or a tolerance")
+        if distribution_type == DistributionType.UNIFORM:
+            return float(random_generator.uniform(low, high))
+        if low == high:
+            return float(low)
+        return float(random_generator.triangular(low, min(max(mean, low), high), high))
+
+    std = distribution_data.std
+    if tolerance is not None:
+        std = abs(mean) * tolerance / 3 if distribution_type == DistributionType.NORMAL else math.log1p(tolerance) / 3
+    if std is None or std < 0:
+        raise ValueError(f"A {distribution_type} distribution needs a non-negative std, or a tolerance")
+    if distribution_type == DistributionType.LOGNORMAL and mean <= 0:
+        raise ValueError(f"A {distribution_type} distribution needs a positive median, got {mean}")
+
+    # Truncated by redrawing, so the values within the bounds keep the shape of the distribution
+    for _ in range(MAX_TRUNCATED_DRAW_ATTEMPTS):
+        if distribution_type == DistributionType.NORMAL:
+            value = float(random_generator.normal(mean, std))
+        else:
+            value = mean * math.exp(random_generator.normal(0.0, std))
+        if (distribution_data.low is None or value >= distribution_data.low) \
+                and (distribution_data.high is None or value <= distribution_data.high):
+            return value
+
+    raise ValueError(
+        f"No {distribution_type} draw fell within [{distribution_data.low}, {distribution_data.high}] "
+        f"in {MAX_TRUNCATED_DRAW_ATTEMPTS} attempts"
+    )
+
+
+def iter_monte_carlo_parameters(
+        default_parameters: ParametersType,
+        monte_carlo_data: MonteCarloData,
+) -> typing.Iterator[ParametersType]:
+    # Each sample draws its parameters in turn from one seeded generator, so sample i is the same whatever the
+    # batch size, and the samples are generated as they are needed instead of all at once
+    base_parameters = canonicalize_parameters(default_parameters)
+    unknown_parameters = [name for name in monte_carlo_data.distributions if not hasattr(base_parameters, name)]
+    if unknown_parameters:
+        raise KeyError(f"Unknown Monte Carlo parameters: {', '.join(unknown_parameters)}")
+
+    random_generator = np.random.default_rng(monte_carlo_data.seed)
+    for _ in range(monte_carlo_data.num_samples):
+        yield dataclasses.replace(base_parameters, **{
+            name: canonicalize_sweep_value(draw_distribution_value(
+                distribution_data=distribution_data,
+                nominal_value=getattr(base_parameters, name),
+                random_generator=random_generator,
+            ))
+            for name, distribution_data in monte_carlo_data.distributions.items()
+        })
@@ -0,0 +1,313 @@
+""" Simulation Scheduling Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import os
+import json
+import time
+import uuid
+import heapq
+import dataclasses
+from pathlib import Path
+
+from .spice import *
+from .utils import *
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "RUNTIME_HISTORY_FILE_NAME",
+    "MAX_RUNTIME_RECORDS_PER_SOURCE",
+    "RuntimeRecordData",
+    "RuntimeCostModelData",
+    "ScheduledPointData",
+    "RuntimeHistory",
+    "get_default_runtime_history_file_path",
+    "get_simulation_cost",
+    "schedule_simulation_points",
+    "estimate_wall_time",
+    "format_simulation_schedule",
+]
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+RUNTIME_HISTORY_FILE_NAME = "runtime_history.json"
+
+# Stores how many of the latest runtimes are kept per schematic, so the model follows changes to the schematic
+MAX_RUNTIME_RECORDS_PER_SOURCE = 1000
+
+
+# --------------------------------------------------
+#   Dataclasses
+# --------------------------------------------------
+
+@dataclasses.dataclass(frozen=True)
+class RuntimeRecordData:
+    source_file_path: str
+    point_hash: str
+    # Stores the cost of the point, see get_simulation_cost
+    cost: float
+    # Stores the wall time of the simulation in seconds
+    runtime: float
+    timestamp: float
+
+
+@dataclasses.dataclass(frozen=True)
+class RuntimeCostModelData:
+    # Stores runtime = intercept + slope * cost, in seconds
+    intercept: float
+    slope: float
+    num_records: int
+
+    def predict(self, cost: float) -> float:
+        return max(self.intercept + self.slope * cost, 0.0)
+
+
+@dataclasses.dataclass(frozen=True)
+class ScheduledPointData:
+    # Stores a SimulationPointData, or anything else with a source file and parameters
+    point: object
+    cost: float
+    # Stores the predicted runtime in seconds, or None when nothing has been recorded to predict it from
+    predicted_runtime: float | None
+
+
+# --------------------------------------------------
+#   Classes
+# --------------------------------------------------
+
+class RuntimeHistory:
+    """ The recorded runtime of every simulated point, with a cost model per schematic fitted from them.
+
+    Each schematic's runtimes are fitted as a straight line in the point's cost, the number of maximum timesteps it
+    spans. Schematics without records of their own borrow the model fitted to every record, and without any records
+    the points can only be ordered by their cost.
+
+    Several processes may share one history file. Saving merges the records on disk with those held in memory, so
+    concurrent sweeps keep each other's records, and an unreadable file is treated as an empty history.
+    """
+
+    def __init__(self, file_path: str | Path | None = None) -> None:
+        self.file_path = Path(file_path) if file_path is not None else None
+        self._per_source_records: dict[str, list[RuntimeRecordData]] = {}
+        self._cost_models: dict[str | None, RuntimeCostModelData | None] = {}
+
+        if self.file_path is not None:
+            self._add_records(_load_runtime_records(self.file_path))
+
+    def __len__(self) -> int:
+        return sum(len(records) for records in self._per_source_records.values())
+
+    def record(
+            self,
+            source_file_path: str | Path,
+            parameters: ParametersType,
+            runtime: float,
+    ) -> None:
+        source_file_key = _get_source_file_key(source_file_path)
+        records = self._per_source_records.setdefault(source_file_key, [])
+        records.append(RuntimeRecordData(
+            source_file_path=source_file_key,
+            point_hash=dataclass_hash(parameters),
+            cost=get_simulation_cost(parameters),
+            runtime=runtime,
+            timestamp=time.time(),
+        ))
+        del records[:-MAX_RUNTIME_RECORDS_PER_SOURCE]
+
+        self._cost_models.pop(source_file_key, None)
+        self._cost_models.pop(None, None)
+
+    def save(self) -> None:
+        if self.file_path is None:
+            return
+
+        # The records other processes saved since this history was loaded are merged in first. The temporary file
+        # is unique to this save, so concurrent saves never replace each other's
+        self._add_records(_load_runtime_records(self.file_path))
+
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_file_path = self.file_path.with_name(
+            f".{self.file_path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+        )
+        try:
+            with open(temporary_file_path, "w") as json_file:
+                json.dump([
+                    dataclasses.asdict(record)
+                    for records in self._per_source_records.values()
+                    for record in records
+                ], json_file)
+            temporary_file_path.replace(self.file_path)
+        finally:
+            temporary_file_path.unlink(missing_ok=True)
+
+    def get_cost_model(self, source_file_path: str | Path | None = None) -> RuntimeCostModelData | None:
+        # None gives the model fitted to the records of every schematic
+        source_file_key = _get_source_file_key(source_file_path) if source_file_path is not None else None
+        if source_file_key not in self._cost_models:
+            if source_file_key is None:
+                records = [record for records in self._per_source_records.values() for record in records]
+            else:
+                records = self._per_source_records.get(source_file_key, [])
+            self._cost_models[source_file_key] = _fit_cost_model(records)
+
+        return self._cost_models[source_file_key]
+
+    def predict(self, source_file_path: str | Path, parameters: ParametersType) -> float | None:
+        cost_model = self.get_cost_model(source_file_path)
+        if cost_model is None:
+            cost_model = self.get_cost_model()
+        if cost_model is None:
+            return None
+
+        return cost_model.predict(get_simulation_cost(parameters))
+
+    def _add_records(self, records: list[RuntimeRecordData]) -> None:
+        # Records already held are skipped, and each schematic keeps its latest records only
+        for source_file_key in {record.source_file_path for record in records}:
+            source_records = self._per_source_records.setdefault(source_file_key, [])
+            known_records = set(source_records)
+            source_records.extend(
+                record for record in records
+                if record.source_file_path == source_file_key and record not in known_records
+            )
+            source_records.sort(key=lambda record: record.timestamp)
+            del source_records[:-MAX_RUNTIME_RECORDS_PER_SOURCE]
+            self._cost_models.pop(source_file_key, None)
+        self._cost_models.pop(None, None)
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def get_default_runtime_history_file_path() -> Path:
+    # The history describes this machine, so it is kept per user rather than per output directory
+    return Path.home() / ".switchsim" / RUNTIME_HISTORY_FILE_NAME
+
+
+def get_simulation_cost(parameters: ParametersType) -> float:
+    # The number of maximum timesteps the simulation spans, which the solver's work grows with
+    return parameters.duration / parameters.max_timestep
+
+
+def schedule_simulation_points(
+        points: list,
+        runtime_history: RuntimeHistory | None = None,
+) -> list[ScheduledPointData]:
+    # Longest predicted first, so the longest points start straight away instead of finishing last on one worker.
+    # Points without a prediction are ordered by their cost, after those with one
+    scheduled_points = []
+    for point in points:
+        predicted_runtime = None
+        if runtime_history is not None:
+            predicted_runtime = runtime_history.predict(point.source_file_path, point.parameters)
+        scheduled_points.append(ScheduledPointData(
+            point=point,
+            cost=get_simulation_cost(point.parameters),
+            predicted_runtime=predicted_runtime,
+        ))
+
+    return sorted(scheduled_points, key=lambda scheduled_point: (
+        scheduled_point.predicted_runtime is None,
+        -(scheduled_point.predicted_runtime or 0.0),
+        -scheduled_point.cost,
+    ))
+
+
+def estimate_wall_time(runtimes: list[float], num_workers: int) -> float:
+    # Each runtime is handed, in order, to the worker that frees up first
+    worker_finish_times = [0.0] * max(num_workers, 1)
+    for runtime in runtimes:
+        heapq.heappush(worker_finish_times, heapq.heappop(worker_finish_times) + runtime)
+
+    return max(worker_finish_times)
+
+
+def format_simulation_schedule(
+        scheduled_points: list[ScheduledPointData],
+        num_workers: int,
+) -> str:
+    lines = [f"{'#':>5}  {'cost':>10}  {'predicted':>10}  point"]
+    for i, scheduled_point in enumerate(scheduled_points):
+        point = scheduled_point.point
+        predicted_runtime = (
+            f"{scheduled_point.predicted_runtime:9.1f}s" if scheduled_point.predicted_runtime is not None else "?"
+        )
+        targets = ", ".join(f"{job.run_name}/{job.swept_parameter}/{job.index}" for job in getattr(point, "jobs", ()))
+        lines.append(
+            f"{i + 1:>5}  {scheduled_point.cost:>10.4g}  {predicted_runtime:>10}  "
+            f"{Path(point.source_file_path).name} {targets}"
+        )
+
+    predicted_runtimes = [
+        scheduled_point.predicted_runtime for scheduled_point in scheduled_points
+        if scheduled_point.predicted_runtime is not None
+    ]
+    num_unpredicted = len(scheduled_points) - len(predicted_runtimes)
+    lines.append(
+        f"{len(scheduled_points)} point(s), {sum(predicted_runtimes):.1f}s of simulation, "
+        f"estimated wall time with {num_workers} worker(s): {estimate_wall_time(predicted_runtimes, num_workers):.1f}s"
+        + (f" plus {num_unpredicted} point(s) without history" if num_unpredicted else "")
+    )
+
+    return "\n".join(lines)
+
+
+def _fit_cost_model(records: list[RuntimeRecordData]) -> RuntimeCostModelData | None:
+    if not records:
+        return None
+
+    num_records = len(records)
+    mean_cost = sum(record.cost for record in records) / num_records
+    mean_runtime = sum(record.runtime for record in records) / num_records
+    cost_variance = sum((record.cost - mean_cost) ** 2 for record in records)
+
+    # Least squares line through the records, which falls back to runtime proportional to cost when every record
+    # has the same cost or the line would have a negative slope
+    slope = None
+    if cost_variance > 0:
+        slope = sum((record.cost - mean_cost) * (record.runtime - mean_runtime) for record in records) / cost_variance
+    if slope is None or slope < 0:
+        if mean_cost > 0:
+            return RuntimeCostModelData(intercept=0.0, slope=mean_runtime / mean_cost, num_records=num_records)
+        return RuntimeCostModelData(intercept=mean_runtime, slope=0.0, num_records=num_records)
+
+    return RuntimeCostModelData(
+        intercept=mean_runtime - slope * mean_cost,
+        slope=slope,
+        num_records=num_records,
+    )
+
+
+def _load_runtime_records(file_path: Path) -> list[RuntimeRecordData]:
+    # A missing, truncated or otherwise unreadable history is only a lost schedule, never a failed sweep
+    try:
+        with open(file_path, "r") as json_file:
+            records_data = json.load(json_file)
+    except (OSError, ValueError):
+        return []
+    if not isinstance(records_data, list):
+        return []
+
+    records = []
+    for record_data in records_data:
+        try:
+            records.append(RuntimeRecordData(**record_data))
+        except TypeError:
+            continue
+    return records
+
+
+def _get_source_file_key(source_file_path: str | Path) -> str:
+    return str(Path(source_file_path).resolve())
@@ -6,27 +6,86 @@
 #   Imports
 # --------------------------------------------------
 
+import os
 import json
 import time
 import typing
 import uuid
+import collections
 import dataclasses
 from pathlib import Path
 from datetime import datetime
 
-import numpy as np
+import pandas as pd
 import yaml
-from argon2 import Parameters
 
 from .analysis import *
+from .chunked import *
 from .config import *
+from .execution import *
+from .fields import *
+from .pyramid import *
+from .sampling import *
+from .spice import *
+from .storage import *
+from .sweep import *
 from .utils import *
 
+# The modules only needed by parallel runs, metrics, scheduling and the results database are imported where they
+# are used, so loading saved outputs does not pay for them
+if typing.TYPE_CHECKING:
+    from .governor import ConcurrencyGovernor
+    from .metrics import SimulationMetrics
+    from .scheduling import RuntimeHistory
+    from .transport import WaveformDescriptorData
+
 
 # --------------------------------------------------
 #   Exports
 # --------------------------------------------------
 
+__all__ = [
+    "SIMULATION_PARAMETERS_FILE_NAME",
+    "SIMULATION_OUTPUT_FILE_NAME",
+    "SIMULATION_COMPRESSED_OUTPUT_FILE_NAME",
+    "SIMULATION_OUTPUT_PYRAMID_FILE_NAME",
+    "PARAMETER_SWEEP_FILE_NAME",
+    "SIMULATION_MANIFEST_FILE_NAME",
+    "COMPUTED_RESULTS_FILE_NAME",
+    "COMPUTED_RESULTS_ATTRS_KEY",
+    "TRANSIENT_START_TIME_ATTRS_KEY",
+    "RunData",
+    "SimulationJobData",
+    "SimulationPointData",
+    "ConfigSetupData",
+    "ConfigData",
+    "load_config_from_yaml",
+    "config_from_dict",
+    "config_setup_from_dict",
+    "run_simulations",
+    "compile_run_netlists",
+    "get_simulation_jobs",
+    "plan_simulation_points",
+    "simulate_points",
+    "run_double_pulse_test_simulations",
+    "process_simulation_outputs",
+    "process_double_pulse_simulation_outputs",
+    "save_simulation_outputs",
+    "save_simulation_point_output",
+    "load_simulation_manifest",
+    "update_simulation_manifest",
+    "load_simulation_outputs",
+    "load_simulation_point_output",
+    "iter_simulation_point_output_chunks",
+    "load_double_pulse_test_simulation_outputs",
+    "save_simulation_results",
+    "load_simulation_results",
+    "simulate",
+    "simulate_double_pulse_test",
+    "simulate_swept",
+    "run_buck_converter_simulations",
+]
+
 
 # --------------------------------------------------
 #   Constants
@@ -34,7 +93,13 @@ from .utils import *
 
 SIMULATION_PARAMETERS_FILE_NAME = "parameters.json"
 SIMULATION_OUTPUT_FILE_NAME = "output.csv"
+SIMULATION_COMPRESSED_OUTPUT_FILE_NAME = f"output{COMPRESSED_WAVEFORM_FILE_SUFFIX}"
+SIMULATION_OUTPUT_PYRAMID_FILE_NAME = "output_pyramid.npz"
 PARAMETER_SWEEP_FILE_NAME = "results.csv"
+SIMULATION_MANIFEST_FILE_NAME = "manifest.json"
+COMPUTED_RESULTS_FILE_NAME = "computed_results.json"
+COMPUTED_RESULTS_ATTRS_KEY = "computed_results"
+TRANSIENT_START_TIME_ATTRS_KEY = "transient_start_time"
 
 
 # --------------------------------------------------
@@ -42,16 +107,30 @@ PARAMETER_SWEEP_FILE_NAME = "results.csv"
 # --------------------------------------------------
 
 @dataclasses.dataclass(frozen=True)
-class SweptParameterData:
-    start: float
-    end: float
-    step: float
+class RunData:
+    source_file_path: Path
+    parameters_to_sweep: dict[str, SweptParameterData] | None = None
+    # Stores the draws of a Monte Carlo run, which keeps only its results instead of its waveforms
+    monte_carlo: MonteCarloData | None = None
 
 
 @dataclasses.dataclass(frozen=True)
-class RunData:
+class SimulationJobData:
+    run_name: str
+    swept_parameter: str
+    # Stores the position of the point within its sweep
+    index: int
     source_file_path: Path
-    parameters_to_sweep: dict[str, SweptParameterData] | None = None
+    parameters: DoublePulseTestParameters | BuckConverterParameters
+
+
+@dataclasses.dataclass(frozen=True)
+class SimulationPointData:
+    source_file_path: Path
+    parameters: DoublePulseTestParameters | BuckConverterParameters
+    point_hash: str
+    # Stores every job, across runs and sweeps, that shares this source file and parameter set
+    jobs: tuple[SimulationJobData, ...]
 
 
 @dataclasses.dataclass(frozen=True)
@@ -59,6 +138,13 @@ class ConfigSetupData:
     output_field_mapping: DoublePulseTestOutputFields | BuckConverterOutputFields
     default_parameters: DoublePulseTestParameters | BuckConverterParameters
     ltspice_executable_file_path: str | None = None
+    execution_policy: ExecutionPolicyData = ExecutionPolicyData()
+    # Stores whether each schematic is translated into a netlist once, instead of once per point
+    use_netlist: bool = False
+    # Stores whether only the traces of the output field mapping are written to the .raw files
+    save_mapped_traces: bool = False
+    # Stores whether the .raw files only start just before the first window the results are computed from
+    windowed_transient: bool = False
 
 
 @dataclasses.dataclass(frozen=True)
@@ -89,6 +175,18 @@ def config_from_dict(config_data: dict, simulation_type: SimulationType) -> Conf
     results_data = config_data["results"]
     assert isinstance(results_data, list)
 
+    runs = {run_name: _run_data_from_dict(run_data) for run_name, run_data in runs_data.items()}
+
+    config = ConfigData(
+        setup=config_setup_from_dict(setup_data, simulation_type),
+        runs=runs,
+        results=results_data,
+    )
+
+    return config
+
+
+def config_setup_from_dict(setup_data: dict, simulation_type: SimulationType) -> ConfigSetupData:
     ltspice_executable_file_path = setup_data.get("ltspice_executable_file_path", DEFAULT_LTSPICE_EXECUTABLE_FILE_PATH)
 
     output_field_mapping_data = setup_data["output_field_mapping"]
@@ -103,20 +201,18 @@ def config_from_dict(config_data: dict, simulation_type: SimulationType) -> Conf
         parameters_type=get_parameters_type(simulation_type),
     )
 
-    runs = {run_name: _run_data_from_dict(run_data) for run_name, run_data in runs_data.items()}
+    execution_policy = _execution_policy_from_dict(setup_data.get("execution", {}))
 
-    config = ConfigData(
-        setup=ConfigSetupData(
-            output_field_mapping=output_field_mapping,
-            default_parameters=default_parameters,
-            ltspice_executable_file_path=ltspice_executable_file_path,
-        ),
-        runs=runs,
-        results=results_data,
+    return ConfigSetupData(
+        output_field_mapping=output_field_mapping,
+        default_parameters=default_parameters,
+        ltspice_executable_file_path=ltspice_executable_file_path,
+        execution_policy=execution_policy,
+        use_netlist=bool(setup_data.get("use_netlist", False)),
+        save_mapped_traces=bool(setup_data.get("save_mapped_traces", False)),
+        windowed_transient=bool(setup_data.get("windowed_transient", False)),
     )
 
-    return config
-
 
 def run_simulations(
         simulation_type: SimulationType,
@@ -124,59 +220,210 @@ def run_simulations(
         default_parameters: DoublePulseTestParameters,
         output_field_mapping: DoublePulseTestOutputFields,
         ltspice_executable_file_path: str = DEFAULT_LTSPICE_EXECUTABLE_FILE_PATH,
+        execution_policy: ExecutionPolicyData | None = None,
+        max_workers: int | None = None,
+        runtime_history: "RuntimeHistory | None" = None,
+        use_netlist: bool = False,
+        save_mapped_traces: bool = False,
+        windowed_results: list[str] | None = None,
+        metrics: "SimulationMetrics | None" = None,
+        governor: "ConcurrencyGovernor | None" = None,
         verbose: bool = False,
 ) -> dict[str, dict[str, list[tuple[DoublePulseTestParameters, pd.DataFrame]]]]:
+    if use_netlist:
+        runs = compile_run_netlists(
+            runs=runs,
+            ltspice_executable_file_path=ltspice_executable_file_path,
+            execution_policy=execution_policy,
+        )
+
+    jobs = get_simulation_jobs(
+        simulation_type=simulation_type,
+        runs=runs,
+        default_parameters=default_parameters,
+    )
+
+    # Sweeps around the same defaults share points (the defaults themselves at the very least), so every unique
+    # point is simulated once and its output is shared by every sweep that references it
+    points = plan_simulation_points(jobs)
+    verbose_print(verbose, f"Planned {len(jobs)} points, {len(points)} unique")
+
+    per_point_outputs = simulate_points(
+        simulation_type=simulation_type,
+        points=points,
+        output_field_mapping=output_field_mapping,
+        ltspice_executable_file_path=ltspice_executable_file_path,
+        execution_policy=execution_policy,
+        max_workers=max_workers,
+        runtime_history=runtime_history,
+        save_mapped_traces=save_mapped_traces,
+        windowed_results=windowed_results,
+        metrics=metrics,
+        governor=governor,
+        verbose=verbose,
+    )
+
+    # Points that failed and were skipped are left out of every sweep that references them
     per_run_outputs = {}
-    num_runs = len(runs)
+    for job in jobs:
+        parameter_outputs = per_run_outputs.setdefault(job.run_name, {}).setdefault(job.swept_parameter, [])
+        simulation_outputs = per_point_outputs.get((_get_job_source_file_path(job), dataclass_hash(job.parameters)))
+        if simulation_outputs is not None:
+            parameter_outputs.append((job.parameters, simulation_outputs))
 
-    for i, (run_name, run_data) in enumerate(runs.items()):
+    for run_name, per_parameter_outputs in per_run_outputs.items():
+        verbose_print(verbose, f"Run {run_name}")
+        for swept_parameter, parameter_outputs in per_parameter_outputs.items():
+            num_output_rows = len(parameter_outputs[0][1]) if parameter_outputs else 0
+            verbose_print(verbose, f"\t - {swept_parameter}: {len(parameter_outputs)} points, {num_output_rows} rows")
 
-        source_file_path = run_data.source_file_path
-        parameters_to_sweep = run_data.parameters_to_sweep
-        per_parameter_outputs = {}
+    return per_run_outputs
 
-        verbose_print(verbose, f"Run {i + 1} / {num_runs} - {run_name}: {source_file_path}")
 
-        if parameters_to_sweep is None:
-            input_parameters_collection = [default_parameters]
-            parameter_outputs = simulate(
-                simulation_type=simulation_type,
-                source_file_path=source_file_path,
-                output_field_mapping=output_field_mapping,
-                input_parameters_collection=input_parameters_collection,
-                cleanup=True,
-                ltspice_executable_file_path=ltspice_executable_file_path,
+def compile_run_netlists(
+        runs: dict[str, RunData],
+        ltspice_executable_file_path: str = DEFAULT_LTSPICE_EXECUTABLE_FILE_PATH,
+        execution_policy: ExecutionPolicyData | None = None,
+) -> dict[str, RunData]:
+    # Points the runs at the cached netlist of their schematic, translating each schematic at most once
+    netlist_file_paths = {}
+    for run_data in runs.values():
+        source_file_path = Path(run_data.source_file_path).resolve()
+        if source_file_path not in netlist_file_paths:
+            netlist_file_paths[source_file_path] = compile_ltspice_netlist(
+                schematic_file_path=source_file_path,
+                executable_file_path=ltspice_executable_file_path,
+                execution_policy=execution_policy,
             )
-            per_parameter_outputs["default"] = parameter_outputs
 
-            output_data = parameter_outputs[0]
-            num_output_rows = len(output_data)
-            verbose_print(verbose, f"\t - default: {num_output_rows} rows")
+    return {
+        run_name: dataclasses.replace(
+            run_data,
+            source_file_path=netlist_file_paths[Path(run_data.source_file_path).resolve()],
+        )
+        for run_name, run_data in runs.items()
+    }
+
+
+def get_simulation_jobs(
+        simulation_type: SimulationType,
+        runs: dict[str, RunData],
+        default_parameters: ParametersType,
+) -> list[SimulationJobData]:
+    # Expands every run into its individual points, in the same layout as the outputs of run_simulations
+    jobs = []
+
+    for run_name, run_data in runs.items():
+        # Monte Carlo runs are drawn and analysed batch by batch by run_monte_carlo_simulations
+        if run_data.monte_carlo is not None:
+            continue
+
+        if run_data.parameters_to_sweep is None:
+            per_parameter_collections = {"default": [canonicalize_parameters(default_parameters)]}
         else:
-            for swept_parameter, swept_parameter_data in parameters_to_sweep.items():
-                parameter_outputs = simulate_swept(
-                    simulation_type=simulation_type,
-                    source_file_path=str(source_file_path),
-                    output_field_mapping=output_field_mapping,
+            per_parameter_collections = {
+                swept_parameter: get_swept_parameters(
                     default_parameters=default_parameters,
                     swept_parameter=swept_parameter,
-                    start_value=swept_parameter_data.start,
-                    end_value=swept_parameter_data.end,
-                    step=swept_parameter_data.step,
-                    cleanup=True,
-                    ltspice_executable_file_path=ltspice_executable_file_path,
-                    verbose=verbose,
+                    swept_parameter_data=swept_parameter_data,
                 )
+                for swept_parameter, swept_parameter_data in run_data.parameters_to_sweep.items()
+            }
 
-                per_parameter_outputs[swept_parameter] = parameter_outputs
+        for swept_parameter, input_parameters_collection in per_parameter_collections.items():
+            for i, input_parameters in enumerate(input_parameters_collection):
+                jobs.append(SimulationJobData(
+                    run_name=run_name,
+                    swept_parameter=swept_parameter,
+                    index=i,
+                    source_file_path=Path(run_data.source_file_path),
+                    parameters=input_parameters,
+                ))
+
+    return jobs
+
+
+def plan_simulation_points(jobs: list[SimulationJobData]) -> list[SimulationPointData]:
+    # Groups the jobs by source file and canonical parameter hash, keeping the order in which points first appear
+    per_point_jobs = {}
+    for job in jobs:
+        point_key = (_get_job_source_file_path(job), dataclass_hash(job.parameters))
+        per_point_jobs.setdefault(point_key, []).append(job)
+
+    return [
+        SimulationPointData(
+            source_file_path=source_file_path,
+            parameters=point_jobs[0].parameters,
+            point_hash=point_hash,
+            jobs=tuple(point_jobs),
+        )
+        for (source_file_path, point_hash), point_jobs in per_point_jobs.items()
+    ]
 
-                output_data = parameter_outputs[0]
-                num_output_rows = len(output_data)
-                verbose_print(verbose, f"\t - {swept_parameter}: {num_output_rows} rows")
 
-        per_run_outputs[run_name] = per_parameter_outputs
+def simulate_points(
+        simulation_type: SimulationType,
+        points: list[SimulationPointData],
+        output_field_mapping: OutputFieldsType,
+        ltspice_executable_file_path: str = DEFAULT_LTSPICE_EXECUTABLE_FILE_PATH,
+        execution_policy: ExecutionPolicyData | None = None,
+        max_workers: int | None = None,
+        runtime_history: "RuntimeHistory | None" = None,
+        save_mapped_traces: bool = False,
+        windowed_results: list[str] | None = None,
+        selected_results: list[str] | None = None,
+        metrics: "SimulationMetrics | None" = None,
+        governor: "ConcurrencyGovernor | None" = None,
+        verbose: bool = False,
+) -> dict[tuple[Path, str], pd.DataFrame | dict[str, float]]:
+    # Returns the output of every point that did not fail, keyed by its source file and point hash, which is its
+    # results rather than its waveform when the results are selected. The points are dispatched longest predicted
+    # first, and the runtime of each is recorded in the history when one is given. A governor runs the points in
+    # a pool of its maximum size, tuning how many run at once
+    from .scheduling import schedule_simulation_points
+
+    scheduled_points = [
+        scheduled_point.point for scheduled_point in schedule_simulation_points(points, runtime_history)
+    ]
+
+    if governor is not None:
+        max_workers = governor.max_workers
+
+    try:
+        if max_workers is not None and max_workers > 1:
+            return _simulate_points_in_parallel(
+                simulation_type=simulation_type,
+                points=scheduled_points,
+                output_field_mapping=output_field_mapping,
+                ltspice_executable_file_path=ltspice_executable_file_path,
+                execution_policy=execution_policy,
+                max_workers=max_workers,
+                runtime_history=runtime_history,
+                save_mapped_traces=save_mapped_traces,
+                windowed_results=windowed_results,
+                selected_results=selected_results,
+                metrics=metrics,
+                governor=governor,
+                verbose=verbose,
+            )
 
-    return per_run_outputs
+        return _simulate_points(
+            simulation_type=simulation_type,
+            points=scheduled_points,
+            output_field_mapping=output_field_mapping,
+            ltspice_executable_file_path=ltspice_executable_file_path,
+            execution_policy=execution_policy,
+            runtime_history=runtime_history,
+            save_mapped_traces=save_mapped_traces,
+            windowed_results=windowed_results,
+            selected_results=selected_results,
+            metrics=metrics,
+            verbose=verbose,
+        )
+    finally:
+        # Whatever finished before a failure is still worth remembering
+        if runtime_history is not None:
+            runtime_history.save()
 
 
 def run_double_pulse_test_simulations(
@@ -184,6 +431,14 @@ def run_double_pulse_test_simulations(
         default_parameters: DoublePulseTestParameters,
         output_field_mapping: DoublePulseTestOutputFields,
         ltspice_executable_file_path: str = DEFAULT_LTSPICE_EXECUTABLE_FILE_PATH,
+        execution_policy: ExecutionPolicyData | None = None,
+        max_workers: int | None = None,
+        runtime_history: "RuntimeHistory | None" = None,
+        use_netlist: bool = False,
+        save_mapped_traces: bool = False,
+        windowed_results: list[str] | None = None,
+        metrics: "SimulationMetrics | None" = None,
+        governor: "ConcurrencyGovernor | None" = None,
         verbose: bool = False,
 ) -> dict[str, dict[str, list[tuple[DoublePulseTestParameters, pd.DataFrame]]]]:
     return run_simulations(
@@ -192,28 +447,85 @@ def run_double_pulse_test_simulations(
         default_parameters=default_parameters,
         output_field_mapping=output_field_mapping,
         ltspice_executable_file_path=ltspice_executable_file_path,
+        execution_policy=execution_policy,
+        max_workers=max_workers,
+        runtime_history=runtime_history,
+        use_netlist=use_netlist,
+        save_mapped_traces=save_mapped_traces,
+        windowed_results=windowed_results,
+        metrics=metrics,
+        governor=governor,
         verbose=verbose,
     )
 
 
 def process_simulation_outputs(
-        per_run_outputs: dict[str, dict[str, list[tuple[ParametersType, pd.DataFrame]]]],
+        per_run_outputs: dict[str, dict[str, list[tuple[ParametersType, pd.DataFrame | typing.Callable[[], pd.DataFrame] | WaveformChunkSourceData]]]],
         selected_results: list[str],
         simulation_type: SimulationType,
+        previous_results: dict[str, dict[str, pd.DataFrame]] | None = None,
 ) -> dict[str, dict[str, pd.DataFrame]]:
     # Ensure each item is only represented once
-    selected_results = list(set(selected_results))
+    selected_results = list(dict.fromkeys(selected_results))
+
+    if previous_results is None:
+        previous_results = {}
 
     per_run_results: dict[str, dict[str, pd.DataFrame]] = {}
     for run_name, per_parameter_outputs in per_run_outputs.items():
         per_parameter_results = {}
 
         for swept_parameter, parameter_outputs in per_parameter_outputs.items():
-            per_parameter_results[swept_parameter] = []
+            previous_parameter_results = previous_results.get(run_name, {}).get(swept_parameter)
+            previous_rows, previous_computed_results = _get_previously_computed_results(previous_parameter_results)
+
+            parameter_results_rows = []
+            computed_results = {}
 
             for input_parameters, output_data in parameter_outputs:
+                point_hash = dataclass_hash(input_parameters)
                 parameter_results = dataclasses.asdict(input_parameters)
-                for result_key in selected_results:
+                parameter_results[POINT_HASH_FIELD_NAME] = point_hash
+
+                # Carry over every result that was already computed for this point
+                computed_result_keys = previous_computed_results.get(point_hash, [])
+                previous_row = previous_rows.get(point_hash, {})
+                for result_key in computed_result_keys:
+                    parameter_results[result_key] = previous_row.get(result_key)
+
+                # Only the missing results need the waveform, which may be loaded lazily
+                missing_result_keys = [
+                    result_key for result_key in selected_results if result_key not in computed_result_keys
+                ]
+                if missing_result_keys and isinstance(output_data, WaveformChunkSourceData):
+                    # Streamed waveforms compute every missing result in one pass over their chunks
+                    _check_transient_start_time(
+                        simulation_type,
+                        input_parameters,
+                        missing_result_keys,
+                        output_data.transient_start_time,
+                    )
+                    parameter_results.update(analyse_waveform_chunks(
+                        simulation_type=simulation_type,
+                        chunks=output_data.open_chunks(),
+                        input_parameters=input_parameters,
+                        selected_results=missing_result_keys,
+                    ))
+                    computed_results[point_hash] = list(computed_result_keys) + missing_result_keys
+                    parameter_results_rows.append(parameter_results)
+                    continue
+
+                if missing_result_keys and callable(output_data):
+                    output_data = output_data()
+                if missing_result_keys:
+                    _check_transient_start_time(
+                        simulation_type,
+                        input_parameters,
+                        missing_result_keys,
+                        output_data.attrs.get(TRANSIENT_START_TIME_ATTRS_KEY, 0.0),
+                    )
+
+                for result_key in missing_result_keys:
                     getter = simulation_type_result_getters[simulation_type.value][result_key]
                     result = getter(
                         input_data=output_data,
@@ -221,9 +533,12 @@ def process_simulation_outputs(
                     )
                     parameter_results[result_key] = result
 
-                per_parameter_results[swept_parameter].append(parameter_results)
+                computed_results[point_hash] = list(computed_result_keys) + missing_result_keys
+                parameter_results_rows.append(parameter_results)
 
-            per_parameter_results[swept_parameter] = pd.DataFrame(per_parameter_results[swept_parameter])
+            parameter_results_data = pd.DataFrame(parameter_results_rows)
+            parameter_results_data.attrs[COMPUTED_RESULTS_ATTRS_KEY] = computed_results
+            per_parameter_results[swept_parameter] = parameter_results_data
 
         per_run_results[run_name] = per_parameter_results
 
@@ -233,41 +548,160 @@ def process_simulation_outputs(
 def process_double_pulse_simulation_outputs(
         per_run_outputs: dict[str, dict[str, list[tuple[ParametersType, pd.DataFrame]]]],
         selected_results: list[str],
+        previous_results: dict[str, dict[str, pd.DataFrame]] | None = None,
 ) -> dict[str, dict[str, pd.DataFrame]]:
     return process_simulation_outputs(
         per_run_outputs=per_run_outputs,
         selected_results=selected_results,
         simulation_type=SimulationType.DOUBLE_PULSE_TEST,
+        previous_results=previous_results,
     )
 
 
 def save_simulation_outputs(
         output_directory_path: str | Path,
-        per_run_outputs: dict[str, dict[str, list[tuple[ParametersType, pd.DataFrame]]]]
+        per_run_outputs: dict[str, dict[str, list[tuple[ParametersType, pd.DataFrame]]]],
+        save_pyramid: bool = True,
+        compress: bool = True,
+        metrics: "SimulationMetrics | None" = None,
 ) -> None:
     if isinstance(output_directory_path, str):
         output_directory_path = Path(output_directory_path)
 
     output_directory_path.mkdir(parents=True, exist_ok=True)
 
+    manifest_entries = []
+
     for run_name, per_run_outputs in per_run_outputs.items():
         for swept_parameter, per_parameters_outputs in per_run_outputs.items():
-            parameters_output_directory_path = output_directory_path / run_name / swept_parameter
-            parameters_output_directory_path.mkdir(parents=True, exist_ok=True)
-
             for i, (used_parameters, simulation_outputs) in enumerate(per_parameters_outputs):
-                simulation_directory_path = parameters_output_directory_path / f"{i}"
-                simulation_directory_path.mkdir(parents=True, exist_ok=True)
+                manifest_entry = save_simulation_point_output(
+                    output_directory_path=output_directory_path,
+                    run_name=run_name,
+                    swept_parameter=swept_parameter,
+                    index=i,
+                    used_parameters=used_parameters,
+                    simulation_outputs=simulation_outputs,
+                    save_pyramid=save_pyramid,
+                    compress=compress,
+                    metrics=metrics,
+                )
+                manifest_entries.append(manifest_entry)
+
+    # Record every saved point in a manifest so the outputs can be indexed without walking the tree
+    update_simulation_manifest(
+        output_directory_path=output_directory_path,
+        manifest_entries=manifest_entries,
+    )
+
+
+def save_simulation_point_output(
+        output_directory_path: str | Path,
+        run_name: str,
+        swept_parameter: str,
+        index: int,
+        used_parameters: ParametersType,
+        simulation_outputs: pd.DataFrame | WaveformChunkSourceData,
+        save_pyramid: bool = True,
+        compress: bool = True,
+        metrics: "SimulationMetrics | None" = None,
+) -> dict:
+    # A streamed waveform is written chunk by chunk, once into the output and once into the pyramid, so it is
+    # never held whole
+    if isinstance(output_directory_path, str):
+        output_directory_path = Path(output_directory_path)
+
+    simulation_directory_path = output_directory_path / run_name / swept_parameter / f"{index}"
+    simulation_directory_path.mkdir(parents=True, exist_ok=True)
+
+    # Save the used parameters as json
+    simulation_parameters_file_path = simulation_directory_path / SIMULATION_PARAMETERS_FILE_NAME
+    simulation_parameters_data = dataclasses.asdict(used_parameters)
+    with open(str(simulation_parameters_file_path), "w") as json_file:
+        json.dump(simulation_parameters_data, json_file, indent=4)
+
+    # Save the simulation output compressed, with the time axis stored once per sweep, or as csv. Only one of
+    # the two is kept, so a re-saved point never loads the stale other one
+    compressed_output_file_path = simulation_directory_path / SIMULATION_COMPRESSED_OUTPUT_FILE_NAME
+    csv_output_file_path = simulation_directory_path / SIMULATION_OUTPUT_FILE_NAME
+    if compress:
+        save_compressed_waveform(
+            waveform_data=_open_output_chunks(simulation_outputs),
+            file_path=compressed_output_file_path,
+            shared_directory_path=simulation_directory_path.parent,
+        )
+        csv_output_file_path.unlink(missing_ok=True)
+        written_file_paths = [simulation_parameters_file_path, compressed_output_file_path]
+    else:
+        with open(csv_output_file_path, "w", newline="") as csv_file:
+            for i, chunk in enumerate(_open_output_chunks(simulation_outputs)):
+                chunk.to_csv(csv_file, index=False, header=i == 0)
+        compressed_output_file_path.unlink(missing_ok=True)
+        written_file_paths = [simulation_parameters_file_path, csv_output_file_path]
+
+    # Save a min/max pyramid next to the output so plots never have to draw every sample
+    if save_pyramid:
+        pyramid_file_path = simulation_directory_path / SIMULATION_OUTPUT_PYRAMID_FILE_NAME
+        save_waveform_pyramid(
+            pyramid=build_waveform_pyramid(_open_output_chunks(simulation_outputs)),
+            file_path=pyramid_file_path,
+        )
+        written_file_paths.append(pyramid_file_path)
+
+    if metrics is not None:
+        metrics.increment("output_bytes_written_total", sum(file_path.stat().st_size for file_path in written_file_paths))
+
+    # The start of a windowed transient is recorded, so results looking before it are refused later on
+    if isinstance(simulation_outputs, WaveformChunkSourceData):
+        transient_start_time = simulation_outputs.transient_start_time
+    else:
+        transient_start_time = simulation_outputs.attrs.get(TRANSIENT_START_TIME_ATTRS_KEY, 0.0)
+
+    return {
+        "run_name": run_name,
+        "swept_parameter": swept_parameter,
+        "index": index,
+        "parameters": simulation_parameters_data,
+        "transient_start_time": transient_start_time,
+    }
+
+
+def load_simulation_manifest(
+        output_directory_path: str | Path,
+) -> list[dict] | None:
+    if isinstance(output_directory_path, str):
+        output_directory_path = Path(output_directory_path)
+
+    manifest_file_path = output_directory_path / SIMULATION_MANIFEST_FILE_NAME
+    if not manifest_file_path.exists():
+        return None
+
+    with open(manifest_file_path, "r") as json_file:
+        manifest_data = json.load(json_file)
+
+    return manifest_data["entries"]
+
+
+def update_simulation_manifest(
+        output_directory_path: str | Path,
+        manifest_entries: list[dict],
+) -> None:
+    if isinstance(output_directory_path, str):
+        output_directory_path = Path(output_directory_path)
 
-                # Save the used parameters as json
-                simulation_parameters_file_path = simulation_directory_path / SIMULATION_PARAMETERS_FILE_NAME
-                simulation_parameters_data = dataclasses.asdict(used_parameters)
-                with open(str(simulation_parameters_file_path), "w") as json_file:
-                    json.dump(simulation_parameters_data, json_file, indent=4)
+    # Entries of sweeps that were not re-saved are kept, while re-saved sweeps are replaced entirely
+    updated_sweeps = {
+        (manifest_entry["run_name"], manifest_entry["swept_parameter"]) for manifest_entry in manifest_entries
+    }
+    existing_entries = load_simulation_manifest(output_directory_path) or []
+    entries = [
+        manifest_entry for manifest_entry in existing_entries
+        if (manifest_entry["run_name"], manifest_entry["swept_parameter"]) not in updated_sweeps
+    ] + manifest_entries
 
-                # Save the simulation output as csv
-                simulation_output_file_path = simulation_directory_path / SIMULATION_OUTPUT_FILE_NAME
-                simulation_outputs.to_csv(simulation_output_file_path, index=False)
+    manifest_file_path = output_directory_path / SIMULATION_MANIFEST_FILE_NAME
+    with open(manifest_file_path, "w") as json_file:
+        json.dump({"entries": entries}, json_file)
 
 
 def load_simulation_outputs(
@@ -291,9 +725,12 @@ def load_simulation_outputs(
                 continue
             per_run_outputs[run_name.name][swept_parameter.name] = []
 
-            for simulation_directory in sorted(swept_parameter.iterdir(), key=lambda x: int(x.name)):
-                if not simulation_directory.is_dir():
-                    continue
+            # Only the numbered point directories, not the time bases shared between them
+            simulation_directories = [
+                simulation_directory for simulation_directory in swept_parameter.iterdir()
+                if simulation_directory.is_dir() and simulation_directory.name.isdigit()
+            ]
+            for simulation_directory in sorted(simulation_directories, key=lambda x: int(x.name)):
 
                 # Load the simulation parameters
                 simulation_parameters_file_path = simulation_directory / SIMULATION_PARAMETERS_FILE_NAME
@@ -302,14 +739,44 @@ def load_simulation_outputs(
                 used_parameters = parameters_type(**simulation_parameters_data)
 
                 # Load the simulation outputs
-                simulation_output_file_path = simulation_directory / SIMULATION_OUTPUT_FILE_NAME
-                simulation_outputs = pd.read_csv(simulation_output_file_path)
+                simulation_outputs = load_simulation_point_output(simulation_directory)
 
                 per_run_outputs[run_name.name][swept_parameter.name].append((used_parameters, simulation_outputs))
 
     return per_run_outputs
 
 
+def load_simulation_point_output(
+        simulation_directory_path: str | Path,
+) -> pd.DataFrame:
+    if isinstance(simulation_directory_path, str):
+        simulation_directory_path = Path(simulation_directory_path)
+
+    # Outputs saved before compression was added are still csv
+    compressed_output_file_path = simulation_directory_path / SIMULATION_COMPRESSED_OUTPUT_FILE_NAME
+    if compressed_output_file_path.exists():
+        return load_compressed_waveform(compressed_output_file_path)
+
+    return pd.read_csv(simulation_directory_path / SIMULATION_OUTPUT_FILE_NAME)
+
+
+def iter_simulation_point_output_chunks(
+        simulation_directory_path: str | Path,
+        chunk_size: int = DEFAULT_WAVEFORM_CHUNK_SIZE,
+) -> typing.Iterator[pd.DataFrame]:
+    # Streaming counterpart of load_simulation_point_output, for outputs larger than memory
+    if isinstance(simulation_directory_path, str):
+        simulation_directory_path = Path(simulation_directory_path)
+
+    compressed_output_file_path = simulation_directory_path / SIMULATION_COMPRESSED_OUTPUT_FILE_NAME
+    if compressed_output_file_path.exists():
+        yield from iter_compressed_waveform_chunks(compressed_output_file_path, chunk_size=chunk_size)
+        return
+
+    with pd.read_csv(simulation_directory_path / SIMULATION_OUTPUT_FILE_NAME, chunksize=chunk_size) as chunks:
+        yield from chunks
+
+
 def load_double_pulse_test_simulation_outputs(
         output_directory_path: str | Path,
 ) -> dict[str, dict[str, list[tuple[DoublePulseTestParameters, pd.DataFrame]]]]:
@@ -322,6 +789,7 @@ def load_double_pulse_test_simulation_outputs(
 def save_simulation_results(
         per_run_results: dict[str, dict[str, pd.DataFrame]],
         output_directory_path: str | Path,
+        simulation_output_directory_path: str | Path | None = None,
 ) -> None:
     if isinstance(output_directory_path, str):
         output_directory_path = Path(output_directory_path)
@@ -337,6 +805,29 @@ def save_simulation_results(
             parameter_sweep_results_file_path = swept_parameter_directory_path / PARAMETER_SWEEP_FILE_NAME
             parameter_sweep_results.to_csv(str(parameter_sweep_results_file_path), index=False)
 
+            # Record which (point hash, result key) pairs have been computed, so they are not recomputed later
+            computed_results = parameter_sweep_results.attrs.get(COMPUTED_RESULTS_ATTRS_KEY)
+            if computed_results is not None:
+                computed_results_file_path = swept_parameter_directory_path / COMPUTED_RESULTS_FILE_NAME
+                computed_results_data = [
+                    [point_hash, result_key]
+                    for point_hash, result_keys in computed_results.items()
+                    for result_key in result_keys
+                ]
+                with open(computed_results_file_path, "w") as json_file:
+                    json.dump(computed_results_data, json_file)
+
+    # Index every point and result in one database, so cross-run questions do not have to walk the tree
+    from .database import RESULTS_DATABASE_FILE_NAME, write_results_database
+
+    write_results_database(
+        database_file_path=output_directory_path / RESULTS_DATABASE_FILE_NAME,
+        per_run_results=per_run_results,
+        result_keys=_get_result_keys(per_run_results),
+        simulation_output_directory_path=simulation_output_directory_path,
+        per_run_point_indices=_get_point_indices(per_run_results, simulation_output_directory_path),
+    )
+
 
 def load_simulation_results(
         output_directory_path: str | Path,
@@ -356,8 +847,25 @@ def load_simulation_results(
                 continue
 
             parameter_sweep_results_file_path = swept_parameter / PARAMETER_SWEEP_FILE_NAME
-            if parameter_sweep_results_file_path.exists():
-                results_data[run_name.name][swept_parameter.name] = pd.read_csv(parameter_sweep_results_file_path)
+            if not parameter_sweep_results_file_path.exists():
+                continue
+
+            parameter_sweep_results = pd.read_csv(
+                parameter_sweep_results_file_path,
+                dtype={POINT_HASH_FIELD_NAME: str},
+            )
+
+            computed_results_file_path = swept_parameter / COMPUTED_RESULTS_FILE_NAME
+            if computed_results_file_path.exists():
+                with open(computed_results_file_path, "r") as json_file:
+                    computed_results_data = json.load(json_file)
+
+                computed_results = {}
+                for point_hash, result_key in computed_results_data:
+                    computed_results.setdefault(point_hash, []).append(result_key)
+                parameter_sweep_results.attrs[COMPUTED_RESULTS_ATTRS_KEY] = computed_results
+
+            results_data[run_name.name][swept_parameter.name] = parameter_sweep_results
 
     return results_data
 
@@ -369,56 +877,129 @@ def simulate(
         input_parameters_collection: list[ParametersType],
         cleanup: bool = True,
         ltspice_executable_file_path: str = DEFAULT_LTSPICE_EXECUTABLE_FILE_PATH,
+        execution_policy: ExecutionPolicyData | None = None,
+        save_mapped_traces: bool = False,
+        windowed_results: list[str] | None = None,
+        selected_results: list[str] | None = None,
+        metrics: "SimulationMetrics | None" = None,
         verbose: bool = False,
-) -> list[tuple[DoublePulseTestParameters, pd.DataFrame]]:
+) -> list[tuple[DoublePulseTestParameters, pd.DataFrame | dict[str, float]]]:
+    # Only the mapped traces are written to the .raw file, and with windowed results only from just before the
+    # first window they are computed from, which shrinks the file and its parsing by the traces and time left out.
+    # With selected results, each point's results are computed while its .raw file is streamed in chunks and are
+    # returned instead of its waveform, so no waveform is ever held whole
     if isinstance(source_file_path, str):
         source_file_path = Path(source_file_path)
+    if execution_policy is None:
+        execution_policy = ExecutionPolicyData()
 
     base_directory = source_file_path.parent
 
     results = []
 
     num_parameter_sets = len(input_parameters_collection)
+    # Netlists are simulated as they are, without LTspice translating a schematic for every point
+    if is_netlist_file_path(source_file_path):
+        workspace_simulation_file_suffix = source_file_path.suffix
+        modify_params = modify_ltspice_netlist_params
+    else:
+        workspace_simulation_file_suffix = ".asc"
+        modify_params = modify_ltspice_params
+
     for i, input_parameters in enumerate(input_parameters_collection):
         workspace_simulation_file_name = _generate_simulation_file_name()
-        workspace_simulation_file_path = base_directory / f"{workspace_simulation_file_name}.asc"
+        workspace_simulation_file_path = base_directory / f"{workspace_simulation_file_name}{workspace_simulation_file_suffix}"
 
         # Modify the SPICE file's parameters and save to a new file within the workspace__
-        modify_ltspice_params(
+        modify_params(
             source_file_path=str(source_file_path),
             destination_file_path=str(workspace_simulation_file_path),
             params_to_modify=dataclass_to_dict(input_parameters),
         )
 
+        if save_mapped_traces:
+            add_ltspice_directives(workspace_simulation_file_path, [get_save_directive(output_field_mapping)])
+        transient_start_time = 0.0
+        if windowed_results:
+            transient_start_time = get_analysis_start_time(simulation_type, input_parameters, windowed_results) or 0.0
+            if transient_start_time:
+                set_ltspice_transient_start(workspace_simulation_file_path, transient_start_time)
+
         # Execute the simulation
         verbose_print(verbose, f"\t\t - {i + 1} / {num_parameter_sets} Executing {workspace_simulation_file_path.name}...")
         start_time = time.time()
-        execute_ltspice(
-            executable_file_path=ltspice_executable_file_path,
-            simulation_file_path=str(workspace_simulation_file_path),
-        )
+        try:
+            execute_ltspice(
+                executable_file_path=ltspice_executable_file_path,
+                simulation_file_path=str(workspace_simulation_file_path),
+                execution_policy=execution_policy,
+                end_time=input_parameters.duration,
+            )
+        except SimulationExecutionError as error:
+            if metrics is not None:
+                metrics.increment("points_failed_total")
+            if cleanup:
+                delete_files_with_same_name(
+                    directory=base_directory,
+                    file_name=workspace_simulation_file_path.stem,
+                )
+
+            # A failed point only aborts the sweep when the policy does not allow skipping it
+            if not execution_policy.skip_failed:
+                raise
+            verbose_print(verbose, f"\t\t - {i + 1} / {num_parameter_sets} Skipped: {error}")
+            continue
+
         duration = time.time() - start_time
         verbose_print(verbose, f"\t\t - {i + 1} / {num_parameter_sets} Executed in {duration: .2f} seconds")
 
         # Read and standardise the raw waveform data
         workspace_raw_waveform_file_path = get_raw_file_path(workspace_simulation_file_path)
-        # TODO: I HATE coding, why does this work
-        # if not workspace_raw_waveform_file_path.exists():
-        #     execute_ltspice(
-        #         executable_file_path=ltspice_executable_file_path,
-        #         simulation_file_path=str(workspace_simulation_file_path),
-        #     )
+        parse_start_time = time.time()
 
-        if not workspace_raw_waveform_file_path.exists():
-            raise RuntimeError(f"An error occurred while trying to execute: {source_file_path}")
-
-        waveform_data = read_ltspice_output(
+        # The header is parsed once, for both the read plan and the reader
+        raw_header = read_ltspice_raw_header(workspace_raw_waveform_file_path)
+        read_plan = get_waveform_read_plan(
+            source_file_path=source_file_path,
             simulation_type=simulation_type,
-            raw_waveform_file_path=str(workspace_raw_waveform_file_path),
             field_mapping=output_field_mapping,
+            raw_waveform_file_path=workspace_raw_waveform_file_path,
+            header=raw_header,
         )
 
-        results.append((input_parameters, waveform_data))
+        if selected_results is not None:
+            _check_transient_start_time(simulation_type, input_parameters, selected_results, transient_start_time)
+            point_outputs = analyse_waveform_chunks(
+                simulation_type=simulation_type,
+                chunks=iter_ltspice_output_chunks(
+                    simulation_type=simulation_type,
+                    raw_waveform_file_path=str(workspace_raw_waveform_file_path),
+                    field_mapping=output_field_mapping,
+                    read_plan=read_plan,
+                    header=raw_header,
+                ),
+                input_parameters=input_parameters,
+                selected_results=selected_results,
+            )
+        else:
+            point_outputs = read_ltspice_output(
+                simulation_type=simulation_type,
+                raw_waveform_file_path=str(workspace_raw_waveform_file_path),
+                field_mapping=output_field_mapping,
+                read_plan=read_plan,
+                header=raw_header,
+            )
+            # The waveform holds nothing before the windowed transient's start, which is kept with it
+            if transient_start_time:
+                point_outputs.attrs[TRANSIENT_START_TIME_ATTRS_KEY] = transient_start_time
+
+        if metrics is not None:
+            metrics.observe("ltspice_runtime_seconds", duration)
+            metrics.observe("parse_seconds", time.time() - parse_start_time)
+            metrics.increment("raw_bytes_total", workspace_raw_waveform_file_path.stat().st_size)
+            metrics.increment("points_completed_total")
+
+        results.append((input_parameters, point_outputs))
 
         # CLean up if needed
         if cleanup:
@@ -436,6 +1017,7 @@ def simulate_double_pulse_test(
         input_parameters_collection: list[DoublePulseTestParameters],
         cleanup: bool = True,
         ltspice_executable_file_path: str = DEFAULT_LTSPICE_EXECUTABLE_FILE_PATH,
+        execution_policy: ExecutionPolicyData | None = None,
         verbose: bool = False,
 ) -> list[tuple[DoublePulseTestParameters, pd.DataFrame]]:
     return simulate(
@@ -445,8 +1027,8 @@ def simulate_double_pulse_test(
         input_parameters_collection=input_parameters_collection,
         cleanup=cleanup,
         ltspice_executable_file_path=ltspice_executable_file_path,
+        execution_policy=execution_policy,
         verbose=verbose,
-
     )
 
 
@@ -461,22 +1043,25 @@ def simulate_swept(
         step: float,
         cleanup: bool = True,
         ltspice_executable_file_path: str = DEFAULT_LTSPICE_EXECUTABLE_FILE_PATH,
+        execution_policy: ExecutionPolicyData | None = None,
         verbose: bool = False,
 ) -> list[tuple[ParametersType, pd.DataFrame]]:
     return simulate(
         simulation_type=simulation_type,
         source_file_path=source_file_path,
         output_field_mapping=output_field_mapping,
-        input_parameters_collection=_get_swept_parameters(
+        input_parameters_collection=get_swept_parameters(
             default_parameters=default_parameters,
-            parameters_type=get_parameters_type(simulation_type),
             swept_parameter=swept_parameter,
-            start_value=start_value,
-            end_value=end_value,
-            step=step,
+            swept_parameter_data=SweptParameterData(
+                start=start_value,
+                end=end_value,
+                step=step,
+            ),
         ),
         cleanup=cleanup,
         ltspice_executable_file_path=ltspice_executable_file_path,
+        execution_policy=execution_policy,
         verbose=verbose,
     )
 
@@ -487,20 +1072,313 @@ def run_buck_converter_simulations(
     pass
 
 
-def _get_swept_parameters(
-        default_parameters: ParametersType,
-        parameters_type: type[ParametersType],
-        swept_parameter: str,
-        start_value: float,
-        end_value: float,
-        step: float,
-) -> list[DoublePulseTestParameters]:
-    parameters_collection = []
-    for value in np.arange(start_value, end_value, step):
-        parameters_dict = dataclasses.asdict(default_parameters)
-        parameters_dict[swept_parameter] = value
-        parameters_collection.append(parameters_type(**parameters_dict))
-    return parameters_collection
+def _simulate_points(
+        simulation_type: SimulationType,
+        points: list[SimulationPointData],
+        output_field_mapping: OutputFieldsType,
+        ltspice_executable_file_path: str,
+        execution_policy: ExecutionPolicyData | None,
+        runtime_history: "RuntimeHistory | None",
+        save_mapped_traces: bool,
+        windowed_results: list[str] | None,
+        selected_results: list[str] | None,
+        metrics: "SimulationMetrics | None",
+        verbose: bool,
+) -> dict[tuple[Path, str], pd.DataFrame | dict[str, float]]:
+    per_point_outputs = {}
+
+    for i, point in enumerate(points):
+        verbose_print(verbose, f"{i + 1} / {len(points)}: {point.source_file_path.name} {point.point_hash}")
+        if metrics is not None:
+            metrics.set("points_pending", len(points) - i)
+            metrics.set("workers_busy", 1)
+
+        start_time = time.time()
+        parameter_outputs = simulate(
+            simulation_type=simulation_type,
+            source_file_path=point.source_file_path,
+            output_field_mapping=output_field_mapping,
+            input_parameters_collection=[point.parameters],
+            cleanup=True,
+            ltspice_executable_file_path=ltspice_executable_file_path,
+            execution_policy=execution_policy,
+            save_mapped_traces=save_mapped_traces,
+            windowed_results=windowed_results,
+            selected_results=selected_results,
+            metrics=metrics,
+            verbose=verbose,
+        )
+        runtime = time.time() - start_time
+        if metrics is not None:
+            metrics.set("points_pending", len(points) - i - 1)
+            metrics.set("workers_busy", 0)
+        if not parameter_outputs:
+            continue
+
+        if metrics is not None:
+            metrics.observe("point_seconds", runtime)
+        if runtime_history is not None:
+            runtime_history.record(point.source_file_path, point.parameters, runtime)
+
+        [(_, simulation_outputs)] = parameter_outputs
+        per_point_outputs[(point.source_file_path, point.point_hash)] = simulation_outputs
+
+    return per_point_outputs
+
+
+def _simulate_points_in_parallel(
+        simulation_type: SimulationType,
+        points: list[SimulationPointData],
+        output_field_mapping: OutputFieldsType,
+        ltspice_executable_file_path: str,
+        execution_policy: ExecutionPolicyData | None,
+        max_workers: int,
+        runtime_history: "RuntimeHistory | None",
+        save_mapped_traces: bool,
+        windowed_results: list[str] | None,
+        selected_results: list[str] | None,
+        metrics: "SimulationMetrics | None",
+        governor: "ConcurrencyGovernor | None",
+        verbose: bool,
+) -> dict[tuple[Path, str], pd.DataFrame | dict[str, float]]:
+    # Each worker simulates one point and hands its waveform back through the transport, so only a small
+    # descriptor crosses the process boundary and the parent's DataFrame is a view of the worker's block. Selected
+    # results are small enough to be returned as they are. The points are submitted in order, all at once, or with
+    # a governor only while its limit allows
+    import concurrent.futures
+    from .transport import WaveformDescriptorData, WaveformTransport, import_waveform
+
+    per_point_outputs = {}
+    pending_points = collections.deque(points)
+    futures = {}
+    num_finished_points = 0
+    # The workers report their pids with their results, as a fork server may start them outside this process's
+    # tree. Until one has, the governor measures the children of this process
+    worker_pids = set()
+
+    with WaveformTransport() as transport, concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        try:
+            while pending_points or futures:
+                while pending_points and (governor is None or governor.can_dispatch(len(futures))):
+                    point = pending_points.popleft()
+                    futures[executor.submit(
+                        _simulate_point_task,
+                        simulation_type,
+                        point.source_file_path,
+                        output_field_mapping,
+                        point.parameters,
+                        ltspice_executable_file_path,
+                        execution_policy,
+                        transport.directory_path,
+                        transport.fallback_directory_path,
+                        save_mapped_traces,
+                        windowed_results,
+                        selected_results,
+                    )] = point
+
+                if metrics is not None:
+                    metrics.set("points_pending", len(pending_points) + len(futures))
+                    metrics.set("workers_busy", min(max_workers, len(futures)))
+
+                finished_futures, _ = concurrent.futures.wait(
+                    futures,
+                    timeout=governor.sample_interval if governor is not None else None,
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+
+                for future in finished_futures:
+                    point = futures.pop(future)
+                    num_finished_points += 1
+                    point_outputs, runtime, point_metrics, worker_pid = future.result()
+                    worker_pids.add(worker_pid)
+
+                    # The worker's counters and histograms are recorded in its own process and merged here
+                    if metrics is not None:
+                        metrics.merge(point_metrics)
+
+                    if point_outputs is None:
+                        verbose_print(verbose, f"{num_finished_points} / {len(points)}: skipped failed point {point.point_hash}")
+                        continue
+
+                    if metrics is not None:
+                        metrics.observe("point_seconds", runtime)
+                    if runtime_history is not None:
+                        runtime_history.record(point.source_file_path, point.parameters, runtime)
+
+                    if isinstance(point_outputs, WaveformDescriptorData):
+                        point_outputs = import_waveform(point_outputs)
+                    per_point_outputs[(point.source_file_path, point.point_hash)] = point_outputs
+                    verbose_print(
+                        verbose,
+                        f"{num_finished_points} / {len(points)}: {point.source_file_path.name} {point.point_hash} in {runtime:.2f} seconds",
+                    )
+
+                if governor is not None and governor.update(len(futures), sorted(worker_pids) or None):
+                    verbose_print(verbose, f"Concurrency {governor.format_status()}")
+                if governor is not None and metrics is not None:
+                    metrics.set("concurrency_limit", governor.limit)
+                    if governor.last_sample is not None:
+                        metrics.set("available_memory_bytes", governor.last_sample.available_memory)
+        except BaseException:
+            executor.shutdown(cancel_futures=True)
+            raise
+
+    if metrics is not None:
+        metrics.set("points_pending", 0)
+        metrics.set("workers_busy", 0)
+
+    return per_point_outputs
+
+
+def _simulate_point_task(
+        simulation_type: SimulationType,
+        source_file_path: Path,
+        output_field_mapping: OutputFieldsType,
+        parameters: ParametersType,
+        ltspice_executable_file_path: str,
+        execution_policy: ExecutionPolicyData | None,
+        transport_directory_path: Path,
+        transport_fallback_directory_path: Path | None,
+        save_mapped_traces: bool = False,
+        windowed_results: list[str] | None = None,
+        selected_results: list[str] | None = None,
+) -> tuple["WaveformDescriptorData | dict[str, float] | None", float, "SimulationMetrics", int]:
+    from .metrics import SimulationMetrics
+    from .transport import export_waveform
+
+    point_metrics = SimulationMetrics()
+    start_time = time.time()
+    parameter_outputs = simulate(
+        simulation_type=simulation_type,
+        source_file_path=source_file_path,
+        output_field_mapping=output_field_mapping,
+        input_parameters_collection=[parameters],
+        cleanup=True,
+        ltspice_executable_file_path=ltspice_executable_file_path,
+        execution_policy=execution_policy,
+        save_mapped_traces=save_mapped_traces,
+        windowed_results=windowed_results,
+        selected_results=selected_results,
+        metrics=point_metrics,
+    )
+    runtime = time.time() - start_time
+
+    # A failed point skipped by the execution policy produces no output
+    if not parameter_outputs:
+        return None, runtime, point_metrics, os.getpid()
+
+    [(_, simulation_outputs)] = parameter_outputs
+    if selected_results is not None:
+        return simulation_outputs, runtime, point_metrics, os.getpid()
+
+    descriptor = export_waveform(simulation_outputs, transport_directory_path, transport_fallback_directory_path)
+    return descriptor, runtime, point_metrics, os.getpid()
+
+
+def _open_output_chunks(simulation_outputs: pd.DataFrame | WaveformChunkSourceData) -> typing.Iterable[pd.DataFrame]:
+    if isinstance(simulation_outputs, WaveformChunkSourceData):
+        return simulation_outputs.open_chunks()
+    return [simulation_outputs]
+
+
+def _check_transient_start_time(
+        simulation_type: SimulationType,
+        input_parameters: ParametersType,
+        result_keys: list[str],
+        transient_start_time: float,
+) -> None:
+    # A waveform simulated with a windowed transient holds nothing before its start, so a result looking earlier
+    # than it, or with no known window, would silently be computed from a truncated waveform
+    if not transient_start_time:
+        return
+
+    for result_key in result_keys:
+        # The sample count holds for whatever the waveform holds
+        if result_key == NUM_SAMPLES_RESULT_KEY:
+            continue
+        analysis_start_time = get_analysis_start_time(simulation_type, input_parameters, [result_key])
+        if analysis_start_time is None or analysis_start_time < transient_start_time:
+            raise ValueError(
+                f"The result '{result_key}' needs the waveform from {analysis_start_time or 0.0} seconds, but its "
+                f"transient was only simulated from {transient_start_time} seconds. Simulate the point again "
+                f"without the windowed transient, or with '{result_key}' among its results"
+            )
+
+
+def _get_job_source_file_path(job: SimulationJobData) -> Path:
+    # Different spellings of the same schematic path must share their points
+    return Path(job.source_file_path).resolve()
+
+
+def _get_result_keys(per_run_results: dict[str, dict[str, pd.DataFrame]]) -> list[str]:
+    # Result columns are the known result getters plus anything recorded as computed
+    result_keys = {
+        result_key
+        for result_getters in simulation_type_result_getters.values()
+        for result_key in result_getters
+    }
+    for per_swept_parameter_results in per_run_results.values():
+        for parameter_sweep_results in per_swept_parameter_results.values():
+            for computed_result_keys in parameter_sweep_results.attrs.get(COMPUTED_RESULTS_ATTRS_KEY, {}).values():
+                result_keys.update(computed_result_keys)
+
+    return sorted(result_keys)
+
+
+def _get_point_indices(
+        per_run_results: dict[str, dict[str, pd.DataFrame]],
+        simulation_output_directory_path: str | Path | None,
+) -> dict[str, dict[str, list[int]]] | None:
+    # The index of each results row's output directory, from the manifest entry with its point hash. The rows of
+    # a sweep with failed points skip their indices, so their positions can not be used. Points repeated within a
+    # sweep take their indices in order
+    manifest_entries = None
+    if simulation_output_directory_path is not None:
+        manifest_entries = load_simulation_manifest(simulation_output_directory_path)
+    if manifest_entries is None:
+        return None
+
+    per_point_indices = {}
+    for manifest_entry in sorted(manifest_entries, key=lambda manifest_entry: manifest_entry["index"]):
+        point_hash = dict_hash(manifest_entry["parameters"])
+        point_key = (manifest_entry["run_name"], manifest_entry["swept_parameter"], point_hash)
+        per_point_indices.setdefault(point_key, collections.deque()).append(int(manifest_entry["index"]))
+
+    per_run_point_indices = {}
+    for run_name, per_swept_parameter_results in per_run_results.items():
+        for swept_parameter, parameter_sweep_results in per_swept_parameter_results.items():
+            if POINT_HASH_FIELD_NAME not in parameter_sweep_results.columns:
+                continue
+
+            point_indices = []
+            for point_hash in parameter_sweep_results[POINT_HASH_FIELD_NAME]:
+                indices = per_point_indices.get((run_name, swept_parameter, point_hash))
+                if not indices:
+                    break
+                point_indices.append(indices.popleft())
+            else:
+                per_run_point_indices.setdefault(run_name, {})[swept_parameter] = point_indices
+
+    return per_run_point_indices
+
+
+def _get_previously_computed_results(
+        parameter_results: pd.DataFrame | None,
+) -> tuple[dict[str, dict], dict[str, list[str]]]:
+    if parameter_results is None or POINT_HASH_FIELD_NAME not in parameter_results.columns:
+        return {}, {}
+
+    computed_results = parameter_results.attrs.get(COMPUTED_RESULTS_ATTRS_KEY, {})
+    rows = {
+        row[POINT_HASH_FIELD_NAME]: row for row in parameter_results.to_dict(orient="records")
+    }
+
+    # Pairs without a matching results row can not be carried over
+    computed_results = {
+        point_hash: result_keys for point_hash, result_keys in computed_results.items() if point_hash in rows
+    }
+
+    return rows, computed_results
 
 
 def _generate_simulation_file_name(prefix: str | None = None) -> str:
@@ -529,6 +1407,27 @@ def _parameters_from_dict(
     return parameters
 
 
+def _execution_policy_from_dict(
+        execution_policy_data: dict[str, typing.Any],
+) -> ExecutionPolicyData:
+    assert isinstance(execution_policy_data, dict)
+
+    timeout = execution_policy_data.get("timeout")
+    retry_failure_types = execution_policy_data.get("retry_failures")
+
+    return ExecutionPolicyData(
+        timeout=float(timeout) if timeout is not None else None,
+        max_retries=int(execution_policy_data.get("max_retries", 0)),
+        backoff=float(execution_policy_data.get("backoff", 1.0)),
+        backoff_factor=float(execution_policy_data.get("backoff_factor", 2.0)),
+        retry_failure_types=(
+            tuple(SimulationFailureType(failure_type) for failure_type in retry_failure_types)
+            if retry_failure_types is not None else DEFAULT_RETRY_FAILURE_TYPES
+        ),
+        skip_failed=bool(execution_policy_data.get("skip_failed", False)),
+    )
+
+
 def _run_data_from_dict(
         run_data: dict[str, typing.Any],
 ) -> RunData:
@@ -543,13 +1442,73 @@ def _run_data_from_dict(
     if parameters_to_sweep_data is not None:
         assert isinstance(parameters_to_sweep_data, dict)
         parameters_to_sweep = {
-            swept_parameter: SweptParameterData(
-                **{key: float(value) for key, value in swept_parameter_data.items()}
-            )
+            swept_parameter: _swept_parameter_data_from_dict(swept_parameter_data)
             for swept_parameter, swept_parameter_data in parameters_to_sweep_data.items()
         }
 
+    monte_carlo_data = run_data.get("monte_carlo")
+    monte_carlo = None
+    if monte_carlo_data is not None:
+        if parameters_to_sweep is not None:
+            raise ValueError("A run either sweeps its parameters or draws them, not both")
+        monte_carlo = _monte_carlo_data_from_dict(monte_carlo_data)
+
     return RunData(
         source_file_path=source_file_path,
         parameters_to_sweep=parameters_to_sweep,
+        monte_carlo=monte_carlo,
+    )
+
+
+def _swept_parameter_data_from_dict(
+        swept_parameter_data: dict[str, typing.Any],
+) -> SweptParameterData:
+    assert isinstance(swept_parameter_data, dict)
+
+    values = swept_parameter_data.get("values")
+    num_points = swept_parameter_data.get("num_points")
+
+    return SweptParameterData(
+        **{
+            key: float(swept_parameter_data[key])
+            for key in ("start", "end", "step") if swept_parameter_data.get(key) is not None
+        },
+        mode=SweepMode(swept_parameter_data.get("mode", SweepMode.STEP)),
+        num_points=int(num_points) if num_points is not None else None,
+        values=tuple(float(value) for value in values) if values is not None else None,
+    )
+
+
+def _monte_carlo_data_from_dict(
+        monte_carlo_data: dict[str, typing.Any],
+) -> MonteCarloData:
+    assert isinstance(monte_carlo_data, dict)
+
+    distributions_data = monte_carlo_data["parameters"]
+    assert isinstance(distributions_data, dict)
+
+    seed = monte_carlo_data.get("seed")
+
+    return MonteCarloData(
+        num_samples=int(monte_carlo_data["num_samples"]),
+        distributions={
+            parameter: _distribution_data_from_dict(distribution_data)
+            for parameter, distribution_data in distributions_data.items()
+        },
+        seed=int(seed) if seed is not None else None,
+        batch_size=int(monte_carlo_data.get("batch_size", DEFAULT_MONTE_CARLO_BATCH_SIZE)),
+    )
+
+
+def _distribution_data_from_dict(
+        distribution_data: dict[str, typing.Any],
+) -> DistributionData:
+    assert isinstance(distribution_data, dict)
+
+    return DistributionData(
+        type=DistributionType(distribution_data["distribution"]),
+        **{
+            key: float(distribution_data[key])
+            for key in ("mean", "std", "low", "high", "tolerance") if distribution_data.get(key) is not None
+        },
     )
@@ -8,17 +8,21 @@
 # --------------------------------------------------
 
 import os
+import re
 import enum
+import uuid
+import typing
+import shutil
+import hashlib
+import functools
 from dataclasses import dataclass
 
-import ltspice
-import subprocess
+import numpy as np
 import pandas as pd
 import dataclasses
 from pathlib import Path
 
-from prompt_toolkit.lexers import SimpleLexer
-
+from .execution import *
 from .fields import *
 
 
@@ -34,14 +38,53 @@ __all__ = [
     "DoublePulseTestOutputFields",
     "BuckConverterOutputFields",
     "OutputFieldsType",
+    "NETLIST_FILE_SUFFIXES",
     "modify_ltspice_params",
+    "modify_ltspice_netlist_params",
+    "compile_ltspice_netlist",
+    "is_netlist_file_path",
+    "add_ltspice_directives",
+    "get_save_directive",
+    "set_ltspice_transient_start",
     "execute_ltspice",
     "read_ltspice_output",
+    "DEFAULT_WAVEFORM_CHUNK_SIZE",
+    "iter_ltspice_output_chunks",
+    "RawFileHeaderData",
+    "WaveformReadPlanData",
+    "read_ltspice_raw_header",
+    "get_ltspice_raw_end_time",
+    "resolve_output_column_mapping",
+    "compile_waveform_read_plan",
+    "get_waveform_read_plan",
     "get_raw_file_path",
+    "get_log_file_path",
     "get_parameters_type",
     "get_output_fields_type",
 ]
 
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+RAW_HEADER_MAX_SIZE = int(1e6)
+
+# Stores the relative shortfall of a .raw file's last time from the .tran stop time that still counts as complete
+RAW_END_TIME_TOLERANCE = 1e-6
+
+# Stores the number of rows a waveform is streamed in when it is analysed in chunks
+DEFAULT_WAVEFORM_CHUNK_SIZE = 1 << 18
+
+# Stores the suffixes of files that are simulated as netlists rather than as schematics
+NETLIST_FILE_SUFFIXES = (".net", ".cir", ".sp")
+
+# Matches the start of each "name=" assignment of a .param directive, but not a "==" comparison
+NETLIST_PARAM_ASSIGNMENT_PATTERN = re.compile(r"([A-Za-z_]\w*)\s*=(?!=)")
+
+# Stores the .tran options that follow its positional times
+TRAN_OPTION_KEYWORDS = ("uic", "steady", "nodiscard", "startup", "step")
+
+
 # --------------------------------------------------
 #   Enums
 # --------------------------------------------------
@@ -176,6 +219,54 @@ class BuckConverterOutputFields:
 OutputFieldsType = DoublePulseTestOutputFields | BuckConverterOutputFields
 
 
+@dataclasses.dataclass(frozen=True)
+class RawFileHeaderData:
+    plot_name: str
+    flags: tuple[str, ...]
+    variable_names: tuple[str, ...]
+    num_points: int
+    # Stores the byte offset at which the waveform values start
+    data_offset: int
+    is_binary: bool
+
+    @property
+    def is_double(self) -> bool:
+        return "double" in self.flags
+
+    @property
+    def is_fast_access(self) -> bool:
+        # Fast access files store each trace contiguously instead of interleaving them per point
+        return "fastaccess" in self.flags
+
+    @property
+    def variable_dtypes(self) -> tuple[np.dtype, ...]:
+        # The time axis is always stored in double precision, the other traces only when flagged
+        trace_dtype = np.dtype(np.float64) if self.is_double else np.dtype(np.float32)
+        return (np.dtype(np.float64),) + (trace_dtype,) * (len(self.variable_names) - 1)
+
+    @property
+    def point_size(self) -> int:
+        return sum(dtype.itemsize for dtype in self.variable_dtypes)
+
+
+@dataclasses.dataclass(frozen=True)
+class WaveformReadPlanData:
+    simulation_type: SimulationType
+    standard_fields: tuple[str, ...]
+    # Stores the trace name, index and stored dtype each standard field is read from, or None for a ground node
+    source_names: tuple[str | None, ...]
+    source_indices: tuple[int | None, ...]
+    source_dtypes: tuple[str | None, ...]
+    # Stores the fields derived from the standard fields by the simulation type's auxiliary field calculator
+    auxiliary_fields: tuple[str, ...]
+    # Stores the traces of the .raw header the plan was compiled from, which a file must match to be read with it
+    variable_names: tuple[str, ...] = ()
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        return self.standard_fields + self.auxiliary_fields
+
+
 # --------------------------------------------------
 #   Functions
 # --------------------------------------------------
@@ -191,7 +282,7 @@ def modify_ltspice_params(
 
     # Find the line containing the parameters
     for i, line in enumerate(lines):
-        if line.strip().startswith("TEXT") and "!.param" in line:
+        if _is_schematic_param_line(line):
             metadata_segment, params_segment = line.split("!", maxsplit=1)
             param_line = f"{metadata_segment}!"
             param_segments = params_segment.split(r'\n')
@@ -208,16 +299,192 @@ def modify_ltspice_params(
         file.write("".join(lines))
 
 
+def modify_ltspice_netlist_params(
+        source_file_path: str,
+        destination_file_path: str,
+        params_to_modify: dict[str, float],
+) -> None:
+    # Netlist counterpart of modify_ltspice_params: every .param directive is its own line, which may hold several
+    # assignments. Only parameters that are already assigned are replaced, as with schematics. A netlist compiled
+    # from a schematic only has those replaced that modify_ltspice_params replaces in the schematic, so parameters
+    # the schematic derives with expressions, such as the pulse starts, stay expressions in both
+    schematic_file_path = _get_netlist_schematic_file_path(source_file_path)
+    if schematic_file_path is not None:
+        params_to_modify = _get_schematic_modified_params(schematic_file_path, params_to_modify)
+
+    text, encoding = _read_netlist_text(source_file_path)
+
+    lines = [_modify_netlist_param_line(line, params_to_modify) for line in text.splitlines(keepends=True)]
+
+    with open(destination_file_path, "w", encoding=encoding, newline="") as file:
+        file.write("".join(lines))
+
+
+def compile_ltspice_netlist(
+        schematic_file_path: str | Path,
+        executable_file_path: str,
+        execution_policy: ExecutionPolicyData | None = None,
+) -> Path:
+    # Translates the schematic into a netlist once per schematic content. The netlist is kept next to the schematic,
+    # so its relative library and include paths still resolve, and is reused until the schematic changes
+    schematic_file_path = Path(schematic_file_path)
+    if is_netlist_file_path(schematic_file_path):
+        return schematic_file_path
+
+    content_hash = _get_schematic_content_hash(schematic_file_path)
+    netlist_file_path = schematic_file_path.with_name(f"{schematic_file_path.stem}.{content_hash}.net")
+    if netlist_file_path.exists():
+        return netlist_file_path
+
+    if not os.path.exists(executable_file_path):
+        raise FileNotFoundError(executable_file_path)
+
+    # LTspice names the netlist after the schematic, so it is translated from a uniquely named copy, which lets
+    # concurrent runs compile the same schematic without overwriting each other's netlist
+    workspace_schematic_file_path = schematic_file_path.with_name(
+        f"{schematic_file_path.stem}.{content_hash}.{uuid.uuid4().hex[:8]}.asc"
+    )
+    workspace_netlist_file_path = workspace_schematic_file_path.with_suffix(".net")
+    shutil.copyfile(schematic_file_path, workspace_schematic_file_path)
+
+    try:
+        execution_result = execute_with_retries(
+            argv=[str(executable_file_path), "-netlist", str(workspace_schematic_file_path)],
+            output_file_path=workspace_netlist_file_path,
+            log_file_path=get_log_file_path(workspace_schematic_file_path),
+            execution_policy=execution_policy,
+        )
+        if not execution_result.succeeded:
+            raise SimulationExecutionError(
+                f"{execution_result.failure_type} while translating {schematic_file_path} into a netlist: "
+                f"{execution_result.failure_message}",
+                execution_result=execution_result,
+            )
+
+        os.replace(workspace_netlist_file_path, netlist_file_path)
+    finally:
+        for file_path in (
+                workspace_schematic_file_path,
+                workspace_netlist_file_path,
+                get_log_file_path(workspace_schematic_file_path),
+        ):
+            if file_path.exists():
+                file_path.unlink()
+
+    return netlist_file_path
+
+
+def is_netlist_file_path(file_path: str | Path) -> bool:
+    return Path(file_path).suffix.lower() in NETLIST_FILE_SUFFIXES
+
+
+def add_ltspice_directives(
+        simulation_file_path: str | Path,
+        directives: list[str],
+) -> None:
+    # Adds SPICE directives to a workspace schematic or netlist written by modify_ltspice_params or
+    # modify_ltspice_netlist_params
+    simulation_file_path = Path(simulation_file_path)
+    if not directives:
+        return
+
+    if is_netlist_file_path(simulation_file_path):
+        text, encoding = _read_netlist_text(simulation_file_path)
+        newline = "\r\n" if "\r\n" in text else "\n"
+        lines = text.splitlines(keepends=True)
+
+        # Anything after .end is ignored, so the directives go before it
+        end_index = next(
+            (i for i in range(len(lines) - 1, -1, -1) if lines[i].strip().lower() == ".end"),
+            len(lines),
+        )
+        if end_index == len(lines) and lines and not lines[-1].endswith(("\n", "\r")):
+            lines[-1] += newline
+        lines[end_index:end_index] = [f"{directive}{newline}" for directive in directives]
+
+        with open(simulation_file_path, "w", encoding=encoding, newline="") as file:
+            file.write("".join(lines))
+        return
+
+    # Schematics hold their directives in TEXT items, with the lines of one item separated by a literal \n
+    with open(simulation_file_path, "r", encoding="utf-8") as file:
+        text = file.read()
+    if text and not text.endswith("\n"):
+        text += "\n"
+    text += "TEXT 0 0 Left 2 !" + r"\n".join(directives) + "\n"
+
+    with open(simulation_file_path, "w", encoding="utf-8") as file:
+        file.write(text)
+
+
+def get_save_directive(field_mapping: OutputFieldsType) -> str:
+    # Every alternative trace name of every mapped field is saved, as only LTspice knows which of them exist. The
+    # time axis is always written
+    trace_names = []
+    for field in dataclasses.fields(field_mapping):
+        if field.name == TIME_FIELD_NAME:
+            continue
+        output_field = getattr(field_mapping, field.name)
+        trace_names.extend([output_field] if isinstance(output_field, str) else output_field)
+
+    return ".save " + " ".join(dict.fromkeys(trace_names))
+
+
+def set_ltspice_transient_start(
+        simulation_file_path: str | Path,
+        start_time: float,
+) -> None:
+    # Sets the time from which the .tran directive of a workspace schematic or netlist writes its output. The
+    # simulation itself still starts at zero
+    simulation_file_path = Path(simulation_file_path)
+
+    if is_netlist_file_path(simulation_file_path):
+        text, encoding = _read_netlist_text(simulation_file_path)
+        lines = [_modify_tran_segment(line, start_time) for line in text.splitlines(keepends=True)]
+    else:
+        encoding = "utf-8"
+        with open(simulation_file_path, "r", encoding=encoding) as file:
+            lines = file.readlines()
+        for i, line in enumerate(lines):
+            if line.strip().startswith("TEXT") and "!" in line:
+                metadata_segment, directives_segment = line.rstrip("\r\n").split("!", maxsplit=1)
+                lines[i] = f"{metadata_segment}!" + r"\n".join(
+                    _modify_tran_segment(segment, start_time) for segment in directives_segment.split(r"\n")
+                ) + "\n"
+
+    with open(simulation_file_path, "w", encoding=encoding, newline="") as file:
+        file.write("".join(lines))
+
+
 def execute_ltspice(
         executable_file_path: str,
         simulation_file_path: str,
-) -> None:
+        execution_policy: ExecutionPolicyData | None = None,
+        end_time: float | None = None,
+) -> ExecutionResultData:
+    # With the .tran stop time, an attempt whose .raw file ends before it, as LTspice leaves it when it aborts a
+    # transient without a failing exit code, is a failed attempt
     if not os.path.exists(executable_file_path):
         raise FileNotFoundError(executable_file_path)
     if not os.path.exists(simulation_file_path):
         raise FileNotFoundError(simulation_file_path)
 
-    subprocess.call(f'"{executable_file_path}" -Run -b "{simulation_file_path}"')
+    execution_result = execute_with_retries(
+        argv=[str(executable_file_path), "-Run", "-b", str(simulation_file_path)],
+        output_file_path=get_raw_file_path(simulation_file_path),
+        log_file_path=get_log_file_path(simulation_file_path),
+        execution_policy=execution_policy,
+        validate_output=functools.partial(_validate_raw_end_time, end_time=end_time) if end_time is not None else None,
+    )
+
+    if not execution_result.succeeded:
+        raise SimulationExecutionError(
+            f"{execution_result.failure_type} while executing {simulation_file_path} after "
+            f"{execution_result.attempts} attempt(s): {execution_result.failure_message}",
+            execution_result=execution_result,
+        )
+
+    return execution_result
 
 
 def get_raw_file_path(asc_file_path: str | Path) -> Path:
@@ -227,6 +494,13 @@ def get_raw_file_path(asc_file_path: str | Path) -> Path:
     return raw_file_path
 
 
+def get_log_file_path(asc_file_path: str | Path) -> Path:
+    if isinstance(asc_file_path, str):
+        asc_file_path = Path(asc_file_path)
+    log_file_path = asc_file_path.with_suffix(".log")
+    return log_file_path
+
+
 def get_parameters_type(simulation_type: SimulationType) -> type[ParametersType]:
     return _parameters_types[simulation_type.value]
 
@@ -235,81 +509,431 @@ def get_output_fields_type(simulation_type: SimulationType) -> type[OutputFields
     return _output_field_types[simulation_type.value]
 
 
-def _standardise_waveform_data(
-        simulation_type: SimulationType,
-        raw_waveform_data: pd.DataFrame,
-        field_mapping: OutputFieldsType,
-) -> pd.DataFrame:
-    standardised_data = _renamed_columns_waveform_data(
-        waveform_data=raw_waveform_data,
-        field_mapping=field_mapping,
+def read_ltspice_raw_header(file_path: str | Path) -> RawFileHeaderData:
+    with open(file_path, "rb") as file:
+        header_bytes = file.read(RAW_HEADER_MAX_SIZE)
+
+    # LTspice writes the header as UTF-16LE, while other tools write it as plain text
+    encoding = "utf-16-le" if header_bytes[1:2] == b"\x00" else "utf-8"
+
+    for data_marker, is_binary in (("Binary:\n", True), ("Values:\n", False)):
+        encoded_data_marker = data_marker.encode(encoding)
+        marker_offset = header_bytes.find(encoded_data_marker)
+        if marker_offset != -1 and (encoding == "utf-8" or marker_offset % 2 == 0):
+            break
+    else:
+        raise ValueError(f"Could not find the end of the header of {file_path}")
+
+    header_lines = header_bytes[:marker_offset].decode(encoding).splitlines()
+
+    header_values = {}
+    variable_names = []
+    variables_line_index = None
+    for i, line in enumerate(header_lines):
+        if variables_line_index is not None:
+            variable_segments = line.split()
+            if len(variable_segments) >= 2:
+                variable_names.append(variable_segments[1])
+        elif line.startswith("Variables:"):
+            variables_line_index = i
+        elif ":" in line:
+            key, value = line.split(":", maxsplit=1)
+            header_values[key.strip()] = value.strip()
+
+    return RawFileHeaderData(
+        plot_name=header_values.get("Plotname", ""),
+        flags=tuple(header_values.get("Flags", "").split()),
+        variable_names=tuple(variable_names),
+        num_points=int(header_values["No. Points"]),
+        data_offset=marker_offset + len(encoded_data_marker),
+        is_binary=is_binary,
     )
 
+
+def get_ltspice_raw_end_time(file_path: str | Path) -> float | None:
+    # Returns the last time a binary .raw file holds, counting only the points that were written in full, as an
+    # interrupted simulation leaves fewer than its header announces. None for the formats that can not be checked
+    header = read_ltspice_raw_header(file_path)
+    if not header.is_binary or "real" not in header.flags or "stepped" in header.flags:
+        return None
+
+    data_size = os.path.getsize(file_path) - header.data_offset
+    if header.is_fast_access:
+        # The time trace is stored first and whole, even when the later traces were cut short
+        num_points = min(header.num_points, data_size // np.dtype(np.float64).itemsize)
+        offset = header.data_offset + (num_points - 1) * np.dtype(np.float64).itemsize
+    else:
+        num_points = min(header.num_points, data_size // header.point_size)
+        offset = header.data_offset + (num_points - 1) * header.point_size
+    if num_points <= 0:
+        return 0.0
+
+    with open(file_path, "rb") as file:
+        file.seek(offset)
+        (end_time,) = np.frombuffer(file.read(8), dtype=np.float64)
+
+    # LTspice marks some time points with a negative sign
+    return abs(float(end_time))
+
+
+def resolve_output_column_mapping(
+        columns: typing.Iterable[str],
+        field_mapping: OutputFieldsType,
+) -> dict[str, str | None]:
+    # Maps each standard field to the waveform column it is read from, or None when no alternative is present
+    columns = set(columns)
+
+    column_mapping = {}
+    for field in dataclasses.fields(field_mapping):
+        output_field = getattr(field_mapping, field.name)
+        if isinstance(output_field, str):
+            output_field = [output_field]
+        elif not isinstance(output_field, list):
+            raise TypeError(f"Output field must be a string or a list of strings. Got {type(output_field)}")
+
+        column_mapping[field.name] = next((column for column in output_field if column in columns), None)
+
     # If the source voltage column does not exist in the data, LTSpice has assigned it ground
-    # with zero voltage. This should be added manually in this case.
-    if DUT_SOURCE_VOLTAGE_FIELD_NAME not in standardised_data.columns:
-        standardised_data[DUT_SOURCE_VOLTAGE_FIELD_NAME] = 0.0
-
-    # Filter the dataset to only contained the required fields
-    # standardised_data = standardised_data[list(STANDARD_DOUBLE_PULSE_TEST_FIELDS)]
-    standardised_data = _filtered_columns_waveform_data(
-        waveform_data=standardised_data,
+    # with zero voltage. It is filled in with zeros in this case.
+    missing_fields = [
+        standard_field for standard_field, column in column_mapping.items()
+        if column is None and standard_field != DUT_SOURCE_VOLTAGE_FIELD_NAME
+    ]
+    if missing_fields:
+        raise KeyError(f"Missing columns: {', '.join(missing_fields)} from columns -> [{', '.join(sorted(columns))}]")
+
+    return column_mapping
+
+
+def compile_waveform_read_plan(
+        simulation_type: SimulationType,
+        raw_waveform_file_path: str | Path,
+        field_mapping: OutputFieldsType,
+) -> WaveformReadPlanData:
+    return _compile_waveform_read_plan(
+        simulation_type=simulation_type,
+        header=read_ltspice_raw_header(raw_waveform_file_path),
         field_mapping=field_mapping,
     )
 
-    # Add auxiliary fields
-    standardised_data = _auxiliary_field_adders[simulation_type.value](
-        waveform_data=standardised_data,
-    )
 
-    return standardised_data
+def get_waveform_read_plan(
+        source_file_path: str | Path,
+        simulation_type: SimulationType,
+        field_mapping: OutputFieldsType,
+        raw_waveform_file_path: str | Path,
+        header: RawFileHeaderData | None = None,
+) -> WaveformReadPlanData:
+    # Every point simulated from a schematic usually produces the same traces, so its plan is compiled once and
+    # reused while the .raw headers list the same traces. It is recompiled when they do not, as after the schematic
+    # was edited or the saved traces changed. A header already parsed from the file is not parsed again
+    key = (str(source_file_path), SimulationType(simulation_type).value, repr(field_mapping))
+    if header is None:
+        header = read_ltspice_raw_header(raw_waveform_file_path)
+    read_plan = _waveform_read_plans.get(key)
+    if read_plan is None or read_plan.variable_names != header.variable_names:
+        read_plan = _waveform_read_plans[key] = _compile_waveform_read_plan(
+            simulation_type=simulation_type,
+            header=header,
+            field_mapping=field_mapping,
+        )
+    return read_plan
 
 
-def _add_double_pulse_test_auxiliary_fields(
-        waveform_data: pd.DataFrame,
+def read_ltspice_output(
+        simulation_type: SimulationType,
+        raw_waveform_file_path: str,
+        field_mapping: OutputFieldsType,
+        read_plan: WaveformReadPlanData | None = None,
+        header: RawFileHeaderData | None = None,
 ) -> pd.DataFrame:
-    dut_drain_voltage = waveform_data[DUT_DRAIN_VOLTAGE_FIELD_NAME]
-    dut_source_voltage = waveform_data[DUT_SOURCE_VOLTAGE_FIELD_NAME]
-    dut_drain_current = waveform_data[DUT_DRAIN_CURRENT_FIELD_NAME]
-
-    waveform_data[TIME_DIFFERENTIALS_FIELD_NAME] = waveform_data[TIME_FIELD_NAME].diff().fillna(0)
-    waveform_data[DUT_DRAIN_SOURCE_VOLTAGE_FIELD_NAME] = dut_drain_voltage - dut_source_voltage
-    dut_drain_source_voltage = waveform_data[DUT_DRAIN_SOURCE_VOLTAGE_FIELD_NAME]
-    waveform_data[DUT_DRAIN_SOURCE_POWER_FIELD_NAME] = dut_drain_source_voltage * dut_drain_current
-    waveform_data[DUT_DRAIN_SOURCE_ENERGY_FIELD_NAME] = (
-            waveform_data[DUT_DRAIN_SOURCE_POWER_FIELD_NAME] * waveform_data[TIME_DIFFERENTIALS_FIELD_NAME]
-    )
-    waveform_data[DUT_DRAIN_SOURCE_RESISTANCE_FIELD_NAME] = abs(
-        waveform_data[DUT_DRAIN_SOURCE_VOLTAGE_FIELD_NAME] / waveform_data[DUT_DRAIN_CURRENT_FIELD_NAME]
-    )
+    # A header already parsed from the file, as for its read plan, is not parsed again. A plan compiled from a
+    # header with other traces would read the wrong ones
+    if header is None:
+        header = read_ltspice_raw_header(raw_waveform_file_path)
+    if read_plan is None or read_plan.variable_names != header.variable_names:
+        read_plan = _compile_waveform_read_plan(
+            simulation_type=simulation_type,
+            header=header,
+            field_mapping=field_mapping,
+        )
+
+    if not _is_directly_readable(raw_waveform_file_path, header):
+        # ASCII, stepped and complex data are left to the ltspice package
+        raw_waveform_data = _read_ltspice_waveform(raw_waveform_file_path)
+        return _standardise_waveform_data(
+            simulation_type=simulation_type,
+            raw_waveform_data=raw_waveform_data,
+            field_mapping=field_mapping,
+            read_plan=read_plan,
+        )
+
+    block, field_data = _allocate_waveform_block(read_plan.fields, header.num_points)
+
+    # Only the planned traces are decoded, straight from the memory mapped file into the output block
+    for standard_field, index in zip(read_plan.standard_fields, read_plan.source_indices):
+        if index is None:
+            field_data[standard_field].fill(0.0)
+        else:
+            field_data[standard_field][:] = _map_raw_trace(raw_waveform_file_path, header, index)
 
-    return waveform_data
+    # Compressed LTspice files flag points by negating the time value
+    np.abs(field_data[TIME_FIELD_NAME], out=field_data[TIME_FIELD_NAME])
 
+    _auxiliary_field_calculators[simulation_type.value](field_data)
 
-def _add_buck_converter_auxiliary_fields(
-        waveform_data: pd.DataFrame,
-) -> pd.DataFrame:
-    waveform_data[SUPPLY_VOLTAGE_FIELD_NAME] = waveform_data[DUT_DRAIN_VOLTAGE_FIELD_NAME] - waveform_data[LOAD_NEGATIVE_VOLTAGE_FIELD_NAME]
-    waveform_data[LOAD_VOLTAGE_FIELD_FIELD_NAME] = waveform_data[LOAD_POSITIVE_VOLTAGE_FIELD_NAME] - waveform_data[LOAD_NEGATIVE_VOLTAGE_FIELD_NAME]
-    return waveform_data
+    return pd.DataFrame(block.T, columns=list(read_plan.fields), copy=False)
 
 
-def read_ltspice_output(
+def iter_ltspice_output_chunks(
         simulation_type: SimulationType,
         raw_waveform_file_path: str,
         field_mapping: OutputFieldsType,
-) -> pd.DataFrame:
-    raw_waveform_data = _read_ltspice_waveform(raw_waveform_file_path)
+        chunk_size: int = DEFAULT_WAVEFORM_CHUNK_SIZE,
+        read_plan: WaveformReadPlanData | None = None,
+        header: RawFileHeaderData | None = None,
+) -> typing.Iterator[pd.DataFrame]:
+    # Streams read_ltspice_output in consecutive chunks of rows, so only one chunk of the waveform is ever held.
+    # The last time of each chunk is carried into the next, so the chunks concatenate to the whole output
+    # A plan compiled from a header with other traces would read the wrong ones
+    if header is None:
+        header = read_ltspice_raw_header(raw_waveform_file_path)
+    if read_plan is None or read_plan.variable_names != header.variable_names:
+        read_plan = _compile_waveform_read_plan(
+            simulation_type=simulation_type,
+            header=header,
+            field_mapping=field_mapping,
+        )
+
+    if not _is_directly_readable(raw_waveform_file_path, header):
+        # The ltspice package cannot stream, so these files are read whole and then chunked
+        waveform_data = read_ltspice_output(
+            simulation_type=simulation_type,
+            raw_waveform_file_path=raw_waveform_file_path,
+            field_mapping=field_mapping,
+            read_plan=read_plan,
+            header=header,
+        )
+        for start in range(0, len(waveform_data), chunk_size):
+            yield waveform_data.iloc[start:start + chunk_size]
+        return
+
+    previous_time = None
+    for num_points, traces in _read_raw_trace_chunks(raw_waveform_file_path, header, read_plan.source_indices, chunk_size):
+        block, field_data = _allocate_waveform_block(read_plan.fields, num_points)
+
+        for standard_field, trace in zip(read_plan.standard_fields, traces):
+            if trace is None:
+                field_data[standard_field].fill(0.0)
+            else:
+                field_data[standard_field][:] = trace
+
+        np.abs(field_data[TIME_FIELD_NAME], out=field_data[TIME_FIELD_NAME])
+
+        _auxiliary_field_calculators[simulation_type.value](field_data, previous_time=previous_time)
+        previous_time = float(field_data[TIME_FIELD_NAME][-1])
+
+        yield pd.DataFrame(block.T, columns=list(read_plan.fields), copy=False)
+
+
+def _compile_waveform_read_plan(
+        simulation_type: SimulationType,
+        header: RawFileHeaderData,
+        field_mapping: OutputFieldsType,
+) -> WaveformReadPlanData:
+    column_mapping = resolve_output_column_mapping(
+        columns=header.variable_names,
+        field_mapping=field_mapping,
+    )
 
-    standardised_data = _standardise_waveform_data(
-        simulation_type=simulation_type,
-        raw_waveform_data=raw_waveform_data,
-        field_mapping=field_mapping
+    source_indices = tuple(
+        header.variable_names.index(column) if column is not None else None for column in column_mapping.values()
+    )
+
+    return WaveformReadPlanData(
+        simulation_type=SimulationType(simulation_type),
+        standard_fields=tuple(column_mapping),
+        source_names=tuple(column_mapping.values()),
+        source_indices=source_indices,
+        source_dtypes=tuple(
+            header.variable_dtypes[index].name if index is not None else None for index in source_indices
+        ),
+        auxiliary_fields=_auxiliary_field_names[SimulationType(simulation_type).value],
+        variable_names=tuple(header.variable_names),
+    )
+
+
+def _standardise_waveform_data(
+        simulation_type: SimulationType,
+        raw_waveform_data: pd.DataFrame,
+        field_mapping: OutputFieldsType,
+        read_plan: WaveformReadPlanData | None = None,
+) -> pd.DataFrame:
+    if read_plan is None:
+        column_mapping = resolve_output_column_mapping(
+            columns=raw_waveform_data.columns,
+            field_mapping=field_mapping,
+        )
+    else:
+        column_mapping = dict(zip(read_plan.standard_fields, read_plan.source_names))
+
+    fields = tuple(column_mapping) + _auxiliary_field_names[simulation_type.value]
+    block, field_data = _allocate_waveform_block(fields, len(raw_waveform_data))
+
+    for standard_field, column in column_mapping.items():
+        if column is None:
+            field_data[standard_field].fill(0.0)
+        else:
+            field_data[standard_field][:] = raw_waveform_data[column].to_numpy()
+
+    np.abs(field_data[TIME_FIELD_NAME], out=field_data[TIME_FIELD_NAME])
+
+    _auxiliary_field_calculators[simulation_type.value](field_data)
+
+    return pd.DataFrame(block.T, columns=list(fields), copy=False)
+
+
+def _allocate_waveform_block(
+        fields: tuple[str, ...],
+        num_points: int,
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    # The whole output is a single preallocated block with one contiguous row per field. The DataFrame is a
+    # view of its transpose, so the standardised data is never copied again
+    block = np.empty((len(fields), num_points), dtype=np.float64)
+    field_data = dict(zip(fields, block))
+    return block, field_data
+
+
+def _validate_raw_end_time(
+        raw_waveform_file_path: Path,
+        end_time: float,
+) -> tuple[SimulationFailureType | None, str | None]:
+    raw_end_time = get_ltspice_raw_end_time(raw_waveform_file_path)
+    if raw_end_time is not None and raw_end_time < end_time * (1 - RAW_END_TIME_TOLERANCE):
+        return (
+            SimulationFailureType.MISSING_OUTPUT,
+            f"The output ends at {raw_end_time:g} seconds, before the {end_time:g} second stop time",
+        )
+    return None, None
+
+
+def _is_directly_readable(raw_waveform_file_path: str | Path, header: RawFileHeaderData) -> bool:
+    if not header.is_binary or "real" not in header.flags or "stepped" in header.flags:
+        return False
+
+    # A size mismatch (e.g. an interrupted simulation) is reported by the ltspice package instead
+    data_size = os.path.getsize(raw_waveform_file_path) - header.data_offset
+    return data_size == header.num_points * header.point_size
+
+
+def _map_raw_trace(
+        raw_waveform_file_path: str | Path,
+        header: RawFileHeaderData,
+        index: int,
+) -> np.ndarray:
+    if header.is_fast_access:
+        offset = header.data_offset + header.num_points * _get_raw_trace_offset(header, index)
+        return np.memmap(raw_waveform_file_path, dtype=header.variable_dtypes[index], mode="r", offset=offset, shape=(header.num_points,))
+
+    points = np.memmap(raw_waveform_file_path, dtype=_get_raw_point_dtype(header, index), mode="r", offset=header.data_offset, shape=(header.num_points,))
+    return points["value"]
+
+
+def _read_raw_trace_chunks(
+        raw_waveform_file_path: str | Path,
+        header: RawFileHeaderData,
+        indices: tuple[int | None, ...],
+        chunk_size: int,
+) -> typing.Iterator[tuple[int, tuple[np.ndarray | None, ...]]]:
+    # Reads the traces chunk by chunk into buffers, rather than through a memory map, whose touched pages would
+    # all stay resident and grow with the file instead of the chunk
+    with open(raw_waveform_file_path, "rb") as file:
+        for start in range(0, header.num_points, chunk_size):
+            num_points = min(chunk_size, header.num_points - start)
+
+            if header.is_fast_access:
+                traces = []
+                for index in indices:
+                    if index is None:
+                        traces.append(None)
+                        continue
+                    dtype = header.variable_dtypes[index]
+                    file.seek(header.data_offset + header.num_points * _get_raw_trace_offset(header, index) + start * dtype.itemsize)
+                    traces.append(np.fromfile(file, dtype=dtype, count=num_points))
+                yield num_points, tuple(traces)
+                continue
+
+            # Interleaved points are read once per chunk, and each trace is viewed out of them
+            file.seek(header.data_offset + start * header.point_size)
+            points_data = file.read(num_points * header.point_size)
+            yield num_points, tuple(
+                np.frombuffer(points_data, dtype=_get_raw_point_dtype(header, index))["value"] if index is not None else None
+                for index in indices
+            )
+
+
+def _get_raw_trace_offset(header: RawFileHeaderData, index: int) -> int:
+    return sum(dtype.itemsize for dtype in header.variable_dtypes[:index])
+
+
+def _get_raw_point_dtype(header: RawFileHeaderData, index: int) -> np.dtype:
+    # Interleaved points are viewed through a record type holding only the requested trace
+    return np.dtype({
+        "names": ["value"],
+        "formats": [header.variable_dtypes[index]],
+        "offsets": [_get_raw_trace_offset(header, index)],
+        "itemsize": header.point_size,
+    })
+
+
+def _calculate_double_pulse_test_auxiliary_fields(
+        field_data: dict[str, np.ndarray],
+        previous_time: float | None = None,
+) -> None:
+    time = field_data[TIME_FIELD_NAME]
+    dut_drain_voltage = field_data[DUT_DRAIN_VOLTAGE_FIELD_NAME]
+    dut_source_voltage = field_data[DUT_SOURCE_VOLTAGE_FIELD_NAME]
+    dut_drain_current = field_data[DUT_DRAIN_CURRENT_FIELD_NAME]
+    time_differentials = field_data[TIME_DIFFERENTIALS_FIELD_NAME]
+    dut_drain_source_voltage = field_data[DUT_DRAIN_SOURCE_VOLTAGE_FIELD_NAME]
+    dut_drain_source_power = field_data[DUT_DRAIN_SOURCE_POWER_FIELD_NAME]
+    dut_drain_source_energy = field_data[DUT_DRAIN_SOURCE_ENERGY_FIELD_NAME]
+    dut_drain_source_resistance = field_data[DUT_DRAIN_SOURCE_RESISTANCE_FIELD_NAME]
+
+    # Every field is written in place into its preallocated row
+    # The first differential is zero at the start of the waveform, and spans back to the previous chunk otherwise
+    time_differentials[:1] = 0.0 if previous_time is None else time[:1] - previous_time
+    np.subtract(time[1:], time[:-1], out=time_differentials[1:])
+    np.subtract(dut_drain_voltage, dut_source_voltage, out=dut_drain_source_voltage)
+    np.multiply(dut_drain_source_voltage, dut_drain_current, out=dut_drain_source_power)
+    np.multiply(dut_drain_source_power, time_differentials, out=dut_drain_source_energy)
+
+    # The resistance is undefined while no drain current flows, so it is left as NaN instead of infinity
+    dut_drain_source_resistance.fill(np.nan)
+    np.divide(dut_drain_source_voltage, dut_drain_current, out=dut_drain_source_resistance, where=dut_drain_current != 0)
+    np.abs(dut_drain_source_resistance, out=dut_drain_source_resistance)
+
+
+def _calculate_buck_converter_auxiliary_fields(
+        field_data: dict[str, np.ndarray],
+        previous_time: float | None = None,
+) -> None:
+    np.subtract(
+        field_data[DUT_DRAIN_VOLTAGE_FIELD_NAME],
+        field_data[LOAD_NEGATIVE_VOLTAGE_FIELD_NAME],
+        out=field_data[SUPPLY_VOLTAGE_FIELD_NAME],
+    )
+    np.subtract(
+        field_data[LOAD_POSITIVE_VOLTAGE_FIELD_NAME],
+        field_data[LOAD_NEGATIVE_VOLTAGE_FIELD_NAME],
+        out=field_data[LOAD_VOLTAGE_FIELD_FIELD_NAME],
     )
 
-    return standardised_data
 
 def _read_ltspice_waveform(file_path: str) -> pd.DataFrame:
+    # Imported here as the ltspice package pulls in matplotlib, which only the fallback reader should pay for
+    import ltspice
+
     # Parse the .raw file
     l = ltspice.Ltspice(file_path)
     l.parse()
@@ -319,6 +943,52 @@ def _read_ltspice_waveform(file_path: str) -> pd.DataFrame:
     return pd.DataFrame(waveform_data)
 
 
+def _is_schematic_param_line(line: str) -> bool:
+    return line.strip().startswith("TEXT") and "!.param" in line
+
+
+def _get_schematic_modified_params(
+        schematic_file_path: str | Path,
+        params_to_modify: dict[str, float],
+) -> dict[str, float]:
+    # The parameters modify_ltspice_params replaces, which are those matched by a segment of the first .param TEXT
+    # item of the schematic
+    with open(schematic_file_path, 'r') as file:
+        lines = file.readlines()
+
+    modified_params = {}
+    for line in lines:
+        if not _is_schematic_param_line(line):
+            continue
+        for param_segment in line.split("!", maxsplit=1)[1].split(r'\n'):
+            param = next(
+                (param for param in params_to_modify if param_segment.strip().startswith(f".param {param}")),
+                None,
+            )
+            if param is not None:
+                modified_params[param] = params_to_modify[param]
+        break
+
+    return modified_params
+
+
+def _get_schematic_content_hash(schematic_file_path: Path) -> str:
+    return hashlib.sha256(schematic_file_path.read_bytes()).hexdigest()[:16]
+
+
+def _get_netlist_schematic_file_path(netlist_file_path: str | Path) -> Path | None:
+    # Netlists compiled by compile_ltspice_netlist are named after their schematic and its content hash, and only
+    # stand for the schematic while it is unchanged
+    netlist_file_path = Path(netlist_file_path)
+    schematic_stem, _, content_hash = netlist_file_path.stem.rpartition(".")
+    schematic_file_path = netlist_file_path.with_name(f"{schematic_stem}.asc")
+    if not schematic_stem or not schematic_file_path.exists():
+        return None
+    if _get_schematic_content_hash(schematic_file_path) != content_hash:
+        return None
+    return schematic_file_path
+
+
 def _modify_param_segment(
         param_segment: str,
         params_to_modify: dict[str, float],
@@ -329,40 +999,64 @@ def _modify_param_segment(
     return param_segment
 
 
-def _renamed_columns_waveform_data(
-        waveform_data: pd.DataFrame,
-        field_mapping: OutputFieldsType,
-) -> pd.DataFrame:
-    field_mapping: dict = dataclasses.asdict(field_mapping)
+def _modify_tran_segment(segment: str, start_time: float) -> str:
+    # .tran [Tprint] Tstop [Tstart [Tmaxstep]] [options], where the start is the third positional time
+    line_ending = segment[len(segment.rstrip("\r\n")):]
+    directive, separator, comment = segment.rstrip("\r\n").partition(";")
+    tokens = directive.split()
+    if not tokens or tokens[0].lower() != ".tran":
+        return segment
 
-    new_columns = {}
-    for standard_field, output_field in field_mapping.items():
-        if isinstance(output_field, str):
-            new_columns[output_field] = standard_field
-        elif isinstance(output_field, list):
-            for field in output_field:
-                if field in waveform_data.columns:
-                    new_columns[field] = standard_field
-                    break
-        else:
-            raise TypeError(f"Output field must be a string or a list of strings. Got {type(output_field)}")
+    arguments = tokens[1:]
+    num_times = next(
+        (i for i, argument in enumerate(arguments) if argument.lower() in TRAN_OPTION_KEYWORDS),
+        len(arguments),
+    )
+    times, options = arguments[:num_times], arguments[num_times:]
+    if len(times) == 1:
+        times = ["0", times[0]]
+    if len(times) == 2:
+        times.append(repr(start_time))
+    else:
+        times[2] = repr(start_time)
 
-    return waveform_data.rename(columns=new_columns)
+    return " ".join([tokens[0], *times, *options]) + (f" ;{comment}" if separator else "") + line_ending
 
 
-def _filtered_columns_waveform_data(
-        waveform_data: pd.DataFrame,
-        field_mapping: OutputFieldsType,
-) -> pd.DataFrame:
+def _modify_netlist_param_line(
+        line: str,
+        params_to_modify: dict[str, float],
+) -> str:
+    stripped_line = line.lstrip()
+    if not stripped_line.lower().startswith(".param"):
+        return line
+
+    # Each value runs up to the next assignment, so expressions with spaces are kept whole
+    body = stripped_line[len(".param"):].rstrip("\r\n")
+    assignments = list(NETLIST_PARAM_ASSIGNMENT_PATTERN.finditer(body))
+    if not any(assignment.group(1) in params_to_modify for assignment in assignments):
+        return line
+
+    segments = []
+    for i, assignment in enumerate(assignments):
+        param = assignment.group(1)
+        value_end = assignments[i + 1].start() if i + 1 < len(assignments) else len(body)
+        value = params_to_modify[param] if param in params_to_modify else body[assignment.end():value_end].strip()
+        segments.append(f"{param}={value}")
+
+    line_ending = line[len(line.rstrip("\r\n")):]
+    return f".param {' '.join(segments)}{line_ending}"
+
+
+def _read_netlist_text(file_path: str | Path) -> tuple[str, str]:
+    # Depending on the version, LTspice writes netlists as UTF-16LE, UTF-8 or the Windows code page
+    data = Path(file_path).read_bytes()
+    if data.startswith(b"\xff\xfe") or b"\x00" in data[:64]:
+        return data.decode("utf-16-le").lstrip("\ufeff"), "utf-16-le"
     try:
-        return waveform_data[field_mapping.standard_fields]
-    except KeyError:
-        missing_columns = set()
-        for required_column in field_mapping.standard_fields:
-            if required_column not in waveform_data.columns:
-                missing_columns.add(required_column)
-
-        raise KeyError(f"Missing columns: {', '.join(missing_columns)} from columns -> [{', '.join(list(waveform_data.columns))}]")
+        return data.decode("utf-8"), "utf-8"
+    except UnicodeDecodeError:
+        return data.decode("latin-1"), "latin-1"
 
 
 # --------------------------------------------------
@@ -379,7 +1073,23 @@ _output_field_types = {
     SimulationType.BUCK_CONVERTER.value: BuckConverterOutputFields,
 }
 
-_auxiliary_field_adders = {
-    SimulationType.DOUBLE_PULSE_TEST.value: _add_double_pulse_test_auxiliary_fields,
-    SimulationType.BUCK_CONVERTER.value: _add_buck_converter_auxiliary_fields,
+_auxiliary_field_names = {
+    SimulationType.DOUBLE_PULSE_TEST.value: (
+        TIME_DIFFERENTIALS_FIELD_NAME,
+        DUT_DRAIN_SOURCE_VOLTAGE_FIELD_NAME,
+        DUT_DRAIN_SOURCE_POWER_FIELD_NAME,
+        DUT_DRAIN_SOURCE_ENERGY_FIELD_NAME,
+        DUT_DRAIN_SOURCE_RESISTANCE_FIELD_NAME,
+    ),
+    SimulationType.BUCK_CONVERTER.value: (
+        SUPPLY_VOLTAGE_FIELD_NAME,
+        LOAD_VOLTAGE_FIELD_FIELD_NAME,
+    ),
+}
+
+_waveform_read_plans: dict[tuple[str, str, str], WaveformReadPlanData] = {}
+
+_auxiliary_field_calculators = {
+    SimulationType.DOUBLE_PULSE_TEST.value: _calculate_double_pulse_test_auxiliary_fields,
+    SimulationType.BUCK_CONVERTER.value: _calculate_buck_converter_auxiliary_fields,
 }
\ No newline at end of file
@@ -0,0 +1,448 @@
+""" Waveform Storage Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import os
+import json
+import uuid
+import zlib
+import struct
+import typing
+import shutil
+import hashlib
+import tempfile
+import functools
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .fields import *
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "COMPRESSED_WAVEFORM_FILE_SUFFIX",
+    "SHARED_COLUMN_FILE_PREFIX",
+    "DEFAULT_SHARED_FIELDS",
+    "STORAGE_BLOCK_SIZE",
+    "save_compressed_waveform",
+    "load_compressed_waveform",
+    "iter_compressed_waveform_chunks",
+    "encode_column",
+    "decode_column",
+]
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+COMPRESSED_WAVEFORM_FILE_SUFFIX = ".swz"
+COMPRESSED_WAVEFORM_MAGIC = b"SWZ\x01"
+
+# Stores the prefix of the content-addressed files holding columns shared between points
+SHARED_COLUMN_FILE_PREFIX = "shared_"
+
+# Stores the columns that are usually identical across the points of a sweep, and are stored once
+DEFAULT_SHARED_FIELDS = (TIME_FIELD_NAME, TIME_DIFFERENTIALS_FIELD_NAME)
+
+# Stores the bit-level transforms a float64 column is stored with, each of which is exactly reversible:
+#   xor    each value's bits XOR the previous value's bits, leaving zeros where smooth neighbours agree
+#   delta  each value's bits minus the previous value's bits, small for monotonic columns within one binade
+#   delta2 the difference of consecutive deltas, zero for evenly spaced columns such as a fixed-timestep time axis
+COLUMN_ENCODINGS = ("xor", "delta", "delta2")
+RAW_COLUMN_ENCODING = "raw"
+
+# Stores how many rows each independently decodable block of a column holds. A column's encoding is chosen on its
+# first block, and a waveform written or read in chunks only holds the blocks of the current chunk
+STORAGE_BLOCK_SIZE = 1 << 16
+
+COMPRESSION_LEVEL = 6
+
+SHARED_COLUMN_CACHE_SIZE = 16
+
+
+# --------------------------------------------------
+#   Classes
+# --------------------------------------------------
+
+class _CompressedWaveformFile:
+    """ An open compressed waveform file, from which any row range of a column can be decoded.
+
+    Only the blocks overlapping the requested rows are read and decompressed, and the last decoded block of each
+    column is kept, so consecutive chunks that split a block do not decode it twice.
+    """
+
+    def __init__(self, file_path: str | Path) -> None:
+        self.file_path = Path(file_path)
+        self._file = open(self.file_path, "rb")
+
+        self.header, payload_offset = _read_header(self._file)
+        self.num_points = self.header["num_points"]
+        self.columns = self.header["columns"]
+        # Files written before the columns were split into blocks hold every column as a single block
+        self.block_size = self.header.get("block_size", max(self.num_points, 1))
+
+        self._block_offsets = []
+        self._shared_files: dict[int, _CompressedWaveformFile] = {}
+        self._decoded_blocks: dict[int, tuple[int, np.ndarray]] = {}
+        offset = payload_offset
+        for column in self.columns:
+            block_offsets = []
+            for block_size in column.get("block_sizes", [column["size"]] if "size" in column else []):
+                block_offsets.append((offset, block_size))
+                offset += block_size
+            self._block_offsets.append(block_offsets)
+
+    def __enter__(self) -> "_CompressedWaveformFile":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def column_names(self) -> list[str]:
+        return [column["name"] for column in self.columns]
+
+    def get_shared_file_path(self, i: int) -> Path | None:
+        if "shared" not in self.columns[i]:
+            return None
+        return (self.file_path.parent / self.columns[i]["shared"]).resolve()
+
+    def read(self, i: int, start: int, stop: int) -> np.ndarray:
+        shared_file_path = self.get_shared_file_path(i)
+        if shared_file_path is not None:
+            if i not in self._shared_files:
+                self._shared_files[i] = _CompressedWaveformFile(shared_file_path)
+            return self._shared_files[i].read(0, start, stop)
+
+        if stop <= start:
+            return np.empty(0, dtype=np.dtype(self.columns[i]["dtype"]))
+
+        segments = []
+        for block_index in range(start // self.block_size, (stop - 1) // self.block_size + 1):
+            block_start = block_index * self.block_size
+            block = self._decode_block(i, block_index, min(self.block_size, self.num_points - block_start))
+            segments.append(block[max(start - block_start, 0):stop - block_start])
+
+        return segments[0] if len(segments) == 1 else np.concatenate(segments)
+
+    def close(self) -> None:
+        for shared_file in self._shared_files.values():
+            shared_file.close()
+        self._decoded_blocks.clear()
+        self._file.close()
+
+    def _decode_block(self, i: int, block_index: int, num_points: int) -> np.ndarray:
+        if self._decoded_blocks.get(i, (None,))[0] == block_index:
+            return self._decoded_blocks[i][1]
+
+        column = self.columns[i]
+        offset, size = self._block_offsets[i][block_index]
+        self._file.seek(offset)
+        block = decode_column(
+            payload=self._file.read(size),
+            dtype=np.dtype(column["dtype"]),
+            encoding=column["encoding"],
+            num_points=num_points,
+        )
+        self._decoded_blocks[i] = (block_index, block)
+        return block
+
+
+class _CompressedColumnWriter:
+    """ Encodes a column block by block as its values are streamed in, spooling the payloads to a temporary file.
+
+    The encoding is chosen on the first block, as encode_column does, and the hash of the values is updated with
+    every block, so a shared column can be named after its content once it is complete.
+    """
+
+    def __init__(self, name: str, directory_path: Path) -> None:
+        self.name = name
+        self.dtype: np.dtype | None = None
+        self.encoding: str | None = None
+        self.block_sizes: list[int] = []
+        self.num_points = 0
+        self.content_hash = hashlib.sha256()
+        self.payload_file = tempfile.TemporaryFile(dir=directory_path)
+
+        self._pending_values: list[np.ndarray] = []
+        self._num_pending_points = 0
+
+    def write(self, values: np.ndarray) -> None:
+        if self.dtype is None:
+            self.dtype = values.dtype
+            self.content_hash.update(values.dtype.str.encode())
+
+        if len(values):
+            self._pending_values.append(values)
+            self._num_pending_points += len(values)
+        while self._num_pending_points >= STORAGE_BLOCK_SIZE:
+            self._write_block(STORAGE_BLOCK_SIZE)
+
+    def flush(self) -> None:
+        if self._num_pending_points:
+            self._write_block(self._num_pending_points)
+        self.payload_file.seek(0)
+
+    def get_header(self) -> dict:
+        return {
+            "name": self.name,
+            "dtype": self.dtype.str if self.dtype is not None else np.dtype(np.float64).str,
+            "encoding": self.encoding or RAW_COLUMN_ENCODING,
+            "block_sizes": self.block_sizes,
+        }
+
+    def close(self) -> None:
+        self.payload_file.close()
+
+    def _write_block(self, num_points: int) -> None:
+        # The block is taken from the front of the pending values, which only copies when it spans several writes
+        segments = []
+        num_missing_points = num_points
+        while num_missing_points:
+            values = self._pending_values[0]
+            segments.append(values[:num_missing_points])
+            if len(values) > num_missing_points:
+                self._pending_values[0] = values[num_missing_points:]
+            else:
+                self._pending_values.pop(0)
+            num_missing_points -= len(segments[-1])
+        self._num_pending_points -= num_points
+
+        block = np.ascontiguousarray(segments[0] if len(segments) == 1 else np.concatenate(segments))
+        if self.encoding is None:
+            self.encoding = _choose_encoding(block)
+
+        payload = _encode_block(block, self.encoding)
+        self.payload_file.write(payload)
+        self.block_sizes.append(len(payload))
+        self.content_hash.update(block)
+        self.num_points += len(block)
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def save_compressed_waveform(
+        waveform_data: pd.DataFrame | typing.Iterable[pd.DataFrame],
+        file_path: str | Path,
+        shared_directory_path: str | Path | None = None,
+        shared_fields: tuple[str, ...] = DEFAULT_SHARED_FIELDS,
+) -> None:
+    # Every column is stored losslessly with its best encoding, one block of rows at a time, so a waveform streamed
+    # as consecutive chunks of rows is written with the memory of one chunk. When a shared directory is given, the
+    # shared fields are written there once under the hash of their content and only referenced by the file, so
+    # points with the same time axis share it, even when saved by different processes
+    file_path = Path(file_path)
+    if isinstance(waveform_data, pd.DataFrame):
+        waveform_data = [waveform_data]
+
+    column_writers: list[_CompressedColumnWriter] = []
+    try:
+        for chunk in waveform_data:
+            if not column_writers:
+                column_writers = [_CompressedColumnWriter(column, file_path.parent) for column in chunk.columns]
+            for column_writer in column_writers:
+                column_writer.write(chunk[column_writer.name].to_numpy())
+
+        columns = []
+        payload_files = []
+        for column_writer in column_writers:
+            column_writer.flush()
+
+            if shared_directory_path is not None and column_writer.name in shared_fields:
+                shared_file_path = _save_shared_column(column_writer, Path(shared_directory_path))
+                columns.append({
+                    "name": column_writer.name,
+                    "shared": os.path.relpath(shared_file_path, file_path.parent),
+                })
+                continue
+
+            columns.append(column_writer.get_header())
+            payload_files.append(column_writer.payload_file)
+
+        num_points = column_writers[0].num_points if column_writers else 0
+        _write_atomically(
+            file_path,
+            {"num_points": num_points, "block_size": STORAGE_BLOCK_SIZE, "columns": columns},
+            payload_files,
+        )
+    finally:
+        for column_writer in column_writers:
+            column_writer.close()
+
+
+def load_compressed_waveform(file_path: str | Path) -> pd.DataFrame:
+    # Every float64 column is decoded straight into one row of a (fields, points) block, which the DataFrame
+    # views without a copy, as read_ltspice_output does
+    with _CompressedWaveformFile(file_path) as waveform_file:
+        num_points = waveform_file.num_points
+        columns = waveform_file.columns
+        is_float_block = all(
+            column.get("dtype", np.dtype(np.float64).str) == np.dtype(np.float64).str for column in columns
+        )
+
+        block = np.empty((len(columns), num_points), dtype=np.float64) if is_float_block else None
+        column_values = {}
+        for i, column in enumerate(columns):
+            shared_file_path = waveform_file.get_shared_file_path(i)
+            if shared_file_path is not None:
+                values = _load_shared_column(str(shared_file_path))
+            else:
+                values = waveform_file.read(i, 0, num_points)
+
+            if block is not None:
+                block[i] = values
+            else:
+                column_values[column["name"]] = np.array(values)
+
+        column_names = waveform_file.column_names
+
+    if block is not None:
+        return pd.DataFrame(block.T, columns=column_names, copy=False)
+    return pd.DataFrame(column_values, columns=column_names)
+
+
+def iter_compressed_waveform_chunks(
+        file_path: str | Path,
+        chunk_size: int,
+) -> typing.Iterator[pd.DataFrame]:
+    # Streams the waveform in consecutive chunks of rows, with the memory of one chunk and one block per column
+    with _CompressedWaveformFile(file_path) as waveform_file:
+        column_names = waveform_file.column_names
+        for start in range(0, waveform_file.num_points, chunk_size):
+            stop = min(start + chunk_size, waveform_file.num_points)
+            yield pd.DataFrame({
+                column: waveform_file.read(i, start, stop) for i, column in enumerate(column_names)
+            }, columns=column_names)
+
+
+def encode_column(values: np.ndarray) -> tuple[str, list[bytes]]:
+    # The encoding that compresses the first block best is used for all of them. Each transformed value's bytes
+    # are then regrouped by significance, so the runs of zero high bytes compress to almost nothing
+    values = np.ascontiguousarray(values)
+    blocks = [values[start:start + STORAGE_BLOCK_SIZE] for start in range(0, len(values), STORAGE_BLOCK_SIZE)]
+
+    encoding = _choose_encoding(blocks[0]) if blocks else RAW_COLUMN_ENCODING
+    return encoding, [_encode_block(block, encoding) for block in blocks]
+
+
+def decode_column(
+        payload: bytes | memoryview,
+        dtype: np.dtype,
+        encoding: str,
+        num_points: int,
+) -> np.ndarray:
+    data = zlib.decompress(payload)
+    if encoding == RAW_COLUMN_ENCODING:
+        return np.frombuffer(data, dtype=dtype, count=num_points)
+
+    transformed = np.frombuffer(data, dtype=np.uint8).reshape(8, num_points).T.copy().view(np.uint64).ravel()
+    return _inverse_transform(transformed, encoding).view(np.float64)
+
+
+def _choose_encoding(first_block: np.ndarray) -> str:
+    if first_block.dtype != np.float64 or len(first_block) < 3:
+        return RAW_COLUMN_ENCODING
+
+    sample_bits = first_block.view(np.uint64)
+    return min(
+        COLUMN_ENCODINGS,
+        key=lambda candidate: len(zlib.compress(_shuffle(_transform(sample_bits, candidate)), 1)),
+    )
+
+
+def _encode_block(block: np.ndarray, encoding: str) -> bytes:
+    if encoding == RAW_COLUMN_ENCODING:
+        return zlib.compress(block.tobytes(), COMPRESSION_LEVEL)
+    return zlib.compress(_shuffle(_transform(block.view(np.uint64), encoding)), COMPRESSION_LEVEL)
+
+def _transform(bits: np.ndarray, encoding: str) -> np.ndarray:
+    # The first value is kept as it is, and unsigned arithmetic wraps, so every transform is exactly reversible
+    transformed = bits.copy()
+    if encoding == "xor":
+        transformed[1:] ^= bits[:-1]
+    else:
+        transformed[1:] -= bits[:-1]
+        if encoding == "delta2":
+            transformed[2:] -= (bits[1:-1] - bits[:-2])
+
+    return transformed
+
+
+def _inverse_transform(transformed: np.ndarray, encoding: str) -> np.ndarray:
+    if encoding == "xor":
+        return np.bitwise_xor.accumulate(transformed)
+
+    deltas = transformed
+    if encoding == "delta2":
+        deltas = transformed.copy()
+        deltas[1:] = np.cumsum(transformed[1:], dtype=np.uint64)
+    return np.cumsum(deltas, dtype=np.uint64)
+
+
+def _shuffle(bits: np.ndarray) -> bytes:
+    return np.ascontiguousarray(bits.view(np.uint8).reshape(-1, 8).T).tobytes()
+
+
+def _save_shared_column(column_writer: _CompressedColumnWriter, shared_directory_path: Path) -> Path:
+    content_hash = column_writer.content_hash.hexdigest()[:16]
+    shared_file_path = shared_directory_path / f"{SHARED_COLUMN_FILE_PREFIX}{column_writer.name}_{content_hash}{COMPRESSED_WAVEFORM_FILE_SUFFIX}"
+
+    # The name is the content, so an existing file never has to be rewritten
+    if not shared_file_path.exists():
+        shared_directory_path.mkdir(parents=True, exist_ok=True)
+        _write_atomically(
+            shared_file_path,
+            {
+                "num_points": column_writer.num_points,
+                "block_size": STORAGE_BLOCK_SIZE,
+                "columns": [column_writer.get_header()],
+            },
+            [column_writer.payload_file],
+        )
+
+    return shared_file_path
+
+
+@functools.lru_cache(maxsize=SHARED_COLUMN_CACHE_SIZE)
+def _load_shared_column(shared_file_path: str) -> np.ndarray:
+    # Shared files never change once written, so the points of a sweep decode their time axis once
+    values = load_compressed_waveform(shared_file_path).iloc[:, 0].to_numpy()
+    values.flags.writeable = False
+    return values
+
+
+def _read_header(file: typing.BinaryIO) -> tuple[dict, int]:
+    # Returns the header and the offset of the first payload
+    if file.read(len(COMPRESSED_WAVEFORM_MAGIC)) != COMPRESSED_WAVEFORM_MAGIC:
+        raise ValueError(f"Not a compressed waveform file: {file.name}")
+
+    (header_size,) = struct.unpack("<Q", file.read(8))
+    header = json.loads(file.read(header_size).decode("utf-8"))
+
+    return header, len(COMPRESSED_WAVEFORM_MAGIC) + 8 + header_size
+
+
+def _write_atomically(file_path: Path, header: dict, payload_files: list[typing.BinaryIO]) -> None:
+    # The payloads are copied from their spooled files in order, after the header that indexes them
+    header_bytes = json.dumps(header).encode("utf-8")
+    temporary_file_path = file_path.with_name(f".{file_path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        with open(temporary_file_path, "wb") as file:
+            file.write(COMPRESSED_WAVEFORM_MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes)
+            for payload_file in payload_files:
+                shutil.copyfileobj(payload_file, file)
+        os.replace(temporary_file_path, file_path)
+    finally:
+        temporary_file_path.unlink(missing_ok=True)
@@ -0,0 +1,200 @@
+""" Streaming Statistics Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import math
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "DEFAULT_SKETCH_RELATIVE_ACCURACY",
+    "DEFAULT_SKETCH_MAX_NUM_BUCKETS",
+    "DEFAULT_SUMMARY_QUANTILES",
+    "DEFAULT_SUMMARY_NUM_BINS",
+    "RunningStatistics",
+    "QuantileSketch",
+    "StreamingSummary",
+]
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+# Stores the relative error of every quantile estimated by the sketch
+DEFAULT_SKETCH_RELATIVE_ACCURACY = 0.01
+# Stores the number of buckets kept per sign, beyond which the buckets of the smallest magnitudes are merged
+DEFAULT_SKETCH_MAX_NUM_BUCKETS = 2048
+
+DEFAULT_SUMMARY_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+DEFAULT_SUMMARY_NUM_BINS = 50
+
+# Stores the magnitude below which values are counted as zero by the sketch
+SKETCH_MIN_MAGNITUDE = 1e-300
+
+
+# --------------------------------------------------
+#   Classes
+# --------------------------------------------------
+
+class RunningStatistics:
+    """ The count, mean, variance and range of a stream of values, updated one value at a time.
+
+    The mean and the sum of squared deviations follow Welford's update, which stays accurate when the spread is
+    small relative to the mean. NaN values are counted apart and left out of everything else.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.nan_count = 0
+        self.mean = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._squared_deviation_sum = 0.0
+
+    def update(self, value: float) -> None:
+        if math.isnan(value):
+            self.nan_count += 1
+            return
+
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._squared_deviation_sum += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def variance(self) -> float:
+        # The sample variance, which needs at least two values
+        return self._squared_deviation_sum / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """ A fixed-size sketch of a stream of values that estimates any quantile within a relative accuracy.
+
+    Each value is counted in a logarithmically spaced bucket of its magnitude, one store per sign, so a quantile is
+    the representative value of the bucket it falls in. The number of buckets grows with the log of the value range
+    only, and past the maximum the buckets of the smallest magnitudes are merged.
+    """
+
+    def __init__(
+            self,
+            relative_accuracy: float = DEFAULT_SKETCH_RELATIVE_ACCURACY,
+            max_num_buckets: int = DEFAULT_SKETCH_MAX_NUM_BUCKETS,
+    ) -> None:
+        self.relative_accuracy = relative_accuracy
+        self.max_num_buckets = max_num_buckets
+        self.count = 0
+        self.zero_count = 0
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._positive_bucket_counts: dict[int, int] = {}
+        self._negative_bucket_counts: dict[int, int] = {}
+
+    def update(self, value: float) -> None:
+        if math.isnan(value):
+            return
+
+        self.count += 1
+        if abs(value) < SKETCH_MIN_MAGNITUDE:
+            self.zero_count += 1
+            return
+
+        bucket_counts = self._positive_bucket_counts if value > 0 else self._negative_bucket_counts
+        bucket_index = math.ceil(math.log(abs(value)) / self._log_gamma)
+        bucket_counts[bucket_index] = bucket_counts.get(bucket_index, 0) + 1
+
+        if len(bucket_counts) > self.max_num_buckets:
+            smallest_index, next_index = sorted(bucket_counts)[:2]
+            bucket_counts[next_index] += bucket_counts.pop(smallest_index)
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return math.nan
+
+        rank = q * (self.count - 1)
+        seen_count = 0
+        for value, count in self.iter_buckets():
+            seen_count += count
+            if seen_count > rank:
+                return value
+
+        return math.nan
+
+    def iter_buckets(self):
+        # Yields the representative value and count of every bucket in ascending order of value
+        for bucket_index in sorted(self._negative_bucket_counts, reverse=True):
+            yield -self._get_bucket_value(bucket_index), self._negative_bucket_counts[bucket_index]
+        if self.zero_count:
+            yield 0.0, self.zero_count
+        for bucket_index in sorted(self._positive_bucket_counts):
+            yield self._get_bucket_value(bucket_index), self._positive_bucket_counts[bucket_index]
+
+    def _get_bucket_value(self, bucket_index: int) -> float:
+        # The value within relative_accuracy of every magnitude in (gamma^(i - 1), gamma^i]
+        return 2 * math.exp(bucket_index * self._log_gamma) / (self._gamma + 1)
+
+
+class StreamingSummary:
+    """ The running statistics, quantiles and histogram of a stream of result values, in constant memory. """
+
+    def __init__(
+            self,
+            relative_accuracy: float = DEFAULT_SKETCH_RELATIVE_ACCURACY,
+            max_num_buckets: int = DEFAULT_SKETCH_MAX_NUM_BUCKETS,
+    ) -> None:
+        self.statistics = RunningStatistics()
+        self.sketch = QuantileSketch(relative_accuracy=relative_accuracy, max_num_buckets=max_num_buckets)
+
+    def update(self, value: float) -> None:
+        value = float(value)
+        self.statistics.update(value)
+        self.sketch.update(value)
+
+    def histogram(self, num_bins: int = DEFAULT_SUMMARY_NUM_BINS) -> tuple[list[float], list[int]]:
+        # Equal-width bins over the observed range, filled from the sketch buckets
+        if self.statistics.count == 0:
+            return [], []
+
+        low, high = self.statistics.min, self.statistics.max
+        if low == high:
+            return [low, high], [self.statistics.count]
+
+        bin_width = (high - low) / num_bins
+        bin_counts = [0] * num_bins
+        for value, count in self.sketch.iter_buckets():
+            bin_index = min(max(int((value - low) / bin_width), 0), num_bins - 1)
+            bin_counts[bin_index] += count
+
+        return [low + i * bin_width for i in range(num_bins)] + [high], bin_counts
+
+    def to_dict(
+            self,
+            quantiles: tuple[float, ...] = DEFAULT_SUMMARY_QUANTILES,
+            num_bins: int = DEFAULT_SUMMARY_NUM_BINS,
+    ) -> dict:
+        statistics = self.statistics
+        bin_edges, bin_counts = self.histogram(num_bins)
+        return {
+            "count": statistics.count,
+            "nan_count": statistics.nan_count,
+            "mean": statistics.mean if statistics.count else math.nan,
+            "std": statistics.std,
+            "min": statistics.min if statistics.count else math.nan,
+            "max": statistics.max if statistics.count else math.nan,
+            # The bucket values are clamped to the observed range, which is exact at both ends
+            "quantiles": {f"{q:g}": min(max(self.sketch.quantile(q), statistics.min), statistics.max) for q in quantiles},
+            "histogram": {"bin_edges": bin_edges, "counts": bin_counts},
+        }
@@ -0,0 +1,389 @@
+""" Result Surrogate Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import dataclasses
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .config import *
+from .execution import *
+from .simulation import *
+from .spice import *
+from .utils import *
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "DEFAULT_SURROGATE_NOISE",
+    "DEFAULT_SURROGATE_LENGTH_SCALES",
+    "SurrogatePredictionData",
+    "GaussianProcessSurrogate",
+    "fit_result_surrogate",
+    "refine_result_surrogate",
+]
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+# Stores the noise variance added to the kernel diagonal, relative to the signal variance
+DEFAULT_SURROGATE_NOISE = 1e-6
+# Stores the candidate kernel length scales, in units of each parameter's training range
+DEFAULT_SURROGATE_LENGTH_SCALES = (0.05, 0.1, 0.2, 0.35, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0)
+
+SURROGATE_RUN_NAME = "surrogate"
+
+
+# --------------------------------------------------
+#   Dataclasses
+# --------------------------------------------------
+
+@dataclasses.dataclass(frozen=True)
+class SurrogatePredictionData:
+    mean: np.ndarray
+    # Stores the standard deviation of the prediction, in the units of the result
+    std: np.ndarray
+
+
+# --------------------------------------------------
+#   Classes
+# --------------------------------------------------
+
+class GaussianProcessSurrogate:
+    """ Gaussian process over the per-point results of a sweep.
+
+    Each parameter is scaled by its training range and each result is standardised, and every result shares one
+    squared exponential kernel whose length scale maximises the summed marginal likelihood. Everything a query needs
+    is precomputed by `fit`, so a prediction is a handful of small matrix products.
+    """
+
+    def __init__(
+            self,
+            parameter_names: list[str],
+            result_keys: list[str],
+            noise: float = DEFAULT_SURROGATE_NOISE,
+            length_scales: tuple[float, ...] = DEFAULT_SURROGATE_LENGTH_SCALES,
+    ) -> None:
+        self.parameter_names = list(parameter_names)
+        self.result_keys = list(result_keys)
+        self.noise = noise
+        self.length_scales = length_scales
+
+        self.length_scale: float | None = None
+        self._x_offset = None
+        self._x_scale = None
+        self._y_offset = None
+        self._y_scale = None
+        self._training_points = None
+        self._weights = None
+        self._inverse_covariance = None
+        self._signal_variances = None
+
+    @property
+    def num_points(self) -> int:
+        return 0 if self._training_points is None else len(self._training_points)
+
+    def fit(
+            self,
+            parameters_data: np.ndarray,
+            results_data: np.ndarray,
+    ) -> "GaussianProcessSurrogate":
+        parameters_data = np.asarray(parameters_data, dtype=np.float64).reshape(-1, len(self.parameter_names))
+        results_data = np.asarray(results_data, dtype=np.float64).reshape(-1, len(self.result_keys))
+        if len(parameters_data) == 0:
+            raise ValueError("A surrogate needs at least one training point")
+
+        # Parameters that do not vary in the training data are scaled by 1, so they neither divide by zero nor
+        # dominate the distance
+        self._x_offset = parameters_data.min(axis=0)
+        self._x_scale = np.ptp(parameters_data, axis=0)
+        self._x_scale[self._x_scale == 0] = 1.0
+        self._y_offset = results_data.mean(axis=0)
+        self._y_scale = results_data.std(axis=0)
+        self._y_scale[self._y_scale == 0] = 1.0
+
+        training_points = (parameters_data - self._x_offset) / self._x_scale
+        standardised_results = (results_data - self._y_offset) / self._y_scale
+        squared_distances = _get_squared_distances(training_points, training_points)
+
+        best_fit = None
+        for length_scale in self.length_scales:
+            fit = _fit_kernel(squared_distances, standardised_results, length_scale, self.noise)
+            if fit is not None and (best_fit is None or fit[0] > best_fit[0]):
+                best_fit = fit
+                self.length_scale = length_scale
+
+        if best_fit is None:
+            raise ValueError("The surrogate kernel could not be factorised for any length scale")
+
+        _, self._weights, self._inverse_covariance, self._signal_variances = best_fit
+
+        self._training_points = training_points
+        return self
+
+    def predict(
+            self,
+            parameters: ParametersType | dict | list[ParametersType | dict] | np.ndarray,
+    ) -> dict[str, SurrogatePredictionData]:
+        if self._training_points is None:
+            raise RuntimeError("The surrogate has not been fitted")
+
+        query_points = (self._get_parameters_matrix(parameters) - self._x_offset) / self._x_scale
+        cross_covariance = np.exp(
+            -0.5 * _get_squared_distances(query_points, self._training_points) / self.length_scale ** 2
+        )
+
+        means = cross_covariance @ self._weights
+        explained_variances = np.einsum(
+            "ij,jk,ik->i", cross_covariance, self._inverse_covariance, cross_covariance
+        )
+        unit_variances = np.clip(1.0 - explained_variances, 0.0, None)
+
+        return {
+            result_key: SurrogatePredictionData(
+                mean=means[:, i] * self._y_scale[i] + self._y_offset[i],
+                std=np.sqrt(unit_variances * self._signal_variances[i]) * self._y_scale[i],
+            )
+            for i, result_key in enumerate(self.result_keys)
+        }
+
+    def _get_parameters_matrix(
+            self,
+            parameters: ParametersType | dict | list[ParametersType | dict] | np.ndarray,
+    ) -> np.ndarray:
+        if isinstance(parameters, np.ndarray):
+            return parameters.astype(np.float64, copy=False).reshape(-1, len(self.parameter_names))
+        if not isinstance(parameters, list):
+            parameters = [parameters]
+
+        return np.array([
+            [
+                point_parameters[name] if isinstance(point_parameters, dict) else getattr(point_parameters, name)
+                for name in self.parameter_names
+            ]
+            for point_parameters in parameters
+        ], dtype=np.float64)
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def fit_result_surrogate(
+        simulation_type: SimulationType,
+        parameter_results: pd.DataFrame | dict[str, pd.DataFrame],
+        result_keys: list[str],
+        parameter_names: list[str] | None = None,
+        noise: float = DEFAULT_SURROGATE_NOISE,
+) -> GaussianProcessSurrogate:
+    # Accepts the results of one sweep, or every sweep of a run as returned by process_simulation_outputs, whose
+    # shared points are only used once
+    simulation_type = SimulationType(simulation_type)
+    if isinstance(parameter_results, dict):
+        parameter_results = pd.concat(list(parameter_results.values()), ignore_index=True)
+    if POINT_HASH_FIELD_NAME in parameter_results.columns:
+        parameter_results = parameter_results.drop_duplicates(subset=POINT_HASH_FIELD_NAME)
+    parameter_results = parameter_results.dropna(subset=result_keys)
+
+    if parameter_names is None:
+        parameter_names = _get_varied_parameter_names(
+            parameters_type=get_parameters_type(simulation_type),
+            parameters_data=parameter_results,
+        )
+
+    surrogate = GaussianProcessSurrogate(
+        parameter_names=parameter_names,
+        result_keys=result_keys,
+        noise=noise,
+    )
+    return surrogate.fit(
+        parameters_data=parameter_results[parameter_names].to_numpy(),
+        results_data=parameter_results[result_keys].to_numpy(),
+    )
+
+
+def refine_result_surrogate(
+        simulation_type: SimulationType,
+        source_file_path: str | Path,
+        output_field_mapping: OutputFieldsType,
+        candidate_parameters_collection: list[ParametersType],
+        result_keys: list[str],
+        tolerances: float | dict[str, float],
+        parameter_results: pd.DataFrame | None = None,
+        batch_size: int = 1,
+        max_simulations: int | None = None,
+        ltspice_executable_file_path: str = DEFAULT_LTSPICE_EXECUTABLE_FILE_PATH,
+        execution_policy: ExecutionPolicyData | None = None,
+        verbose: bool = False,
+) -> tuple[GaussianProcessSurrogate, pd.DataFrame]:
+    # Repeatedly fits the surrogate and simulates the candidates whose predicted uncertainty exceeds the tolerance
+    # of any result, most uncertain first, until every candidate is within tolerance or the budget is spent
+    simulation_type = SimulationType(simulation_type)
+    if not isinstance(tolerances, dict):
+        tolerances = {result_key: tolerances for result_key in result_keys}
+
+    parameter_names = _get_varied_parameter_names(
+        parameters_type=get_parameters_type(simulation_type),
+        parameters_data=pd.DataFrame([dataclasses.asdict(parameters) for parameters in candidate_parameters_collection]),
+    )
+
+    if parameter_results is None:
+        parameter_results = pd.DataFrame()
+    attempted_point_hashes = set(parameter_results.get(POINT_HASH_FIELD_NAME, []))
+    candidates = [
+        parameters for parameters in candidate_parameters_collection
+        if dataclass_hash(parameters) not in attempted_point_hashes
+    ]
+
+    num_simulations = 0
+    surrogate = None
+    while candidates:
+        if max_simulations is not None and num_simulations >= max_simulations:
+            break
+
+        num_selected = batch_size
+        if max_simulations is not None:
+            num_selected = min(num_selected, max_simulations - num_simulations)
+
+        if len(parameter_results) < 2:
+            # Too few points to fit anything, so the first batch is spread across the candidates instead
+            selected_positions = _select_space_filling_positions(
+                points=np.array([[getattr(parameters, name) for name in parameter_names] for parameters in candidates]),
+                count=max(num_selected, 2 - len(parameter_results)),
+            )
+        else:
+            surrogate = fit_result_surrogate(
+                simulation_type=simulation_type,
+                parameter_results=parameter_results,
+                result_keys=result_keys,
+                parameter_names=parameter_names,
+            )
+            predictions = surrogate.predict(candidates)
+            uncertainty_ratios = np.max([
+                predictions[result_key].std / tolerances[result_key] for result_key in result_keys
+            ], axis=0)
+
+            selected_positions = [
+                position for position in np.argsort(-uncertainty_ratios)[:num_selected]
+                if uncertainty_ratios[position] > 1.0
+            ]
+            if not selected_positions:
+                break
+
+        selected_positions = set(selected_positions)
+        selected_parameters = [candidates[position] for position in sorted(selected_positions)]
+        candidates = [
+            parameters for position, parameters in enumerate(candidates) if position not in selected_positions
+        ]
+        num_simulations += len(selected_parameters)
+
+        verbose_print(verbose, f"Simulating {len(selected_parameters)} point(s), {len(candidates)} candidate(s) left")
+
+        # Points that fail and are skipped by the execution policy are simply left out of the training data
+        parameter_outputs = simulate(
+            simulation_type=simulation_type,
+            source_file_path=source_file_path,
+            output_field_mapping=output_field_mapping,
+            input_parameters_collection=selected_parameters,
+            ltspice_executable_file_path=ltspice_executable_file_path,
+            execution_policy=execution_policy,
+            verbose=verbose,
+        )
+        if not parameter_outputs:
+            continue
+
+        per_run_results = process_simulation_outputs(
+            per_run_outputs={SURROGATE_RUN_NAME: {SURROGATE_RUN_NAME: parameter_outputs}},
+            selected_results=result_keys,
+            simulation_type=simulation_type,
+        )
+        parameter_results = pd.concat(
+            [parameter_results, per_run_results[SURROGATE_RUN_NAME][SURROGATE_RUN_NAME]],
+            ignore_index=True,
+        )
+
+    if surrogate is None or surrogate.num_points != len(parameter_results):
+        surrogate = fit_result_surrogate(
+            simulation_type=simulation_type,
+            parameter_results=parameter_results,
+            result_keys=result_keys,
+            parameter_names=parameter_names,
+        )
+
+    return surrogate, parameter_results
+
+
+def _fit_kernel(
+        squared_distances: np.ndarray,
+        standardised_results: np.ndarray,
+        length_scale: float,
+        noise: float,
+) -> tuple[float, np.ndarray, np.ndarray, np.ndarray] | None:
+    num_points = len(squared_distances)
+    covariance = np.exp(-0.5 * squared_distances / length_scale ** 2)
+    covariance[np.diag_indices(num_points)] += noise
+
+    try:
+        cholesky_factor = np.linalg.cholesky(covariance)
+    except np.linalg.LinAlgError:
+        return None
+
+    inverse_cholesky_factor = np.linalg.solve(cholesky_factor, np.eye(num_points))
+    inverse_covariance = inverse_cholesky_factor.T @ inverse_cholesky_factor
+    weights = inverse_covariance @ standardised_results
+
+    # The signal variance of each result has a closed form maximum, so only the length scale is searched
+    signal_variances = np.maximum(np.einsum("ij,ij->j", standardised_results, weights) / num_points, 1e-12)
+    log_likelihood = np.sum(
+        -0.5 * num_points * np.log(signal_variances) - np.sum(np.log(np.diag(cholesky_factor)))
+    )
+
+    return log_likelihood, weights, inverse_covariance, signal_variances
+
+
+def _get_squared_distances(points_a: np.ndarray, points_b: np.ndarray) -> np.ndarray:
+    squared_distances = (
+        np.sum(points_a ** 2, axis=1)[:, None]
+        + np.sum(points_b ** 2, axis=1)[None, :]
+        - 2.0 * points_a @ points_b.T
+    )
+    return np.maximum(squared_distances, 0.0)
+
+
+def _get_varied_parameter_names(
+        parameters_type: type[ParametersType],
+        parameters_data: pd.DataFrame,
+) -> list[str]:
+    return [
+        field.name for field in dataclasses.fields(parameters_type)
+        if field.name in parameters_data.columns and parameters_data[field.name].nunique() > 1
+    ]
+
+
+def _select_space_filling_positions(points: np.ndarray, count: int) -> list[int]:
+    # Greedy maximin: starts from the first point and repeatedly adds the point farthest from those chosen
+    points_range = np.ptp(points, axis=0)
+    points = (points - points.min(axis=0)) / np.where(points_range == 0, 1.0, points_range)
+
+    positions = [0]
+    min_squared_distances = _get_squared_distances(points, points[:1])[:, 0]
+    while len(positions) < min(count, len(points)):
+        position = int(np.argmax(min_squared_distances))
+        positions.append(position)
+        min_squared_distances = np.minimum(
+            min_squared_distances,
+            _get_squared_distances(points, points[position:position + 1])[:, 0],
+        )
+
+    return positions
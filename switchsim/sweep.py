@@ -0,0 +1,157 @@
+""" Parameter Sweep Generation Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import enum
+import math
+import functools
+import dataclasses
+
+import numpy as np
+
+from .spice import *
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "SWEEP_VALUE_SIGNIFICANT_DIGITS",
+    "SweepMode",
+    "SweptParameterData",
+    "canonicalize_sweep_value",
+    "canonicalize_parameters",
+    "get_sweep_values",
+    "get_swept_parameters",
+]
+
+
+# --------------------------------------------------
+#   Enums
+# --------------------------------------------------
+
+class SweepMode(enum.StrEnum):
+    # Stores start, start + step, ... up to but excluding end
+    STEP = "step"
+    # Stores evenly spaced values from start to end inclusive, given either num_points or a step that lands on end
+    LINSPACE = "linspace"
+    # Stores num_points logarithmically spaced values per decade or octave from start up to end inclusive
+    DECADE = "dec"
+    OCTAVE = "oct"
+    # Stores the explicitly listed values
+    LIST = "list"
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+# Stores the significant digits kept by every generated value, so the same sweep always hashes the same
+SWEEP_VALUE_SIGNIFICANT_DIGITS = 12
+
+# Stores how close, in steps, a value has to be to the end point to be treated as landing on it
+SWEEP_ENDPOINT_TOLERANCE = 1e-9
+
+
+# --------------------------------------------------
+#   Dataclasses
+# --------------------------------------------------
+
+@dataclasses.dataclass(frozen=True)
+class SweptParameterData:
+    start: float | None = None
+    end: float | None = None
+    step: float | None = None
+    mode: SweepMode = SweepMode.STEP
+    # Stores the total number of points of a linspace sweep, or the number of points per decade or octave
+    num_points: int | None = None
+    values: tuple[float, ...] | None = None
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def canonicalize_sweep_value(value: float) -> float:
+    # Rounding to a fixed number of significant digits removes the last-bit noise of the float arithmetic, and
+    # converting to a builtin float keeps numpy scalars out of the parameters
+    return float(f"{value:.{SWEEP_VALUE_SIGNIFICANT_DIGITS}g}")
+
+
+@functools.lru_cache(maxsize=128)
+def canonicalize_parameters(parameters: ParametersType) -> ParametersType:
+    return dataclasses.replace(parameters, **{
+        field.name: canonicalize_sweep_value(getattr(parameters, field.name))
+        for field in dataclasses.fields(parameters)
+        if isinstance(getattr(parameters, field.name), (int, float))
+    })
+
+
+def get_sweep_values(swept_parameter_data: SweptParameterData) -> list[float]:
+    mode = SweepMode(swept_parameter_data.mode)
+    start = swept_parameter_data.start
+    end = swept_parameter_data.end
+    step = swept_parameter_data.step
+    num_points = swept_parameter_data.num_points
+
+    # Every value is computed from its index rather than accumulated, so the error never grows along the sweep
+    if mode == SweepMode.LIST:
+        if swept_parameter_data.values is None:
+            raise ValueError("A list sweep needs values")
+        values = swept_parameter_data.values
+    elif mode == SweepMode.STEP:
+        _check_sweep_fields(mode, start=start, end=end, step=step)
+        if step <= 0:
+            raise ValueError(f"A {mode} sweep needs a positive step, got {step}")
+        num_steps = math.ceil((end - start) / step - SWEEP_ENDPOINT_TOLERANCE)
+        values = start + step * np.arange(max(num_steps, 0))
+    elif mode == SweepMode.LINSPACE:
+        _check_sweep_fields(mode, start=start, end=end)
+        if num_points is None:
+            _check_sweep_fields(mode, step=step)
+            if step == 0:
+                raise ValueError(f"A {mode} sweep needs a non-zero step, got {step}")
+            num_intervals = (end - start) / step
+            if num_intervals < 0:
+                raise ValueError(f"A {mode} sweep needs a step towards the end {end} from {start}, got {step}")
+            if abs(num_intervals - round(num_intervals)) > SWEEP_ENDPOINT_TOLERANCE * max(abs(num_intervals), 1):
+                raise ValueError(f"The end {end} is not on the grid of step {step} from {start}")
+            num_points = round(num_intervals) + 1
+        elif num_points < 1:
+            raise ValueError(f"A {mode} sweep needs at least one point, got {num_points}")
+        values = np.linspace(start, end, num_points)
+    else:
+        _check_sweep_fields(mode, start=start, end=end, num_points=num_points)
+        if start <= 0 or end < start:
+            raise ValueError(f"A {mode} sweep needs 0 < start <= end, got {start} and {end}")
+        if num_points < 1:
+            raise ValueError(f"A {mode} sweep needs at least one point per {mode}, got {num_points}")
+        base = 10.0 if mode == SweepMode.DECADE else 2.0
+        num_steps = math.floor(math.log(end / start, base) * num_points + SWEEP_ENDPOINT_TOLERANCE)
+        values = start * base ** (np.arange(num_steps + 1) / num_points)
+
+    return [canonicalize_sweep_value(value) for value in values]
+
+
+def get_swept_parameters(
+        default_parameters: ParametersType,
+        swept_parameter: str,
+        swept_parameter_data: SweptParameterData,
+) -> list[ParametersType]:
+    # Each point only replaces the swept field of the canonical defaults, instead of rebuilding every field
+    base_parameters = canonicalize_parameters(default_parameters)
+    return [
+        dataclasses.replace(base_parameters, **{swept_parameter: value})
+        for value in get_sweep_values(swept_parameter_data)
+    ]
+
+
+def _check_sweep_fields(mode: SweepMode, **fields) -> None:
+    missing_fields = [name for name, value in fields.items() if value is None]
+    if missing_fields:
+        raise ValueError(f"A {mode} sweep needs {', '.join(missing_fields)}")
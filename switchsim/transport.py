@@ -0,0 +1,170 @@
+""" Waveform Transport Module
+
+"""
+
+# --------------------------------------------------
+#   Imports
+# --------------------------------------------------
+
+import os
+import errno
+import uuid
+import shutil
+import tempfile
+import dataclasses
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "WaveformDescriptorData",
+    "WaveformTransport",
+    "get_default_transport_directory_path",
+    "export_waveform",
+    "import_waveform",
+]
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+# Stores the memory backed file system preferred for the transport files, where available
+SHARED_MEMORY_DIRECTORY_PATH = Path("/dev/shm")
+
+TRANSPORT_DIRECTORY_PREFIX = "switchsim-transport-"
+TRANSPORT_FILE_SUFFIX = ".block"
+
+# Stores the share of the free space a block may take before it is written to the fallback directory instead,
+# leaving room for the blocks of the other workers
+TRANSPORT_MAX_FREE_SPACE_FRACTION = 0.5
+
+
+# --------------------------------------------------
+#   Dataclasses
+# --------------------------------------------------
+
+@dataclasses.dataclass(frozen=True)
+class WaveformDescriptorData:
+    file_path: str
+    # Stores the (fields, points) shape of the block, with one contiguous row per field
+    shape: tuple[int, int]
+    dtype: str
+    columns: tuple[str, ...]
+    # Stores the waveform's attrs, such as the start of a windowed transient
+    attrs: dict = dataclasses.field(default_factory=dict)
+
+
+# --------------------------------------------------
+#   Classes
+# --------------------------------------------------
+
+class WaveformTransport:
+    """ Hands standardised waveforms from worker processes to the parent without pickling them.
+
+    A worker writes each waveform block once into a file in the transport directory, which lives in memory backed
+    storage where the platform has it, and only returns its small descriptor. The parent maps the file and views it
+    as a DataFrame, so the samples are never copied through a pipe. Blocks that do not fit in the free space of the
+    transport directory, such as a container's small /dev/shm, are written to the fallback directory on disk.
+    """
+
+    def __init__(
+            self,
+            directory_path: str | Path | None = None,
+            fallback_directory_path: str | Path | None = None,
+    ) -> None:
+        if directory_path is None:
+            directory_path = get_default_transport_directory_path()
+        if fallback_directory_path is None:
+            fallback_directory_path = tempfile.gettempdir()
+
+        self.directory_path = Path(tempfile.mkdtemp(prefix=TRANSPORT_DIRECTORY_PREFIX, dir=directory_path))
+        self.fallback_directory_path = None
+        if Path(fallback_directory_path).resolve() != Path(directory_path).resolve():
+            self.fallback_directory_path = Path(
+                tempfile.mkdtemp(prefix=TRANSPORT_DIRECTORY_PREFIX, dir=fallback_directory_path)
+            )
+
+    def __enter__(self) -> "WaveformTransport":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        # Files that are still mapped can not be removed on Windows, and are left to the temporary directory
+        shutil.rmtree(self.directory_path, ignore_errors=True)
+        if self.fallback_directory_path is not None:
+            shutil.rmtree(self.fallback_directory_path, ignore_errors=True)
+
+
+# --------------------------------------------------
+#   Functions
+# --------------------------------------------------
+
+def get_default_transport_directory_path() -> Path:
+    if SHARED_MEMORY_DIRECTORY_PATH.is_dir() and os.access(SHARED_MEMORY_DIRECTORY_PATH, os.W_OK):
+        return SHARED_MEMORY_DIRECTORY_PATH
+    return Path(tempfile.gettempdir())
+
+
+def export_waveform(
+        waveform_data: pd.DataFrame,
+        transport_directory_path: str | Path,
+        fallback_directory_path: str | Path | None = None,
+) -> WaveformDescriptorData:
+    # A standardised waveform is already a view of a (fields, points) block, in which case the transpose below is
+    # the block itself and is written out without an intermediate copy
+    block = np.ascontiguousarray(waveform_data.to_numpy(dtype=np.float64).T)
+
+    file_name = f"{uuid.uuid4()}{TRANSPORT_FILE_SUFFIX}"
+    file_path = Path(transport_directory_path) / file_name
+    if fallback_directory_path is not None:
+        free_space = shutil.disk_usage(transport_directory_path).free
+        if block.nbytes > free_space * TRANSPORT_MAX_FREE_SPACE_FRACTION:
+            file_path = Path(fallback_directory_path) / file_name
+
+    try:
+        block.tofile(file_path)
+    except OSError as error:
+        # Other workers may fill the transport directory between the check and the write
+        file_path.unlink(missing_ok=True)
+        is_fallback = fallback_directory_path is None or file_path.parent == Path(fallback_directory_path)
+        if error.errno != errno.ENOSPC or is_fallback:
+            raise
+        file_path = Path(fallback_directory_path) / file_name
+        block.tofile(file_path)
+
+    return WaveformDescriptorData(
+        file_path=str(file_path),
+        shape=block.shape,
+        dtype=block.dtype.str,
+        columns=tuple(waveform_data.columns),
+        attrs=dict(waveform_data.attrs),
+    )
+
+
+def import_waveform(descriptor: WaveformDescriptorData) -> pd.DataFrame:
+    # The mapping is copy-on-write, so the DataFrame can be modified without touching the file. Once mapped, the
+    # file is unlinked and its memory is released with the last view of the DataFrame
+    if 0 in descriptor.shape:
+        os.remove(descriptor.file_path)
+        waveform_data = pd.DataFrame(np.empty(descriptor.shape[::-1]), columns=list(descriptor.columns))
+        waveform_data.attrs.update(descriptor.attrs)
+        return waveform_data
+
+    block = np.memmap(descriptor.file_path, dtype=np.dtype(descriptor.dtype), mode="c", shape=descriptor.shape)
+    try:
+        os.remove(descriptor.file_path)
+    except OSError:
+        pass
+
+    waveform_data = pd.DataFrame(block.T, columns=list(descriptor.columns), copy=False)
+    waveform_data.attrs.update(descriptor.attrs)
+    return waveform_data
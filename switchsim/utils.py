@@ -6,6 +6,8 @@
 #   Imports
 # --------------------------------------------------
 
+import json
+import hashlib
 import dataclasses
 from pathlib import Path
 
@@ -16,6 +18,8 @@ from pathlib import Path
 
 __all__ = [
     "dataclass_to_dict",
+    "dataclass_hash",
+    "dict_hash",
     "verbose_print",
     "delete_files_with_same_name",
 ]
@@ -39,6 +43,17 @@ def dataclass_to_dict(dataclass) -> dict:
     return {**data, **properties}
 
 
+def dataclass_hash(dataclass) -> str:
+    # Canonical hash of the dataclass fields, stable across processes and field ordering
+    return dict_hash(dataclasses.asdict(dataclass))
+
+
+def dict_hash(data: dict) -> str:
+    # Same hash as dataclass_hash, for fields that were saved as a dictionary
+    data = json.dumps(data, sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+
 def verbose_print(is_verbose: bool, *args, **kwargs) -> None:
     if is_verbose:
         print(*args, **kwargs)
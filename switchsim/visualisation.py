@@ -6,10 +6,55 @@
 #   Imports
 # --------------------------------------------------
 
+import functools
 import itertools
 import dataclasses
+import concurrent.futures
+from pathlib import Path
+
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from .fields import *
+from .pyramid import *
+from .spice import *
+
+
+# --------------------------------------------------
+#   Exports
+# --------------------------------------------------
+
+__all__ = [
+    "FIGURE_FILE_FORMATS",
+    "SubplotData",
+    "ResultPlotData",
+    "EnvelopePlotData",
+    "VerticalSubplotsRenderer",
+    "plot_vertical_subplots",
+    "plot_parameter_results",
+    "plot_waveform_envelopes",
+    "render_vertical_subplots",
+    "render_parameter_results",
+    "render_results_tree",
+    "default_waveform_plot_fields",
+]
+
+
+# --------------------------------------------------
+#   Constants
+# --------------------------------------------------
+
+FIGURE_FILE_FORMATS = ("png", "svg")
+
+VERTICAL_SUBPLOT_HEIGHT = 5
+VERTICAL_SUBPLOTS_WIDTH = 10
+PARAMETER_RESULTS_FIGURE_SIZE = (10, 6)
+DEFAULT_FIGURE_DPI = 100
+
+RESULTS_FIGURES_DIRECTORY_NAME = "results"
+WAVEFORMS_FIGURES_DIRECTORY_NAME = "waveforms"
 
 
 # --------------------------------------------------
@@ -34,6 +79,67 @@ class ResultPlotData:
     linestyle: str | None = None
 
 
+@dataclasses.dataclass(frozen=True)
+class EnvelopePlotData:
+    label: str
+    color: str
+    pyramid: WaveformPyramidData
+    field: str
+    # Stores the raw waveform, drawn once the view is zoomed in beyond the finest pyramid level
+    waveform_data: pd.DataFrame | None = None
+
+
+# --------------------------------------------------
+#   Classes
+# --------------------------------------------------
+
+class VerticalSubplotsRenderer:
+    """ Off-screen renderer for a stack of subplots sharing the x-axis.
+
+    The figure and its lines are created on the first render. Later renders with the same number of subplots only
+    swap the line data and labels, which is much cheaper than building a new figure for every point of a sweep.
+    """
+
+    def __init__(
+            self,
+            num_subplots: int,
+            dpi: int = DEFAULT_FIGURE_DPI,
+    ) -> None:
+        # The figure is bound to an Agg canvas directly, so nothing touches the pyplot state or a display
+        self.figure = Figure(figsize=(VERTICAL_SUBPLOTS_WIDTH, VERTICAL_SUBPLOT_HEIGHT * num_subplots), dpi=dpi)
+        FigureCanvasAgg(self.figure)
+        self.axes = list(self.figure.subplots(num_subplots, 1, sharex=True, squeeze=False)[:, 0])
+        self._lines = []
+
+    @property
+    def num_pixels(self) -> int:
+        return int(self.figure.get_figwidth() * self.figure.dpi)
+
+    def render(self, subplots_data: list[SubplotData]) -> Figure:
+        if len(subplots_data) != len(self.axes):
+            raise ValueError(f"Expected {len(self.axes)} subplots, got {len(subplots_data)}")
+
+        if not self._lines:
+            self._lines = _draw_vertical_subplots(self.axes, subplots_data)
+            self.figure.tight_layout()
+            return self.figure
+
+        for ax, line, subplot_data in zip(self.axes, self._lines, subplots_data):
+            line.set_data(subplot_data.xdata, subplot_data.ydata)
+            line.set_label(subplot_data.label)
+            line.set_color(subplot_data.color)
+            ax.set_title(subplot_data.title)
+            ax.set_ylabel(subplot_data.ylabel)
+            ax.relim()
+            ax.autoscale_view()
+            ax.legend()
+
+        return self.figure
+
+    def save(self, file_path: str | Path) -> None:
+        self.figure.savefig(file_path)
+
+
 # --------------------------------------------------
 #   Functions
 # --------------------------------------------------
@@ -41,30 +147,208 @@ class ResultPlotData:
 def plot_vertical_subplots(
         subplots_data: list[SubplotData],
 ) -> None:
-    if len(subplots_data) != 2:
-        raise NotImplementedError()
+    fig, ax = plt.subplots(
+        len(subplots_data), 1,
+        figsize=(VERTICAL_SUBPLOTS_WIDTH, VERTICAL_SUBPLOT_HEIGHT * len(subplots_data)),
+        sharex=True,
+        squeeze=False,
+    )
+    _draw_vertical_subplots(list(ax[:, 0]), subplots_data)
+
+    # Adjust layout
+    plt.tight_layout()
+    plt.show()
+
+
+def plot_parameter_results(
+        results: dict[str, dict[str, pd.DataFrame]],
+        parameter: str,
+        per_result_plot_data: dict[str, ResultPlotData],
+        title: str,
+        xlabel: str,
+        ylabel: str,
+        y_multiplier: float = 1,
+) -> None:
+    fig, ax = plt.subplots(figsize=PARAMETER_RESULTS_FIGURE_SIZE)
+    _draw_parameter_results(
+        ax=ax,
+        results=results,
+        parameter=parameter,
+        per_result_plot_data=per_result_plot_data,
+        title=title,
+        xlabel=xlabel,
+        ylabel=ylabel,
+        y_multiplier=y_multiplier,
+    )
+    plt.tight_layout()
+
+    plt.show()
+
+
+def plot_waveform_envelopes(
+        ax: plt.Axes,
+        envelopes_plot_data: list[EnvelopePlotData],
+) -> list[plt.Line2D]:
+    # Each line draws the pyramid level matching the axis width, and is redrawn from a finer or coarser level
+    # whenever the visible time range changes, so zooming only ever draws about two points per pixel
+    def get_envelope(envelope_plot_data: EnvelopePlotData, x_range: tuple[float, float] | None):
+        return get_pyramid_envelope(
+            pyramid=envelope_plot_data.pyramid,
+            field=envelope_plot_data.field,
+            num_pixels=max(int(ax.get_window_extent().width), 1),
+            x_range=x_range,
+            waveform_data=envelope_plot_data.waveform_data,
+        )
+
+    lines = []
+    for envelope_plot_data in envelopes_plot_data:
+        line, = ax.plot(
+            *get_envelope(envelope_plot_data, None),
+            label=envelope_plot_data.label,
+            color=envelope_plot_data.color,
+        )
+        lines.append(line)
+
+    def on_xlim_changed(changed_ax: plt.Axes) -> None:
+        x_range = changed_ax.get_xlim()
+        for line, envelope_plot_data in zip(lines, envelopes_plot_data):
+            line.set_data(*get_envelope(envelope_plot_data, x_range))
 
-    fig, ax = plt.subplots(2, 1, figsize=(10, 10), sharex=True)
-    for i, subplot_data in enumerate(subplots_data):
-        ax[i].plot(
+    ax.callbacks.connect("xlim_changed", on_xlim_changed)
+
+    return lines
+
+
+def render_vertical_subplots(
+        subplots_data: list[SubplotData],
+        dpi: int = DEFAULT_FIGURE_DPI,
+) -> Figure:
+    renderer = VerticalSubplotsRenderer(num_subplots=len(subplots_data), dpi=dpi)
+    return renderer.render(subplots_data)
+
+
+def render_parameter_results(
+        results: dict[str, dict[str, pd.DataFrame]],
+        parameter: str,
+        per_result_plot_data: dict[str, ResultPlotData],
+        title: str,
+        xlabel: str,
+        ylabel: str,
+        y_multiplier: float = 1,
+        dpi: int = DEFAULT_FIGURE_DPI,
+) -> Figure:
+    figure = Figure(figsize=PARAMETER_RESULTS_FIGURE_SIZE, dpi=dpi)
+    FigureCanvasAgg(figure)
+    _draw_parameter_results(
+        ax=figure.subplots(),
+        results=results,
+        parameter=parameter,
+        per_result_plot_data=per_result_plot_data,
+        title=title,
+        xlabel=xlabel,
+        ylabel=ylabel,
+        y_multiplier=y_multiplier,
+    )
+    figure.tight_layout()
+
+    return figure
+
+
+def render_results_tree(
+        simulation_type: SimulationType,
+        results_directory_path: str | Path,
+        figures_directory_path: str | Path,
+        output_directory_path: str | Path | None = None,
+        waveform_fields: tuple[str, ...] | None = None,
+        file_format: str = "png",
+        max_workers: int | None = None,
+) -> list[Path]:
+    # Renders one figure per (swept parameter, result) comparing every run, and, when the simulation outputs are
+    # given, one waveform figure per point. Each task is rendered headless in a worker process and the waveform
+    # tasks cover a whole sweep, so every worker reuses one figure across the points of that sweep
+    simulation_type = SimulationType(simulation_type)
+    if file_format not in FIGURE_FILE_FORMATS:
+        raise ValueError(f"Unsupported figure format '{file_format}', expected one of {FIGURE_FILE_FORMATS}")
+    if waveform_fields is None:
+        waveform_fields = default_waveform_plot_fields[simulation_type.value]
+
+    results_directory_path = Path(results_directory_path)
+    figures_directory_path = Path(figures_directory_path)
+
+    # The tasks only carry paths and names, so nothing large is pickled to the workers
+    swept_parameters = sorted({
+        swept_parameter_directory.name
+        for run_directory in results_directory_path.iterdir() if run_directory.is_dir()
+        for swept_parameter_directory in run_directory.iterdir() if swept_parameter_directory.is_dir()
+    })
+    tasks = [
+        (
+            _render_parameter_results_task,
+            simulation_type,
+            results_directory_path,
+            swept_parameter,
+            figures_directory_path / RESULTS_FIGURES_DIRECTORY_NAME / swept_parameter,
+            file_format,
+        )
+        for swept_parameter in swept_parameters
+    ]
+
+    if output_directory_path is not None:
+        from .dataset import open_simulation_output_dataset
+
+        dataset = open_simulation_output_dataset(
+            output_directory_path=output_directory_path,
+            simulation_type=simulation_type,
+        )
+        tasks.extend(
+            (
+                _render_waveform_sweep_task,
+                simulation_type,
+                Path(output_directory_path),
+                run_name,
+                swept_parameter,
+                waveform_fields,
+                figures_directory_path / WAVEFORMS_FIGURES_DIRECTORY_NAME / run_name / swept_parameter,
+                file_format,
+            )
+            for run_name in dataset.run_names
+            for swept_parameter in dataset.get_swept_parameters(run_name)
+        )
+
+    figure_file_paths = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(*task) for task in tasks]
+        for future in futures:
+            figure_file_paths.extend(future.result())
+
+    return figure_file_paths
+
+
+def _draw_vertical_subplots(
+        axes: list[plt.Axes],
+        subplots_data: list[SubplotData],
+) -> list[plt.Line2D]:
+    lines = []
+    for ax, subplot_data in zip(axes, subplots_data):
+        line, = ax.plot(
             subplot_data.xdata,
             subplot_data.ydata,
             label=subplot_data.label,
             color=subplot_data.color,
         )
-        ax[i].set_title(subplot_data.title)
+        lines.append(line)
+        ax.set_title(subplot_data.title)
         if subplot_data.xlabel is not None:
-            ax[i].set_xlabel(subplot_data.xlabel)
-        ax[i].set_ylabel(subplot_data.ylabel)
-        ax[i].grid(True)
-        ax[i].legend()
+            ax.set_xlabel(subplot_data.xlabel)
+        ax.set_ylabel(subplot_data.ylabel)
+        ax.grid(True)
+        ax.legend()
 
-    # Adjust layout
-    plt.tight_layout()
-    plt.show()
+    return lines
 
 
-def plot_parameter_results(
+def _draw_parameter_results(
+        ax: plt.Axes,
         results: dict[str, dict[str, pd.DataFrame]],
         parameter: str,
         per_result_plot_data: dict[str, ResultPlotData],
@@ -74,13 +358,14 @@ def plot_parameter_results(
         y_multiplier: float = 1,
 ) -> None:
     # Plot the total energy loss vs. DC link voltage for both devices
-    plt.figure(figsize=(10, 6))
     color_cycle = itertools.cycle(plt.rcParams['axes.prop_cycle'].by_key()['color'])
     for device_key, per_parameter_results in results.items():
+        if parameter not in per_parameter_results:
+            continue
         parameter_results = per_parameter_results[parameter]
         color = next(color_cycle)
         for result_key, result_plot_data in per_result_plot_data.items():
-            plt.plot(
+            ax.plot(
                 parameter_results[parameter],
                 parameter_results[result_key] * y_multiplier,
                 marker=result_plot_data.marker,
@@ -89,11 +374,112 @@ def plot_parameter_results(
                 linestyle=result_plot_data.linestyle,
             )
 
-    plt.title(title)
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.legend()
+    ax.grid(True)
 
-    plt.show()
+
+def _render_parameter_results_task(
+        simulation_type: SimulationType,
+        results_directory_path: Path,
+        swept_parameter: str,
+        figures_directory_path: Path,
+        file_format: str,
+) -> list[Path]:
+    from .simulation import load_simulation_results
+
+    per_run_results = load_simulation_results(output_directory_path=results_directory_path)
+
+    # Every column that is neither an input parameter nor the point hash is a computed result
+    non_result_columns = {field.name for field in dataclasses.fields(get_parameters_type(simulation_type))}
+    non_result_columns.add(POINT_HASH_FIELD_NAME)
+    result_keys = list(dict.fromkeys(
+        column
+        for per_parameter_results in per_run_results.values()
+        if swept_parameter in per_parameter_results
+        for column in per_parameter_results[swept_parameter].columns
+        if column not in non_result_columns
+    ))
+
+    figures_directory_path.mkdir(parents=True, exist_ok=True)
+
+    figure_file_paths = []
+    for result_key in result_keys:
+        figure = render_parameter_results(
+            results=per_run_results,
+            parameter=swept_parameter,
+            per_result_plot_data={result_key: ResultPlotData(label=result_key, marker="o")},
+            title=f"{result_key} vs {swept_parameter}",
+            xlabel=swept_parameter,
+            ylabel=result_key,
+        )
+        figure_file_path = figures_directory_path / f"{result_key}.{file_format}"
+        figure.savefig(figure_file_path)
+        figure_file_paths.append(figure_file_path)
+
+    return figure_file_paths
+
+
+def _render_waveform_sweep_task(
+        simulation_type: SimulationType,
+        output_directory_path: Path,
+        run_name: str,
+        swept_parameter: str,
+        waveform_fields: tuple[str, ...],
+        figures_directory_path: Path,
+        file_format: str,
+) -> list[Path]:
+    from .dataset import open_simulation_output_dataset
+
+    dataset = open_simulation_output_dataset(
+        output_directory_path=output_directory_path,
+        simulation_type=simulation_type,
+        # Stores only the point being drawn, whose waveform is shared by its fields when it has to be loaded
+        cache_size=1,
+    )
+    renderer = VerticalSubplotsRenderer(num_subplots=len(waveform_fields))
+    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+
+    figures_directory_path.mkdir(parents=True, exist_ok=True)
+
+    figure_file_paths = []
+    for entry in dataset.select(run_name=run_name, swept_parameter=swept_parameter):
+        # Only the pyramid level matching the figure width is drawn, and the waveform is only loaded when it is
+        # too short for even the finest level to fill the figure
+        pyramid = dataset.load_pyramid(entry)
+        subplots_data = []
+        for i, field in enumerate(waveform_fields):
+            xdata, ydata = get_pyramid_envelope(
+                pyramid=pyramid,
+                field=field,
+                num_pixels=renderer.num_pixels,
+                waveform_data=functools.partial(dataset.load, entry),
+            )
+            subplots_data.append(SubplotData(
+                title=f"{run_name} {swept_parameter} {entry.index}",
+                label=field,
+                ylabel=field,
+                color=colors[i % len(colors)],
+                xdata=xdata,
+                ydata=ydata,
+                xlabel=TIME_FIELD_NAME if i == len(waveform_fields) - 1 else None,
+            ))
+
+        renderer.render(subplots_data)
+        figure_file_path = figures_directory_path / f"{entry.index}.{file_format}"
+        renderer.save(figure_file_path)
+        figure_file_paths.append(figure_file_path)
+
+    return figure_file_paths
+
+
+# --------------------------------------------------
+#   Variables
+# --------------------------------------------------
+
+default_waveform_plot_fields = {
+    SimulationType.DOUBLE_PULSE_TEST.value: (DUT_DRAIN_SOURCE_VOLTAGE_FIELD_NAME, DUT_DRAIN_CURRENT_FIELD_NAME),
+    SimulationType.BUCK_CONVERTER.value: (SUPPLY_VOLTAGE_FIELD_NAME, LOAD_VOLTAGE_FIELD_FIELD_NAME),
+}
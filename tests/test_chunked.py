@@ -0,0 +1,104 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from switchsim.analysis import *
+from switchsim.chunked import *
+from switchsim.fields import *
+from switchsim.spice import *
+
+
+def _get_double_pulse_test_parameters() -> DoublePulseTestParameters:
+    return DoublePulseTestParameters(
+        leading_duration=5e-6,
+        lagging_duration=5e-6,
+        load_supply_voltage=400,
+        load_test_current=4,
+        first_pulse_duration=50e-6,
+        second_pulse_duration=5e-6,
+        off_duration=5e-6,
+        on_gate_resistance=10,
+        dut_case_temperature=25,
+    )
+
+
+def _get_buck_converter_parameters() -> BuckConverterParameters:
+    return BuckConverterParameters(
+        supply_input_voltage=48,
+        load_current=2,
+        current_ripple=0.2,
+        voltage_ripple=0.01,
+        dut_case_temperature=25,
+        switching_frequency=100e3,
+        duty_cycle=0.25,
+        duration=1e-3,
+    )
+
+
+def _get_waveform_data(duration: float, num_points: int) -> pd.DataFrame:
+    # Irregular time steps, as LTspice writes them
+    rng = np.random.default_rng(0)
+    time = np.sort(rng.random(num_points)) * duration
+    return pd.DataFrame({
+        TIME_FIELD_NAME: time,
+        DUT_DRAIN_SOURCE_ENERGY_FIELD_NAME: rng.random(num_points) * 1e-9,
+        SUPPLY_VOLTAGE_FIELD_NAME: 48 + rng.standard_normal(num_points),
+        SUPPLY_CURRENT_FIELD_NAME: 0.5 + 0.1 * rng.standard_normal(num_points),
+        LOAD_CURRENT_FIELD_FIELD_NAME: 2 + 0.1 * rng.standard_normal(num_points),
+    })
+
+
+def _get_chunks(waveform_data: pd.DataFrame, chunk_size: int) -> list[pd.DataFrame]:
+    return [waveform_data.iloc[start:start + chunk_size] for start in range(0, len(waveform_data), chunk_size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 997, 10_000, 50_000])
+@pytest.mark.parametrize(
+    "simulation_type, input_parameters",
+    [
+        (SimulationType.DOUBLE_PULSE_TEST, _get_double_pulse_test_parameters()),
+        (SimulationType.BUCK_CONVERTER, _get_buck_converter_parameters()),
+    ],
+)
+def test_chunked_results_match_whole_waveform(simulation_type, input_parameters, chunk_size):
+    waveform_data = _get_waveform_data(input_parameters.duration, 20_000)
+    result_getters = simulation_type_result_getters[simulation_type.value]
+    selected_results = list(result_getters)
+
+    chunked_results = analyse_waveform_chunks(
+        simulation_type=simulation_type,
+        chunks=_get_chunks(waveform_data, chunk_size),
+        input_parameters=input_parameters,
+        selected_results=selected_results,
+    )
+
+    for result_key in selected_results:
+        whole_result = result_getters[result_key](input_data=waveform_data, input_parameters=input_parameters)
+        assert math.isclose(chunked_results[result_key], whole_result, rel_tol=1e-12), result_key
+
+
+def test_chunked_results_of_empty_window():
+    input_parameters = _get_double_pulse_test_parameters()
+    # The waveform ends before the second pulse, so the turn-on window is empty
+    waveform_data = _get_waveform_data(input_parameters.second_pulse_start / 2, 1_000)
+
+    chunked_results = analyse_waveform_chunks(
+        simulation_type=SimulationType.DOUBLE_PULSE_TEST,
+        chunks=_get_chunks(waveform_data, 100),
+        input_parameters=input_parameters,
+        selected_results=["turn_on_loss", NUM_SAMPLES_RESULT_KEY],
+    )
+
+    assert chunked_results == {"turn_on_loss": 0.0, NUM_SAMPLES_RESULT_KEY: 1_000.0}
+
+
+def test_unknown_result():
+    with pytest.raises(KeyError):
+        analyse_waveform_chunks(
+            simulation_type=SimulationType.DOUBLE_PULSE_TEST,
+            chunks=[],
+            input_parameters=_get_double_pulse_test_parameters(),
+            selected_results=["power_efficiency"],
+        )
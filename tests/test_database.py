@@ -0,0 +1,73 @@
+import dataclasses
+
+import numpy as np
+import pandas as pd
+
+from switchsim.database import *
+from switchsim.fields import *
+from switchsim.simulation import *
+from switchsim.spice import *
+from switchsim.utils import *
+
+
+DEFAULT_PARAMETERS = DoublePulseTestParameters(
+    leading_duration=5e-6,
+    lagging_duration=5e-6,
+    load_supply_voltage=400.0,
+    load_test_current=4.0,
+    first_pulse_duration=50e-6,
+    second_pulse_duration=5e-6,
+    off_duration=5e-6,
+    on_gate_resistance=10.0,
+    dut_case_temperature=25.0,
+)
+
+
+def test_point_indices_follow_the_manifest(tmp_path):
+    # The point at index 1 failed, so the results rows skip it
+    output_directory_path = tmp_path / "outputs"
+    waveform_data = pd.DataFrame({"time": np.linspace(0, 1, 8), "dut_drain_current": np.ones(8)})
+    manifest_entries = []
+    per_parameter_results_rows = []
+    for index in (0, 2, 3):
+        parameters = dataclasses.replace(DEFAULT_PARAMETERS, load_test_current=float(index))
+        manifest_entries.append(save_simulation_point_output(
+            output_directory_path=output_directory_path,
+            run_name="a",
+            swept_parameter="load_test_current",
+            index=index,
+            used_parameters=parameters,
+            simulation_outputs=waveform_data,
+        ))
+        per_parameter_results_rows.append({
+            **dataclasses.asdict(parameters),
+            POINT_HASH_FIELD_NAME: dataclass_hash(parameters),
+            "turn_on_loss": float(index),
+        })
+    update_simulation_manifest(output_directory_path, manifest_entries)
+
+    save_simulation_results(
+        per_run_results={"a": {"load_test_current": pd.DataFrame(per_parameter_results_rows)}},
+        output_directory_path=tmp_path / "results",
+        simulation_output_directory_path=output_directory_path,
+    )
+
+    point_results = load_point_results(tmp_path / "results")
+    assert point_results["point_index"].tolist() == [0, 2, 3]
+    assert point_results["output_location"].tolist() == [f"a/load_test_current/{index}" for index in (0, 2, 3)]
+    assert point_results["turn_on_loss"].tolist() == [0.0, 2.0, 3.0]
+
+
+def test_point_indices_default_to_row_positions(tmp_path):
+    results = pd.DataFrame([
+        {"load_test_current": 1.0, "turn_on_loss": 2.0},
+        {"load_test_current": 3.0, "turn_on_loss": 4.0},
+    ])
+
+    write_results_database(
+        database_file_path=tmp_path / RESULTS_DATABASE_FILE_NAME,
+        per_run_results={"a": {"load_test_current": results}},
+        result_keys=["turn_on_loss"],
+    )
+
+    assert load_point_results(tmp_path)["point_index"].tolist() == [0, 1]
@@ -0,0 +1,68 @@
+import os
+import time
+
+from switchsim.distributed import *
+
+
+def _expire_leases(queue: DirectoryJobQueue) -> None:
+    expired_time = time.time() - 2 * DEFAULT_LEASE_TIMEOUT
+    for leased_job_file_path in queue.leased_directory_path.glob("*.json"):
+        os.utime(leased_job_file_path, (expired_time, expired_time))
+
+
+def _get_queue(tmp_path) -> tuple[DirectoryJobQueue, str]:
+    queue = DirectoryJobQueue(tmp_path)
+    queue.create()
+    job_id = queue.submit("submission", 0, {"targets": []})
+    return queue, job_id
+
+
+def test_expired_lease_is_requeued(tmp_path):
+    queue, job_id = _get_queue(tmp_path)
+    job_data = queue.claim("worker-a")
+
+    assert queue.requeue_expired() == []
+    _expire_leases(queue)
+    assert queue.requeue_expired(max_attempts=2) == [job_id]
+
+    # The worker whose lease expired can no longer settle the job
+    assert not queue.heartbeat(job_id, job_data["lease_token"])
+    assert not queue.complete(job_id, job_data["lease_token"])
+
+    [pending_job_data] = queue.get_jobs("pending")
+    assert pending_job_data["attempts"] == 1
+    assert "lease expired" in pending_job_data["error"]
+
+
+def test_expired_lease_fails_after_max_attempts(tmp_path):
+    queue, job_id = _get_queue(tmp_path)
+
+    for _ in range(2):
+        queue.claim("worker-a")
+        _expire_leases(queue)
+        queue.requeue_expired(max_attempts=2)
+
+    assert queue.get_counts() == {"pending": 0, "leased": 0, "done": 0, "failed": 1}
+    [failed_job_data] = queue.get_jobs("failed")
+    assert failed_job_data["job_id"] == job_id
+    assert failed_job_data["attempts"] == 2
+
+
+def test_failed_job_is_retried_until_max_attempts(tmp_path):
+    queue, job_id = _get_queue(tmp_path)
+
+    for attempt in range(1, 4):
+        job_data = queue.claim("worker-a")
+        assert job_data["attempts"] == attempt
+        assert queue.fail(job_id, job_data["lease_token"], "error", max_attempts=3)
+
+    assert queue.claim("worker-a") is None
+    assert queue.get_counts()["failed"] == 1
+
+
+def test_completed_job(tmp_path):
+    queue, job_id = _get_queue(tmp_path)
+    job_data = queue.claim("worker-a")
+
+    assert queue.complete(job_id, job_data["lease_token"])
+    assert queue.get_counts() == {"pending": 0, "leased": 0, "done": 1, "failed": 0}
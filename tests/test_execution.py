@@ -0,0 +1,96 @@
+import sys
+import functools
+from pathlib import Path
+
+import numpy as np
+
+from switchsim import execution
+from switchsim import spice
+from switchsim.execution import *
+
+
+END_TIME = 1e-6
+
+
+def _write_raw_file(file_path, num_points: int, num_written_points: int) -> None:
+    # A binary .raw whose header announces num_points, of which only the first num_written_points were written, as
+    # LTspice leaves it when it aborts a transient
+    header_lines = [
+        "Title: * test.asc",
+        "Plotname: Transient Analysis",
+        "Flags: real forward",
+        "No. Variables: 2",
+        f"No. Points: {num_points:>12}",
+        "Variables:",
+        "\t0\ttime\ttime",
+        "\t1\tV(out)\tvoltage",
+        "Binary:",
+    ]
+    points = np.zeros(num_points, dtype=np.dtype([("time", np.float64), ("value", np.float32)]))
+    points["time"] = np.linspace(0.0, END_TIME, num_points)
+    with open(file_path, "wb") as file:
+        file.write(("\n".join(header_lines) + "\n").encode("utf-16-le"))
+        file.write(points[:num_written_points].tobytes())
+
+
+def _classify_attempt(tmp_path, log_text: str, num_written_points: int, return_code: int = 0):
+    output_file_path = tmp_path / "test.raw"
+    log_file_path = tmp_path / "test.log"
+    _write_raw_file(output_file_path, 100, num_written_points)
+    log_file_path.write_text(log_text)
+
+    return execution._classify_attempt(
+        return_code=return_code,
+        timed_out=False,
+        output_file_path=output_file_path,
+        log_file_path=log_file_path,
+        execution_policy=ExecutionPolicyData(),
+        validate_output=functools.partial(spice._validate_raw_end_time, end_time=END_TIME),
+    )
+
+
+def test_complete_run(tmp_path):
+    assert _classify_attempt(tmp_path, "Total elapsed time: 1 seconds.\n", 100) == (None, None)
+
+
+def test_partial_run_with_failure_in_log(tmp_path):
+    # LTspice exits with 0 when it aborts a transient, so only the log tells the failure apart
+    failure_type, _ = _classify_attempt(tmp_path, "Time step too small; time = 5e-07\n", 50)
+
+    assert failure_type == SimulationFailureType.TIMESTEP_TOO_SMALL
+
+
+def test_partial_run_with_clean_log(tmp_path):
+    failure_type, failure_message = _classify_attempt(tmp_path, "Total elapsed time: 1 seconds.\n", 50)
+
+    assert failure_type == SimulationFailureType.MISSING_OUTPUT
+    assert "before the" in failure_message
+
+
+def test_recovered_convergence_is_not_a_failure(tmp_path):
+    log_text = "Gmin stepping failed\nSource stepping succeeded\n"
+
+    assert _classify_attempt(tmp_path, log_text, 100) == (None, None)
+
+
+def test_partial_run_is_retried(tmp_path):
+    output_file_path = tmp_path / "test.raw"
+    log_file_path = tmp_path / "test.log"
+    script = (
+        "import sys\n"
+        "sys.path.insert(0, sys.argv[1])\n"
+        "from test_execution import _write_raw_file\n"
+        "_write_raw_file(sys.argv[2], 100, 50)\n"
+    )
+
+    execution_result = execute_with_retries(
+        argv=[sys.executable, "-c", script, str(Path(__file__).parent), str(output_file_path)],
+        output_file_path=output_file_path,
+        log_file_path=log_file_path,
+        execution_policy=ExecutionPolicyData(max_retries=2, backoff=0.0),
+        validate_output=functools.partial(spice._validate_raw_end_time, end_time=END_TIME),
+    )
+
+    assert execution_result.failure_type == SimulationFailureType.MISSING_OUTPUT
+    assert execution_result.attempts == 3
+    assert execution_result.return_code == 0
@@ -0,0 +1,46 @@
+import json
+import math
+
+from switchsim import montecarlo
+from switchsim.montecarlo import *
+from switchsim.sampling import *
+from switchsim.streaming import *
+
+
+def _save_statistics(file_path, result_values: dict[str, list[float]]) -> dict[str, dict]:
+    result_summaries = {result_key: StreamingSummary() for result_key in result_values}
+    for result_key, values in result_values.items():
+        for value in values:
+            result_summaries[result_key].update(value)
+
+    return montecarlo._save_monte_carlo_statistics(
+        file_path=file_path,
+        run_name="run",
+        monte_carlo_data=MonteCarloData(
+            num_samples=3,
+            distributions={"on_gate_resistance": DistributionData(type=DistributionType.NORMAL, tolerance=0.1)},
+        ),
+        num_samples=3,
+        num_failed=0,
+        result_summaries=result_summaries,
+    )
+
+
+def _reject_constant(constant: str):
+    raise AssertionError(f"{constant} was written to the statistics")
+
+
+def test_statistics_of_failed_result(tmp_path):
+    file_path = tmp_path / MONTE_CARLO_STATISTICS_FILE_NAME
+
+    result_statistics = _save_statistics(file_path, {"turn_on_loss": [1.0, 2.0, 3.0], "turn_off_loss": [math.nan] * 3})
+
+    # The file is strict JSON, which has no NaN literal
+    with open(file_path, "r") as json_file:
+        statistics = json.load(json_file, parse_constant=_reject_constant)
+    assert statistics["results"]["turn_on_loss"]["mean"] == 2.0
+    assert statistics["results"]["turn_off_loss"]["nan_count"] == 3
+    assert statistics["results"]["turn_off_loss"]["mean"] is None
+    assert statistics["results"]["turn_off_loss"]["min"] is None
+    # The returned statistics keep their NaN values
+    assert math.isnan(result_statistics["turn_off_loss"]["mean"])
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from switchsim.analysis import *
+from switchsim.chunked import *
+from switchsim.fields import *
+from switchsim.simulation import *
+from switchsim.spice import *
+
+
+INPUT_PARAMETERS = DoublePulseTestParameters(
+    leading_duration=5e-6,
+    lagging_duration=5e-6,
+    load_supply_voltage=400,
+    load_test_current=4,
+    first_pulse_duration=50e-6,
+    second_pulse_duration=5e-6,
+    off_duration=5e-6,
+    on_gate_resistance=10,
+    dut_case_temperature=25,
+)
+
+# Stores the start of a transient windowed for the turn-on loss alone, which is after the turn-off window's start
+TRANSIENT_START_TIME = get_analysis_start_time(SimulationType.DOUBLE_PULSE_TEST, INPUT_PARAMETERS, ["turn_on_loss"])
+
+
+def _get_windowed_waveform_data() -> pd.DataFrame:
+    time = np.linspace(TRANSIENT_START_TIME, INPUT_PARAMETERS.duration, 1_000)
+    waveform_data = pd.DataFrame({
+        TIME_FIELD_NAME: time,
+        DUT_DRAIN_SOURCE_ENERGY_FIELD_NAME: np.full(len(time), 1e-9),
+    })
+    waveform_data.attrs[TRANSIENT_START_TIME_ATTRS_KEY] = TRANSIENT_START_TIME
+    return waveform_data
+
+
+def _get_windowed_chunk_source() -> WaveformChunkSourceData:
+    waveform_data = _get_windowed_waveform_data()
+    return WaveformChunkSourceData(
+        open_chunks=lambda: iter([waveform_data.iloc[:500], waveform_data.iloc[500:]]),
+        transient_start_time=TRANSIENT_START_TIME,
+    )
+
+
+def _process(output_data, selected_results: list[str]) -> pd.DataFrame:
+    per_run_results = process_simulation_outputs(
+        per_run_outputs={"run": {"max_timestep": [(INPUT_PARAMETERS, output_data)]}},
+        selected_results=selected_results,
+        simulation_type=SimulationType.DOUBLE_PULSE_TEST,
+    )
+    return per_run_results["run"]["max_timestep"]
+
+
+@pytest.mark.parametrize("get_output_data", [_get_windowed_waveform_data, _get_windowed_chunk_source])
+def test_results_within_the_window(get_output_data):
+    parameter_results = _process(get_output_data(), ["turn_on_loss", NUM_SAMPLES_RESULT_KEY])
+
+    assert parameter_results["turn_on_loss"].iloc[0] > 0
+    assert parameter_results[NUM_SAMPLES_RESULT_KEY].iloc[0] == 1_000
+
+
+@pytest.mark.parametrize("get_output_data", [_get_windowed_waveform_data, _get_windowed_chunk_source])
+def test_results_before_the_window(get_output_data):
+    with pytest.raises(ValueError, match="turn_off_loss"):
+        _process(get_output_data(), ["turn_on_loss", "turn_off_loss"])
+
+
+def test_results_of_unwindowed_waveform():
+    # A waveform with no recorded start is trusted to hold the whole transient
+    waveform_data = _get_windowed_waveform_data()
+    waveform_data.attrs.clear()
+
+    parameter_results = _process(waveform_data, ["turn_off_loss"])
+
+    assert parameter_results["turn_off_loss"].iloc[0] > 0
@@ -0,0 +1,148 @@
+import re
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from switchsim import spice
+from switchsim.spice import *
+
+
+SCHEMATIC_TEXT = (
+    "Version 4\n"
+    "SHEET 1 880 680\n"
+    "TEXT -480 -80 Left 2 !.tran 0 {duration} 0 {max_timestep}\n"
+    r"TEXT -480 56 Left 2 !.param max_timestep=100n\n.param leading_duration=5u\n.param lagging_duration=5u"
+    r"\n.param first_pulse_duration=50u\n.param second_pulse_duration=5u\n.param off_duration=5u" "\n"
+    r"TEXT 664 -24 Left 2 !.param first_pulse_start=leading_duration"
+    r"\n.param second_pulse_start=leading_duration + first_pulse_duration + off_duration"
+    r"\n.param duration=second_pulse_start + second_pulse_duration + lagging_duration" "\n"
+)
+
+NETLIST_TEXT = (
+    "* s.asc\n"
+    ".tran 0 {duration} 0 {max_timestep}\n"
+    ".param max_timestep=100n\n"
+    ".param leading_duration=5u\n"
+    ".param lagging_duration=5u\n"
+    ".param first_pulse_duration=50u\n"
+    ".param second_pulse_duration=5u\n"
+    ".param off_duration=5u\n"
+    ".param first_pulse_start=leading_duration\n"
+    ".param second_pulse_start=leading_duration + first_pulse_duration + off_duration\n"
+    ".param duration=second_pulse_start + second_pulse_duration + lagging_duration\n"
+    ".end\n"
+)
+
+PARAMS_TO_MODIFY = {
+    "max_timestep": 2e-9,
+    "leading_duration": 1e-6,
+    "lagging_duration": 2e-6,
+    "first_pulse_duration": 3e-5,
+    "second_pulse_duration": 4e-6,
+    "off_duration": 6e-6,
+    # Derived values, which both files compute with expressions
+    "first_pulse_start": 1e-6,
+    "second_pulse_start": 3.7e-5,
+    "duration": 4.3e-5,
+}
+
+
+def _get_param_values(text: str) -> dict[str, str]:
+    return dict(re.findall(r"\.param (\w+)=([^\\\n]+)", text))
+
+
+def test_netlist_and_schematic_params_match(tmp_path):
+    schematic_file_path = tmp_path / "s.asc"
+    schematic_file_path.write_text(SCHEMATIC_TEXT)
+    content_hash = hashlib.sha256(schematic_file_path.read_bytes()).hexdigest()[:16]
+    netlist_file_path = tmp_path / f"s.{content_hash}.net"
+    netlist_file_path.write_text(NETLIST_TEXT)
+
+    modify_ltspice_params(str(schematic_file_path), str(tmp_path / "point.asc"), PARAMS_TO_MODIFY)
+    modify_ltspice_netlist_params(str(netlist_file_path), str(tmp_path / "point.net"), PARAMS_TO_MODIFY)
+
+    schematic_values = _get_param_values((tmp_path / "point.asc").read_text())
+    netlist_values = _get_param_values((tmp_path / "point.net").read_text())
+    assert schematic_values == netlist_values
+    assert netlist_values["max_timestep"] == "2e-09"
+    assert netlist_values["duration"] == "second_pulse_start + second_pulse_duration + lagging_duration"
+
+
+def test_standalone_netlist_params_are_all_replaced(tmp_path):
+    netlist_file_path = tmp_path / "standalone.net"
+    netlist_file_path.write_text(NETLIST_TEXT)
+
+    modify_ltspice_netlist_params(str(netlist_file_path), str(tmp_path / "point.net"), PARAMS_TO_MODIFY)
+
+    netlist_values = _get_param_values((tmp_path / "point.net").read_text())
+    assert netlist_values == {param: str(value) for param, value in PARAMS_TO_MODIFY.items()}
+
+
+def _write_raw_file(file_path, num_points: int) -> None:
+    variable_names = ["time", "V(dut_gate_voltage)", "V(dut_drain_voltage)", "Ix(dut:D)"]
+    header_lines = [
+        "Title: * test.asc",
+        "Plotname: Transient Analysis",
+        "Flags: real forward",
+        f"No. Variables: {len(variable_names)}",
+        f"No. Points: {num_points:>12}",
+        "Variables:",
+        *(f"\t{i}\t{name}\t{'time' if i == 0 else 'voltage'}" for i, name in enumerate(variable_names)),
+        "Binary:",
+    ]
+    rng = np.random.default_rng(0)
+    point_dtype = np.dtype([("time", np.float64)] + [(name, np.float32) for name in variable_names[1:]])
+    points = np.zeros(num_points, dtype=point_dtype)
+    points["time"] = np.cumsum(rng.random(num_points)) * 1e-9
+    for name in variable_names[1:]:
+        points[name] = rng.random(num_points)
+    with open(file_path, "wb") as file:
+        file.write(("\n".join(header_lines) + "\n").encode("utf-16-le"))
+        file.write(points.tobytes())
+
+
+def test_raw_header_is_parsed_once(tmp_path, monkeypatch):
+    raw_waveform_file_path = tmp_path / "test.raw"
+    _write_raw_file(raw_waveform_file_path, 1_000)
+    field_mapping = DoublePulseTestOutputFields(
+        dut_gate_voltage="V(dut_gate_voltage)",
+        dut_drain_voltage="V(dut_drain_voltage)",
+        dut_drain_current=["Ix(dut:D)"],
+    )
+    simulation_type = SimulationType.DOUBLE_PULSE_TEST
+    whole_waveform_data = read_ltspice_output(simulation_type, str(raw_waveform_file_path), field_mapping)
+
+    num_header_reads = 0
+    read_ltspice_raw_header = spice.read_ltspice_raw_header
+
+    def count_header_reads(file_path):
+        nonlocal num_header_reads
+        num_header_reads += 1
+        return read_ltspice_raw_header(file_path)
+
+    monkeypatch.setattr(spice, "read_ltspice_raw_header", count_header_reads)
+
+    header = spice.read_ltspice_raw_header(raw_waveform_file_path)
+    read_plan = get_waveform_read_plan(
+        source_file_path=tmp_path / "test.asc",
+        simulation_type=simulation_type,
+        field_mapping=field_mapping,
+        raw_waveform_file_path=raw_waveform_file_path,
+        header=header,
+    )
+    waveform_data = read_ltspice_output(
+        simulation_type, str(raw_waveform_file_path), field_mapping, read_plan=read_plan, header=header,
+    )
+    chunks = list(iter_ltspice_output_chunks(
+        simulation_type,
+        str(raw_waveform_file_path),
+        field_mapping,
+        chunk_size=300,
+        read_plan=read_plan,
+        header=header,
+    ))
+
+    assert num_header_reads == 1
+    pd.testing.assert_frame_equal(waveform_data, whole_waveform_data)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), whole_waveform_data)
@@ -0,0 +1,69 @@
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+
+from switchsim import storage
+from switchsim.storage import *
+
+
+def _get_waveform_data(num_points: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "time": np.cumsum(rng.random(num_points)),
+        "time_differentials": np.full(num_points, 1e-9),
+        "dut_drain_voltage": rng.standard_normal(num_points),
+        "dut_drain_current": np.sin(np.arange(num_points) / 100),
+    })
+
+
+def test_roundtrip(tmp_path):
+    waveform_data = _get_waveform_data(3 * STORAGE_BLOCK_SIZE + 17)
+
+    save_compressed_waveform(waveform_data, tmp_path / "output.swz", shared_directory_path=tmp_path)
+
+    assert load_compressed_waveform(tmp_path / "output.swz").equals(waveform_data)
+    assert list(tmp_path.glob(f"{SHARED_COLUMN_FILE_PREFIX}*"))
+
+
+def test_streamed_roundtrip(tmp_path):
+    waveform_data = _get_waveform_data(2 * STORAGE_BLOCK_SIZE + 5)
+    chunks = [waveform_data.iloc[start:start + 10007] for start in range(0, len(waveform_data), 10007)]
+
+    save_compressed_waveform(chunks, tmp_path / "streamed.swz", shared_directory_path=tmp_path)
+    save_compressed_waveform(waveform_data, tmp_path / "whole.swz", shared_directory_path=tmp_path)
+
+    assert (tmp_path / "streamed.swz").read_bytes() == (tmp_path / "whole.swz").read_bytes()
+    streamed_data = pd.concat(iter_compressed_waveform_chunks(tmp_path / "streamed.swz", 4099), ignore_index=True)
+    assert streamed_data.equals(waveform_data)
+
+
+def test_empty_roundtrip(tmp_path):
+    waveform_data = _get_waveform_data(0)
+
+    save_compressed_waveform(waveform_data, tmp_path / "output.swz")
+
+    loaded_data = load_compressed_waveform(tmp_path / "output.swz")
+    assert list(loaded_data.columns) == list(waveform_data.columns)
+    assert len(loaded_data) == 0
+
+
+def test_single_block_file(tmp_path):
+    # Files written before the columns were split into blocks hold one block per column and no block sizes
+    waveform_data = _get_waveform_data(STORAGE_BLOCK_SIZE + 3)
+    columns = []
+    payloads = []
+    for column in waveform_data.columns:
+        values = waveform_data[column].to_numpy()
+        payload = storage._encode_block(values, "xor")
+        columns.append({"name": column, "dtype": values.dtype.str, "encoding": "xor", "size": len(payload)})
+        payloads.append(payload)
+    header_bytes = json.dumps({"num_points": len(waveform_data), "columns": columns}).encode("utf-8")
+    (tmp_path / "output.swz").write_bytes(
+        storage.COMPRESSED_WAVEFORM_MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes + b"".join(payloads)
+    )
+
+    assert load_compressed_waveform(tmp_path / "output.swz").equals(waveform_data)
+    streamed_data = pd.concat(iter_compressed_waveform_chunks(tmp_path / "output.swz", 1000), ignore_index=True)
+    assert streamed_data.equals(waveform_data)